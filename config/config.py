@@ -8,7 +8,33 @@ KAFKA_CONFIG = {
         'temperature': 'temperature_data',
         'humidity': 'humidity_data',
         'motion': 'motion_data'
-    }
+    },
+    # Wire format per topic: json (fallback) or binary; consumers auto-detect
+    'encodings': {
+        'temperature': os.getenv('KAFKA_ENCODING_TEMPERATURE', 'json'),
+        'humidity': os.getenv('KAFKA_ENCODING_HUMIDITY', 'json'),
+        'motion': os.getenv('KAFKA_ENCODING_MOTION', 'json')
+    },
+    # Batch consumption: messages per consume() call and its timeout (seconds)
+    'consume_batch_size': int(os.getenv('KAFKA_CONSUME_BATCH_SIZE', '1000')),
+    'consume_timeout': float(os.getenv('KAFKA_CONSUME_TIMEOUT', '1.0')),
+    # librdkafka fetch tuning passed straight to the Consumer
+    'consumer': {
+        'fetch.min.bytes': int(os.getenv('KAFKA_FETCH_MIN_BYTES', '65536')),
+        'fetch.wait.max.ms': int(os.getenv('KAFKA_FETCH_WAIT_MAX_MS', '100')),
+        'queued.max.messages.kbytes': int(os.getenv('KAFKA_QUEUED_MAX_MESSAGES_KBYTES', '65536'))
+    },
+    # librdkafka producer tuning for the sensor gateway
+    'producer': {
+        'linger.ms': int(os.getenv('KAFKA_LINGER_MS', '20')),
+        'batch.size': int(os.getenv('KAFKA_BATCH_SIZE_BYTES', '1048576')),
+        'compression.type': os.getenv('KAFKA_COMPRESSION', 'lz4'),  # lz4 or zstd
+        'acks': os.getenv('KAFKA_ACKS', 'all'),
+        'enable.idempotence': True,
+        'queue.buffering.max.messages': int(os.getenv('KAFKA_PRODUCER_QUEUE_MESSAGES', '100000'))
+    },
+    # Binary frames are split into this many sensor-id key groups
+    'frame_key_groups': int(os.getenv('KAFKA_FRAME_KEY_GROUPS', '16'))
 }
 
 # PostgreSQL Configuration
@@ -46,6 +72,36 @@ SENSOR_CONFIG = {
     'motion_probability': 0.2  # 20% chance of motion detection
 }
 
+# Pipeline Configuration
+PIPELINE_CONFIG = {
+    'queue_capacity': int(os.getenv('PIPELINE_QUEUE_CAPACITY', '1000')),
+    # One of: block, drop_oldest, drop_priority, coalesce
+    'overflow_policy': os.getenv('PIPELINE_OVERFLOW_POLICY', 'coalesce'),
+    'batch_size': int(os.getenv('PIPELINE_BATCH_SIZE', '500')),
+    # Higher priority readings are kept longer under drop_priority
+    'type_priorities': {
+        'motion': 2,
+        'temperature': 1,
+        'humidity': 0
+    }
+}
+
+# Storage Configuration
+STORAGE_CONFIG = {
+    # One of: postgres, influxdb, parquet
+    'backend': os.getenv('STORAGE_BACKEND', 'postgres'),
+    'parquet_path': os.getenv('PARQUET_PATH', 'data/parquet'),
+    'parquet_flush_rows': int(os.getenv('PARQUET_FLUSH_ROWS', '100000'))
+}
+
+# Cold-tier Archive Configuration
+ARCHIVE_CONFIG = {
+    'path': os.getenv('ARCHIVE_PATH', 'data/archive'),
+    # Partitions are archived once they are older than this many months
+    'keep_months': int(os.getenv('ARCHIVE_KEEP_MONTHS', '3')),
+    'compression': os.getenv('ARCHIVE_COMPRESSION', 'zstd')
+}
+
 # Alert Thresholds
 ALERT_THRESHOLDS = {
     'temperature_high': float(os.getenv('TEMP_HIGH_THRESHOLD', '28.0')),
@@ -54,6 +110,134 @@ ALERT_THRESHOLDS = {
     'humidity_low': float(os.getenv('HUMIDITY_LOW_THRESHOLD', '35.0'))
 }
 
+# Streaming Alert Engine Configuration
+ALERT_ENGINE_CONFIG = {
+    # A breach ends once the value is back past the threshold by this margin
+    'hysteresis': {
+        'temperature': float(os.getenv('TEMP_ALERT_HYSTERESIS', '0.5')),
+        'humidity': float(os.getenv('HUMIDITY_ALERT_HYSTERESIS', '2.0'))
+    },
+    # A breach must last this long before it raises an alert
+    'min_duration_seconds': float(os.getenv('ALERT_MIN_DURATION', '30')),
+    # At most one alert per sensor and rule within this window
+    'cooldown_seconds': float(os.getenv('ALERT_COOLDOWN', '600'))
+}
+
+# Streaming Anomaly Detection Configuration
+ANOMALY_CONFIG = {
+    'alpha': float(os.getenv('ANOMALY_EWMA_ALPHA', '0.05')),  # EWMA smoothing factor
+    'z_threshold': float(os.getenv('ANOMALY_Z_THRESHOLD', '4.0')),
+    'warmup': int(os.getenv('ANOMALY_WARMUP_READINGS', '30')),
+    # Standard deviation floor per sensor type
+    'min_std': {
+        'temperature': 0.1,
+        'humidity': 0.5
+    },
+    'sensor_types': ('temperature', 'humidity')
+}
+
+# Sensor Liveness Configuration
+LIVENESS_CONFIG = {
+    # Seconds without a reading after which a sensor is marked stale
+    'timeouts': {
+        'temperature': float(os.getenv('TEMP_STALE_TIMEOUT', '60')),
+        'humidity': float(os.getenv('HUMIDITY_STALE_TIMEOUT', '60')),
+        'motion': float(os.getenv('MOTION_STALE_TIMEOUT', '120'))
+    },
+    'default_timeout': float(os.getenv('SENSOR_STALE_TIMEOUT', '60')),
+    'tick_seconds': float(os.getenv('LIVENESS_TICK_SECONDS', '1.0'))
+}
+
+# Occupancy Sessionization Configuration
+OCCUPANCY_CONFIG = {
+    # Motion within this many seconds of an interval's end continues it
+    'merge_gap_seconds': float(os.getenv('OCCUPANCY_MERGE_GAP', '30')),
+    # Open intervals of sensors silent this long are closed at their last reading
+    'idle_timeout_seconds': float(os.getenv('OCCUPANCY_IDLE_TIMEOUT', '300'))
+}
+
+# Quantile Sketch Configuration
+SKETCH_CONFIG = {
+    # Percentiles from the sketches are within this relative error
+    'relative_accuracy': float(os.getenv('SKETCH_RELATIVE_ACCURACY', '0.01')),
+    'window_seconds': float(os.getenv('SKETCH_WINDOW_SECONDS', '60')),
+    # A window is stored once readings this far past its end have arrived
+    'allowed_lateness_seconds': float(os.getenv('SKETCH_ALLOWED_LATENESS', '30')),
+    'sensor_types': ('temperature', 'humidity')
+}
+
+# Location Aggregate Configuration
+LOCATION_AGGREGATE_CONFIG = {
+    # Name of the home-level rollup over all locations
+    'home': os.getenv('HOME_NAME', 'home'),
+    'window_seconds': float(os.getenv('LOCATION_WINDOW_SECONDS', '300')),
+    'allowed_lateness_seconds': float(os.getenv('LOCATION_ALLOWED_LATENESS', '30'))
+}
+
+# Shared-Memory Hot Window Configuration
+HOT_WINDOW_CONFIG = {
+    'enabled': os.getenv('HOT_WINDOW_ENABLED', 'true').lower() == 'true',
+    'name': os.getenv('HOT_WINDOW_NAME', 'iot_hot_window'),
+    'max_sensors': int(os.getenv('HOT_WINDOW_MAX_SENSORS', '1024')),
+    # Readings kept per sensor; 600 covers 10 minutes at one reading per second
+    'slots': int(os.getenv('HOT_WINDOW_SLOTS', '600')),
+    # Readers fall back to the database once the window has not been written for this long
+    'max_age_seconds': float(os.getenv('HOT_WINDOW_MAX_AGE', '30'))
+}
+
+# Analytics Backfill Configuration
+BACKFILL_CONFIG = {
+    'window_minutes': int(os.getenv('BACKFILL_WINDOW_MINUTES', '5')),
+    # Tasks also break at every partition bound
+    'task_hours': int(os.getenv('BACKFILL_TASK_HOURS', '24')),
+    # 0 uses one worker per CPU
+    'workers': int(os.getenv('BACKFILL_WORKERS', '0')),
+    'checkpoint_path': os.getenv('BACKFILL_CHECKPOINT_PATH', 'data/backfill_checkpoint.json')
+}
+
+# PostgreSQL Ingest Configuration
+INGEST_CONFIG = {
+    # prepared: one EXECUTE of a prepared unnest INSERT per batch and sensor type;
+    # row: one INSERT and commit per reading
+    'insert_mode': os.getenv('INGEST_INSERT_MODE', 'prepared'),
+    # strict: synchronous commit; relaxed: synchronous_commit off, a crash may
+    # lose the last few hundred ms; staged: relaxed COPY into an unlogged staging
+    # table merged every staging_merge_seconds (prepared insert mode only)
+    'durability': {
+        'temperature': os.getenv('INGEST_DURABILITY_TEMPERATURE', 'strict'),
+        'humidity': os.getenv('INGEST_DURABILITY_HUMIDITY', 'strict'),
+        'motion': os.getenv('INGEST_DURABILITY_MOTION', 'relaxed')
+    },
+    # strict or relaxed for the analytics session
+    'analytics_durability': os.getenv('INGEST_DURABILITY_ANALYTICS', 'relaxed'),
+    'staging_merge_seconds': float(os.getenv('INGEST_STAGING_MERGE_SECONDS', '10'))
+}
+
+# Ingest Filter Configuration
+INGEST_FILTER_CONFIG = {
+    # Stored rows become a step series, so averages over raw rows are biased
+    # once this is on; use time-weighted aggregates from src.streaming.filters
+    'enabled': os.getenv('INGEST_FILTER_ENABLED', 'false').lower() == 'true',
+    # A reading is stored when it moves past the deadband or max_interval_seconds
+    # have passed since the last stored reading; motion stores transitions only
+    'rules': {
+        'temperature': {
+            'mode': 'deadband',
+            'deadband': float(os.getenv('TEMP_DEADBAND', '0.2')),
+            'max_interval_seconds': float(os.getenv('TEMP_MAX_INTERVAL', '300'))
+        },
+        'humidity': {
+            'mode': 'deadband',
+            'deadband': float(os.getenv('HUMIDITY_DEADBAND', '1.0')),
+            'max_interval_seconds': float(os.getenv('HUMIDITY_MAX_INTERVAL', '300'))
+        },
+        'motion': {
+            'mode': 'transition',
+            'max_interval_seconds': float(os.getenv('MOTION_MAX_INTERVAL', '300'))
+        }
+    }
+}
+
 # Logging Configuration
 LOGGING_CONFIG = {
     'version': 1,
@@ -94,6 +278,19 @@ def get_config() -> Dict[str, Any]:
         'influxdb': INFLUXDB_CONFIG,
         'flink': FLINK_CONFIG,
         'sensor': SENSOR_CONFIG,
+        'pipeline': PIPELINE_CONFIG,
+        'storage': STORAGE_CONFIG,
+        'archive': ARCHIVE_CONFIG,
         'alerts': ALERT_THRESHOLDS,
+        'alert_engine': ALERT_ENGINE_CONFIG,
+        'anomaly': ANOMALY_CONFIG,
+        'liveness': LIVENESS_CONFIG,
+        'occupancy': OCCUPANCY_CONFIG,
+        'sketches': SKETCH_CONFIG,
+        'location_aggregates': LOCATION_AGGREGATE_CONFIG,
+        'hot_window': HOT_WINDOW_CONFIG,
+        'backfill': BACKFILL_CONFIG,
+        'ingest': INGEST_CONFIG,
+        'ingest_filter': INGEST_FILTER_CONFIG,
         'logging': LOGGING_CONFIG
     } 
\ No newline at end of file
@@ -9,13 +9,14 @@ Modules:
     utils: Utility functions and configuration
 """
 
-from .setup.setup_db import setup_tables
+from .setup.setup_db import setup_tables, provision
 from .tests.test_db import test_connection, test_tables, test_partitions, test_query_performance
 from .utils.db_utils import get_connection, execute_query, create_partition
 from .utils.db_config import DB_CONFIG, TABLE_SCHEMAS, INDEX_DEFINITIONS, INITIAL_SENSORS
 
 __all__ = [
     'setup_tables',
+    'provision',
     'test_connection',
     'test_tables',
     'test_partitions',
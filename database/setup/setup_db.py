@@ -1,71 +1,109 @@
-"""Main database setup module."""
+"""Main database setup module.
+
+``provision`` is the idempotent setup for large fleets. It only creates
+what is missing and never drops data, so it can be rerun at any time,
+e.g. to add the coming months' partitions or to load a new inventory:
+
+1. Missing tables, columns, partitions and partitioned parent indexes
+   are created in a single transaction.
+2. The sensor inventory (a CSV file) is COPYed into a temporary table and
+   merged into ``sensors`` with one INSERT ... ON CONFLICT.
+3. Missing indexes are built with ``CREATE INDEX CONCURRENTLY``, one per
+   partition, over several connections in parallel, and attached to
+   their partitioned parent index.
+
+``setup_tables`` drops and recreates every table.
+"""
+import argparse
+import csv
+import io
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 
 from ..utils.db_config import (
     DB_CONFIG,
     TABLE_SCHEMAS,
     INDEX_DEFINITIONS,
     INITIAL_SENSORS,
-    PARTITIONED_TABLES
+    COLUMN_MIGRATIONS,
+    PARTITIONED_TABLES,
+    UNLOGGED_TABLES
 )
-from ..utils.db_utils import get_connection, execute_query, create_partition
+from ..utils.db_utils import get_connection, execute_query, create_partition, get_month_boundaries
+
+# (index name, CREATE INDEX CONCURRENTLY statement, partitioned parent index or None)
+IndexJob = Tuple[str, str, Optional[str]]
+
+def table_definition(table_name: str, schema: str, if_not_exists: bool = False) -> str:
+    """Return the CREATE TABLE statement of a table."""
+    exists = "IF NOT EXISTS " if if_not_exists else ""
+    if table_name in PARTITIONED_TABLES:
+        return f"""
+        CREATE TABLE {exists}{table_name} (
+            {schema},
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    unlogged = "UNLOGGED " if table_name in UNLOGGED_TABLES else ""
+    return f"""
+    CREATE {unlogged}TABLE {exists}{table_name} (
+        {schema}
+    )
+    """
+
+def month_starts(start: datetime, months: int) -> List[datetime]:
+    """Return the first day of `months` consecutive months from start's month."""
+    starts = []
+    for _ in range(months):
+        month_start, start = get_month_boundaries(start)
+        starts.append(month_start)
+    return starts
+
+def split_index_definition(index_def: str) -> Tuple[str, str]:
+    """Split 'table(columns)' into the table and its column list."""
+    table, columns = index_def.split('(', 1)
+    return table.strip(), f"({columns}"
+
+def inventory_csv(sensors: Sequence[Tuple[str, str, Optional[str]]]) -> str:
+    """Return sensors as an inventory CSV with a header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['sensor_id', 'type', 'location'])
+    writer.writerows(sensors)
+    return buffer.getvalue()
 
 def setup_tables() -> None:
-    """Create the required tables in the database."""
+    """Drop and recreate the required tables in the database."""
     conn = None
     cursor = None
     try:
         conn = get_connection(DB_CONFIG)
         conn.autocommit = False
         cursor = conn.cursor()
-        
+
         # Drop existing tables
         execute_query(
             cursor,
             f"""
-            DROP TABLE IF EXISTS 
+            DROP TABLE IF EXISTS
                 {','.join(TABLE_SCHEMAS.keys())}
             CASCADE
             """,
             description="Cleaned up existing tables"
         )
-        
+
         # Create tables
         for table_name, schema in TABLE_SCHEMAS.items():
-            if table_name in PARTITIONED_TABLES:
-                query = f"""
-                CREATE TABLE {table_name} (
-                    {schema},
-                    PRIMARY KEY (id, timestamp)
-                ) PARTITION BY RANGE (timestamp)
-                """
-            else:
-                query = f"""
-                CREATE TABLE {table_name} (
-                    {schema}
-                )
-                """
-            execute_query(cursor, query, description=f"Created {table_name} table")
-        
+            execute_query(cursor, table_definition(table_name, schema), description=f"Created {table_name} table")
+
         # Create partitions
-        current_date = datetime.now()
-        base_date = current_date.replace(day=1)
-        
         for table in PARTITIONED_TABLES:
-            for i in range(3):
-                if i == 0:
-                    partition_date = base_date
-                else:
-                    if base_date.month + i <= 12:
-                        partition_date = base_date.replace(month=base_date.month + i)
-                    else:
-                        new_year = base_date.year + ((base_date.month + i - 1) // 12)
-                        new_month = ((base_date.month + i - 1) % 12) + 1
-                        partition_date = base_date.replace(year=new_year, month=new_month)
-                
+            for partition_date in month_starts(datetime.now(), 3):
                 create_partition(cursor, table, partition_date)
-        
+
         # Create indexes
         for index_name, index_def in INDEX_DEFINITIONS:
             execute_query(
@@ -73,27 +111,211 @@ def setup_tables() -> None:
                 f"CREATE INDEX {index_name} ON {index_def}",
                 description=f"Created index {index_name}"
             )
-        
+
         # Insert initial sensor data
-        for sensor in INITIAL_SENSORS:
+        load_sensor_inventory(cursor)
+
+        conn.commit()
+        print("Tables created and initialized successfully!")
+
+    except Exception as e:
+        print(f"Error setting up tables: {str(e)}")
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def create_schema(cursor, start: datetime, months: int) -> None:
+    """Create the missing tables, columns, partitions and partitioned parent indexes.
+
+    Run inside one transaction so a fleet never sees half a partition set.
+    Parent indexes are created ON ONLY the partitioned table, which is
+    instant; they become valid once every partition's index is attached.
+    """
+    for table_name, schema in TABLE_SCHEMAS.items():
+        execute_query(cursor, table_definition(table_name, schema, if_not_exists=True))
+
+    # Tables created by an older schema lack the columns added since
+    for table_name, column, definition in COLUMN_MIGRATIONS:
+        execute_query(cursor, """
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+        """, (table_name, column))
+        if cursor.fetchone() is None:
             execute_query(
                 cursor,
-                """
-                INSERT INTO sensors (sensor_id, type, location)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (sensor_id) DO UPDATE 
-                SET type = EXCLUDED.type,
-                    location = EXCLUDED.location,
-                    updated_at = CURRENT_TIMESTAMP
-                """,
-                sensor
+                f"ALTER TABLE {table_name} ADD COLUMN {column} {definition}",
+                description=f"Added {table_name}.{column}"
             )
-        
+
+    for table in PARTITIONED_TABLES:
+        for partition_date in month_starts(start, months):
+            create_partition(cursor, table, partition_date, if_not_exists=True)
+
+    for index_name, index_def in INDEX_DEFINITIONS:
+        table, _ = split_index_definition(index_def)
+        if table in PARTITIONED_TABLES:
+            execute_query(cursor, f"CREATE INDEX IF NOT EXISTS {index_name} ON ONLY {index_def}")
+    print(f"Tables and {months} months of partitions are in place")
+
+def load_sensor_inventory(cursor, inventory: Optional[str] = None) -> int:
+    """COPY a sensor inventory into the sensors table.
+
+    The inventory is a CSV file of sensor_id,type,location with a header
+    row; without one the INITIAL_SENSORS are loaded. Known sensors take
+    the inventory's type and location, and unchanged rows are not
+    rewritten. Returns the number of sensors inserted or updated.
+    """
+    execute_query(cursor, """
+        CREATE TEMP TABLE sensor_inventory (
+            sensor_id VARCHAR(50) NOT NULL,
+            type VARCHAR(20) NOT NULL,
+            location VARCHAR(100)
+        ) ON COMMIT DROP
+    """)
+    copy = "COPY sensor_inventory (sensor_id, type, location) FROM STDIN WITH (FORMAT csv, HEADER true)"
+    if inventory:
+        with open(inventory, 'r', newline='') as source:
+            cursor.copy_expert(copy, source)
+    else:
+        cursor.copy_expert(copy, io.StringIO(inventory_csv(INITIAL_SENSORS)))
+
+    # One row per sensor, or ON CONFLICT would update a row twice
+    execute_query(cursor, """
+        INSERT INTO sensors (sensor_id, type, location)
+        SELECT DISTINCT ON (sensor_id) sensor_id, type, location
+        FROM sensor_inventory
+        ORDER BY sensor_id
+        ON CONFLICT (sensor_id) DO UPDATE
+        SET type = EXCLUDED.type,
+            location = EXCLUDED.location,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (sensors.type, sensors.location) IS DISTINCT FROM (EXCLUDED.type, EXCLUDED.location)
+    """, description="Loaded sensor inventory")
+    return cursor.rowcount
+
+def index_jobs(cursor) -> List[IndexJob]:
+    """Return the indexes that are missing or were left invalid by a failed build.
+
+    Partitioned indexes get one job per partition whose index is not yet
+    attached to the parent index; other indexes get a single job.
+    """
+    jobs = []
+    for index_name, index_def in INDEX_DEFINITIONS:
+        table, columns = split_index_definition(index_def)
+        if table not in PARTITIONED_TABLES:
+            cursor.execute("""
+                SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND indisvalid
+            """, (index_name,))
+            if cursor.fetchone() is None:
+                jobs.append((index_name, f"CREATE INDEX CONCURRENTLY {index_name} ON {index_def}", None))
+            continue
+
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM pg_inherits ii
+                  JOIN pg_index x ON x.indexrelid = ii.inhrelid
+                  WHERE ii.inhparent = %s::regclass AND x.indrelid = c.oid
+              )
+            ORDER BY c.relname
+        """, (table, index_name))
+        for (partition,) in cursor.fetchall():
+            partition_index = f"{index_name}{partition[len(table):]}"
+            jobs.append((
+                partition_index,
+                f"CREATE INDEX CONCURRENTLY {partition_index} ON {partition} {columns}",
+                index_name
+            ))
+    return jobs
+
+def build_index(cursor, index_name: str, statement: str, parent: Optional[str]) -> None:
+    """Build one index concurrently and attach it to its parent index.
+
+    Must run on an autocommit connection. An invalid index left by an
+    interrupted build is dropped and rebuilt.
+    """
+    execute_query(cursor, "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (index_name,))
+    existing = cursor.fetchone()
+    if existing is not None and not existing[0]:
+        execute_query(cursor, f"DROP INDEX CONCURRENTLY {index_name}")
+        existing = None
+    if existing is None:
+        execute_query(cursor, statement)
+    if parent:
+        execute_query(cursor, f"ALTER INDEX {parent} ATTACH PARTITION {index_name}")
+    print(f"Built index {index_name}")
+
+def _index_worker(pending: queue.Queue) -> int:
+    """Build queued indexes over a connection of its own until none are left."""
+    built = 0
+    conn = get_connection(DB_CONFIG)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            while True:
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return built
+                build_index(cursor, *job)
+                built += 1
+    finally:
+        conn.close()
+
+def build_indexes(jobs: List[IndexJob], workers: int = 4) -> int:
+    """Build index jobs in parallel over up to `workers` connections."""
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    workers = min(workers, len(jobs))
+    if not workers:
+        return 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_index_worker, pending) for _ in range(workers)]
+        return sum(future.result() for future in futures)
+
+def provision(
+    inventory: Optional[str] = None,
+    start: Optional[datetime] = None,
+    months: int = 3,
+    index_workers: int = 4
+) -> None:
+    """Idempotently create the schema, load the sensor inventory and build indexes.
+
+    Never drops anything. start is the first partition month (default: the
+    current month) and months the number of monthly partitions per table.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection(DB_CONFIG)
+        conn.autocommit = False
+        cursor = conn.cursor()
+
+        began = time.perf_counter()
+        create_schema(cursor, start or datetime.now(), months)
+        conn.commit()
+        print(f"Schema ready in {time.perf_counter() - began:.1f}s")
+
+        began = time.perf_counter()
+        loaded = load_sensor_inventory(cursor, inventory)
+        conn.commit()
+        print(f"Inserted or updated {loaded} sensors in {time.perf_counter() - began:.1f}s")
+
+        jobs = index_jobs(cursor)
         conn.commit()
-        print("Tables created and initialized successfully!")
-        
     except Exception as e:
-        print(f"Error setting up tables: {str(e)}")
+        print(f"Error provisioning database: {str(e)}")
         if conn:
             conn.rollback()
         raise
@@ -103,15 +325,32 @@ def setup_tables() -> None:
         if conn:
             conn.close()
 
+    began = time.perf_counter()
+    built = build_indexes(jobs, index_workers)
+    print(f"Built {built} indexes with {index_workers} connections in {time.perf_counter() - began:.1f}s")
+
 def main():
     """Main setup function."""
+    parser = argparse.ArgumentParser(description="Set up the IoT database tables.")
+    parser.add_argument('--reset', action='store_true',
+                        help='drop and recreate every table, deleting all data')
+    parser.add_argument('--inventory', help='CSV of sensor_id,type,location (with a header row) to load')
+    parser.add_argument('--start', type=lambda value: datetime.strptime(value, '%Y-%m'),
+                        help='first partition month as YYYY-MM (default: current month)')
+    parser.add_argument('--months', type=int, default=3, help='monthly partitions per table')
+    parser.add_argument('--index-workers', type=int, default=4, help='parallel index build connections')
+    args = parser.parse_args()
+
     print("Setting up IoT database tables...")
     try:
-        setup_tables()
+        if args.reset:
+            setup_tables()
+        else:
+            provision(args.inventory, args.start, args.months, args.index_workers)
         print("Database setup completed successfully!")
     except Exception as e:
         print(f"Setup failed: {str(e)}")
         exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
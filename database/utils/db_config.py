@@ -15,6 +15,7 @@ DB_CONFIG = {
 TABLE_SCHEMAS: Dict[str, str] = {
     'sensors': """
         sensor_id VARCHAR(50) PRIMARY KEY,
+        sensor_key SERIAL UNIQUE,
         type VARCHAR(20) NOT NULL,
         location VARCHAR(100),
         status VARCHAR(20) DEFAULT 'active',
@@ -51,6 +52,87 @@ TABLE_SCHEMAS: Dict[str, str] = {
         window_start TIMESTAMP NOT NULL,
         window_end TIMESTAMP NOT NULL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'sensor_alerts': """
+        id SERIAL PRIMARY KEY,
+        sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+        rule VARCHAR(50) NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        threshold DECIMAL(10,2) NOT NULL,
+        value DECIMAL(10,2) NOT NULL,
+        breach_start TIMESTAMP NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'sensor_anomalies': """
+        id SERIAL PRIMARY KEY,
+        sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+        timestamp TIMESTAMP NOT NULL,
+        value DECIMAL(10,2) NOT NULL,
+        baseline DECIMAL(10,2) NOT NULL,
+        std_dev DECIMAL(10,4) NOT NULL,
+        z_score DECIMAL(10,2) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'occupancy_intervals': """
+        id SERIAL PRIMARY KEY,
+        sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+        location VARCHAR(100),
+        start_time TIMESTAMP NOT NULL,
+        end_time TIMESTAMP NOT NULL,
+        duration_seconds DECIMAL(10,2) NOT NULL,
+        is_open BOOLEAN NOT NULL DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'sensor_sketches': """
+        id SERIAL PRIMARY KEY,
+        sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+        sensor_type VARCHAR(20) NOT NULL,
+        window_start TIMESTAMP NOT NULL,
+        window_end TIMESTAMP NOT NULL,
+        count INTEGER NOT NULL,
+        min_value DOUBLE PRECISION NOT NULL,
+        max_value DOUBLE PRECISION NOT NULL,
+        sketch BYTEA NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'sensor_type_sketches': """
+        id SERIAL PRIMARY KEY,
+        sensor_type VARCHAR(20) NOT NULL,
+        window_start TIMESTAMP NOT NULL,
+        window_end TIMESTAMP NOT NULL,
+        sensors INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        sketch BYTEA NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'location_analytics': """
+        id SERIAL PRIMARY KEY,
+        scope VARCHAR(20) NOT NULL,
+        location VARCHAR(100) NOT NULL,
+        sensor_type VARCHAR(20) NOT NULL,
+        window_start TIMESTAMP NOT NULL,
+        window_end TIMESTAMP NOT NULL,
+        count INTEGER NOT NULL,
+        sum_value DOUBLE PRECISION NOT NULL,
+        min_value DOUBLE PRECISION NOT NULL,
+        max_value DOUBLE PRECISION NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """,
+    'temperature_readings_staging': """
+        sensor_id VARCHAR(50) NOT NULL,
+        value DECIMAL(5,2) NOT NULL,
+        timestamp TIMESTAMP NOT NULL
+    """,
+    'humidity_readings_staging': """
+        sensor_id VARCHAR(50) NOT NULL,
+        value DECIMAL(5,2) NOT NULL,
+        timestamp TIMESTAMP NOT NULL
+    """,
+    'motion_events_staging': """
+        sensor_id VARCHAR(50) NOT NULL,
+        detected BOOLEAN NOT NULL,
+        timestamp TIMESTAMP NOT NULL
     """
 }
 
@@ -59,7 +141,15 @@ INDEX_DEFINITIONS = [
     ("idx_temp_sensor_timestamp", "temperature_readings(sensor_id, timestamp)"),
     ("idx_humidity_sensor_timestamp", "humidity_readings(sensor_id, timestamp)"),
     ("idx_motion_sensor_timestamp", "motion_events(sensor_id, timestamp)"),
-    ("idx_analytics_sensor_metric", "sensor_analytics(sensor_id, metric_name, window_start)")
+    ("idx_analytics_sensor_metric", "sensor_analytics(sensor_id, metric_name, window_start)"),
+    ("idx_analytics_metric_window", "sensor_analytics(metric_name, window_start)"),
+    ("idx_alerts_sensor_timestamp", "sensor_alerts(sensor_id, timestamp)"),
+    ("idx_anomalies_sensor_timestamp", "sensor_anomalies(sensor_id, timestamp)"),
+    ("idx_occupancy_sensor_start", "occupancy_intervals(sensor_id, start_time)"),
+    ("idx_occupancy_end", "occupancy_intervals(end_time)"),
+    ("idx_sketches_type_window", "sensor_sketches(sensor_type, window_start)"),
+    ("idx_type_sketches_window", "sensor_type_sketches(sensor_type, window_start)"),
+    ("idx_location_analytics_window", "location_analytics(sensor_type, scope, window_start)")
 ]
 
 # Initial sensor data
@@ -81,5 +171,15 @@ INITIAL_SENSORS = [
     ('motion_sensor_5', 'motion', 'Bathroom')
 ]
 
+# Columns added after their table was first created: (table, column, definition).
+# Provisioning adds them to existing databases.
+COLUMN_MIGRATIONS = [
+    ('sensors', 'sensor_key', 'SERIAL UNIQUE'),
+    ('occupancy_intervals', 'is_open', 'BOOLEAN NOT NULL DEFAULT FALSE')
+]
+
 # Partitioned tables
-PARTITIONED_TABLES = ['temperature_readings', 'humidity_readings', 'motion_events'] 
\ No newline at end of file
+PARTITIONED_TABLES = ['temperature_readings', 'humidity_readings', 'motion_events']
+
+# Unlogged, index-free tables that staged ingest writes into
+UNLOGGED_TABLES = ['temperature_readings_staging', 'humidity_readings_staging', 'motion_events_staging']
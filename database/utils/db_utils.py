@@ -41,15 +41,19 @@ def create_partition(
     cursor: cursor,
     table_name: str,
     partition_date: datetime,
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    if_not_exists: bool = False
 ) -> None:
-    """Create a partition for the specified table and date range."""
+    """Create a partition for the specified table and date range.
+
+    With if_not_exists an existing partition is left as it is.
+    """
     try:
         start_date, end_date = get_month_boundaries(partition_date)
         partition_name = f"{table_name}_p{start_date.strftime('%Y_%m')}"
         
         query = f"""
-        CREATE TABLE {partition_name}
+        CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{partition_name}
         PARTITION OF {table_name}
         FOR VALUES FROM ('{start_date.strftime('%Y-%m-%d %H:%M:%S')}') 
         TO ('{end_date.strftime('%Y-%m-%d %H:%M:%S')}')
@@ -0,0 +1,45 @@
+"""Archive closed monthly partitions to the Parquet cold tier."""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import ARCHIVE_CONFIG
+from src.storage.archive import PartitionArchiver
+
+def archive_partitions(keep_months: int, archive_path: str, dry_run: bool):
+    """Archive every partition that ended more than keep_months months ago."""
+    now = datetime.now()
+    months = now.year * 12 + (now.month - 1) - keep_months
+    cutoff = datetime(months // 12, months % 12 + 1, 1)
+
+    archiver = PartitionArchiver(
+        {
+            'host': 'localhost',
+            'user': 'iot_user',
+            'password': 'iot_password',
+            'database': 'iot_db',
+            'port': '5432'
+        },
+        archive_path,
+        compression=ARCHIVE_CONFIG['compression']
+    )
+    try:
+        print(f"Archiving partitions ending on or before {cutoff:%Y-%m-%d} to {archive_path}")
+        archived = archiver.archive_closed(cutoff, dry_run=dry_run)
+        for partition, rows in archived.items():
+            print(f"  {partition}: {rows} rows")
+        print(f"Archived {len(archived)} partitions")
+    finally:
+        archiver.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--keep-months', type=int, default=ARCHIVE_CONFIG['keep_months'],
+                        help='number of recent months to keep in PostgreSQL')
+    parser.add_argument('--archive-path', default=ARCHIVE_CONFIG['path'])
+    parser.add_argument('--dry-run', action='store_true', help='only list partitions to archive')
+    args = parser.parse_args()
+    archive_partitions(args.keep_months, args.archive_path, args.dry_run)
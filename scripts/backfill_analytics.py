@@ -0,0 +1,47 @@
+"""Recompute sensor_analytics for a historical range in parallel."""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import BACKFILL_CONFIG, POSTGRES_CONFIG
+from src.processors.backfill import BACKFILL_METRICS, AnalyticsBackfill
+
+def backfill_analytics(start: datetime, end: datetime, sensor_types, workers: int,
+                       checkpoint_path: str, dry_run: bool):
+    """Backfill every window of [start, end), resuming from the checkpoint."""
+    backfill = AnalyticsBackfill(
+        POSTGRES_CONFIG,
+        window_minutes=BACKFILL_CONFIG['window_minutes'],
+        task_hours=BACKFILL_CONFIG['task_hours'],
+        workers=workers,
+        checkpoint_path=checkpoint_path
+    )
+    if dry_run:
+        tasks = backfill.plan(start, end, sensor_types)
+        for task in tasks:
+            print(f"  {task.task_id} -> {task.end.isoformat()}")
+        print(f"{len(tasks)} tasks")
+        return
+
+    print(f"Backfilling {', '.join(sensor_types)} from {start} to {end}")
+    written = backfill.run(start, end, sensor_types)
+    print(f"Wrote {sum(written.values())} metric rows in {len(written)} tasks")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('start', type=datetime.fromisoformat, help='range start, e.g. 2024-01-01')
+    parser.add_argument('end', type=datetime.fromisoformat, help='range end (exclusive)')
+    parser.add_argument('--sensor-types', nargs='+', choices=list(BACKFILL_METRICS),
+                        default=list(BACKFILL_METRICS))
+    parser.add_argument('--workers', type=int, default=BACKFILL_CONFIG['workers'],
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--checkpoint', default=BACKFILL_CONFIG['checkpoint_path'],
+                        help='file recording finished tasks')
+    parser.add_argument('--dry-run', action='store_true', help='only list the tasks')
+    args = parser.parse_args()
+    os.makedirs(os.path.dirname(args.checkpoint) or '.', exist_ok=True)
+    backfill_analytics(args.start, args.end, args.sensor_types, args.workers,
+                       args.checkpoint, args.dry_run)
@@ -0,0 +1,77 @@
+"""Benchmark the consume -> decode -> store path against the in-memory broker."""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import KAFKA_CONFIG
+from src.processors.sensor_processor import SensorProcessor
+from src.storage.base import ReadingBatch, create_backend
+from src.transport.base import InMemoryTransport
+from src.transport.producer import SensorGateway
+
+SENSOR_PREFIXES = {'temperature': 'temp_sensor', 'humidity': 'humidity_sensor', 'motion': 'motion_sensor'}
+
+def make_batch(sensor_type: str, num_readings: int, num_sensors: int, seed: int) -> ReadingBatch:
+    """Build a deterministic batch of readings spread over num_sensors sensors."""
+    rng = np.random.default_rng(seed)
+    sensor_ids = np.array([f"{SENSOR_PREFIXES[sensor_type]}_{i}" for i in range(num_sensors)], dtype=object)
+    start = np.datetime64(datetime(2024, 1, 1), 'us')
+    timestamps = start + np.arange(num_readings).astype('timedelta64[ms]') * 100
+    if sensor_type == 'motion':
+        values = rng.random(num_readings) < 0.2
+    else:
+        values = np.round(rng.normal(22.0 if sensor_type == 'temperature' else 50.0, 2.0, num_readings), 2)
+    return ReadingBatch(sensor_type, sensor_ids[np.arange(num_readings) % num_sensors], timestamps, values)
+
+def benchmark(readings: int, sensors: int, encoding: str, partitions: int, batch_size: int, backend: str):
+    """Preload the broker, then time SensorProcessor draining it."""
+    encodings = {sensor_type: encoding for sensor_type in KAFKA_CONFIG['topics']}
+    KAFKA_CONFIG['encodings'] = encodings
+    KAFKA_CONFIG['consume_batch_size'] = batch_size
+    transport = InMemoryTransport(num_partitions=partitions)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backends = [] if backend == 'none' else [create_backend('parquet', root_path=tmp_dir)]
+        processor = SensorProcessor(transport=transport, backends=backends)
+        processor.batch_timeout = 0
+
+        # Publish to the topics the processor resolved from the environment
+        gateway = SensorGateway(transport.create_producer(KAFKA_CONFIG['producer']), processor.codec,
+                                processor.topic_map, frame_key_groups=KAFKA_CONFIG['frame_key_groups'])
+        per_type = readings // len(SENSOR_PREFIXES)
+        start = time.time()
+        for seed, sensor_type in enumerate(SENSOR_PREFIXES):
+            # Publish in chunks like a gateway receiving simulator batches
+            batch = make_batch(sensor_type, per_type, sensors, seed)
+            for chunk in np.array_split(np.arange(len(batch)), max(1, per_type // 1000)):
+                gateway.publish_batch(batch.take(chunk))
+        gateway.close()
+        stats = gateway.stats()
+        print(f"Produced {stats.readings_sent} readings in {stats.messages_sent} {encoding} messages "
+              f"({stats.bytes_sent / 1024 / 1024:.1f} MiB) in {time.time() - start:.2f}s")
+
+        start = time.time()
+        processor.run(until_idle=True)
+        elapsed = time.time() - start
+    print(f"Consumed {processor.readings_processed} readings in {elapsed:.2f}s: "
+          f"{processor.readings_processed / elapsed:,.0f} readings/second")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readings', type=int, default=300000)
+    parser.add_argument('--sensors', type=int, default=100, help='sensors per type')
+    parser.add_argument('--encoding', choices=['json', 'binary'], default='json')
+    parser.add_argument('--partitions', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=KAFKA_CONFIG['consume_batch_size'],
+                        help='messages per consume() call')
+    parser.add_argument('--backend', choices=['none', 'parquet'], default='parquet',
+                        help='storage behind the consumer')
+    args = parser.parse_args()
+    benchmark(args.readings, args.sensors, args.encoding, args.partitions, args.batch_size, args.backend)
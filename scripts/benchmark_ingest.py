@@ -0,0 +1,89 @@
+"""Benchmark prepared batch inserts under each ingest durability mode."""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import POSTGRES_CONFIG
+from src.processors.ingest import DURABILITY_MODES, PreparedInserts, staging_table
+from src.storage.base import SENSOR_TABLES, ReadingBatch
+
+SENSOR_TYPE = 'temperature'
+BENCH_SENSORS = [f"bench_temp_{i}" for i in range(10)]
+
+def make_batch(start: datetime, batch_size: int, rng: np.random.Generator) -> ReadingBatch:
+    timestamps = np.datetime64(start, 'us') + np.arange(batch_size).astype('timedelta64[ms]')
+    sensor_ids = np.array(BENCH_SENSORS, dtype=object)[np.arange(batch_size) % len(BENCH_SENSORS)]
+    values = np.round(rng.normal(22.0, 2.0, batch_size), 2)
+    return ReadingBatch(SENSOR_TYPE, sensor_ids, timestamps, values)
+
+def register_sensors(conn):
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO sensors (sensor_id, type, location) VALUES (%s, %s, 'benchmark') "
+            "ON CONFLICT (sensor_id) DO NOTHING",
+            [(sensor_id, SENSOR_TYPE) for sensor_id in BENCH_SENSORS]
+        )
+    conn.commit()
+
+def remove_readings(conn):
+    table, _ = SENSOR_TABLES[SENSOR_TYPE]
+    with conn.cursor() as cur:
+        for name in (table, staging_table(SENSOR_TYPE)):
+            cur.execute(f"DELETE FROM {name} WHERE sensor_id = ANY(%s)", (BENCH_SENSORS,))
+    conn.commit()
+
+def benchmark_mode(conn, mode: str, batches: int, batch_size: int, seed: int):
+    """Write batches through one mode and report commit latency and throughput."""
+    inserts = PreparedInserts(conn, {SENSOR_TYPE: mode})
+    rng = np.random.default_rng(seed)
+    start = datetime.now() - timedelta(hours=1)
+    latencies = np.empty(batches)
+    began = time.perf_counter()
+    for i in range(batches):
+        batch = make_batch(start + timedelta(seconds=i), batch_size, rng)
+        before = time.perf_counter()
+        inserts.write_batch(batch)
+        latencies[i] = time.perf_counter() - before
+    elapsed = time.perf_counter() - began
+
+    merge_time = 0.0
+    if mode == 'staged':
+        before = time.perf_counter()
+        inserts.merge_staged()
+        merge_time = time.perf_counter() - before
+    total = batches * batch_size
+    print(f"{mode:8s} {np.median(latencies) * 1000:8.2f} {np.percentile(latencies, 99) * 1000:8.2f} "
+          f"{total / (elapsed + merge_time):12,.0f} {merge_time:8.2f}")
+
+def benchmark(batches: int, batch_size: int, modes, seed: int):
+    conn = psycopg2.connect(**POSTGRES_CONFIG)
+    conn.autocommit = False
+    try:
+        register_sensors(conn)
+        print(f"{batches} batches of {batch_size} {SENSOR_TYPE} readings")
+        print(f"{'mode':8s} {'p50 ms':>8s} {'p99 ms':>8s} {'readings/s':>12s} {'merge s':>8s}")
+        for mode in modes:
+            remove_readings(conn)
+            benchmark_mode(conn, mode, batches, batch_size, seed)
+    finally:
+        remove_readings(conn)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sensors WHERE sensor_id = ANY(%s)", (BENCH_SENSORS,))
+        conn.commit()
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batches', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=50, help='readings per batch')
+    parser.add_argument('--modes', nargs='+', choices=DURABILITY_MODES, default=list(DURABILITY_MODES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark(args.batches, args.batch_size, args.modes, args.seed)
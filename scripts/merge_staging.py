@@ -0,0 +1,45 @@
+"""Merge the unlogged staging tables into their partitions, once or periodically."""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import INGEST_CONFIG, POSTGRES_CONFIG
+from src.processors.ingest import merge_staging
+from src.storage.base import SENSOR_TABLES
+
+logger = logging.getLogger(__name__)
+
+def merge_loop(sensor_types, interval: float, once: bool):
+    """Merge every staging table, then repeat every interval seconds."""
+    conn = psycopg2.connect(**POSTGRES_CONFIG)
+    conn.autocommit = False
+    try:
+        while True:
+            for sensor_type in sensor_types:
+                try:
+                    merged = merge_staging(conn, sensor_type)
+                    print(f"{sensor_type}: merged {merged} readings")
+                except Exception as e:
+                    logger.error(f"Error merging staged {sensor_type} readings: {e}")
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sensor-types', nargs='+', choices=list(SENSOR_TABLES), default=list(SENSOR_TABLES))
+    parser.add_argument('--interval', type=float, default=INGEST_CONFIG['staging_merge_seconds'],
+                        help='seconds between merges')
+    parser.add_argument('--once', action='store_true', help='merge once and exit')
+    args = parser.parse_args()
+    merge_loop(args.sensor_types, args.interval, args.once)
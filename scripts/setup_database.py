@@ -93,6 +93,15 @@ def setup_tables():
             humidity_readings,
             motion_events,
             sensor_analytics,
+            sensor_alerts,
+            sensor_anomalies,
+            occupancy_intervals,
+            sensor_sketches,
+            sensor_type_sketches,
+            location_analytics,
+            temperature_readings_staging,
+            humidity_readings_staging,
+            motion_events_staging,
             sensors
         CASCADE
         """)
@@ -102,6 +111,7 @@ def setup_tables():
         cursor.execute("""
         CREATE TABLE sensors (
             sensor_id VARCHAR(50) PRIMARY KEY,
+            sensor_key SERIAL UNIQUE,
             type VARCHAR(20) NOT NULL,
             location VARCHAR(100),
             status VARCHAR(20) DEFAULT 'active',
@@ -163,6 +173,126 @@ def setup_tables():
         cursor.execute("ALTER TABLE sensor_analytics OWNER TO iot_user")
         print("Created sensor_analytics table")
 
+        # Create sensor_alerts table
+        cursor.execute("""
+        CREATE TABLE sensor_alerts (
+            id SERIAL PRIMARY KEY,
+            sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+            rule VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            threshold DECIMAL(10,2) NOT NULL,
+            value DECIMAL(10,2) NOT NULL,
+            breach_start TIMESTAMP NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("ALTER TABLE sensor_alerts OWNER TO iot_user")
+        print("Created sensor_alerts table")
+
+        # Create sensor_anomalies table
+        cursor.execute("""
+        CREATE TABLE sensor_anomalies (
+            id SERIAL PRIMARY KEY,
+            sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+            timestamp TIMESTAMP NOT NULL,
+            value DECIMAL(10,2) NOT NULL,
+            baseline DECIMAL(10,2) NOT NULL,
+            std_dev DECIMAL(10,4) NOT NULL,
+            z_score DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("ALTER TABLE sensor_anomalies OWNER TO iot_user")
+        print("Created sensor_anomalies table")
+
+        # Create occupancy_intervals table
+        cursor.execute("""
+        CREATE TABLE occupancy_intervals (
+            id SERIAL PRIMARY KEY,
+            sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+            location VARCHAR(100),
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP NOT NULL,
+            duration_seconds DECIMAL(10,2) NOT NULL,
+            is_open BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("ALTER TABLE occupancy_intervals OWNER TO iot_user")
+        print("Created occupancy_intervals table")
+
+        # Create sensor_sketches table
+        cursor.execute("""
+        CREATE TABLE sensor_sketches (
+            id SERIAL PRIMARY KEY,
+            sensor_id VARCHAR(50) REFERENCES sensors(sensor_id),
+            sensor_type VARCHAR(20) NOT NULL,
+            window_start TIMESTAMP NOT NULL,
+            window_end TIMESTAMP NOT NULL,
+            count INTEGER NOT NULL,
+            min_value DOUBLE PRECISION NOT NULL,
+            max_value DOUBLE PRECISION NOT NULL,
+            sketch BYTEA NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("ALTER TABLE sensor_sketches OWNER TO iot_user")
+        print("Created sensor_sketches table")
+
+        # Create sensor_type_sketches table
+        cursor.execute("""
+        CREATE TABLE sensor_type_sketches (
+            id SERIAL PRIMARY KEY,
+            sensor_type VARCHAR(20) NOT NULL,
+            window_start TIMESTAMP NOT NULL,
+            window_end TIMESTAMP NOT NULL,
+            sensors INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            sketch BYTEA NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("ALTER TABLE sensor_type_sketches OWNER TO iot_user")
+        print("Created sensor_type_sketches table")
+
+        # Create location_analytics table
+        cursor.execute("""
+        CREATE TABLE location_analytics (
+            id SERIAL PRIMARY KEY,
+            scope VARCHAR(20) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            sensor_type VARCHAR(20) NOT NULL,
+            window_start TIMESTAMP NOT NULL,
+            window_end TIMESTAMP NOT NULL,
+            count INTEGER NOT NULL,
+            sum_value DOUBLE PRECISION NOT NULL,
+            min_value DOUBLE PRECISION NOT NULL,
+            max_value DOUBLE PRECISION NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("ALTER TABLE location_analytics OWNER TO iot_user")
+        print("Created location_analytics table")
+
+        # Create unlogged staging tables for staged ingest: no WAL, indexes or
+        # foreign keys, emptied by a crash
+        staging_schema = {
+            'temperature_readings_staging': "value DECIMAL(5,2) NOT NULL",
+            'humidity_readings_staging': "value DECIMAL(5,2) NOT NULL",
+            'motion_events_staging': "detected BOOLEAN NOT NULL"
+        }
+        for table_name, value_column in staging_schema.items():
+            cursor.execute(f"""
+            CREATE UNLOGGED TABLE {table_name} (
+                sensor_id VARCHAR(50) NOT NULL,
+                {value_column},
+                timestamp TIMESTAMP NOT NULL
+            )
+            """)
+            cursor.execute(f"ALTER TABLE {table_name} OWNER TO iot_user")
+            print(f"Created {table_name} table")
+
         # Create dynamic partitions for each table (current month and next 2 months)
         from datetime import datetime, timedelta
         
@@ -206,7 +336,15 @@ def setup_tables():
             ("idx_temp_sensor_timestamp", "temperature_readings(sensor_id, timestamp)"),
             ("idx_humidity_sensor_timestamp", "humidity_readings(sensor_id, timestamp)"),
             ("idx_motion_sensor_timestamp", "motion_events(sensor_id, timestamp)"),
-            ("idx_analytics_sensor_metric", "sensor_analytics(sensor_id, metric_name, window_start)")
+            ("idx_analytics_sensor_metric", "sensor_analytics(sensor_id, metric_name, window_start)"),
+            ("idx_analytics_metric_window", "sensor_analytics(metric_name, window_start)"),
+            ("idx_alerts_sensor_timestamp", "sensor_alerts(sensor_id, timestamp)"),
+            ("idx_anomalies_sensor_timestamp", "sensor_anomalies(sensor_id, timestamp)"),
+            ("idx_occupancy_sensor_start", "occupancy_intervals(sensor_id, start_time)"),
+            ("idx_occupancy_end", "occupancy_intervals(end_time)"),
+            ("idx_sketches_type_window", "sensor_sketches(sensor_type, window_start)"),
+            ("idx_type_sketches_window", "sensor_type_sketches(sensor_type, window_start)"),
+            ("idx_location_analytics_window", "location_analytics(sensor_type, scope, window_start)")
         ]
 
         for index_name, index_def in index_definitions:
@@ -10,6 +10,7 @@ setup(
         "pandas>=2.1.3",
         "numpy>=1.26.2",
         "SQLAlchemy>=2.0.25",
+        "pyarrow>=14.0.1",
         "streamlit>=1.28.2",
         "plotly>=5.18.0",
     ],
@@ -1,11 +1,30 @@
 import time
 import logging
+from datetime import datetime
 import signal
 import sys
-from simulator.sensor_simulator import SensorSimulator
-from processors.data_processor import DataProcessor
-from processors.analytics_processor import AnalyticsProcessor
-from monitoring.pipeline_monitor import PipelineMonitor
+import threading
+
+from config.config import (
+    PIPELINE_CONFIG, STORAGE_CONFIG, INFLUXDB_CONFIG, ALERT_THRESHOLDS, ALERT_ENGINE_CONFIG,
+    ANOMALY_CONFIG, LIVENESS_CONFIG, OCCUPANCY_CONFIG, SKETCH_CONFIG, LOCATION_AGGREGATE_CONFIG,
+    HOT_WINDOW_CONFIG, INGEST_FILTER_CONFIG, INGEST_CONFIG, ARCHIVE_CONFIG
+)
+from src.monitoring.liveness import LivenessTracker, SensorStatusStore
+from src.monitoring.pipeline_monitor import PipelineMonitor
+from src.pipeline.queues import BoundedStageQueue
+from src.pipeline.registry import SensorRegistry, SensorRegistryStore
+from src.processors.analytics_processor import AnalyticsProcessor
+from src.processors.data_processor import DataProcessor
+from src.simulator.sensor_simulator import SensorSimulator
+from src.storage.base import ReadingBatch, create_backend
+from src.streaming.alerts import AlertEngine, AlertStore
+from src.streaming.anomaly import AnomalyStore, EwmaAnomalyDetector
+from src.streaming.filters import IngestFilter
+from src.streaming.hot_window import HotWindowWriter
+from src.streaming.locations import LocationAggregator, LocationStore
+from src.streaming.occupancy import OccupancySessionizer, OccupancyStore
+from src.streaming.sketches import SketchAggregator, SketchStore
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,7 +33,9 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class IoTDataPipeline:
-    def __init__(self, num_sensors: int = 5, interval: float = 1.0):
+    def __init__(self, num_sensors: int = 5, interval: float = 1.0,
+                 pipeline_config: dict = PIPELINE_CONFIG,
+                 storage_config: dict = STORAGE_CONFIG):
         """Initialize the IoT data pipeline."""
         # Database configuration
         self.db_params = {
@@ -27,9 +48,72 @@ class IoTDataPipeline:
         
         # Initialize components
         self.simulator = SensorSimulator(num_sensors=num_sensors)
-        self.processor = DataProcessor()
-        self.analytics = AnalyticsProcessor(self.db_params)
-        self.monitor = PipelineMonitor(self.db_params)
+        backend_name = storage_config['backend']
+        if backend_name == 'postgres':
+            # Known sensors; unknown ones are registered before their readings are stored
+            self.registry_store = SensorRegistryStore(self.db_params)
+            self.registry = SensorRegistry(self.registry_store)
+            self.processor = DataProcessor(insert_mode=INGEST_CONFIG['insert_mode'],
+                                           durability=INGEST_CONFIG['durability'],
+                                           type_func=self.registry.sensor_type)
+            self.analytics = AnalyticsProcessor(self.db_params,
+                                                archive_path=ARCHIVE_CONFIG['path'],
+                                                durability=INGEST_CONFIG['analytics_durability'])
+            self.monitor = PipelineMonitor(self.db_params, type_func=self.registry.sensor_type)
+            self.alert_store = AlertStore(self.db_params)
+            self.anomaly_store = AnomalyStore(self.db_params)
+            self.status_store = SensorStatusStore(self.db_params)
+            self.occupancy_store = OccupancyStore(self.db_params)
+            self.sketch_store = SketchStore(self.db_params)
+            self.location_store = LocationStore(self.db_params)
+        else:
+            # Server-less runs skip the Postgres-only analytics and partition stats
+            self.registry_store = None
+            self.registry = SensorRegistry()
+            self.processor = DataProcessor(backend=self.create_storage_backend(storage_config),
+                                           type_func=self.registry.sensor_type)
+            self.analytics = None
+            self.monitor = PipelineMonitor(None, type_func=self.registry.sensor_type)
+            self.alert_store = None
+            self.anomaly_store = None
+            self.status_store = None
+            self.occupancy_store = None
+            self.sketch_store = None
+            self.location_store = None
+
+        # Threshold alerts and anomalies are evaluated on each stored batch
+        self.alert_engine = AlertEngine.from_config(ALERT_THRESHOLDS, ALERT_ENGINE_CONFIG)
+        self.anomaly_detector = EwmaAnomalyDetector.from_config(ANOMALY_CONFIG)
+        self.sessionizer = OccupancySessionizer.from_config(OCCUPANCY_CONFIG)
+        self.sketches = SketchAggregator.from_config(SKETCH_CONFIG)
+        self.locations = LocationAggregator.from_config(LOCATION_AGGREGATE_CONFIG, self.registry.locations())
+        self.liveness = LivenessTracker(
+            LIVENESS_CONFIG['timeouts'],
+            default_timeout=LIVENESS_CONFIG['default_timeout'],
+            tick_seconds=LIVENESS_CONFIG['tick_seconds'],
+            type_func=self.registry.sensor_type
+        )
+        # Recent readings shared with local readers such as the dashboard
+        self.hot_window = None
+        if HOT_WINDOW_CONFIG['enabled']:
+            self.hot_window = HotWindowWriter(
+                HOT_WINDOW_CONFIG['name'],
+                max_sensors=HOT_WINDOW_CONFIG['max_sensors'],
+                slots=HOT_WINDOW_CONFIG['slots']
+            )
+        # Readings without new information are evaluated but not stored
+        self.ingest_filter = (IngestFilter.from_config(INGEST_FILTER_CONFIG, self.registry.sensor_type)
+                              if INGEST_FILTER_CONFIG['enabled'] else None)
+
+        # Bounded queues between generation -> validation -> storage
+        capacity = pipeline_config['queue_capacity']
+        policy = pipeline_config['overflow_policy']
+        priorities = pipeline_config['type_priorities']
+        priority_func = lambda reading: priorities.get(self.registry.sensor_type(reading['sensor_id']), 0)
+        self.raw_queue = BoundedStageQueue('raw', capacity, policy, priority_func=priority_func)
+        self.valid_queue = BoundedStageQueue('valid', capacity, policy, priority_func=priority_func)
+        self.batch_size = pipeline_config['batch_size']
+        self.stage_threads = []
         
         self.interval = interval
         self.running = False
@@ -39,11 +123,105 @@ class IoTDataPipeline:
         signal.signal(signal.SIGINT, self.handle_shutdown)
         signal.signal(signal.SIGTERM, self.handle_shutdown)
 
+    @staticmethod
+    def create_storage_backend(storage_config: dict):
+        """Create the configured non-Postgres storage backend."""
+        if storage_config['backend'] == 'parquet':
+            return create_backend(
+                'parquet',
+                root_path=storage_config['parquet_path'],
+                flush_rows=storage_config['parquet_flush_rows']
+            )
+        return create_backend(storage_config['backend'], **INFLUXDB_CONFIG)
+
     def handle_shutdown(self, signum, frame):
         """Handle shutdown signals gracefully."""
         logger.info("Shutdown signal received, stopping pipeline...")
         self.running = False
 
+    def evaluate_stream(self, readings):
+        """Run the streaming evaluators and aggregators on a batch of readings."""
+        alerts, anomalies, intervals, sketches, aggregates = [], [], [], [], []
+        self.locations.learn_locations(readings)
+        for batch in ReadingBatch.from_readings(readings, self.registry.sensor_type).values():
+            alerts.extend(self.alert_engine.process(batch))
+            anomalies.extend(self.anomaly_detector.process(batch))
+            intervals.extend(self.sessionizer.process(batch))
+            sketches.extend(self.sketches.process(batch))
+            aggregates.extend(self.locations.process(batch))
+            if self.hot_window:
+                self.hot_window.write(batch, self.locations.location_of)
+        now = datetime.now()
+        intervals.extend(self.sessionizer.close_idle(now))
+
+        for alert in alerts:
+            logger.warning(f"Alert {alert.status}: {alert.rule} on {alert.sensor_id} "
+                           f"(value {alert.value}, threshold {alert.threshold}, since {alert.breach_start})")
+        for anomaly in anomalies:
+            logger.warning(f"Anomaly on {anomaly.sensor_id}: {anomaly.value:.2f} vs baseline "
+                           f"{anomaly.baseline:.2f} (z={anomaly.z_score:.1f})")
+        self.monitor.record_alerts(alerts)
+        self.monitor.record_anomalies(anomalies)
+        if intervals:
+            logger.info(f"Closed {len(intervals)} occupancy intervals")
+
+        try:
+            if self.alert_store:
+                self.alert_store.store_alerts(alerts)
+            if self.anomaly_store:
+                self.anomaly_store.store_anomalies(anomalies)
+            if self.occupancy_store:
+                self.occupancy_store.store_intervals(intervals, self.sessionizer.open_intervals(), now)
+            if self.sketch_store:
+                self.sketch_store.store_sketches(sketches)
+            if self.location_store:
+                self.location_store.store_aggregates(aggregates)
+        except Exception as e:
+            logger.error(f"Error storing stream events: {e}")
+
+    def check_liveness(self, readings):
+        """Record who reported and mark sensors that went silent or came back."""
+        recovered = self.liveness.touch_readings(readings) if readings else None
+        stale = self.liveness.advance(datetime.now())
+        for changes in (recovered, stale):
+            if not changes:
+                continue
+            for sensor_id in changes.stale_ids:
+                logger.warning(f"Sensor {sensor_id} stopped reporting")
+            for sensor_id in changes.recovered_ids:
+                logger.info(f"Sensor {sensor_id} is reporting again")
+            self.monitor.record_liveness_changes(changes, self.liveness.stale_count)
+            if self.status_store:
+                try:
+                    self.status_store.apply(changes)
+                except Exception as e:
+                    logger.error(f"Error updating sensor status: {e}")
+
+    def generate_stage(self):
+        """Generate simulator batches at the configured interval."""
+        while self.running:
+            self.raw_queue.put_many(self.simulator.generate_batch(), timeout=self.interval)
+            time.sleep(self.interval)
+        self.raw_queue.close()
+
+    def validate_stage(self):
+        """Validate raw readings and forward the valid ones to storage."""
+        while self.running or len(self.raw_queue):
+            for reading in self.raw_queue.get_batch(self.batch_size, timeout=self.interval):
+                is_valid, error = self.monitor.validate_reading(reading)
+                if is_valid:
+                    self.valid_queue.put(reading, timeout=self.interval)
+                else:
+                    logger.warning(f"Invalid reading from {reading['sensor_id']}: {error}")
+        self.valid_queue.close()
+
+    def start_stages(self):
+        """Start the generation and validation stages in background threads."""
+        for target in (self.generate_stage, self.validate_stage):
+            thread = threading.Thread(target=target, name=target.__name__, daemon=True)
+            thread.start()
+            self.stage_threads.append(thread)
+
     def run(self):
         """Run the data pipeline."""
         self.running = True
@@ -51,37 +229,52 @@ class IoTDataPipeline:
         start_time = time.time()
         last_analytics_time = start_time
         analytics_interval = 300  # Run analytics every 5 minutes
+        last_merge_time = start_time
 
         try:
             logger.info("Starting IoT data pipeline...")
-            while self.running:
+            self.start_stages()
+            while self.running or len(self.valid_queue):
+                # Drain whatever the upstream stages have queued
+                readings = self.valid_queue.get_batch(self.batch_size, timeout=self.interval)
+                self.check_liveness(readings)
+                if not readings:
+                    continue
                 batch_start_time = time.time()
-                
-                # Generate and validate readings
-                readings = self.simulator.generate_batch()
-                valid_readings = []
-                for reading in readings:
-                    is_valid, error = self.monitor.validate_reading(reading)
-                    if is_valid:
-                        valid_readings.append(reading)
-                    else:
-                        logger.warning(f"Invalid reading from {reading['sensor_id']}: {error}")
-                
+
+                # Register new sensors so their readings pass the foreign key
+                try:
+                    self.registry.register_readings(readings)
+                except Exception as e:
+                    logger.error(f"Error registering sensors: {e}")
+
                 # Process valid readings
-                processed = self.processor.process_readings(valid_readings)
+                stored = readings
+                if self.ingest_filter:
+                    stored = self.ingest_filter.filter_readings(readings)
+                    self.monitor.record_ingest_filter(self.ingest_filter.seen, self.ingest_filter.kept)
+                processed = self.processor.process_readings(stored) if stored else 0
                 total_readings += processed
+                self.evaluate_stream(readings)
                 
-                # Record batch metrics
+                # Record batch and queue metrics
                 processing_time = time.time() - batch_start_time
                 self.monitor.record_batch_metrics(
-                    batch_size=len(readings),
+                    batch_size=len(stored),
                     processing_time=processing_time,
-                    error_count=len(readings) - processed
+                    error_count=len(stored) - processed
                 )
+                self.monitor.record_queue_stats(self.raw_queue.stats())
+                self.monitor.record_queue_stats(self.valid_queue.stats())
                 
-                # Run analytics periodically
+                # Move staged readings into the partitions periodically
                 current_time = time.time()
-                if current_time - last_analytics_time >= analytics_interval:
+                if current_time - last_merge_time >= INGEST_CONFIG['staging_merge_seconds']:
+                    self.processor.merge_staged()
+                    last_merge_time = current_time
+
+                # Run analytics periodically
+                if self.analytics and current_time - last_analytics_time >= analytics_interval:
                     logger.info("Running analytics processing...")
                     self.analytics.process_analytics()
                     last_analytics_time = current_time
@@ -95,21 +288,52 @@ class IoTDataPipeline:
                 readings_per_second = total_readings / elapsed_time
                 logger.info(f"Processing rate: {readings_per_second:.2f} readings/second")
 
-                # Wait for next interval
-                time.sleep(self.interval)
-
         except Exception as e:
             logger.error(f"Error in pipeline: {e}")
             raise
         finally:
+            self.running = False
             self.cleanup()
 
     def cleanup(self):
         """Clean up resources."""
         logger.info("Cleaning up resources...")
+        self.raw_queue.close()
+        self.valid_queue.close()
+        for thread in self.stage_threads:
+            thread.join(timeout=self.interval * 2)
+        try:
+            self.processor.merge_staged()
+        except Exception as e:
+            logger.error(f"Error merging staged readings: {e}")
         self.processor.close()
-        self.analytics.close()
+        if self.registry_store:
+            self.registry_store.close()
+        if self.analytics:
+            self.analytics.close()
         self.monitor.close()
+        if self.alert_store:
+            self.alert_store.close()
+        if self.anomaly_store:
+            self.anomaly_store.close()
+        if self.status_store:
+            self.status_store.close()
+        if self.occupancy_store:
+            self.occupancy_store.close()
+        if self.sketch_store:
+            try:
+                self.sketch_store.store_sketches(self.sketches.flush())
+            except Exception as e:
+                logger.error(f"Error storing open sketches: {e}")
+            self.sketch_store.close()
+        if self.location_store:
+            try:
+                self.location_store.store_aggregates(self.locations.flush())
+            except Exception as e:
+                logger.error(f"Error storing open location aggregates: {e}")
+            self.location_store.close()
+        if self.hot_window:
+            self.hot_window.close()
         logger.info("Pipeline shutdown complete")
 
 def main():
@@ -0,0 +1,210 @@
+"""Detection of sensors that stopped reporting.
+
+``LivenessTracker`` keeps the last-seen time of every sensor in NumPy
+arrays and schedules one expiry check per sensor on a hashed timing wheel.
+Advancing the clock only visits the wheel slots that came due: a sensor
+that reported since it was scheduled is moved to its new deadline, the
+rest are stale. The fleet is never scanned as a whole.
+"""
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import psycopg2
+
+from src.pipeline.queues import sensor_type_of
+from src.streaming.state import SensorIndex, grow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+US_PER_SECOND = 1000000
+
+
+@dataclass
+class LivenessChanges:
+    """Sensors whose liveness changed, with their last-seen times."""
+    stale_ids: List[str]
+    stale_last_seen: List[datetime]
+    recovered_ids: List[str]
+    recovered_last_seen: List[datetime]
+
+    def __bool__(self) -> bool:
+        return bool(self.stale_ids or self.recovered_ids)
+
+
+class LivenessTracker:
+    def __init__(self, timeouts: Dict[str, float], default_timeout: float = 60.0,
+                 tick_seconds: float = 1.0,
+                 type_func: Callable[[str], Optional[str]] = sensor_type_of):
+        """Initialize the tracker.
+
+        timeouts maps sensor types to the silence (in seconds) after which a
+        sensor is stale; other sensors use default_timeout. type_func
+        resolves the type of a newly seen sensor.
+        """
+        self.timeouts = timeouts
+        self.type_func = type_func
+        self.default_timeout = default_timeout
+        self.tick_us = int(tick_seconds * US_PER_SECOND)
+        longest = max([default_timeout, *timeouts.values()])
+        # Every deadline is less than one rotation ahead
+        self.num_slots = int(math.ceil(longest / tick_seconds)) + 2
+        self.index = SensorIndex()
+        self.last_seen = np.zeros(0, dtype=np.int64)  # epoch microseconds
+        self.timeout_us = np.zeros(0, dtype=np.int64)
+        self.scheduled = np.zeros(0, dtype=np.bool_)
+        self.stale = np.zeros(0, dtype=np.bool_)
+        # Kept up to date from the changes, so reading it never scans the fleet
+        self.stale_count = 0
+        self._slots: List[List[np.ndarray]] = [[] for _ in range(self.num_slots)]
+        self._current_tick: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def touch(self, sensor_ids: Sequence[str], timestamps: np.ndarray) -> LivenessChanges:
+        """Record readings; returns the stale sensors that reported again."""
+        timestamps = np.asarray(timestamps, dtype='datetime64[us]')
+        if not len(timestamps):
+            return LivenessChanges([], [], [], [])
+        keys = self.index.keys_for(np.asarray(sensor_ids, dtype=object))
+        self._ensure(keys)
+
+        # Latest reading per sensor in this batch
+        order = np.lexsort((timestamps, keys))
+        keys = keys[order]
+        seen = timestamps[order].astype(np.int64)
+        is_last = np.append(keys[1:] != keys[:-1], True)
+        keys, seen = keys[is_last], seen[is_last]
+
+        newer = seen > self.last_seen[keys]
+        keys, seen = keys[newer], seen[newer]
+        self.last_seen[keys] = seen
+
+        recovered = keys[self.stale[keys]]
+        self.stale[recovered] = False
+        self.stale_count -= len(recovered)
+        unscheduled = keys[~self.scheduled[keys]]
+        self._schedule(unscheduled)
+        return LivenessChanges([], [], self._ids(recovered), self._times(recovered))
+
+    def touch_readings(self, readings: List[Dict]) -> LivenessChanges:
+        """Record simulator reading dicts."""
+        return self.touch([r['sensor_id'] for r in readings], [r['timestamp'] for r in readings])
+
+    def advance(self, now: datetime) -> LivenessChanges:
+        """Move the clock to now and return the sensors that became stale."""
+        now_us = int(np.datetime64(now, 'us').astype(np.int64))
+        now_tick = now_us // self.tick_us
+        if self._current_tick is None:
+            self._current_tick = now_tick
+        # After a long pause every slot is due, but each only once
+        first_tick = max(self._current_tick + 1, now_tick - self.num_slots + 1)
+        due = []
+        for tick in range(first_tick, now_tick + 1):
+            entries = self._slots[tick % self.num_slots]
+            if entries:
+                due.extend(entries)
+                entries.clear()
+        self._current_tick = max(self._current_tick, now_tick)
+        if not due:
+            return LivenessChanges([], [], [], [])
+
+        keys = np.unique(np.concatenate(due))
+        self.scheduled[keys] = False
+        expired = self.last_seen[keys] + self.timeout_us[keys] <= now_us
+        stale = keys[expired & ~self.stale[keys]]
+        self.stale[stale] = True
+        self.stale_count += len(stale)
+        # Sensors that reported since they were scheduled move to their new deadline
+        self._schedule(keys[~expired])
+        return LivenessChanges(self._ids(stale), self._times(stale), [], [])
+
+    def stale_sensors(self) -> List[str]:
+        """Return the sensors currently marked stale; scans the fleet, use stale_count for monitoring."""
+        return self._ids(np.flatnonzero(self.stale[:len(self.index)]))
+
+    def _ensure(self, keys: np.ndarray):
+        size = len(self.index)
+        self.last_seen = grow(self.last_seen, size, 0)
+        self.timeout_us = grow(self.timeout_us, size, 0)
+        self.scheduled = grow(self.scheduled, size, False)
+        self.stale = grow(self.stale, size, False)
+        # Resolve the timeout of newly indexed sensors once
+        new_keys = keys[self.timeout_us[keys] == 0]
+        for key in np.unique(new_keys):
+            sensor_type = self.type_func(self.index.sensor_id(int(key)))
+            timeout = self.timeouts.get(sensor_type, self.default_timeout)
+            self.timeout_us[key] = int(timeout * US_PER_SECOND)
+
+    def _schedule(self, keys: np.ndarray):
+        if not len(keys):
+            return
+        deadline_ticks = (self.last_seen[keys] + self.timeout_us[keys]) // self.tick_us
+        if self._current_tick is not None:
+            # Deadlines already behind the clock are checked on the next tick
+            deadline_ticks = np.maximum(deadline_ticks, self._current_tick + 1)
+        slots = deadline_ticks % self.num_slots
+        order = np.argsort(slots, kind='stable')
+        slots, keys = slots[order], keys[order]
+        bounds = np.flatnonzero(np.diff(slots)) + 1
+        for start, slot_keys in zip(np.append(0, bounds), np.split(keys, bounds)):
+            self._slots[int(slots[start])].append(slot_keys)
+        self.scheduled[keys] = True
+
+    def _ids(self, keys: np.ndarray) -> List[str]:
+        return [self.index.sensor_id(int(key)) for key in keys]
+
+    def _times(self, keys: np.ndarray) -> List[datetime]:
+        return self.last_seen[keys].astype('datetime64[us]').astype(datetime).tolist()
+
+
+class SensorStatusStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store updating sensors.status."""
+        self.db_params = db_params
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def apply(self, changes: LivenessChanges):
+        """Set status and last_reading of changed sensors with one statement per status."""
+        try:
+            with self.conn.cursor() as cur:
+                for status, ids, last_seen in (
+                    ('stale', changes.stale_ids, changes.stale_last_seen),
+                    ('active', changes.recovered_ids, changes.recovered_last_seen)
+                ):
+                    if not ids:
+                        continue
+                    cur.execute("""
+                        UPDATE sensors AS s
+                        SET status = %s,
+                            last_reading = v.last_seen,
+                            updated_at = CURRENT_TIMESTAMP
+                        FROM unnest(%s::varchar[], %s::timestamp[]) AS v(sensor_id, last_seen)
+                        WHERE s.sensor_id = v.sensor_id
+                    """, (status, ids, last_seen))
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error updating sensor status: {e}")
+            raise
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Sensor status store connection closed")
@@ -1,11 +1,12 @@
 import logging
 import psycopg2
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import time
 from collections import deque
 from dataclasses import dataclass
 import statistics
+from src.pipeline.queues import sensor_type_of
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,10 +28,16 @@ class PerformanceMetrics:
     batch_size: int = 0
 
 class PipelineMonitor:
-    def __init__(self, db_params: Dict[str, str], window_size: int = 100):
-        """Initialize the pipeline monitor."""
+    def __init__(self, db_params: Optional[Dict[str, str]], window_size: int = 100,
+                 type_func: Callable[[str], Optional[str]] = sensor_type_of):
+        """Initialize the pipeline monitor.
+
+        Without db_params the monitor runs without a database and reports no
+        partition sizes. type_func resolves the sensor type of a reading.
+        """
         self.db_params = db_params
         self.window_size = window_size
+        self.type_func = type_func
         self.conn = None
         self.start_time = time.time()
         
@@ -38,6 +45,19 @@ class PipelineMonitor:
         self.processing_times = deque(maxlen=window_size)
         self.error_counts = deque(maxlen=window_size)
         self.batch_sizes = deque(maxlen=window_size)
+
+        # Latest depth/drop counters reported by the stage queues
+        self.queue_stats: Dict[str, Any] = {}
+
+        # Streaming alerts per rule and status
+        self.alert_counts: Dict[Tuple[str, str], int] = {}
+        self.anomaly_counts: Dict[str, int] = {}
+        self.stale_count = 0
+        self.recent_stale: deque = deque(maxlen=10)
+
+        # Readings seen and stored by the ingest filter
+        self.filter_seen = 0
+        self.filter_kept = 0
         
         # Data quality metrics
         self.quality_metrics = {
@@ -53,7 +73,8 @@ class PipelineMonitor:
             'motion': (False, True)       # Boolean
         }
         
-        self.connect()
+        if self.db_params is not None:
+            self.connect()
         logger.info("Pipeline monitor initialized")
 
     def connect(self):
@@ -67,14 +88,7 @@ class PipelineMonitor:
 
     def validate_reading(self, reading: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
         """Validate a sensor reading."""
-        sensor_type = None
-        if 'temp_sensor' in reading['sensor_id']:
-            sensor_type = 'temperature'
-        elif 'humidity_sensor' in reading['sensor_id']:
-            sensor_type = 'humidity'
-        elif 'motion_sensor' in reading['sensor_id']:
-            sensor_type = 'motion'
-        
+        sensor_type = self.type_func(reading['sensor_id'])
         if not sensor_type:
             return False, "Invalid sensor type"
         
@@ -104,6 +118,34 @@ class PipelineMonitor:
         self.error_counts.append(error_count)
         self.batch_sizes.append(batch_size)
 
+    def record_queue_stats(self, stats: Any):
+        """Record the latest counters of a stage queue."""
+        self.queue_stats[stats.name] = stats
+
+    def record_alerts(self, alerts: List[Any]):
+        """Count raised and resolved alerts per rule."""
+        for alert in alerts:
+            key = (alert.rule, alert.status)
+            self.alert_counts[key] = self.alert_counts.get(key, 0) + 1
+
+    def record_anomalies(self, anomalies: List[Any]):
+        """Count anomalies per sensor type."""
+        for anomaly in anomalies:
+            self.anomaly_counts[anomaly.sensor_type] = self.anomaly_counts.get(anomaly.sensor_type, 0) + 1
+
+    def record_liveness_changes(self, changes: Any, stale_count: int):
+        """Record the current stale count and the latest sensors that went stale or recovered."""
+        self.stale_count = stale_count
+        for sensor_id in changes.recovered_ids:
+            if sensor_id in self.recent_stale:
+                self.recent_stale.remove(sensor_id)
+        self.recent_stale.extend(changes.stale_ids)
+
+    def record_ingest_filter(self, seen: int, kept: int):
+        """Record the ingest filter's running totals."""
+        self.filter_seen = seen
+        self.filter_kept = kept
+
     def get_performance_metrics(self) -> PerformanceMetrics:
         """Calculate current performance metrics."""
         if not self.processing_times:
@@ -124,6 +166,8 @@ class PipelineMonitor:
 
     def get_partition_sizes(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get the size of each partition in the database."""
+        if self.conn is None:
+            return {}
         try:
             with self.conn.cursor() as cur:
                 partition_sizes = {}
@@ -181,6 +225,25 @@ class PipelineMonitor:
         logger.info(f"Avg Batch Size: {perf_metrics.batch_size:.1f}")
         logger.info(f"Total Errors: {perf_metrics.error_count}")
         
+        logger.info("\n=== Stage Queues ===")
+        for name, stats in self.queue_stats.items():
+            logger.info(f"{name}: depth {stats.depth}/{stats.capacity} "
+                      f"(high watermark {stats.high_watermark}, policy {stats.policy})")
+            logger.info(f"  Dropped: {stats.dropped}, Coalesced: {stats.coalesced}, "
+                      f"Blocked: {stats.blocked_seconds:.2f}s")
+        
+        if self.filter_seen:
+            logger.info(f"Ingest filter: stored {self.filter_kept} of {self.filter_seen} readings "
+                      f"({(1 - self.filter_kept / self.filter_seen) * 100:.1f}% dropped)")
+        
+        logger.info("\n=== Alerts ===")
+        for (rule, status), count in sorted(self.alert_counts.items()):
+            logger.info(f"{rule}: {count} {status}")
+        for sensor_type, count in sorted(self.anomaly_counts.items()):
+            logger.info(f"{sensor_type} anomalies: {count}")
+        if self.stale_count:
+            logger.info(f"Stale sensors: {self.stale_count} (latest: {', '.join(self.recent_stale)})")
+        
         logger.info("\n=== Data Quality ===")
         for sensor_type, metrics in quality_report.items():
             logger.info(f"{sensor_type.capitalize()} Sensors:")
@@ -0,0 +1,276 @@
+"""Bounded queues connecting the pipeline stages.
+
+Each queue has a fixed capacity and an explicit overflow policy so that a
+slow downstream stage (usually the database) degrades the pipeline in a
+controlled way instead of letting readings pile up without limit.
+
+Evicting under overload costs O(1) amortized: the priority policy keeps a
+FIFO of queued entries per priority level, the coalescing policy the
+latest entry per key plus the entries it superseded, and evicted entries
+are only marked dead and skipped when they reach the front.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Supported overflow policies
+POLICY_BLOCK = 'block'
+POLICY_DROP_OLDEST = 'drop_oldest'
+POLICY_DROP_PRIORITY = 'drop_priority'
+POLICY_COALESCE = 'coalesce'
+OVERFLOW_POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_PRIORITY, POLICY_COALESCE)
+
+# Higher value means the reading is kept longer under overload
+DEFAULT_TYPE_PRIORITIES = {
+    'motion': 2,
+    'temperature': 1,
+    'humidity': 0
+}
+
+
+def sensor_type_of(sensor_id: str) -> Optional[str]:
+    """Infer the sensor type from a sensor id."""
+    if 'temp_sensor' in sensor_id:
+        return 'temperature'
+    if 'humidity_sensor' in sensor_id:
+        return 'humidity'
+    if 'motion_sensor' in sensor_id:
+        return 'motion'
+    return None
+
+
+def _reading_key(reading: Dict[str, Any]) -> Hashable:
+    return reading['sensor_id']
+
+
+def _reading_priority(reading: Dict[str, Any]) -> int:
+    return DEFAULT_TYPE_PRIORITIES.get(sensor_type_of(reading['sensor_id']), 0)
+
+
+class _Entry:
+    """A queued item with the bookkeeping its overflow policy needs."""
+    __slots__ = ('item', 'key', 'priority', 'alive')
+
+    def __init__(self, item: Any, key: Hashable = None, priority: int = 0):
+        self.item = item
+        self.key = key
+        self.priority = priority
+        self.alive = True
+
+
+@dataclass
+class QueueStats:
+    """Point-in-time counters for a stage queue."""
+    name: str
+    capacity: int
+    policy: str
+    depth: int = 0
+    high_watermark: int = 0
+    enqueued: int = 0
+    dequeued: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    blocked_seconds: float = 0.0
+
+
+class BoundedStageQueue:
+    def __init__(self, name: str, capacity: int = 1000, policy: str = POLICY_BLOCK,
+                 key_func: Callable[[Any], Hashable] = _reading_key,
+                 priority_func: Callable[[Any], int] = _reading_priority):
+        """Initialize a bounded queue with the given overflow policy."""
+        if capacity <= 0:
+            raise ValueError("Queue capacity must be positive")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}', expected one of {OVERFLOW_POLICIES}")
+
+        self.name = name
+        self.capacity = capacity
+        self.policy = policy
+        self.key_func = key_func
+        self.priority_func = priority_func
+
+        # Entries in arrival order; dead ones were evicted and are skipped
+        self._items: Deque[_Entry] = deque()
+        self._size = 0
+        # Live entries per priority level, oldest first (drop_priority)
+        self._by_priority: Dict[int, Deque[_Entry]] = {}
+        # Latest live entry per key and the older entries it replaced (coalesce)
+        self._latest: Dict[Hashable, _Entry] = {}
+        self._superseded: Deque[_Entry] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        self._high_watermark = 0
+        self._enqueued = 0
+        self._dequeued = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._blocked_seconds = 0.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Add an item, applying the overflow policy if the queue is full.
+
+        Returns False if the item itself was rejected (blocking put timed out,
+        the queue is closed, or it lost a priority comparison).
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            entry = _Entry(item)
+            if self.policy == POLICY_COALESCE:
+                entry.key = self.key_func(item)
+            elif self.policy == POLICY_DROP_PRIORITY:
+                entry.priority = self.priority_func(item)
+            if self._size >= self.capacity and not self._make_room(entry, timeout):
+                self._dropped += 1
+                return False
+            self._append(entry)
+            self._enqueued += 1
+            self._high_watermark = max(self._high_watermark, self._size)
+            self._not_empty.notify()
+            return True
+
+    def put_many(self, items: Iterable[Any], timeout: Optional[float] = None) -> int:
+        """Add several items and return how many were accepted."""
+        return sum(1 for item in items if self.put(item, timeout))
+
+    def get_batch(self, max_items: int, timeout: Optional[float] = None) -> List[Any]:
+        """Remove up to max_items items, waiting up to timeout for the first one."""
+        with self._lock:
+            if not self._size and not self._closed:
+                self._not_empty.wait(timeout)
+            batch = []
+            while len(batch) < max_items and self._size:
+                entry = self._items.popleft()
+                if entry.alive:
+                    self._remove(entry)
+                    batch.append(entry.item)
+            self._dequeued += len(batch)
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def close(self):
+        """Stop accepting items and wake up any waiting producers or consumers."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> QueueStats:
+        """Return a snapshot of the queue counters."""
+        with self._lock:
+            return QueueStats(
+                name=self.name,
+                capacity=self.capacity,
+                policy=self.policy,
+                depth=self._size,
+                high_watermark=self._high_watermark,
+                enqueued=self._enqueued,
+                dequeued=self._dequeued,
+                dropped=self._dropped,
+                coalesced=self._coalesced,
+                blocked_seconds=self._blocked_seconds
+            )
+
+    def _append(self, entry: _Entry):
+        """Queue a live entry. Must be called with the lock held."""
+        self._items.append(entry)
+        self._size += 1
+        if self.policy == POLICY_DROP_PRIORITY:
+            self._by_priority.setdefault(entry.priority, deque()).append(entry)
+        elif self.policy == POLICY_COALESCE:
+            previous = self._latest.get(entry.key)
+            if previous is not None:
+                self._superseded.append(previous)
+                if len(self._superseded) > 2 * self.capacity:
+                    self._superseded = deque(e for e in self._superseded if e.alive)
+            self._latest[entry.key] = entry
+        # Evicted entries wait in the deque until they reach the front
+        if len(self._items) > 2 * self.capacity:
+            self._items = deque(e for e in self._items if e.alive)
+
+    def _remove(self, entry: _Entry):
+        """Take a live entry out of the queue and the policy's indexes."""
+        entry.alive = False
+        self._size -= 1
+        if self.policy == POLICY_DROP_PRIORITY:
+            # Entries leave a level oldest first, whether dequeued or evicted
+            level = self._by_priority[entry.priority]
+            level.popleft()
+            if not level:
+                del self._by_priority[entry.priority]
+        elif self.policy == POLICY_COALESCE and self._latest.get(entry.key) is entry:
+            del self._latest[entry.key]
+
+    def _drop_oldest(self):
+        while True:
+            entry = self._items.popleft()
+            if entry.alive:
+                self._remove(entry)
+                self._dropped += 1
+                return
+
+    def _make_room(self, entry: _Entry, timeout: Optional[float]) -> bool:
+        """Free at least one slot for entry. Must be called with the lock held."""
+        if self.policy == POLICY_BLOCK:
+            return self._wait_for_room(timeout)
+        if self.policy == POLICY_DROP_OLDEST:
+            self._drop_oldest()
+            return True
+        if self.policy == POLICY_DROP_PRIORITY:
+            return self._drop_lowest_priority(entry)
+        return self._coalesce(entry)
+
+    def _wait_for_room(self, timeout: Optional[float]) -> bool:
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        while self._size >= self.capacity and not self._closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            self._not_full.wait(remaining)
+        self._blocked_seconds += time.monotonic() - start
+        return self._size < self.capacity and not self._closed
+
+    def _drop_lowest_priority(self, entry: _Entry) -> bool:
+        """Evict the oldest item of the lowest priority present, if it ranks below entry."""
+        lowest = min(self._by_priority)
+        if lowest >= entry.priority:
+            return False
+        self._remove(self._by_priority[lowest][0])
+        self._dropped += 1
+        return True
+
+    def _coalesce(self, entry: _Entry) -> bool:
+        """Collapse the backlog to the latest pending item per key."""
+        # The pending item of the same key is replaced by entry
+        previous = self._latest.get(entry.key)
+        if previous is not None:
+            self._remove(previous)
+            self._coalesced += 1
+        while self._superseded:
+            older = self._superseded.popleft()
+            if older.alive:
+                self._remove(older)
+                self._coalesced += 1
+        # More distinct sensors than capacity: fall back to dropping the oldest
+        while self._size >= self.capacity:
+            self._drop_oldest()
+        return True
@@ -0,0 +1,193 @@
+"""In-memory registry of known sensors.
+
+Every reading row references ``sensors(sensor_id)``, so a reading of a
+sensor that was never registered fails its insert. ``SensorRegistry``
+caches the registered sensors (integer key, type and location per id),
+finds the unknown ids of each batch with one set difference, and registers
+them with a single upsert before the batch is stored. Stages look the
+sensor type up in the registry instead of parsing the id; ids are only
+parsed once, when a sensor is first seen.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.storage.base import ReadingBatch
+
+from .queues import sensor_type_of
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SensorInfo:
+    """A registered sensor."""
+    key: int
+    sensor_id: str
+    sensor_type: str
+    location: Optional[str]
+
+
+class SensorRegistryStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store for the sensors table."""
+        self.db_params = db_params
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def load_sensors(self) -> List[SensorInfo]:
+        """Return every registered sensor."""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT sensor_key, sensor_id, type, location FROM sensors")
+                rows = cur.fetchall()
+            self.conn.commit()
+            return [SensorInfo(*row) for row in rows]
+        except psycopg2.errors.UndefinedColumn as e:
+            self.conn.rollback()
+            logger.error(f"sensors table predates sensor_key, run python -m database.setup.setup_db "
+                         f"to migrate it: {e}")
+            raise
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error loading sensors: {e}")
+            raise
+
+    def upsert_sensors(self, sensors: List[Tuple[str, str, Optional[str]]]) -> List[SensorInfo]:
+        """Register (sensor_id, type, location) rows in one statement.
+
+        Sensors registered meanwhile by another process keep their row;
+        all sensors are returned with their stored key, type and location.
+        """
+        if not sensors:
+            return []
+        try:
+            with self.conn.cursor() as cur:
+                rows = execute_values(cur, """
+                    INSERT INTO sensors (sensor_id, type, location)
+                    VALUES %s
+                    ON CONFLICT (sensor_id) DO UPDATE SET sensor_id = EXCLUDED.sensor_id
+                    RETURNING sensor_key, sensor_id, type, location
+                """, sensors, page_size=len(sensors), fetch=True)
+            self.conn.commit()
+            return [SensorInfo(*row) for row in rows]
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error registering {len(sensors)} sensors: {e}")
+            raise
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Sensor registry store connection closed")
+
+
+class SensorRegistry:
+    def __init__(self, store: Optional[SensorRegistryStore] = None,
+                 infer_type: Callable[[str], Optional[str]] = sensor_type_of):
+        """Initialize the registry, loading the sensors known to the store.
+
+        Without a store, new sensors get local keys only. infer_type derives
+        the type of a sensor seen for the first time from its id.
+        """
+        self.store = store
+        self.infer_type = infer_type
+        self._sensors: Dict[str, SensorInfo] = {}
+        # Types of ids that are seen but not (yet) registered
+        self._inferred: Dict[str, Optional[str]] = {}
+        if store is not None:
+            self._add(store.load_sensors())
+            logger.info(f"Sensor registry loaded {len(self._sensors)} sensors")
+
+    def __len__(self) -> int:
+        return len(self._sensors)
+
+    def __contains__(self, sensor_id: str) -> bool:
+        return sensor_id in self._sensors
+
+    def get(self, sensor_id: str) -> Optional[SensorInfo]:
+        return self._sensors.get(sensor_id)
+
+    def sensor_type(self, sensor_id: str) -> Optional[str]:
+        """Return the type of a sensor, inferring it once for unregistered ids."""
+        info = self._sensors.get(sensor_id)
+        if info is not None:
+            return info.sensor_type
+        try:
+            return self._inferred[sensor_id]
+        except KeyError:
+            sensor_type = self._inferred[sensor_id] = self.infer_type(sensor_id)
+            return sensor_type
+
+    def key(self, sensor_id: str) -> Optional[int]:
+        info = self._sensors.get(sensor_id)
+        return info.key if info is not None else None
+
+    def location(self, sensor_id: str) -> Optional[str]:
+        info = self._sensors.get(sensor_id)
+        return info.location if info is not None else None
+
+    def locations(self) -> Dict[str, str]:
+        """Return the location of every registered sensor that has one."""
+        return {sensor_id: info.location for sensor_id, info in self._sensors.items() if info.location}
+
+    def unknown(self, sensor_ids: Iterable[str]) -> List[str]:
+        """Return the distinct ids that are not registered, in first-seen order."""
+        return [sensor_id for sensor_id in dict.fromkeys(sensor_ids) if sensor_id not in self._sensors]
+
+    def register_readings(self, readings: Iterable[Dict[str, Any]]) -> List[SensorInfo]:
+        """Register the unknown sensors of a batch of readings in bulk.
+
+        The type and location of a new sensor are taken from its first
+        reading; without a 'type' field the type is inferred from the id.
+        Ids of unknown type are not registered. Returns the newly
+        registered sensors.
+        """
+        readings = list(readings)
+        unknown = set(self.unknown(reading['sensor_id'] for reading in readings))
+        if not unknown:
+            return []
+        rows: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        for reading in readings:
+            sensor_id = reading['sensor_id']
+            if sensor_id in unknown and sensor_id not in rows:
+                sensor_type = reading.get('type') or self.sensor_type(sensor_id)
+                if sensor_type is not None:
+                    rows[sensor_id] = (sensor_id, sensor_type, reading.get('location'))
+        return self._register(list(rows.values()))
+
+    def register_batch(self, batch: ReadingBatch) -> List[SensorInfo]:
+        """Register the unknown sensors of a columnar batch, typed by the batch, in bulk."""
+        unknown = self.unknown(batch.sensor_ids.tolist())
+        return self._register([(sensor_id, batch.sensor_type, None) for sensor_id in unknown])
+
+    def _register(self, rows: List[Tuple[str, str, Optional[str]]]) -> List[SensorInfo]:
+        if not rows:
+            return []
+        if self.store is not None:
+            registered = self.store.upsert_sensors(rows)
+        else:
+            next_key = len(self._sensors) + 1
+            registered = [SensorInfo(next_key + i, *row) for i, row in enumerate(rows)]
+        self._add(registered)
+        logger.info(f"Registered {len(registered)} new sensors")
+        return registered
+
+    def _add(self, sensors: Iterable[SensorInfo]):
+        for info in sensors:
+            self._sensors[info.sensor_id] = info
+            self._inferred.pop(info.sensor_id, None)
@@ -1,8 +1,11 @@
 import logging
 import psycopg2
+import pyarrow as pa
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from itertools import count, islice
+from typing import Dict, Iterator, List, Any, Optional
 from dataclasses import dataclass
+from src.storage.archive import TREND_SCHEMAS, ColdArchive, list_partitions, month_key
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,10 +21,63 @@ class SensorStats:
     window_start: datetime
     window_end: datetime
 
+# Hourly trends per sensor type, with columns in TREND_SCHEMAS order.
+# Aggregates are cast to float8 so they arrive as floats, not Decimals.
+TREND_QUERIES = {
+    'temperature': """
+        SELECT
+            sensor_id,
+            date_trunc('hour', timestamp) as hour,
+            AVG(value)::float8 as avg_value,
+            MIN(value)::float8 as min_value,
+            MAX(value)::float8 as max_value
+        FROM temperature_readings
+        WHERE timestamp >= %s AND timestamp < %s
+        GROUP BY sensor_id, date_trunc('hour', timestamp)
+        ORDER BY hour
+    """,
+    'humidity': """
+        SELECT
+            sensor_id,
+            date_trunc('hour', timestamp) as hour,
+            AVG(value)::float8 as avg_value,
+            MIN(value)::float8 as min_value,
+            MAX(value)::float8 as max_value
+        FROM humidity_readings
+        WHERE timestamp >= %s AND timestamp < %s
+        GROUP BY sensor_id, date_trunc('hour', timestamp)
+        ORDER BY hour
+    """,
+    'motion': """
+        SELECT
+            sensor_id,
+            date_trunc('hour', timestamp) as hour,
+            COUNT(*) as total_events,
+            SUM(CASE WHEN detected THEN 1 ELSE 0 END)::float / COUNT(*) * 100 as activity_rate
+        FROM motion_events
+        WHERE timestamp >= %s AND timestamp < %s
+        GROUP BY sensor_id, date_trunc('hour', timestamp)
+        ORDER BY hour
+    """
+}
+
+# Server-side cursor names must be unique within a transaction
+_cursor_ids = count()
+
 class AnalyticsProcessor:
-    def __init__(self, db_params: Dict[str, str]):
-        """Initialize the analytics processor."""
+    def __init__(self, db_params: Dict[str, str], archive_path: Optional[str] = None,
+                 durability: str = 'strict'):
+        """Initialize the analytics processor.
+
+        With an archive_path, trend queries also read archived partitions
+        from the Parquet cold tier. durability 'relaxed' commits the
+        session's writes with synchronous_commit off.
+        """
+        if durability not in ('strict', 'relaxed'):
+            raise ValueError(f"Unsupported analytics durability '{durability}'")
         self.db_params = db_params
+        self.durability = durability
+        self.cold_archive = ColdArchive(archive_path) if archive_path else None
         self.conn = None
         self.connect()
         logger.info("Analytics processor initialized")
@@ -31,6 +87,10 @@ class AnalyticsProcessor:
         try:
             self.conn = psycopg2.connect(**self.db_params)
             self.conn.autocommit = False
+            if self.durability == 'relaxed':
+                with self.conn.cursor() as cur:
+                    cur.execute("SET synchronous_commit TO OFF")
+                self.conn.commit()
         except Exception as e:
             logger.error(f"Error connecting to database: {e}")
             raise
@@ -135,95 +195,91 @@ class AnalyticsProcessor:
                     self.store_analytics(sensor_id, 'motion_rate', activity_rate,
                                        window_start, window_end)
 
-    def get_sensor_trends(self, hours: int = 24) -> Dict[str, List[Dict[str, Any]]]:
-        """Get sensor reading trends for the specified time period."""
-        trends = {}
+    def iter_trend_chunks(self, sensor_type: str, start_time: datetime, end_time: datetime,
+                          chunk_size: int = 10000) -> Iterator[pa.RecordBatch]:
+        """Stream hourly trends of one sensor type as Arrow record batches.
+
+        A named cursor keeps the result on the server and transfers
+        chunk_size rows per round trip, so memory is bounded by one chunk
+        however long the period is. The read transaction ends with the
+        generator, also when the caller stops early.
+        """
+        schema = TREND_SCHEMAS[sensor_type]
+        cursor_name = f"{sensor_type}_trends_{next(_cursor_ids)}"
+        failed = False
+        try:
+            with self.conn.cursor(name=cursor_name) as cur:
+                cur.itersize = chunk_size
+                cur.execute(TREND_QUERIES[sensor_type], (start_time, end_time))
+                while True:
+                    rows = list(islice(cur, chunk_size))
+                    if not rows:
+                        break
+                    yield pa.RecordBatch.from_arrays(
+                        [pa.array(column, type=column_type)
+                         for column, column_type in zip(zip(*rows), schema.types)],
+                        schema=schema
+                    )
+        except Exception:
+            failed = True
+            self.conn.rollback()
+            raise
+        finally:
+            # Closing the generator early lands here too; never leave the session idle in transaction
+            if not failed:
+                self.conn.commit()
+
+    def get_sensor_trend_tables(self, hours: int = 24, chunk_size: int = 10000) -> Dict[str, pa.Table]:
+        """Get hourly trends as one Arrow table per sensor type.
+
+        Columns are those of TREND_SCHEMAS; use ``table.column(name).to_numpy()``
+        to aggregate further without building a dict per row.
+        """
         end_time = datetime.now()
         start_time = end_time - timedelta(hours=hours)
-        
+
         try:
-            # Temperature trends
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        sensor_id,
-                        date_trunc('hour', timestamp) as hour,
-                        AVG(value) as avg_value,
-                        MIN(value) as min_value,
-                        MAX(value) as max_value
-                    FROM temperature_readings
-                    WHERE timestamp >= %s AND timestamp < %s
-                    GROUP BY sensor_id, date_trunc('hour', timestamp)
-                    ORDER BY hour
-                """, (start_time, end_time))
-                
-                trends['temperature'] = [
-                    {
-                        'sensor_id': row[0],
-                        'hour': row[1],
-                        'avg': float(row[2]),
-                        'min': float(row[3]),
-                        'max': float(row[4])
-                    }
-                    for row in cur.fetchall()
-                ]
-
-            # Humidity trends
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        sensor_id,
-                        date_trunc('hour', timestamp) as hour,
-                        AVG(value) as avg_value,
-                        MIN(value) as min_value,
-                        MAX(value) as max_value
-                    FROM humidity_readings
-                    WHERE timestamp >= %s AND timestamp < %s
-                    GROUP BY sensor_id, date_trunc('hour', timestamp)
-                    ORDER BY hour
-                """, (start_time, end_time))
-                
-                trends['humidity'] = [
-                    {
-                        'sensor_id': row[0],
-                        'hour': row[1],
-                        'avg': float(row[2]),
-                        'min': float(row[3]),
-                        'max': float(row[4])
-                    }
-                    for row in cur.fetchall()
-                ]
-
-            # Motion trends
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        sensor_id,
-                        date_trunc('hour', timestamp) as hour,
-                        COUNT(*) as total_events,
-                        SUM(CASE WHEN detected THEN 1 ELSE 0 END)::float / COUNT(*) * 100 as activity_rate
-                    FROM motion_events
-                    WHERE timestamp >= %s AND timestamp < %s
-                    GROUP BY sensor_id, date_trunc('hour', timestamp)
-                    ORDER BY hour
-                """, (start_time, end_time))
-                
-                trends['motion'] = [
-                    {
-                        'sensor_id': row[0],
-                        'hour': row[1],
-                        'total_events': row[2],
-                        'activity_rate': float(row[3])
-                    }
-                    for row in cur.fetchall()
-                ]
-            
+            trends = {
+                sensor_type: pa.Table.from_batches(
+                    list(self.iter_trend_chunks(sensor_type, start_time, end_time, chunk_size)),
+                    schema=schema
+                )
+                for sensor_type, schema in TREND_SCHEMAS.items()
+            }
+
+            if self.cold_archive:
+                self.add_cold_trends(trends, start_time, end_time)
+
+            self.conn.commit()
             return trends
-            
+
         except Exception as e:
+            self.conn.rollback()
             logger.error(f"Error getting sensor trends: {e}")
             return {}
 
+    def get_sensor_trends(self, hours: int = 24) -> Dict[str, List[Dict[str, Any]]]:
+        """Get sensor reading trends for the specified time period."""
+        return {
+            sensor_type: table.to_pylist()
+            for sensor_type, table in self.get_sensor_trend_tables(hours).items()
+        }
+
+    def add_cold_trends(self, trends: Dict[str, pa.Table], start_time: datetime, end_time: datetime):
+        """Merge archived hourly trends into hot trend tables.
+
+        Months that still have a live partition are read from PostgreSQL only,
+        so a partition caught between export and drop is never counted twice.
+        """
+        tables = {'temperature': 'temperature_readings', 'humidity': 'humidity_readings',
+                  'motion': 'motion_events'}
+        with self.conn.cursor() as cur:
+            for sensor_type, table in tables.items():
+                hot_months = {month_key(start) for _, start, _ in list_partitions(cur, table)}
+                cold = self.cold_archive.hourly_table(sensor_type, start_time, end_time, hot_months)
+                if cold.num_rows:
+                    trends[sensor_type] = pa.concat_tables([trends[sensor_type], cold]).sort_by('hour')
+
     def close(self):
         """Close database connection."""
         if self.conn:
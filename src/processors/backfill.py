@@ -0,0 +1,250 @@
+"""Historical (re)computation of sensor_analytics in parallel.
+
+``AnalyticsProcessor.process_analytics`` only covers the window ending now.
+``AnalyticsBackfill`` recomputes the same metrics for every window of a past
+range. The range is cut into tasks at partition bounds and every
+``task_hours``, aligned to the window grid. The tasks run in a process pool
+with one connection per worker.
+
+Each task is one transaction: it deletes the task's existing metrics and
+inserts the new ones with a single INSERT ... SELECT, so results never
+leave the server and rerunning a task is harmless. Finished tasks are
+recorded in a checkpoint file, and a restarted backfill skips them.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import psycopg2
+
+from src.storage.archive import list_partitions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Windows are aligned to multiples of their width since this origin
+WINDOW_ORIGIN = datetime(2000, 1, 1)
+
+# Sensor type -> (table, [(metric_name, aggregate over the window's rows)]),
+# matching the metrics written by AnalyticsProcessor.process_analytics
+BACKFILL_METRICS = {
+    'temperature': ('temperature_readings', [
+        ('temp_min', 'MIN(value)'),
+        ('temp_max', 'MAX(value)'),
+        ('temp_avg', 'AVG(value)'),
+        ('temp_std', 'COALESCE(STDDEV(value), 0)')
+    ]),
+    'humidity': ('humidity_readings', [
+        ('humidity_min', 'MIN(value)'),
+        ('humidity_max', 'MAX(value)'),
+        ('humidity_avg', 'AVG(value)'),
+        ('humidity_std', 'COALESCE(STDDEV(value), 0)')
+    ]),
+    'motion': ('motion_events', [
+        ('motion_rate', 'SUM(CASE WHEN detected THEN 1 ELSE 0 END)::float / COUNT(*) * 100')
+    ])
+}
+
+
+@dataclass(frozen=True)
+class BackfillTask:
+    """Windows [start, end) of one sensor type, within a single partition."""
+    sensor_type: str
+    start: datetime
+    end: datetime
+
+    @property
+    def task_id(self) -> str:
+        return f"{self.sensor_type}:{self.start.isoformat()}"
+
+
+def align_down(value: datetime, width: timedelta) -> datetime:
+    """Return the start of the window containing value."""
+    return value - (value - WINDOW_ORIGIN) % width
+
+
+def split_range(sensor_type: str, start: datetime, end: datetime, window_minutes: int,
+                task_hours: int, partitions: Sequence[Tuple[str, datetime, datetime]] = ()) -> List[BackfillTask]:
+    """Cut the windows from the one containing start up to end into tasks.
+
+    Tasks break at every partition bound and every task_hours. Bounds are
+    rounded down to the window grid, so a window spanning two partitions
+    belongs to one task.
+    """
+    width = timedelta(minutes=window_minutes)
+    step = timedelta(hours=task_hours)
+    if step % width:
+        raise ValueError(f"task_hours={task_hours} is not a multiple of window_minutes={window_minutes}")
+    start = align_down(start, width)
+    end = align_down(end, width)
+
+    cuts: Set[datetime] = set()
+    for _, partition_start, partition_end in partitions:
+        cuts.update(align_down(bound, width) for bound in (partition_start, partition_end))
+    bound = align_down(start, step) + step
+    while bound < end:
+        cuts.add(bound)
+        bound += step
+    points = [start] + sorted(cut for cut in cuts if start < cut < end) + [end]
+    return [BackfillTask(sensor_type, lower, upper)
+            for lower, upper in zip(points, points[1:]) if lower < upper]
+
+
+def backfill_query(sensor_type: str) -> str:
+    """Return the statement writing a task's metrics into sensor_analytics."""
+    table, metrics = BACKFILL_METRICS[sensor_type]
+    aggregates = ',\n                '.join(f"{expr} AS m{i}" for i, (_, expr) in enumerate(metrics))
+    unpivot = ', '.join(f"('{name}', w.m{i})" for i, (name, _) in enumerate(metrics))
+    return f"""
+        WITH windows AS (
+            SELECT
+                sensor_id,
+                date_bin(%(width)s, timestamp, %(origin)s) AS window_start,
+                {aggregates}
+            FROM {table}
+            WHERE timestamp >= %(start)s AND timestamp < %(end)s
+            GROUP BY sensor_id, date_bin(%(width)s, timestamp, %(origin)s)
+        )
+        INSERT INTO sensor_analytics (sensor_id, metric_name, value, window_start, window_end)
+        SELECT w.sensor_id, m.metric_name, m.value, w.window_start, w.window_start + %(width)s
+        FROM windows w
+        CROSS JOIN LATERAL (VALUES {unpivot}) AS m(metric_name, value)
+    """
+
+
+class BackfillCheckpoint:
+    def __init__(self, path: str, params: Dict[str, object]):
+        """Load the tasks finished by an earlier run with the same params.
+
+        Raises ValueError if the file belongs to a backfill with other params.
+        """
+        self.path = path
+        self.params = params
+        self.done: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state['params'] != params:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to another backfill ({state['params']}); "
+                    "remove it or choose another checkpoint path"
+                )
+            self.done = state['done']
+
+    def mark(self, task_id: str, rows: int):
+        """Record a finished task; the file is replaced atomically."""
+        self.done[task_id] = rows
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'params': self.params, 'done': self.done}, f)
+        os.replace(tmp_path, self.path)
+
+
+# Connection of the current pool worker
+_worker_conn = None
+
+
+def _init_worker(db_params: Dict[str, str]):
+    global _worker_conn
+    _worker_conn = psycopg2.connect(**db_params)
+    _worker_conn.autocommit = False
+
+
+def _run_task(task: BackfillTask, window_minutes: int) -> Tuple[str, int]:
+    """Replace the metrics of a task's windows; returns (task_id, rows written)."""
+    _, metrics = BACKFILL_METRICS[task.sensor_type]
+    params = {
+        'width': timedelta(minutes=window_minutes),
+        'origin': WINDOW_ORIGIN,
+        'start': task.start,
+        'end': task.end,
+        'metrics': [name for name, _ in metrics]
+    }
+    try:
+        with _worker_conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM sensor_analytics
+                WHERE metric_name = ANY(%(metrics)s)
+                  AND window_start >= %(start)s AND window_start < %(end)s
+            """, params)
+            cur.execute(backfill_query(task.sensor_type), params)
+            rows = cur.rowcount
+        _worker_conn.commit()
+        return task.task_id, rows
+    except Exception:
+        _worker_conn.rollback()
+        raise
+
+
+class AnalyticsBackfill:
+    def __init__(self, db_params: Dict[str, str], window_minutes: int = 5, task_hours: int = 24,
+                 workers: Optional[int] = None, checkpoint_path: Optional[str] = None):
+        """Initialize the backfill; workers defaults to the number of CPUs."""
+        self.db_params = db_params
+        self.window_minutes = window_minutes
+        self.task_hours = task_hours
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_path = checkpoint_path
+
+    def plan(self, start: datetime, end: datetime,
+             sensor_types: Sequence[str] = tuple(BACKFILL_METRICS)) -> List[BackfillTask]:
+        """Return the tasks covering [start, end), split at partition bounds."""
+        conn = psycopg2.connect(**self.db_params)
+        try:
+            tasks = []
+            with conn.cursor() as cur:
+                for sensor_type in sensor_types:
+                    table, _ = BACKFILL_METRICS[sensor_type]
+                    tasks.extend(split_range(sensor_type, start, end, self.window_minutes,
+                                             self.task_hours, list_partitions(cur, table)))
+            conn.commit()
+            return tasks
+        finally:
+            conn.close()
+
+    def run(self, start: datetime, end: datetime,
+            sensor_types: Sequence[str] = tuple(BACKFILL_METRICS)) -> Dict[str, int]:
+        """Backfill [start, end) and return rows written per task.
+
+        Tasks already in the checkpoint are skipped. Failed tasks are logged
+        and left out of the checkpoint, so rerunning retries only them.
+        """
+        checkpoint = None
+        if self.checkpoint_path:
+            checkpoint = BackfillCheckpoint(self.checkpoint_path, {
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'window_minutes': self.window_minutes,
+                # Task ids are only the task starts, which depend on task_hours
+                'task_hours': self.task_hours,
+                'sensor_types': sorted(sensor_types)
+            })
+        done = checkpoint.done if checkpoint else {}
+        tasks = [task for task in self.plan(start, end, sensor_types) if task.task_id not in done]
+        logger.info(f"Backfilling {len(tasks)} tasks ({len(done)} already done) with {self.workers} workers")
+
+        written, failed = {}, 0
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.db_params,)) as pool:
+            futures = {pool.submit(_run_task, task, self.window_minutes): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    task_id, rows = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Backfill task {task.task_id} failed: {e}")
+                    continue
+                written[task_id] = rows
+                if checkpoint:
+                    checkpoint.mark(task_id, rows)
+                logger.info(f"Backfilled {task_id} to {task.end}: {rows} rows "
+                            f"({len(written)}/{len(tasks)})")
+
+        if failed:
+            logger.error(f"{failed} backfill tasks failed; rerun to retry them")
+        return written
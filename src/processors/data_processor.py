@@ -1,17 +1,38 @@
 import logging
+import numpy as np
 import psycopg2
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from src.pipeline.queues import sensor_type_of
+from src.storage.base import ReadingBatch, StorageBackend
+from .ingest import PreparedInserts, validate_durability
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DataProcessor:
-    def __init__(self):
-        """Initialize the data processor with database connection."""
+    def __init__(self, backend: Optional[StorageBackend] = None, insert_mode: str = 'prepared',
+                 durability: Optional[Dict[str, str]] = None,
+                 type_func: Optional[Callable[[str], Optional[str]]] = None):
+        """Initialize the data processor with database connection.
+
+        If a storage backend is given, batches are written through it instead
+        of the built-in PostgreSQL inserts. insert_mode selects those inserts:
+        'prepared' writes each sensor type's batch with one prepared EXECUTE,
+        'row' inserts and commits reading by reading. durability sets the
+        prepared inserts' mode per sensor type (see src.processors.ingest).
+        type_func resolves sensor types, e.g. SensorRegistry.sensor_type;
+        it defaults to parsing the sensor id.
+        """
+        if insert_mode not in ('prepared', 'row'):
+            raise ValueError(f"Unknown insert mode '{insert_mode}'")
+        self.backend = backend
+        self.insert_mode = insert_mode
+        self.durability = validate_durability(dict(durability or {}))
+        self.type_func = type_func or sensor_type_of
         # Load .env file from project root
         env_path = Path(__file__).resolve().parents[2] / '.env'
         logger.info(f"Looking for .env file at: {env_path}")
@@ -38,7 +59,9 @@ class DataProcessor:
         logger.info(f"User: {self.db_params['user']}")
         
         self.conn = None
-        self.connect()
+        self.inserts = None
+        if self.backend is None:
+            self.connect()
         logger.info("Data processor initialized")
 
     def connect(self):
@@ -46,6 +69,8 @@ class DataProcessor:
         try:
             self.conn = psycopg2.connect(**self.db_params)
             self.conn.autocommit = False  # We'll manage transactions manually
+            # Prepared statements belong to the session
+            self.inserts = PreparedInserts(self.conn, self.durability)
             logger.info("Successfully connected to the database")
         except Exception as e:
             logger.error(f"Error connecting to the database: {e}")
@@ -118,16 +143,60 @@ class DataProcessor:
                 logger.error(f"Error storing motion event: {e}")
                 raise
 
+    def process_batches(self, readings: List[Dict[str, Any]]) -> int:
+        """Group readings per sensor type and write each group in one call.
+
+        Batches go through the backend if there is one, else through the
+        prepared INSERTs, where a batch rejected for one of its rows is
+        bisected (see write_bisecting). Any other failed batch is logged and
+        skipped as a whole.
+        """
+        if self.backend is None:
+            self.ensure_connection()
+        write = self.backend.write_batch if self.backend is not None else self.write_bisecting
+        processed_count = 0
+        for sensor_type, batch in ReadingBatch.from_readings(readings, self.type_func).items():
+            try:
+                processed_count += write(batch)
+            except Exception as e:
+                logger.error(f"Error storing {sensor_type} batch of {len(batch)} readings: {e}")
+        return processed_count
+
+    def write_bisecting(self, batch: ReadingBatch) -> int:
+        """Write a batch with the prepared INSERTs, splitting it while a row is rejected.
+
+        An unregistered sensor or a value out of the column's range fails
+        the whole EXECUTE. The halves are retried recursively, so the good
+        rows are stored with about 2 log2(n) extra round trips per bad
+        row, and each bad row is logged and dropped.
+        """
+        try:
+            return self.inserts.write_batch(batch)
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            if len(batch) == 1:
+                sensor_id, timestamp, value = next(batch.rows())
+                logger.error(f"Dropping {batch.sensor_type} reading {value} of {sensor_id} at {timestamp}: {e}")
+                return 0
+        half = len(batch) // 2
+        return (self.write_bisecting(batch.take(np.arange(half))) +
+                self.write_bisecting(batch.take(np.arange(half, len(batch)))))
+
     def process_readings(self, readings: List[Dict[str, Any]]):
         """Process a batch of sensor readings."""
+        if self.backend is not None or self.insert_mode == 'prepared':
+            processed_count = self.process_batches(readings)
+            logger.info(f"Processed {processed_count} out of {len(readings)} readings")
+            return processed_count
+
         processed_count = 0
         for reading in readings:
             try:
-                if "temp_sensor" in reading["sensor_id"]:
+                sensor_type = self.type_func(reading["sensor_id"])
+                if sensor_type == "temperature":
                     self.process_temperature_reading(reading)
-                elif "humidity_sensor" in reading["sensor_id"]:
+                elif sensor_type == "humidity":
                     self.process_humidity_reading(reading)
-                elif "motion_sensor" in reading["sensor_id"]:
+                elif sensor_type == "motion":
                     self.process_motion_event(reading)
                 processed_count += 1
             except Exception as e:
@@ -137,8 +206,20 @@ class DataProcessor:
         logger.info(f"Processed {processed_count} out of {len(readings)} readings")
         return processed_count
 
+    def merge_staged(self) -> Dict[str, int]:
+        """Move readings of staged sensor types into their partitioned tables."""
+        if self.inserts is None or 'staged' not in self.durability.values():
+            return {}
+        self.ensure_connection()
+        merged = self.inserts.merge_staged()
+        if any(merged.values()):
+            logger.info(f"Merged staged readings: {merged}")
+        return merged
+
     def close(self):
         """Close database connection."""
+        if self.backend is not None:
+            self.backend.close()
         if self.conn:
             self.conn.close()
             logger.info("Database connection closed")
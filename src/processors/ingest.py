@@ -0,0 +1,236 @@
+"""Low-latency batch inserts through server-side prepared statements.
+
+A small batch is sent as one ``EXECUTE`` of a statement prepared once per
+connection::
+
+    PREPARE insert_temperature_readings (text[], timestamp[], float8[]) AS
+        INSERT INTO temperature_readings (sensor_id, timestamp, value)
+        SELECT * FROM unnest($1, $2, $3)
+
+Each batch is a single round trip carrying three array parameters, and
+PostgreSQL parses and plans the INSERT only once per session instead of
+once per reading. COPY remains the faster path for large bulk loads.
+
+The durability of each sensor type's writes is configurable:
+
+- ``strict``: the commit waits for its WAL to be flushed.
+- ``relaxed``: the transaction runs with ``synchronous_commit = off``, so a
+  crash can lose the last few hundred milliseconds of commits but never
+  corrupts data.
+- ``staged``: relaxed COPY into an UNLOGGED staging table without indexes
+  or foreign keys, emptied by a crash. ``merge_staging`` periodically
+  moves the staged rows into their partitions with one sorted,
+  deduplicating INSERT ... SELECT per partition, then empties the
+  staging table. Rows of sensors that are not registered yet stay staged
+  until they are.
+"""
+import io
+import logging
+from typing import Dict, Optional, Set
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from src.storage.archive import list_partitions
+from src.storage.base import SENSOR_TABLES, ReadingBatch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Array parameter type of each sensor type's value column
+VALUE_ARRAY_TYPES = {
+    'temperature': 'float8[]',
+    'humidity': 'float8[]',
+    'motion': 'boolean[]'
+}
+
+
+DURABILITY_MODES = ('strict', 'relaxed', 'staged')
+
+
+def validate_durability(durability: Dict[str, str]) -> Dict[str, str]:
+    """Check a sensor type -> durability mode mapping."""
+    for sensor_type, mode in durability.items():
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{mode}' for {sensor_type}, "
+                             f"expected one of {DURABILITY_MODES}")
+    return durability
+
+
+def staging_table(sensor_type: str) -> str:
+    table, _ = SENSOR_TABLES[sensor_type]
+    return f"{table}_staging"
+
+
+def statement_name(sensor_type: str) -> str:
+    table, _ = SENSOR_TABLES[sensor_type]
+    return f"insert_{table}"
+
+
+def prepare_statement(sensor_type: str) -> str:
+    """Return the PREPARE statement of a sensor type's batch INSERT."""
+    table, value_column = SENSOR_TABLES[sensor_type]
+    return f"""
+        PREPARE {statement_name(sensor_type)} (text[], timestamp[], {VALUE_ARRAY_TYPES[sensor_type]}) AS
+        INSERT INTO {table} (sensor_id, timestamp, {value_column})
+        SELECT * FROM unnest($1, $2, $3)
+    """
+
+
+class PreparedInserts:
+    def __init__(self, conn, durability: Optional[Dict[str, str]] = None):
+        """Insert batches over conn; statements are prepared on first use.
+
+        durability maps sensor types to a mode of DURABILITY_MODES; types
+        not listed are strict. Prepared statements live as long as the
+        session, so create a new instance whenever the connection is replaced.
+        """
+        self.conn = conn
+        self.durability = validate_durability(dict(durability or {}))
+        self.prepared: Set[str] = set()
+
+    def mode(self, sensor_type: str) -> str:
+        return self.durability.get(sensor_type, 'strict')
+
+    def write_batch(self, batch: ReadingBatch) -> int:
+        """Insert a batch with one EXECUTE, or COPY if staged, in its own transaction."""
+        if not len(batch):
+            return 0
+        mode = self.mode(batch.sensor_type)
+        if mode == 'staged':
+            return self.copy_to_staging(batch)
+        name = statement_name(batch.sensor_type)
+        execute = f"EXECUTE {name} (%s, %s, %s)"
+        if mode == 'relaxed':
+            # Sent with the EXECUTE, so relaxing costs no extra round trip
+            execute = f"SET LOCAL synchronous_commit TO OFF; {execute}"
+        try:
+            with self.conn.cursor() as cur:
+                if name not in self.prepared:
+                    cur.execute(prepare_statement(batch.sensor_type))
+                    self.prepared.add(name)
+                cur.execute(execute, (
+                    batch.sensor_ids.tolist(),
+                    batch.timestamps.tolist(),
+                    batch.values.tolist()
+                ))
+            self.conn.commit()
+            return len(batch)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error writing {batch.sensor_type} batch: {e}")
+            raise
+
+    def copy_to_staging(self, batch: ReadingBatch) -> int:
+        """COPY a batch into its staging table with a relaxed commit."""
+        _, value_column = SENSOR_TABLES[batch.sensor_type]
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SET LOCAL synchronous_commit TO OFF")
+                cur.copy_expert(
+                    f"COPY {staging_table(batch.sensor_type)} (sensor_id, timestamp, {value_column}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    io.BytesIO(batch_csv(batch))
+                )
+            self.conn.commit()
+            return len(batch)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error staging {batch.sensor_type} batch: {e}")
+            raise
+
+    def merge_staged(self) -> Dict[str, int]:
+        """Merge the staging tables of staged sensor types; returns rows inserted per type."""
+        merged = {}
+        for sensor_type, mode in self.durability.items():
+            if mode != 'staged':
+                continue
+            try:
+                merged[sensor_type] = merge_staging(self.conn, sensor_type)
+            except Exception as e:
+                logger.error(f"Error merging staged {sensor_type} readings: {e}")
+        return merged
+
+
+def batch_csv(batch: ReadingBatch) -> bytes:
+    """Encode a batch as headerless CSV rows of (sensor_id, timestamp, value)."""
+    table = pa.table({
+        'sensor_id': pa.array(batch.sensor_ids, type=pa.string()),
+        'timestamp': pa.array(batch.timestamps),
+        'value': pa.array(batch.values)
+    })
+    buffer = io.BytesIO()
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+    return buffer.getvalue()
+
+
+def merge_staging(conn, sensor_type: str) -> int:
+    """Move a staging table into the partitions of its table in one transaction.
+
+    The staging table is locked against writers, then each partition the
+    staged rows fall into gets one INSERT ... SELECT sorted by (sensor_id,
+    timestamp). Rows repeated in staging or already stored are skipped.
+    Rows that fall outside every partition or belong to unregistered
+    sensors stay staged for a later merge; the rest are removed, with a
+    TRUNCATE when nothing stays. Returns the rows inserted.
+    """
+    table, value_column = SENSOR_TABLES[sensor_type]
+    staging = staging_table(sensor_type)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"LOCK TABLE {staging} IN EXCLUSIVE MODE")
+            cur.execute(f"SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM {staging}")
+            staged, first, last = cur.fetchone()
+            if not staged:
+                conn.commit()
+                return 0
+
+            inserted, covered = 0, []
+            for partition, start, end in list_partitions(cur, table):
+                if end <= first or start > last:
+                    continue
+                cur.execute(f"""
+                    INSERT INTO {partition} (sensor_id, timestamp, {value_column})
+                    SELECT DISTINCT ON (s.sensor_id, s.timestamp) s.sensor_id, s.timestamp, s.{value_column}
+                    FROM {staging} s
+                    JOIN sensors USING (sensor_id)
+                    WHERE s.timestamp >= %s AND s.timestamp < %s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM {partition} t
+                          WHERE t.sensor_id = s.sensor_id AND t.timestamp = s.timestamp
+                      )
+                    ORDER BY s.sensor_id, s.timestamp
+                """, (start, end))
+                inserted += cur.rowcount
+                covered.append((start, end))
+
+            condition = " OR ".join(["(s.timestamp >= %s AND s.timestamp < %s)"] * len(covered))
+            params = [bound for bounds in covered for bound in bounds]
+            registered = "EXISTS (SELECT 1 FROM sensors r WHERE r.sensor_id = s.sensor_id)"
+            if covered:
+                cur.execute(f"""
+                    SELECT COUNT(*) FILTER (WHERE NOT ({condition})),
+                           COUNT(*) FILTER (WHERE ({condition}) AND NOT {registered})
+                    FROM {staging} s
+                """, params + params)
+                unpartitioned, unregistered = cur.fetchone()
+            else:
+                unpartitioned, unregistered = staged, 0
+            if not unpartitioned and not unregistered:
+                cur.execute(f"TRUNCATE {staging}")
+            elif covered:
+                cur.execute(f"DELETE FROM {staging} s WHERE ({condition}) AND {registered}", params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if unpartitioned:
+        logger.warning(f"{unpartitioned} staged {sensor_type} readings have no partition yet")
+    if unregistered:
+        logger.warning(f"{unregistered} staged {sensor_type} readings belong to unregistered sensors "
+                       "and stay staged until they are registered")
+    skipped = staged - unpartitioned - unregistered - inserted
+    if skipped:
+        logger.info(f"Skipped {skipped} duplicate staged {sensor_type} readings")
+    return inserted
@@ -3,16 +3,11 @@
 This module consumes sensor data from Kafka topics, processes it,
 and stores it in PostgreSQL and InfluxDB for analysis and visualization.
 """
-import json
 import os
+import sys
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from confluent_kafka import Consumer, KafkaError
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
-import psycopg2
-from psycopg2.extras import execute_batch
 from dotenv import load_dotenv
 
 # Load environment variables from the root directory
@@ -25,134 +20,173 @@ if os.path.exists(env_path):
         print(f.read())
 load_dotenv(env_path, override=True)
 
+# Make the project packages importable when run as a script
+sys.path.append(root_dir)
+from config.config import (
+    KAFKA_CONFIG, ALERT_THRESHOLDS, ALERT_ENGINE_CONFIG, ANOMALY_CONFIG, INGEST_FILTER_CONFIG
+)
+from src.pipeline.registry import SensorRegistry, SensorRegistryStore
+from src.storage.base import ReadingBatch, StorageBackend, create_backend
+from src.streaming.alerts import AlertEngine
+from src.streaming.anomaly import EwmaAnomalyDetector
+from src.streaming.filters import IngestFilter
+from src.transport.base import Transport, create_transport
+from src.transport.codec import TopicCodec
+
 class SensorProcessor:
-    def __init__(self):
+    def __init__(self, transport: Optional[Transport] = None,
+                 backends: Optional[List[StorageBackend]] = None,
+                 registry: Optional[SensorRegistry] = None):
+        """Initialize the processor.
+
+        transport defaults to Kafka at KAFKA_BOOTSTRAP_SERVERS and backends to
+        PostgreSQL plus InfluxDB; pass an InMemoryTransport and other
+        backends to run without external services. registry registers
+        unknown sensors before their readings are stored; it defaults to
+        the PostgreSQL sensors table with the default backends and to an
+        in-memory registry otherwise.
+        """
         print("\nInitializing sensor processor...")
         
         # Kafka configuration
-        kafka_host = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
-        print(f"Kafka host: {kafka_host}")
-        self.consumer = Consumer({
-            'bootstrap.servers': kafka_host,
+        if transport is None:
+            kafka_host = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
+            print(f"Kafka host: {kafka_host}")
+            transport = create_transport('kafka', bootstrap_servers=kafka_host)
+        self.transport = transport
+        self.consumer = transport.create_consumer({
             'group.id': 'sensor_processor_group',
-            'auto.offset.reset': 'earliest'
+            'auto.offset.reset': 'earliest',
+            **KAFKA_CONFIG['consumer']
         })
+        self.batch_size = KAFKA_CONFIG['consume_batch_size']
+        self.batch_timeout = KAFKA_CONFIG['consume_timeout']
         
         # Subscribe to topics
-        self.topics = [
-            os.getenv('KAFKA_TOPIC_TEMPERATURE', 'temperature_data'),
-            os.getenv('KAFKA_TOPIC_HUMIDITY', 'humidity_data'),
-            os.getenv('KAFKA_TOPIC_MOTION', 'motion_data')
-        ]
+        self.topic_map = {
+            'temperature': os.getenv('KAFKA_TOPIC_TEMPERATURE', KAFKA_CONFIG['topics']['temperature']),
+            'humidity': os.getenv('KAFKA_TOPIC_HUMIDITY', KAFKA_CONFIG['topics']['humidity']),
+            'motion': os.getenv('KAFKA_TOPIC_MOTION', KAFKA_CONFIG['topics']['motion'])
+        }
+        self.topics = list(self.topic_map.values())
+        self.codec = TopicCodec(KAFKA_CONFIG['encodings'], self.topic_map)
         print(f"Subscribing to topics: {self.topics}")
         self.consumer.subscribe(self.topics)
         
+        if registry is None:
+            registry = (SensorRegistry(SensorRegistryStore(self.postgres_params()))
+                        if backends is None else SensorRegistry())
+        self.registry = registry
+        self.backends = backends if backends is not None else self.create_default_backends()
+        self.readings_processed = 0
+        self.alert_engine = AlertEngine.from_config(ALERT_THRESHOLDS, ALERT_ENGINE_CONFIG)
+        self.anomaly_detector = EwmaAnomalyDetector.from_config(ANOMALY_CONFIG)
+        self.ingest_filter = (IngestFilter.from_config(INGEST_FILTER_CONFIG, self.registry.sensor_type)
+                              if INGEST_FILTER_CONFIG['enabled'] else None)
+        print("Initialization complete!")
+
+    @staticmethod
+    def postgres_params() -> Dict[str, str]:
+        """Return the PostgreSQL connection parameters from the environment."""
+        return {
+            # Force localhost for local development
+            'host': 'localhost',
+            'port': os.getenv('POSTGRES_PORT', '5432'),
+            'database': os.getenv('POSTGRES_DB', 'iot_db'),
+            'user': os.getenv('POSTGRES_USER', 'iot_user'),
+            'password': os.getenv('POSTGRES_PASSWORD', 'iot_password')
+        }
+
+    @classmethod
+    def create_default_backends(cls) -> List[StorageBackend]:
+        """Create the PostgreSQL and InfluxDB backends from the environment."""
         # PostgreSQL connection
-        # Force localhost for local development
-        pg_host = 'localhost'  # Force localhost
-        pg_port = os.getenv('POSTGRES_PORT', '5432')
-        pg_db = os.getenv('POSTGRES_DB', 'iot_db')
-        pg_user = os.getenv('POSTGRES_USER', 'iot_user')
-        pg_password = os.getenv('POSTGRES_PASSWORD', 'iot_password')
-        
+        pg_params = cls.postgres_params()
         print(f"PostgreSQL connection details:")
-        print(f"Host: {pg_host}")
-        print(f"Port: {pg_port}")
-        print(f"Database: {pg_db}")
-        print(f"User: {pg_user}")
+        print(f"Host: {pg_params['host']}")
+        print(f"Port: {pg_params['port']}")
+        print(f"Database: {pg_params['database']}")
+        print(f"User: {pg_params['user']}")
         
-        self.pg_conn = psycopg2.connect(
-            host=pg_host,
-            port=pg_port,
-            database=pg_db,
-            user=pg_user,
-            password=pg_password
-        )
-        self.pg_cursor = self.pg_conn.cursor()
+        postgres = create_backend('postgres', db_params=pg_params)
         
         # InfluxDB connection
         influx_url = os.getenv('INFLUXDB_URL', 'http://localhost:8086')
         print(f"InfluxDB URL: {influx_url}")
-        self.influx_client = InfluxDBClient(
+        influx = create_backend(
+            'influxdb',
             url=influx_url,
             token=os.getenv('INFLUXDB_TOKEN', 'iot-pipeline-token-2024'),
-            org=os.getenv('INFLUXDB_ORG', 'iot_org')
+            org=os.getenv('INFLUXDB_ORG', 'iot_org'),
+            bucket=os.getenv('INFLUXDB_BUCKET', 'iot_bucket')
         )
-        self.influx_write_api = self.influx_client.write_api(write_options=SYNCHRONOUS)
-        self.influx_bucket = os.getenv('INFLUXDB_BUCKET', 'iot_bucket')
-        print("Initialization complete!")
+        return [postgres, influx]
 
     def process_message(self, message: Dict[str, Any]) -> None:
-        """Process a single sensor message."""
+        """Process a single decoded sensor message."""
+        batch = ReadingBatch.from_columns(
+            message['type'],
+            [message['sensor_id']],
+            [datetime.fromisoformat(message['timestamp'])],
+            [message['value']]
+        )
+        self.process_batch(batch)
+
+    def process_batch(self, batch: ReadingBatch) -> None:
+        """Store a decoded batch in every configured backend."""
         try:
-            # Extract data
-            sensor_id = message['sensor_id']
-            sensor_type = message['type']
-            value = message['value']
-            timestamp = datetime.fromisoformat(message['timestamp'])
-            
-            # Store in PostgreSQL
-            if sensor_type == 'temperature':
-                self.pg_cursor.execute("""
-                    INSERT INTO temperature_readings (sensor_id, value, timestamp)
-                    VALUES (%s, %s, %s)
-                """, (sensor_id, value, timestamp))
-            elif sensor_type == 'humidity':
-                self.pg_cursor.execute("""
-                    INSERT INTO humidity_readings (sensor_id, value, timestamp)
-                    VALUES (%s, %s, %s)
-                """, (sensor_id, value, timestamp))
-            elif sensor_type == 'motion':
-                self.pg_cursor.execute("""
-                    INSERT INTO motion_events (sensor_id, detected, timestamp)
-                    VALUES (%s, %s, %s)
-                """, (sensor_id, value, timestamp))
-            
-            self.pg_conn.commit()
-            
-            # Store in InfluxDB
-            point = Point(sensor_type) \
-                .tag("sensor_id", sensor_id) \
-                .field("value", value) \
-                .time(timestamp)
-            
-            self.influx_write_api.write(
-                bucket=self.influx_bucket,
-                record=point
-            )
-            
-            print(f"Processed {sensor_type} reading from {sensor_id}: {value}")
-            
+            stored = self.ingest_filter.filter(batch) if self.ingest_filter else batch
+            if len(stored):
+                # Readings of unregistered sensors would fail the sensors foreign key
+                self.registry.register_batch(stored)
+                for backend in self.backends:
+                    backend.write_batch(stored)
+            self.readings_processed += len(batch)
+            print(f"Processed {len(batch)} {batch.sensor_type} readings, stored {len(stored)}")
+            for alert in self.alert_engine.process(batch):
+                print(f"Alert {alert.status}: {alert.rule} on {alert.sensor_id} ({alert.value})")
+            for anomaly in self.anomaly_detector.process(batch):
+                print(f"Anomaly on {anomaly.sensor_id}: {anomaly.value} (z={anomaly.z_score:.1f})")
+        except Exception as e:
+            print(f"Error processing {batch.sensor_type} batch: {str(e)}")
+
+    def process_messages(self, messages: List[Any]) -> None:
+        """Decode a consumed batch of messages and store it grouped by sensor type."""
+        payloads = []
+        for msg in messages:
+            if msg.error():
+                if self.transport.is_partition_eof(msg.error()):
+                    print(f"Reached end of partition {msg.partition()}")
+                else:
+                    print(f"Error: {msg.error()}")
+                continue
+            payloads.append((msg.topic(), msg.value()))
+        
+        if not payloads:
+            return
+        
+        try:
+            # One decode per topic instead of one per message
+            batches, invalid = self.codec.decode_many(payloads)
+            if invalid:
+                print(f"Skipped {invalid} undecodable messages")
+            for batch in batches.values():
+                self.process_batch(batch)
         except Exception as e:
-            print(f"Error processing message: {str(e)}")
-            self.pg_conn.rollback()
+            print(f"Error processing messages: {str(e)}")
 
-    def run(self):
-        """Run the processor continuously."""
+    def run(self, until_idle: bool = False):
+        """Run the processor continuously, or until a consume call returns nothing."""
         try:
             print("Starting sensor processor...")
             print("Press Ctrl+C to stop")
             
             while True:
-                msg = self.consumer.poll(1.0)
-                
-                if msg is None:
-                    continue
-                
-                if msg.error():
-                    if msg.error().code() == KafkaError._PARTITION_EOF:
-                        print(f"Reached end of partition {msg.partition()}")
-                    else:
-                        print(f"Error: {msg.error()}")
-                    continue
-                
-                try:
-                    message = json.loads(msg.value().decode('utf-8'))
-                    self.process_message(message)
-                except json.JSONDecodeError as e:
-                    print(f"Error decoding message: {str(e)}")
-                except Exception as e:
-                    print(f"Error processing message: {str(e)}")
+                messages = self.consumer.consume(self.batch_size, self.batch_timeout)
+                if messages:
+                    self.process_messages(messages)
+                elif until_idle:
+                    break
                 
         except KeyboardInterrupt:
             print("\nStopping sensor processor...")
@@ -161,16 +195,12 @@ class SensorProcessor:
 
     def cleanup(self):
         """Clean up resources."""
-        if self.pg_cursor:
-            self.pg_cursor.close()
-        if self.pg_conn:
-            self.pg_conn.close()
         if self.consumer:
             self.consumer.close()
-        if self.influx_write_api:
-            self.influx_write_api.close()
-        if self.influx_client:
-            self.influx_client.close()
+        for backend in self.backends:
+            backend.close()
+        if self.registry.store:
+            self.registry.store.close()
 
 if __name__ == "__main__":
     processor = SensorProcessor()
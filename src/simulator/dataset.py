@@ -0,0 +1,279 @@
+"""Seeded, vectorized generation and bulk loading of historical readings.
+
+``SensorSimulator`` produces one reading at a time for live runs. For
+query, index and partition-pruning benchmarks ``DatasetGenerator`` produces
+months of readings for many sensors with the same models, advancing a
+whole block of sensors per NumPy operation:
+
+- temperature and humidity follow the simulator's bounded random walks
+  (``RANDOM_WALKS``),
+- motion follows its two-state Markov chain (``MOTION_TRANSITIONS``).
+
+Every sensor reports once per interval, at a fixed random offset within
+it. The sensors of each type are split into blocks, and each block is a
+task with its own random stream derived from (seed, sensor type, block),
+so a seed and block size always produce the same dataset whatever the
+number of workers or the chunk size. Tasks run in a process pool with one
+connection per worker and stream their readings into the partitioned
+tables with COPY, one chunk per statement and one transaction per task.
+A task first deletes its sensors' readings in the range, so a failed or
+interrupted load can be rerun without duplicating rows.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+
+from database.utils.db_utils import create_partition, get_month_boundaries
+from src.pipeline.registry import SensorRegistryStore
+from src.processors.ingest import batch_csv
+from src.storage.base import SENSOR_TABLES, ReadingBatch
+
+from .sensor_simulator import MOTION_TRANSITIONS, RANDOM_WALKS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sensor ids are numbered per type like the simulator's
+SENSOR_ID_PREFIXES = {
+    'temperature': 'temp_sensor',
+    'humidity': 'humidity_sensor',
+    'motion': 'motion_sensor'
+}
+SENSOR_TYPES = tuple(SENSOR_ID_PREFIXES)
+
+# Sensors registered per statement
+REGISTER_PAGE_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class DatasetTask:
+    """Sensors first .. first + count - 1 of one type."""
+    sensor_type: str
+    block: int
+    first: int
+    count: int
+
+    @property
+    def task_id(self) -> str:
+        return f"{self.sensor_type}:{self.block}"
+
+    @property
+    def sensor_ids(self) -> List[str]:
+        prefix = SENSOR_ID_PREFIXES[self.sensor_type]
+        return [f"{prefix}_{i}" for i in range(self.first, self.first + self.count)]
+
+
+def plan_tasks(sensors: int, block_size: int,
+               sensor_types: Sequence[str] = SENSOR_TYPES) -> List[DatasetTask]:
+    """Split `sensors` sensors of each type into blocks of block_size."""
+    return [
+        DatasetTask(sensor_type, block, first, min(block_size, sensors + 1 - first))
+        for sensor_type in sensor_types
+        for block, first in enumerate(range(1, sensors + 1, block_size))
+    ]
+
+
+def sensor_inventory(sensors: int, sensor_types: Sequence[str] = SENSOR_TYPES) -> List[Tuple[str, str, str]]:
+    """Return (sensor_id, type, location) rows; sensors numbered i share room_i."""
+    return [
+        (f"{SENSOR_ID_PREFIXES[sensor_type]}_{i}", sensor_type, f"room_{i}")
+        for sensor_type in sensor_types
+        for i in range(1, sensors + 1)
+    ]
+
+
+def step_count(start: datetime, end: datetime, interval_seconds: int) -> int:
+    """Return the number of intervals needed to cover [start, end)."""
+    return -(-(end - start) // timedelta(seconds=interval_seconds))
+
+
+class ReadingStream:
+    def __init__(self, task: DatasetTask, seed: int, start: datetime, interval_seconds: int):
+        """Initialize the readings of a task's sensors from start onwards."""
+        self.task = task
+        self.rng = np.random.default_rng([seed, SENSOR_TYPES.index(task.sensor_type), task.block])
+        interval_us = interval_seconds * 1_000_000
+        self.interval = np.timedelta64(interval_us, 'us')
+        # Each sensor reports at its own fixed offset within the interval
+        self.offsets = self.rng.integers(0, interval_us, task.count).astype('timedelta64[us]')
+        self.sensor_ids = np.array(task.sensor_ids, dtype=object)
+        self.next_time = np.datetime64(start, 'us')
+        if task.sensor_type == 'motion':
+            self.state = np.zeros(task.count, dtype=bool)
+        else:
+            self.state = np.full(task.count, RANDOM_WALKS[task.sensor_type][0])
+
+    def advance(self, steps: int) -> np.ndarray:
+        """Return the next `steps` values of every sensor, shaped (steps, sensors).
+
+        All random numbers of the chunk are drawn at once; only the
+        recurrence itself steps through time, one vector op per step.
+        """
+        count = self.task.count
+        if self.task.sensor_type == 'motion':
+            draws = self.rng.random((steps, count))
+            values = np.empty((steps, count), dtype=bool)
+            state = self.state
+            for t in range(steps):
+                state = draws[t] < np.where(state, MOTION_TRANSITIONS[True], MOTION_TRANSITIONS[False])
+                values[t] = state
+        else:
+            _, step, lower, upper = RANDOM_WALKS[self.task.sensor_type]
+            values = self.rng.uniform(-step, step, (steps, count))
+            values[0] += self.state
+            np.clip(values[0], lower, upper, out=values[0])
+            for t in range(1, steps):
+                np.add(values[t - 1], values[t], out=values[t])
+                np.clip(values[t], lower, upper, out=values[t])
+        self.state = values[-1].copy()
+        return values
+
+    def next_batch(self, steps: int) -> ReadingBatch:
+        """Return the next `steps` readings of every sensor as one batch, step by step."""
+        values = self.advance(steps)
+        if self.task.sensor_type != 'motion':
+            # Readings are rounded like the simulator's; the walk itself is not
+            values = np.round(values, 2)
+        times = self.next_time + np.arange(steps) * self.interval
+        self.next_time = times[-1] + self.interval
+        return ReadingBatch(
+            sensor_type=self.task.sensor_type,
+            sensor_ids=np.tile(self.sensor_ids, steps),
+            timestamps=(times[:, None] + self.offsets[None, :]).ravel(),
+            values=values.ravel()
+        )
+
+
+def iter_task_batches(task: DatasetTask, seed: int, start: datetime, end: datetime,
+                      interval_seconds: int, chunk_rows: int):
+    """Yield a task's readings in [start, end) as batches of about chunk_rows rows."""
+    stream = ReadingStream(task, seed, start, interval_seconds)
+    steps = step_count(start, end, interval_seconds)
+    chunk_steps = max(1, chunk_rows // task.count)
+    end_time = np.datetime64(end, 'us')
+    for done in range(0, steps, chunk_steps):
+        batch = stream.next_batch(min(chunk_steps, steps - done))
+        # Offsets push some readings of the last interval past the end
+        keep = batch.timestamps < end_time
+        if not keep.all():
+            batch = ReadingBatch(batch.sensor_type, batch.sensor_ids[keep],
+                                 batch.timestamps[keep], batch.values[keep])
+        yield batch
+
+
+_worker_conn = None
+
+
+def _init_worker(db_params: Dict[str, str]):
+    global _worker_conn
+    _worker_conn = psycopg2.connect(**db_params)
+    _worker_conn.autocommit = False
+    # A task lost to a crash is rerun and replaces its rows, so commits need not wait for WAL flushes
+    with _worker_conn.cursor() as cur:
+        cur.execute("SET synchronous_commit TO OFF")
+    _worker_conn.commit()
+
+
+def _load_task(task: DatasetTask, seed: int, start: datetime, end: datetime,
+               interval_seconds: int, chunk_rows: int) -> Tuple[str, int]:
+    """Replace a task's readings in [start, end) in one transaction; returns (task_id, rows loaded)."""
+    table, value_column = SENSOR_TABLES[task.sensor_type]
+    copy = f"COPY {table} (sensor_id, timestamp, {value_column}) FROM STDIN WITH (FORMAT csv)"
+    rows = 0
+    try:
+        with _worker_conn.cursor() as cur:
+            cur.execute(f"""
+                DELETE FROM {table}
+                WHERE sensor_id = ANY(%s) AND timestamp >= %s AND timestamp < %s
+            """, (task.sensor_ids, start, end))
+            for batch in iter_task_batches(task, seed, start, end, interval_seconds, chunk_rows):
+                cur.copy_expert(copy, io.BytesIO(batch_csv(batch)))
+                rows += len(batch)
+        _worker_conn.commit()
+    except Exception:
+        _worker_conn.rollback()
+        raise
+    return task.task_id, rows
+
+
+class DatasetGenerator:
+    def __init__(self, db_params: Dict[str, str], sensors: int, interval_seconds: int = 60,
+                 seed: int = 0, block_size: int = 100, chunk_rows: int = 1_000_000,
+                 workers: Optional[int] = None):
+        """Initialize a generator for `sensors` sensors of each type.
+
+        block_size is the number of sensors per task and chunk_rows the
+        rows per COPY. workers defaults to one process per CPU.
+        """
+        self.db_params = db_params
+        self.sensors = sensors
+        self.interval_seconds = interval_seconds
+        self.seed = seed
+        self.block_size = block_size
+        self.chunk_rows = chunk_rows
+        self.workers = workers or os.cpu_count()
+
+    def plan(self, sensor_types: Sequence[str] = SENSOR_TYPES) -> List[DatasetTask]:
+        return plan_tasks(self.sensors, self.block_size, sensor_types)
+
+    def row_count(self, start: datetime, end: datetime, sensor_types: Sequence[str] = SENSOR_TYPES) -> int:
+        """Return the approximate number of readings of [start, end)."""
+        return step_count(start, end, self.interval_seconds) * self.sensors * len(sensor_types)
+
+    def prepare(self, start: datetime, end: datetime, sensor_types: Sequence[str] = SENSOR_TYPES):
+        """Register the sensors and create the monthly partitions covering [start, end)."""
+        store = SensorRegistryStore(self.db_params)
+        try:
+            inventory = sensor_inventory(self.sensors, sensor_types)
+            for i in range(0, len(inventory), REGISTER_PAGE_SIZE):
+                store.upsert_sensors(inventory[i:i + REGISTER_PAGE_SIZE])
+            logger.info(f"Registered {len(inventory)} sensors")
+
+            with store.conn.cursor() as cur:
+                for sensor_type in sensor_types:
+                    table, _ = SENSOR_TABLES[sensor_type]
+                    month = start
+                    while month < end:
+                        create_partition(cur, table, month, if_not_exists=True)
+                        _, month = get_month_boundaries(month)
+            store.conn.commit()
+        except Exception:
+            store.conn.rollback()
+            raise
+        finally:
+            store.close()
+
+    def load(self, start: datetime, end: datetime, sensor_types: Sequence[str] = SENSOR_TYPES) -> Dict[str, int]:
+        """Generate and load the readings of [start, end); returns rows loaded per task.
+
+        Failed tasks are logged and left out of the result; their rows are
+        rolled back, so rerunning the load completes them.
+        """
+        self.prepare(start, end, sensor_types)
+        tasks = self.plan(sensor_types)
+        loaded: Dict[str, int] = {}
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.db_params,)) as pool:
+            futures = {
+                pool.submit(_load_task, task, self.seed, start, end,
+                            self.interval_seconds, self.chunk_rows): task
+                for task in tasks
+            }
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    task_id, rows = future.result()
+                except Exception as e:
+                    logger.error(f"Dataset task {task.task_id} failed: {e}")
+                    continue
+                loaded[task_id] = rows
+                logger.info(f"Loaded {task_id} ({task.count} sensors): {rows} rows "
+                            f"({len(loaded)}/{len(tasks)} tasks)")
+        return loaded
@@ -7,15 +7,27 @@ from typing import Dict, List, Optional
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bounded random walk of each numeric sensor type:
+# (initial value, largest step either way, lower bound, upper bound)
+RANDOM_WALKS = {
+    'temperature': (20.0, 0.5, 15.0, 30.0),
+    'humidity': (50.0, 2.0, 30.0, 70.0)
+}
+
+# Probability of detecting motion given whether motion was detected before
+MOTION_TRANSITIONS = {False: 0.1, True: 0.7}
+
 class SensorSimulator:
     def __init__(self, num_sensors: int = 5):
         """Initialize the sensor simulator with a specified number of sensors."""
         self.sensors: Dict[str, Dict] = {
-            f"temp_sensor_{i}": {"type": "temperature", "location": f"room_{i}", "last_value": 20.0}
+            f"temp_sensor_{i}": {"type": "temperature", "location": f"room_{i}",
+                                 "last_value": RANDOM_WALKS['temperature'][0]}
             for i in range(1, num_sensors + 1)
         }
         self.sensors.update({
-            f"humidity_sensor_{i}": {"type": "humidity", "location": f"room_{i}", "last_value": 50.0}
+            f"humidity_sensor_{i}": {"type": "humidity", "location": f"room_{i}",
+                                     "last_value": RANDOM_WALKS['humidity'][0]}
             for i in range(1, num_sensors + 1)
         })
         self.sensors.update({
@@ -27,22 +39,24 @@ class SensorSimulator:
     def generate_temperature_reading(self, sensor_id: str, base_temp: float = 20.0) -> float:
         """Generate a realistic temperature reading with some random variation."""
         current = self.sensors[sensor_id]["last_value"]
+        _, step, lower, upper = RANDOM_WALKS['temperature']
         # Add some random variation (-0.5 to +0.5) with momentum
-        variation = random.uniform(-0.5, 0.5)
+        variation = random.uniform(-step, step)
         new_temp = current + variation
         # Keep temperature within realistic bounds (15-30°C)
-        new_temp = max(15.0, min(30.0, new_temp))
+        new_temp = max(lower, min(upper, new_temp))
         self.sensors[sensor_id]["last_value"] = new_temp
         return round(new_temp, 2)
 
     def generate_humidity_reading(self, sensor_id: str, base_humidity: float = 50.0) -> float:
         """Generate a realistic humidity reading with some random variation."""
         current = self.sensors[sensor_id]["last_value"]
+        _, step, lower, upper = RANDOM_WALKS['humidity']
         # Add some random variation (-2 to +2) with momentum
-        variation = random.uniform(-2.0, 2.0)
+        variation = random.uniform(-step, step)
         new_humidity = current + variation
         # Keep humidity within realistic bounds (30-70%)
-        new_humidity = max(30.0, min(70.0, new_humidity))
+        new_humidity = max(lower, min(upper, new_humidity))
         self.sensors[sensor_id]["last_value"] = new_humidity
         return round(new_humidity, 2)
 
@@ -51,10 +65,7 @@ class SensorSimulator:
         # 10% chance of motion detection if previously no motion
         # 70% chance of continued motion if previously detected
         prev_state = self.sensors[sensor_id]["last_value"]
-        if prev_state:
-            new_state = random.random() < 0.7  # 70% chance to continue
-        else:
-            new_state = random.random() < 0.1  # 10% chance to detect
+        new_state = random.random() < MOTION_TRANSITIONS[bool(prev_state)]
         self.sensors[sensor_id]["last_value"] = new_state
         return new_state
 
@@ -65,6 +76,7 @@ class SensorSimulator:
         
         reading = {
             "sensor_id": sensor_id,
+            "type": sensor["type"],
             "timestamp": timestamp,
             "location": sensor["location"]
         }
@@ -0,0 +1,283 @@
+"""Cold-tier archival of closed monthly partitions.
+
+Closed partitions of the reading tables are exported to zstd-compressed
+Parquet files sorted by (sensor_id, timestamp), one row group per sensor
+run, then detached and dropped from PostgreSQL::
+
+    <archive>/<table>/month=YYYY-MM/<partition>.parquet
+
+``ColdArchive`` reads those files back so range queries can combine the
+live partitions (hot) with the archive (cold).
+"""
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import psycopg2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .base import SENSOR_TABLES, ReadingBatch
+from .parquet_backend import table_to_batch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reading table -> value column
+SENSOR_TABLES_BY_TABLE = {table: column for table, column in SENSOR_TABLES.values()}
+
+# Columns of hourly trend results per sensor type, hot or cold
+TREND_SCHEMAS = {
+    'temperature': pa.schema([('sensor_id', pa.string()), ('hour', pa.timestamp('us')),
+                              ('avg', pa.float64()), ('min', pa.float64()), ('max', pa.float64())]),
+    'humidity': pa.schema([('sensor_id', pa.string()), ('hour', pa.timestamp('us')),
+                           ('avg', pa.float64()), ('min', pa.float64()), ('max', pa.float64())]),
+    'motion': pa.schema([('sensor_id', pa.string()), ('hour', pa.timestamp('us')),
+                         ('total_events', pa.int64()), ('activity_rate', pa.float64())])
+}
+
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+ARCHIVE_SCHEMA = {
+    'temperature_readings': pa.schema([('sensor_id', pa.string()), ('timestamp', pa.timestamp('us')),
+                                       ('value', pa.float64())]),
+    'humidity_readings': pa.schema([('sensor_id', pa.string()), ('timestamp', pa.timestamp('us')),
+                                    ('value', pa.float64())]),
+    'motion_events': pa.schema([('sensor_id', pa.string()), ('timestamp', pa.timestamp('us')),
+                                ('value', pa.bool_())])
+}
+
+
+def list_partitions(cursor, table: str) -> List[Tuple[str, datetime, datetime]]:
+    """Return (partition_name, start, end) for each range partition of table."""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_class p
+        JOIN pg_inherits i ON p.oid = i.inhparent
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE p.oid = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+    partitions = []
+    for name, bounds in cursor.fetchall():
+        match = BOUND_PATTERN.search(bounds or '')
+        if match:
+            partitions.append((name, datetime.fromisoformat(match.group(1)),
+                               datetime.fromisoformat(match.group(2))))
+    return partitions
+
+
+def month_key(value: datetime) -> str:
+    return value.strftime('%Y-%m')
+
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    """Return the YYYY-MM keys of all months overlapping [start, end)."""
+    months = []
+    year, month = start.year, start.month
+    while datetime(year, month, 1) < end:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class PartitionArchiver:
+    def __init__(self, db_params: Dict[str, str], archive_path: str,
+                 compression: str = 'zstd', row_group_size: int = 1000000,
+                 fetch_size: int = 50000):
+        """Initialize the archiver."""
+        self.db_params = db_params
+        self.archive_path = archive_path
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.fetch_size = fetch_size
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def closed_partitions(self, table: str, cutoff: datetime) -> List[Tuple[str, datetime, datetime]]:
+        """Return partitions of table whose whole range ends at or before cutoff."""
+        with self.conn.cursor() as cur:
+            partitions = list_partitions(cur, table)
+        self.conn.commit()
+        return [p for p in partitions if p[2] <= cutoff]
+
+    def archive_path_for(self, table: str, partition: str, start: datetime) -> str:
+        return os.path.join(self.archive_path, table, f"month={month_key(start)}", f"{partition}.parquet")
+
+    def export_partition(self, table: str, partition: str, start: datetime, commit: bool = True) -> int:
+        """Write a partition to Parquet sorted by sensor and time; return the row count.
+
+        With commit False the read stays in the caller's transaction.
+        """
+        value_column = SENSOR_TABLES_BY_TABLE[table]
+        value_expr = value_column if table == 'motion_events' else f"{value_column}::float8"
+        schema = ARCHIVE_SCHEMA[table]
+        path = self.archive_path_for(table, partition, start)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+
+        rows_written = 0
+        # Named cursor streams the sorted partition instead of loading it at once
+        with self.conn.cursor(name=f"archive_{partition}") as cur, \
+                pq.ParquetWriter(tmp_path, schema, compression=self.compression) as writer:
+            cur.itersize = self.fetch_size
+            cur.execute(f"""
+                SELECT sensor_id, timestamp, {value_expr}
+                FROM {partition}
+                ORDER BY sensor_id, timestamp
+            """)
+            pending: List[Tuple[str, datetime, Any]] = []
+            current_sensor = None
+            for row in cur:
+                # Start a new row group at each sensor boundary or when the group is full
+                if pending and (row[0] != current_sensor or len(pending) >= self.row_group_size):
+                    writer.write_table(self._rows_to_table(pending, schema))
+                    rows_written += len(pending)
+                    pending = []
+                current_sensor = row[0]
+                pending.append(row)
+            if pending:
+                writer.write_table(self._rows_to_table(pending, schema))
+                rows_written += len(pending)
+        if commit:
+            self.conn.commit()
+        os.replace(tmp_path, path)
+        return rows_written
+
+    def archive_partition(self, table: str, partition: str, start: datetime) -> int:
+        """Export a partition, verify the row count, then detach and drop it."""
+        try:
+            with self.conn.cursor() as cur:
+                # Block writers from the export until the drop, so no row lands after it was read
+                cur.execute(f"LOCK TABLE {partition} IN SHARE MODE")
+            rows_written = self.export_partition(table, partition, start, commit=False)
+            with self.conn.cursor() as cur:
+                cur.execute(f"SELECT COUNT(*) FROM {partition}")
+                expected = cur.fetchone()[0]
+                if expected != rows_written:
+                    raise RuntimeError(
+                        f"Archive of {partition} has {rows_written} rows, partition has {expected}"
+                    )
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {partition}")
+                cur.execute(f"DROP TABLE {partition}")
+            self.conn.commit()
+            logger.info(f"Archived {partition}: {rows_written} rows")
+            return rows_written
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error archiving {partition}: {e}")
+            raise
+
+    def archive_closed(self, cutoff: datetime, tables: Sequence[str] = tuple(ARCHIVE_SCHEMA),
+                       dry_run: bool = False) -> Dict[str, int]:
+        """Archive every partition of tables that ends at or before cutoff."""
+        archived = {}
+        for table in tables:
+            for partition, start, end in self.closed_partitions(table, cutoff):
+                if dry_run:
+                    logger.info(f"Would archive {partition} [{start}, {end})")
+                    continue
+                archived[partition] = self.archive_partition(table, partition, start)
+        return archived
+
+    @staticmethod
+    def _rows_to_table(rows: List[Tuple[str, datetime, Any]], schema: pa.Schema) -> pa.Table:
+        sensor_ids, timestamps, values = zip(*rows)
+        return pa.table([
+            pa.array(sensor_ids, type=pa.string()),
+            pa.array(timestamps, type=pa.timestamp('us')),
+            pa.array(values, type=schema.field('value').type)
+        ], schema=schema)
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Partition archiver connection closed")
+
+
+class ColdArchive:
+    def __init__(self, archive_path: str):
+        """Initialize a reader over the Parquet archive."""
+        self.archive_path = archive_path
+
+    def months(self, table: str) -> Set[str]:
+        """Return the archived YYYY-MM months of a table."""
+        table_dir = os.path.join(self.archive_path, table)
+        if not os.path.isdir(table_dir):
+            return set()
+        return {name.split('=', 1)[1] for name in os.listdir(table_dir) if name.startswith('month=')}
+
+    def scan(self, table: str, start: datetime, end: datetime,
+             exclude_months: Optional[Set[str]] = None,
+             sensor_ids: Optional[Sequence[str]] = None) -> pa.Table:
+        """Return archived rows in [start, end), skipping months still hot."""
+        exclude_months = exclude_months or set()
+        files = []
+        for month in months_between(start, end):
+            month_dir = os.path.join(self.archive_path, table, f"month={month}")
+            if month in exclude_months or not os.path.isdir(month_dir):
+                continue
+            files.extend(os.path.join(month_dir, name) for name in sorted(os.listdir(month_dir))
+                         if name.endswith('.parquet'))
+        if not files:
+            return ARCHIVE_SCHEMA[table].empty_table()
+        ts_type = pa.timestamp('us')
+        expr = ((ds.field('timestamp') >= pa.scalar(start, type=ts_type))
+                & (ds.field('timestamp') < pa.scalar(end, type=ts_type)))
+        if sensor_ids is not None:
+            expr = expr & ds.field('sensor_id').isin(list(sensor_ids))
+        return ds.dataset(files, schema=ARCHIVE_SCHEMA[table], format='parquet').to_table(filter=expr)
+
+    def query_range(self, sensor_type: str, start: datetime, end: datetime,
+                    exclude_months: Optional[Set[str]] = None,
+                    sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return archived readings of a sensor type as a batch ordered by time."""
+        table, _ = SENSOR_TABLES[sensor_type]
+        scanned = self.scan(table, start, end, exclude_months, sensor_ids)
+        return table_to_batch(sensor_type, scanned.sort_by('timestamp'))
+
+    def hourly_table(self, sensor_type: str, start: datetime, end: datetime,
+                     exclude_months: Optional[Set[str]] = None) -> pa.Table:
+        """Return archived hourly trends as a table with the TREND_SCHEMAS columns."""
+        table, _ = SENSOR_TABLES[sensor_type]
+        schema = TREND_SCHEMAS[sensor_type]
+        scanned = self.scan(table, start, end, exclude_months)
+        if scanned.num_rows == 0:
+            return schema.empty_table()
+        hourly = pa.table({
+            'sensor_id': scanned.column('sensor_id'),
+            'hour': pc.floor_temporal(scanned.column('timestamp'), 1, 'hour'),
+            'value': pc.cast(scanned.column('value'), pa.float64())
+        }).group_by(['sensor_id', 'hour']).aggregate([
+            ('value', 'count'),
+            ('value', 'mean'),
+            ('value', 'min'),
+            ('value', 'max')
+        ]).sort_by('hour')
+
+        if sensor_type == 'motion':
+            columns = [hourly['sensor_id'], hourly['hour'], hourly['value_count'],
+                       pc.multiply(hourly['value_mean'], 100.0)]
+        else:
+            columns = [hourly['sensor_id'], hourly['hour'], hourly['value_mean'],
+                       hourly['value_min'], hourly['value_max']]
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def hourly_trends(self, sensor_type: str, start: datetime, end: datetime,
+                      exclude_months: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Return hourly trend rows shaped like AnalyticsProcessor.get_sensor_trends."""
+        return self.hourly_table(sensor_type, start, end, exclude_months).to_pylist()
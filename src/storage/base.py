@@ -0,0 +1,151 @@
+"""Storage backend interface shared by the pipeline processors.
+
+Backends exchange data as ``ReadingBatch`` objects: one sensor type per
+batch with the sensor ids, timestamps and values held as NumPy columns.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Sensor type -> (reading table, value column)
+SENSOR_TABLES = {
+    'temperature': ('temperature_readings', 'value'),
+    'humidity': ('humidity_readings', 'value'),
+    'motion': ('motion_events', 'detected')
+}
+
+# Supported aggregation intervals
+AGGREGATE_INTERVALS = ('minute', 'hour', 'day')
+
+
+@dataclass
+class ReadingBatch:
+    """Columnar batch of readings for a single sensor type."""
+    sensor_type: str
+    sensor_ids: np.ndarray  # object array of str
+    timestamps: np.ndarray  # datetime64[us]
+    values: np.ndarray      # float64, or bool for motion
+
+    def __len__(self) -> int:
+        return len(self.sensor_ids)
+
+    @classmethod
+    def from_columns(cls, sensor_type: str, sensor_ids: Sequence[str],
+                     timestamps: Sequence[Any], values: Sequence[Any]) -> 'ReadingBatch':
+        """Build a batch from plain column sequences."""
+        value_dtype = np.bool_ if sensor_type == 'motion' else np.float64
+        return cls(
+            sensor_type=sensor_type,
+            sensor_ids=np.asarray(sensor_ids, dtype=object),
+            timestamps=np.asarray(timestamps, dtype='datetime64[us]'),
+            values=np.asarray(values, dtype=value_dtype)
+        )
+
+    @classmethod
+    def empty(cls, sensor_type: str) -> 'ReadingBatch':
+        """Build an empty batch."""
+        return cls.from_columns(sensor_type, [], [], [])
+
+    @classmethod
+    def from_readings(cls, readings: Iterable[Dict[str, Any]],
+                      type_func: Callable[[str], Optional[str]]) -> Dict[str, 'ReadingBatch']:
+        """Group reading dicts into one batch per sensor type.
+
+        Readings whose type cannot be resolved by type_func are skipped.
+        """
+        columns: Dict[str, Tuple[List, List, List]] = {}
+        for reading in readings:
+            sensor_type = type_func(reading['sensor_id'])
+            if sensor_type is None:
+                continue
+            ids, timestamps, values = columns.setdefault(sensor_type, ([], [], []))
+            ids.append(reading['sensor_id'])
+            timestamps.append(reading['timestamp'])
+            values.append(reading['value'])
+        return {
+            sensor_type: cls.from_columns(sensor_type, *cols)
+            for sensor_type, cols in columns.items()
+        }
+
+    @classmethod
+    def concat(cls, sensor_type: str, batches: Sequence['ReadingBatch']) -> 'ReadingBatch':
+        """Concatenate batches of the same sensor type."""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty(sensor_type)
+        return cls(
+            sensor_type=sensor_type,
+            sensor_ids=np.concatenate([b.sensor_ids for b in batches]),
+            timestamps=np.concatenate([b.timestamps for b in batches]),
+            values=np.concatenate([b.values for b in batches])
+        )
+
+    def rows(self) -> Iterator[Tuple[str, datetime, Any]]:
+        """Yield (sensor_id, timestamp, value) tuples of Python objects for DB drivers."""
+        return zip(self.sensor_ids.tolist(), self.timestamps.astype(object), self.values.tolist())
+
+    def take(self, indices: np.ndarray) -> 'ReadingBatch':
+        """Return the subset of rows selected by an index or boolean mask."""
+        return ReadingBatch(
+            sensor_type=self.sensor_type,
+            sensor_ids=self.sensor_ids[indices],
+            timestamps=self.timestamps[indices],
+            values=self.values[indices]
+        )
+
+
+class StorageBackend(ABC):
+    """Interface implemented by every reading store."""
+
+    @abstractmethod
+    def write_batch(self, batch: ReadingBatch) -> int:
+        """Persist a batch and return the number of readings written."""
+
+    @abstractmethod
+    def query_range(self, sensor_type: str, start: datetime, end: datetime,
+                    sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return readings with start <= timestamp < end, ordered by timestamp."""
+
+    @abstractmethod
+    def latest(self, sensor_type: str,
+               sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return the most recent reading of each sensor."""
+
+    @abstractmethod
+    def aggregate(self, sensor_type: str, start: datetime, end: datetime,
+                  interval: str = 'hour') -> List[Dict[str, Any]]:
+        """Return count/avg/min/max per sensor and interval bucket.
+
+        Each row has the keys sensor_id, bucket, count, avg, min and max.
+        For motion sensors the values are the share of positive detections.
+        """
+
+    def flush(self):
+        """Make buffered writes durable. No-op for unbuffered backends."""
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+def validate_interval(interval: str) -> str:
+    """Check an aggregation interval name."""
+    if interval not in AGGREGATE_INTERVALS:
+        raise ValueError(f"Unsupported interval '{interval}', expected one of {AGGREGATE_INTERVALS}")
+    return interval
+
+
+def create_backend(name: str, **kwargs) -> StorageBackend:
+    """Create a storage backend by name: postgres, influxdb or parquet."""
+    if name == 'postgres':
+        from .postgres_backend import PostgresBackend
+        return PostgresBackend(**kwargs)
+    if name == 'influxdb':
+        from .influx_backend import InfluxBackend
+        return InfluxBackend(**kwargs)
+    if name == 'parquet':
+        from .parquet_backend import ParquetBackend
+        return ParquetBackend(**kwargs)
+    raise ValueError(f"Unknown storage backend '{name}'")
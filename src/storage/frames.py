@@ -0,0 +1,54 @@
+"""Bulk loading of query results into DataFrames.
+
+``pd.read_sql_query`` fetches rows as Python tuples, with a ``Decimal``
+per DECIMAL value, before pandas converts them column by column.
+``read_frame`` instead streams the result with ``COPY (query) TO STDOUT``
+as CSV and decodes it with the multi-threaded Arrow CSV reader straight
+into columns. No per-row Python objects are created.
+"""
+import io
+from typing import Any, Dict, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# How PostgreSQL writes booleans and NULL in CSV: NULL is an unquoted
+# empty field, an empty string is quoted
+_CONVERT_OPTIONS = dict(
+    true_values=['t'],
+    false_values=['f'],
+    null_values=[''],
+    strings_can_be_null=True,
+    quoted_strings_can_be_null=False
+)
+
+
+def frame_from_csv(data: Union[bytes, memoryview],
+                   column_types: Optional[Dict[str, pa.DataType]] = None) -> pd.DataFrame:
+    """Decode PostgreSQL CSV output with a header row into a DataFrame.
+
+    column_types pins the Arrow type of columns whose type should not be
+    inferred, e.g. to keep an all-NULL column numeric.
+    """
+    table = pa_csv.read_csv(
+        pa.py_buffer(data),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types or {}, **_CONVERT_OPTIONS)
+    )
+    return table.to_pandas()
+
+
+def read_frame(conn, query: str, params: Optional[Union[Dict[str, Any], Sequence[Any]]] = None,
+               column_types: Optional[Dict[str, pa.DataType]] = None) -> pd.DataFrame:
+    """Run a SELECT through COPY and return its result as a DataFrame.
+
+    COPY takes no bind parameters, so params are interpolated client-side
+    with the driver's quoting. Cast DECIMAL columns to float8 in the query
+    so they arrive as floats.
+    """
+    with conn.cursor() as cur:
+        bound = cur.mogrify(query, params).decode() if params is not None else query
+        buffer = io.BytesIO()
+        cur.copy_expert(f"COPY ({bound.strip().rstrip(';')}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    conn.commit()
+    return frame_from_csv(buffer.getbuffer(), column_types)
@@ -0,0 +1,188 @@
+"""InfluxDB storage backend.
+
+Writes go through the asynchronous batched writer; reads use Flux queries
+against the v2 HTTP query API and return CSV that is parsed into batches.
+"""
+import csv
+import io
+import json
+import logging
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .base import ReadingBatch, StorageBackend, validate_interval
+from .influx_writer import AsyncInfluxWriter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FLUX_INTERVALS = {'minute': '1m', 'hour': '1h', 'day': '1d'}
+
+
+def _flux_time(value: datetime) -> str:
+    """Format a naive UTC datetime as a Flux time expression."""
+    return f'time(v: "{value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")}")'
+
+
+def _flux_string(value: str) -> str:
+    return json.dumps(value)
+
+
+def _parse_times(values: List[str]) -> np.ndarray:
+    """Parse RFC3339 UTC timestamps into datetime64[us]."""
+    return np.array([value.rstrip('Z') for value in values], dtype='datetime64[ns]').astype('datetime64[us]')
+
+
+def parse_flux_csv(text: str) -> List[Dict[str, str]]:
+    """Parse a Flux CSV response made of blank-line separated tables."""
+    rows = []
+    for block in text.replace('\r\n', '\n').split('\n\n'):
+        if block.strip():
+            rows.extend(csv.DictReader(io.StringIO(block)))
+    return rows
+
+
+class InfluxBackend(StorageBackend):
+    def __init__(self, url: str, token: str, org: str, bucket: str,
+                 timeout: float = 30.0, **writer_options):
+        """Initialize the backend and its background writer."""
+        self.url = url.rstrip('/')
+        self.token = token
+        self.org = org
+        self.bucket = bucket
+        self.timeout = timeout
+        self.writer = AsyncInfluxWriter(url, token, org, bucket, **writer_options)
+
+    def write_batch(self, batch: ReadingBatch) -> int:
+        """Queue the batch on the background writer."""
+        if not len(batch):
+            return 0
+        # datetime64[us] is already epoch microseconds
+        accepted = self.writer.write_batch(
+            batch.sensor_type,
+            batch.sensor_ids.tolist(),
+            batch.values.tolist(),
+            batch.timestamps.astype(np.int64).tolist()
+        )
+        return len(batch) if accepted else 0
+
+    def query_range(self, sensor_type: str, start: datetime, end: datetime,
+                    sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return readings in [start, end) ordered by time."""
+        flux = self._source(sensor_type, _flux_time(start), _flux_time(end), sensor_ids) + """
+            |> keep(columns: ["_time", "_value", "sensor_id"])
+            |> group()
+            |> sort(columns: ["_time"])
+        """
+        return self._rows_to_batch(sensor_type, self._query(flux))
+
+    def latest(self, sensor_type: str,
+               sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return the last reading of each sensor."""
+        flux = self._source(sensor_type, '0', 'now()', sensor_ids) + """
+            |> last()
+            |> keep(columns: ["_time", "_value", "sensor_id"])
+            |> group()
+        """
+        return self._rows_to_batch(sensor_type, self._query(flux))
+
+    def aggregate(self, sensor_type: str, start: datetime, end: datetime,
+                  interval: str = 'hour') -> List[Dict[str, Any]]:
+        """Aggregate per sensor and window in a single Flux reduce pass."""
+        every = FLUX_INTERVALS[validate_interval(interval)]
+        flux = self._source(sensor_type, _flux_time(start), _flux_time(end)) + f"""
+            |> window(every: {every})
+            |> reduce(
+                identity: {{count: 0, sum: 0.0, min: 1.0e308, max: -1.0e308}},
+                fn: (r, accumulator) => ({{
+                    count: accumulator.count + 1,
+                    sum: accumulator.sum + float(v: r._value),
+                    min: if float(v: r._value) < accumulator.min then float(v: r._value) else accumulator.min,
+                    max: if float(v: r._value) > accumulator.max then float(v: r._value) else accumulator.max
+                }})
+            )
+            |> keep(columns: ["_start", "sensor_id", "count", "sum", "min", "max"])
+        """
+        rows = self._query(flux)
+        if not rows:
+            return []
+        buckets = _parse_times([row['_start'] for row in rows]).astype(object)
+        results = []
+        for row, bucket in zip(rows, buckets):
+            count = int(row['count'])
+            results.append({
+                'sensor_id': row['sensor_id'],
+                'bucket': bucket,
+                'count': count,
+                'avg': float(row['sum']) / count if count else None,
+                'min': float(row['min']),
+                'max': float(row['max'])
+            })
+        results.sort(key=lambda r: (r['bucket'], r['sensor_id']))
+        return results
+
+    def flush(self):
+        """Wait for queued points to be written."""
+        self.writer.flush()
+
+    def close(self):
+        """Flush and stop the background writer."""
+        self.writer.close()
+        stats = self.writer.stats()
+        logger.info(f"InfluxDB backend closed: {stats.points_written} points written, "
+                    f"{stats.points_dropped} dropped, avg flush {stats.avg_flush_latency:.3f}s")
+
+    def _source(self, sensor_type: str, start: str, stop: str,
+                sensor_ids: Optional[Sequence[str]] = None) -> str:
+        flux = f"""
+            from(bucket: {_flux_string(self.bucket)})
+            |> range(start: {start}, stop: {stop})
+            |> filter(fn: (r) => r._measurement == {_flux_string(sensor_type)} and r._field == "value")
+        """
+        if sensor_ids is not None:
+            id_set = ', '.join(_flux_string(sensor_id) for sensor_id in sensor_ids)
+            flux += f"|> filter(fn: (r) => contains(value: r.sensor_id, set: [{id_set}]))\n"
+        return flux
+
+    def _query(self, flux: str) -> List[Dict[str, str]]:
+        """Run a Flux query and return the parsed CSV rows."""
+        body = json.dumps({
+            'query': flux,
+            'type': 'flux',
+            'dialect': {'header': True, 'annotations': [], 'delimiter': ','}
+        }).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.url}/api/v2/query?{urllib.parse.urlencode({'org': self.org})}",
+            data=body,
+            headers={
+                'Authorization': f'Token {self.token}',
+                'Content-Type': 'application/json',
+                'Accept': 'application/csv'
+            },
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return parse_flux_csv(response.read().decode('utf-8'))
+        except Exception as e:
+            logger.error(f"Error querying InfluxDB: {e}")
+            raise
+
+    @staticmethod
+    def _rows_to_batch(sensor_type: str, rows: List[Dict[str, str]]) -> ReadingBatch:
+        if not rows:
+            return ReadingBatch.empty(sensor_type)
+        if sensor_type == 'motion':
+            values = [row['_value'] == 'true' for row in rows]
+        else:
+            values = [float(row['_value']) for row in rows]
+        return ReadingBatch(
+            sensor_type=sensor_type,
+            sensor_ids=np.array([row['sensor_id'] for row in rows], dtype=object),
+            timestamps=_parse_times([row['_time'] for row in rows]),
+            values=np.asarray(values, dtype=np.bool_ if sensor_type == 'motion' else np.float64)
+        )
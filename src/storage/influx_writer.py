@@ -0,0 +1,231 @@
+"""Asynchronous batched InfluxDB writer.
+
+Readings are encoded straight to line protocol from column batches and
+handed to a background thread that gzips and posts them to the InfluxDB v2
+write API, so the caller never blocks on an HTTP round trip.
+"""
+import gzip
+import logging
+import math
+import queue
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# HTTP statuses worth retrying; other 4xx errors mean the payload is bad
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def to_epoch_us(timestamp: Any) -> int:
+    """Convert a datetime (naive means UTC) or epoch microseconds to epoch microseconds."""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return (timestamp - EPOCH) // ONE_MICROSECOND
+    return int(timestamp)
+
+
+def _escape_tag(value: str) -> str:
+    return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def _format_field(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return repr(float(value))
+
+
+def is_writable(value: Any) -> bool:
+    """Return whether InfluxDB accepts the value; it rejects NaN and infinities."""
+    return isinstance(value, bool) or math.isfinite(value)
+
+
+def encode_line_protocol(measurement: str, sensor_ids: Sequence[str],
+                         values: Sequence[Any], timestamps: Sequence[Any]) -> bytes:
+    """Encode a column batch as newline separated line protocol with microsecond precision.
+
+    Points whose value is NaN or infinite are left out, since a single one
+    makes InfluxDB reject the whole request.
+    """
+    prefix = _escape_tag(measurement) + ',sensor_id='
+    lines = [
+        f"{prefix}{_escape_tag(sensor_id)} value={_format_field(value)} {to_epoch_us(ts)}"
+        for sensor_id, value, ts in zip(sensor_ids, values, timestamps)
+        if is_writable(value)
+    ]
+    return '\n'.join(lines).encode('utf-8')
+
+
+@dataclass
+class InfluxWriterStats:
+    """Counters for the background writer."""
+    points_queued: int = 0
+    points_written: int = 0
+    points_dropped: int = 0
+    batches_written: int = 0
+    batches_failed: int = 0
+    retries: int = 0
+    queue_depth: int = 0
+    last_flush_latency: float = 0.0
+    avg_flush_latency: float = 0.0
+
+
+class AsyncInfluxWriter:
+    def __init__(self, url: str, token: str, org: str, bucket: str,
+                 batch_size: int = 5000, flush_interval: float = 1.0,
+                 max_queue_batches: int = 1000, max_retries: int = 5,
+                 retry_base_delay: float = 0.5, retry_max_delay: float = 30.0,
+                 timeout: float = 10.0):
+        """Initialize the writer and start its background flush thread."""
+        params = urllib.parse.urlencode({'org': org, 'bucket': bucket, 'precision': 'us'})
+        self.write_url = f"{url.rstrip('/')}/api/v2/write?{params}"
+        self.headers = {
+            'Authorization': f'Token {token}',
+            'Content-Type': 'text/plain; charset=utf-8',
+            'Content-Encoding': 'gzip'
+        }
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.timeout = timeout
+
+        # Each queue item is (encoded lines, point count)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_batches)
+        self._stats = InfluxWriterStats()
+        self._stats_lock = threading.Lock()
+        self._flush_latencies = deque(maxlen=100)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='influx-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"Async InfluxDB writer started for bucket {bucket}")
+
+    def write_batch(self, measurement: str, sensor_ids: Sequence[str],
+                    values: Sequence[Any], timestamps: Sequence[Any]) -> bool:
+        """Encode and enqueue a batch of points without blocking.
+
+        Returns False and counts the points as dropped if the queue is full.
+        Points with NaN or infinite values are dropped and counted as well.
+        """
+        count = sum(1 for value in values if is_writable(value))
+        if count < len(sensor_ids):
+            with self._stats_lock:
+                self._stats.points_dropped += len(sensor_ids) - count
+            logger.warning(f"Dropped {len(sensor_ids) - count} non-finite {measurement} values")
+        if count == 0:
+            return True
+        payload = encode_line_protocol(measurement, sensor_ids, values, timestamps)
+        try:
+            self._queue.put_nowait((payload, count))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats.points_dropped += count
+            logger.warning(f"InfluxDB write queue full, dropped {count} {measurement} points")
+            return False
+        with self._stats_lock:
+            self._stats.points_queued += count
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been written or dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> InfluxWriterStats:
+        """Return a snapshot of the writer counters."""
+        with self._stats_lock:
+            snapshot = InfluxWriterStats(**vars(self._stats))
+        snapshot.queue_depth = self._queue.qsize()
+        if self._flush_latencies:
+            snapshot.avg_flush_latency = statistics.mean(self._flush_latencies)
+        return snapshot
+
+    def close(self, timeout: float = 30.0):
+        """Flush pending points and stop the background thread."""
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+        logger.info("Async InfluxDB writer closed")
+
+    def _run(self):
+        """Background loop collecting queued batches into HTTP requests."""
+        pending = []
+        pending_points = 0
+        deadline = time.monotonic() + self.flush_interval
+        while not (self._stop.is_set() and self._queue.empty() and not pending):
+            try:
+                payload, count = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                pending.append(payload)
+                pending_points += count
+            except queue.Empty:
+                pass
+
+            if pending and (pending_points >= self.batch_size or time.monotonic() >= deadline
+                            or self._stop.is_set()):
+                self._post(b'\n'.join(pending), pending_points)
+                for _ in pending:
+                    self._queue.task_done()
+                pending = []
+                pending_points = 0
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _post(self, body: bytes, point_count: int):
+        """Post a gzipped batch, retrying transient failures with jittered backoff."""
+        data = gzip.compress(body)
+        start = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            try:
+                request = urllib.request.Request(self.write_url, data=data,
+                                                 headers=self.headers, method='POST')
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+                self._record_flush(point_count, time.monotonic() - start)
+                return
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRYABLE_STATUSES:
+                    logger.error(f"InfluxDB rejected batch of {point_count} points: HTTP {e.code}")
+                    break
+                error = f"HTTP {e.code}"
+            except (urllib.error.URLError, OSError) as e:
+                error = str(e)
+
+            if attempt == self.max_retries or self._stop.is_set():
+                logger.error(f"Giving up on batch of {point_count} points after {attempt + 1} attempts: {error}")
+                break
+            # Full jitter keeps many writers from retrying in lockstep
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+            with self._stats_lock:
+                self._stats.retries += 1
+            logger.warning(f"InfluxDB write failed ({error}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+        with self._stats_lock:
+            self._stats.batches_failed += 1
+            self._stats.points_dropped += point_count
+
+    def _record_flush(self, point_count: int, latency: float):
+        self._flush_latencies.append(latency)
+        with self._stats_lock:
+            self._stats.points_written += point_count
+            self._stats.batches_written += 1
+            self._stats.last_flush_latency = latency
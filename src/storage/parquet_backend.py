@@ -0,0 +1,206 @@
+"""Local columnar storage backend using Parquet files.
+
+Readings are buffered in memory and written as compressed Parquet files
+partitioned by sensor type and day::
+
+    <root>/<sensor_type>/date=YYYY-MM-DD/part-<n>.parquet
+
+Range queries prune whole day directories before reading any file, which
+makes this backend a fast bulk-scan path for historical analytics and lets
+the pipeline run without a database server.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from itertools import count
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .base import ReadingBatch, StorageBackend, validate_interval
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATE_PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+
+def batch_to_table(batch: ReadingBatch) -> pa.Table:
+    """Convert a reading batch to an Arrow table."""
+    return pa.table({
+        'sensor_id': pa.array(batch.sensor_ids, type=pa.string()),
+        'timestamp': pa.array(batch.timestamps, type=pa.timestamp('us')),
+        'value': pa.array(batch.values)
+    })
+
+
+def table_to_batch(sensor_type: str, table: pa.Table) -> ReadingBatch:
+    """Convert an Arrow table with sensor_id/timestamp/value columns to a batch."""
+    if table.num_rows == 0:
+        return ReadingBatch.empty(sensor_type)
+    return ReadingBatch(
+        sensor_type=sensor_type,
+        sensor_ids=table.column('sensor_id').to_numpy().astype(object),
+        timestamps=table.column('timestamp').to_numpy().astype('datetime64[us]'),
+        values=table.column('value').to_numpy()
+    )
+
+
+class ParquetBackend(StorageBackend):
+    def __init__(self, root_path: str, flush_rows: int = 100000,
+                 compression: str = 'zstd', latest_lookback_days: int = 7):
+        """Initialize the backend rooted at root_path."""
+        self.root_path = root_path
+        self.flush_rows = flush_rows
+        self.compression = compression
+        self.latest_lookback_days = latest_lookback_days
+        self._buffers: Dict[str, List[ReadingBatch]] = {}
+        self._buffered_rows: Dict[str, int] = {}
+        self._file_seq = count()
+        os.makedirs(root_path, exist_ok=True)
+        logger.info(f"Parquet backend initialized at {root_path}")
+
+    def write_batch(self, batch: ReadingBatch) -> int:
+        """Buffer the batch, writing files once flush_rows readings are pending."""
+        if not len(batch):
+            return 0
+        self._buffers.setdefault(batch.sensor_type, []).append(batch)
+        self._buffered_rows[batch.sensor_type] = self._buffered_rows.get(batch.sensor_type, 0) + len(batch)
+        if self._buffered_rows[batch.sensor_type] >= self.flush_rows:
+            self._flush_type(batch.sensor_type)
+        return len(batch)
+
+    def flush(self):
+        """Write all buffered readings to Parquet files."""
+        for sensor_type in list(self._buffers):
+            self._flush_type(sensor_type)
+
+    def scan_table(self, sensor_type: str, start: datetime, end: datetime,
+                   sensor_ids: Optional[Sequence[str]] = None,
+                   columns: Sequence[str] = ('sensor_id', 'timestamp', 'value')) -> pa.Table:
+        """Return the Arrow table of readings in [start, end) without converting rows."""
+        self._flush_type(sensor_type)
+        dataset = self._dataset(sensor_type)
+        if dataset is None:
+            return pa.table({})
+        ts_type = pa.timestamp('us')
+        expr = (
+            (ds.field('date') >= start.strftime('%Y-%m-%d'))
+            & (ds.field('date') <= end.strftime('%Y-%m-%d'))
+            & (ds.field('timestamp') >= pa.scalar(start, type=ts_type))
+            & (ds.field('timestamp') < pa.scalar(end, type=ts_type))
+        )
+        if sensor_ids is not None:
+            expr = expr & ds.field('sensor_id').isin(list(sensor_ids))
+        return dataset.to_table(columns=list(columns), filter=expr)
+
+    def query_range(self, sensor_type: str, start: datetime, end: datetime,
+                    sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return readings in [start, end) ordered by timestamp."""
+        table = self.scan_table(sensor_type, start, end, sensor_ids)
+        if table.num_rows == 0:
+            return ReadingBatch.empty(sensor_type)
+        return table_to_batch(sensor_type, table.sort_by('timestamp'))
+
+    def latest(self, sensor_type: str,
+               sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return the last reading of each sensor, scanning the newest days first."""
+        self._flush_type(sensor_type)
+        wanted = set(sensor_ids) if sensor_ids is not None else None
+        found: Dict[str, tuple] = {}
+        for day_dir in self._day_dirs(sensor_type)[:self.latest_lookback_days]:
+            table = ds.dataset(day_dir, format='parquet').to_table(columns=['sensor_id', 'timestamp', 'value'])
+            if wanted is not None:
+                table = table.filter(pc.is_in(table.column('sensor_id'), value_set=pa.array(list(wanted))))
+            batch = table_to_batch(sensor_type, table)
+            if not len(batch):
+                continue
+            # Last occurrence per sensor after a stable sort by time
+            order = np.argsort(batch.timestamps, kind='stable')[::-1]
+            ids, first = np.unique(batch.sensor_ids[order], return_index=True)
+            for sensor_id, index in zip(ids, order[first]):
+                if sensor_id not in found:
+                    found[sensor_id] = (batch.timestamps[index], batch.values[index])
+            if wanted is not None and wanted.issubset(found):
+                break
+        if not found:
+            return ReadingBatch.empty(sensor_type)
+        ids = sorted(found)
+        return ReadingBatch.from_columns(
+            sensor_type, ids, [found[i][0] for i in ids], [found[i][1] for i in ids]
+        )
+
+    def aggregate(self, sensor_type: str, start: datetime, end: datetime,
+                  interval: str = 'hour') -> List[Dict[str, Any]]:
+        """Aggregate per sensor and time bucket with Arrow compute kernels."""
+        validate_interval(interval)
+        table = self.scan_table(sensor_type, start, end)
+        if table.num_rows == 0:
+            return []
+        table = pa.table({
+            'sensor_id': table.column('sensor_id'),
+            'bucket': pc.floor_temporal(table.column('timestamp'), 1, interval),
+            'value': pc.cast(table.column('value'), pa.float64())
+        })
+        grouped = table.group_by(['sensor_id', 'bucket']).aggregate([
+            ('value', 'count'),
+            ('value', 'mean'),
+            ('value', 'min'),
+            ('value', 'max')
+        ]).sort_by([('bucket', 'ascending'), ('sensor_id', 'ascending')])
+        return [
+            {
+                'sensor_id': row['sensor_id'],
+                'bucket': row['bucket'],
+                'count': row['value_count'],
+                'avg': row['value_mean'],
+                'min': row['value_min'],
+                'max': row['value_max']
+            }
+            for row in grouped.to_pylist()
+        ]
+
+    def close(self):
+        """Write any buffered readings."""
+        self.flush()
+        logger.info("Parquet backend closed")
+
+    def _flush_type(self, sensor_type: str):
+        batches = self._buffers.pop(sensor_type, None)
+        self._buffered_rows.pop(sensor_type, None)
+        if not batches:
+            return
+        batch = ReadingBatch.concat(sensor_type, batches)
+        batch = batch.take(np.argsort(batch.timestamps, kind='stable'))
+        days = batch.timestamps.astype('datetime64[D]')
+        # Sorted input means each day is a contiguous slice
+        boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+        for day_slice in np.split(np.arange(len(batch)), boundaries):
+            day = str(days[day_slice[0]])
+            day_dir = os.path.join(self.root_path, sensor_type, f"date={day}")
+            os.makedirs(day_dir, exist_ok=True)
+            path = os.path.join(day_dir, f"part-{time.time_ns()}-{next(self._file_seq)}.parquet")
+            pq.write_table(batch_to_table(batch.take(day_slice)), path, compression=self.compression)
+        logger.debug(f"Flushed {len(batch)} {sensor_type} readings to Parquet")
+
+    def _dataset(self, sensor_type: str) -> Optional[ds.Dataset]:
+        type_dir = os.path.join(self.root_path, sensor_type)
+        if not os.path.isdir(type_dir):
+            return None
+        return ds.dataset(type_dir, format='parquet', partitioning=DATE_PARTITIONING)
+
+    def _day_dirs(self, sensor_type: str) -> List[str]:
+        """Return the day partition directories, newest first."""
+        type_dir = os.path.join(self.root_path, sensor_type)
+        if not os.path.isdir(type_dir):
+            return []
+        return [
+            os.path.join(type_dir, name)
+            for name in sorted(os.listdir(type_dir), reverse=True)
+            if name.startswith('date=')
+        ]
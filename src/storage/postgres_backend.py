@@ -0,0 +1,130 @@
+"""PostgreSQL storage backend over the partitioned reading tables."""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from .base import SENSOR_TABLES, ReadingBatch, StorageBackend, validate_interval
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PostgresBackend(StorageBackend):
+    def __init__(self, db_params: Dict[str, str], page_size: int = 1000):
+        """Initialize the backend with its own database connection."""
+        self.db_params = db_params
+        self.page_size = page_size
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def write_batch(self, batch: ReadingBatch) -> int:
+        """Insert the batch with multi-row INSERT statements in one transaction."""
+        if not len(batch):
+            return 0
+        table, value_column = SENSOR_TABLES[batch.sensor_type]
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    f"INSERT INTO {table} (sensor_id, timestamp, {value_column}) VALUES %s",
+                    batch.rows(),
+                    page_size=self.page_size
+                )
+            self.conn.commit()
+            return len(batch)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error writing {batch.sensor_type} batch: {e}")
+            raise
+
+    def query_range(self, sensor_type: str, start: datetime, end: datetime,
+                    sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return readings in [start, end), optionally limited to some sensors."""
+        table, value_column = SENSOR_TABLES[sensor_type]
+        query = f"""
+            SELECT sensor_id, timestamp, {value_column}
+            FROM {table}
+            WHERE timestamp >= %s AND timestamp < %s
+        """
+        params: List[Any] = [start, end]
+        if sensor_ids is not None:
+            query += " AND sensor_id = ANY(%s)"
+            params.append(list(sensor_ids))
+        query += " ORDER BY timestamp"
+        return self._fetch_batch(sensor_type, query, params)
+
+    def latest(self, sensor_type: str,
+               sensor_ids: Optional[Sequence[str]] = None) -> ReadingBatch:
+        """Return the most recent reading of each sensor."""
+        table, value_column = SENSOR_TABLES[sensor_type]
+        query = f"SELECT DISTINCT ON (sensor_id) sensor_id, timestamp, {value_column} FROM {table}"
+        params: List[Any] = []
+        if sensor_ids is not None:
+            query += " WHERE sensor_id = ANY(%s)"
+            params.append(list(sensor_ids))
+        query += " ORDER BY sensor_id, timestamp DESC"
+        return self._fetch_batch(sensor_type, query, params)
+
+    def aggregate(self, sensor_type: str, start: datetime, end: datetime,
+                  interval: str = 'hour') -> List[Dict[str, Any]]:
+        """Aggregate readings per sensor and date_trunc bucket on the server."""
+        validate_interval(interval)
+        table, value_column = SENSOR_TABLES[sensor_type]
+        value_expr = f"{value_column}::int::float8" if sensor_type == 'motion' else f"{value_column}::float8"
+        with self.conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT
+                    sensor_id,
+                    date_trunc(%s, timestamp) AS bucket,
+                    COUNT(*) AS count,
+                    AVG({value_expr}) AS avg_value,
+                    MIN({value_expr}) AS min_value,
+                    MAX({value_expr}) AS max_value
+                FROM {table}
+                WHERE timestamp >= %s AND timestamp < %s
+                GROUP BY sensor_id, bucket
+                ORDER BY bucket, sensor_id
+            """, (interval, start, end))
+            rows = cur.fetchall()
+        self.conn.commit()
+        return [
+            {
+                'sensor_id': row[0],
+                'bucket': row[1],
+                'count': row[2],
+                'avg': row[3],
+                'min': row[4],
+                'max': row[5]
+            }
+            for row in rows
+        ]
+
+    def _fetch_batch(self, sensor_type: str, query: str, params: List[Any]) -> ReadingBatch:
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        self.conn.commit()
+        if not rows:
+            return ReadingBatch.empty(sensor_type)
+        sensor_ids, timestamps, values = zip(*rows)
+        if sensor_type != 'motion':
+            values = [float(value) for value in values]
+        return ReadingBatch.from_columns(sensor_type, sensor_ids, timestamps, values)
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Postgres backend connection closed")
@@ -0,0 +1,302 @@
+"""Streaming threshold alerts over incoming reading batches.
+
+Each rule from ``ALERT_THRESHOLDS`` is evaluated per batch with array
+operations. A sensor enters a breach when it crosses the threshold and
+only leaves it after moving back past the threshold by the hysteresis
+margin. An alert is raised once per breach, after the breach has lasted
+``min_duration``, and not more often than once per ``cooldown`` per
+sensor and rule, so an oscillating sensor yields a single alert.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.pipeline.queues import sensor_type_of
+from src.storage.base import ReadingBatch
+from .state import SensorIndex, grow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NAT = np.datetime64('NaT', 'us')
+
+STATUS_RAISED = 'raised'
+STATUS_RESOLVED = 'resolved'
+
+
+@dataclass
+class AlertRule:
+    """A threshold on one sensor type; kind is 'high' or 'low'."""
+    sensor_type: str
+    kind: str
+    threshold: float
+    hysteresis: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.sensor_type}_{self.kind}"
+
+    @property
+    def clear_threshold(self) -> float:
+        """Value the sensor has to move past to leave the breach."""
+        if self.kind == 'high':
+            return self.threshold - self.hysteresis
+        return self.threshold + self.hysteresis
+
+
+@dataclass
+class Alert:
+    """A raised or resolved threshold alert."""
+    sensor_id: str
+    sensor_type: str
+    rule: str
+    status: str
+    threshold: float
+    value: float
+    breach_start: datetime
+    timestamp: datetime
+
+
+def rules_from_thresholds(thresholds: Dict[str, float],
+                          hysteresis: Optional[Dict[str, float]] = None) -> List[AlertRule]:
+    """Build rules from ALERT_THRESHOLDS style keys such as temperature_high."""
+    hysteresis = hysteresis or {}
+    rules = []
+    for name, threshold in thresholds.items():
+        sensor_type, kind = name.rsplit('_', 1)
+        if kind not in ('high', 'low'):
+            raise ValueError(f"Alert threshold '{name}' must end in _high or _low")
+        rules.append(AlertRule(sensor_type, kind, float(threshold), hysteresis.get(sensor_type, 0.0)))
+    return rules
+
+
+class _RuleState:
+    """Per-sensor breach state of one rule, indexed by sensor key."""
+
+    def __init__(self):
+        self.breaching = np.zeros(0, dtype=np.bool_)
+        self.breach_start = np.full(0, NAT)
+        self.alerted = np.zeros(0, dtype=np.bool_)
+        self.last_alert = np.full(0, NAT)
+
+    def ensure(self, size: int):
+        self.breaching = grow(self.breaching, size, False)
+        self.breach_start = grow(self.breach_start, size, NAT)
+        self.alerted = grow(self.alerted, size, False)
+        self.last_alert = grow(self.last_alert, size, NAT)
+
+
+class AlertEngine:
+    def __init__(self, rules: List[AlertRule], min_duration: float = 0.0,
+                 cooldown: float = 600.0, index: Optional[SensorIndex] = None):
+        """Initialize the engine.
+
+        min_duration and cooldown are in seconds of reading time.
+        """
+        self.rules: Dict[str, List[AlertRule]] = {}
+        for rule in rules:
+            self.rules.setdefault(rule.sensor_type, []).append(rule)
+        self.min_duration = np.timedelta64(int(min_duration * 1e6), 'us')
+        self.cooldown = np.timedelta64(int(cooldown * 1e6), 'us')
+        self.index = index or SensorIndex()
+        self._state: Dict[str, _RuleState] = {rule.name: _RuleState() for rule in rules}
+        self.suppressed = 0
+
+    @classmethod
+    def from_config(cls, thresholds: Dict[str, float], config: Dict[str, Any]) -> 'AlertEngine':
+        """Create an engine from ALERT_THRESHOLDS and ALERT_ENGINE_CONFIG."""
+        return cls(
+            rules_from_thresholds(thresholds, config.get('hysteresis')),
+            min_duration=config.get('min_duration_seconds', 0.0),
+            cooldown=config.get('cooldown_seconds', 600.0)
+        )
+
+    def process(self, batch: ReadingBatch) -> List[Alert]:
+        """Evaluate every rule of the batch's sensor type and return new alerts."""
+        rules = self.rules.get(batch.sensor_type)
+        if not rules or not len(batch):
+            return []
+        keys = self.index.keys_for(batch.sensor_ids)
+        # Evaluate readings per sensor in time order
+        order = np.lexsort((batch.timestamps, keys))
+        keys = keys[order]
+        timestamps = batch.timestamps[order]
+        values = batch.values[order].astype(np.float64)
+        sensor_ids = batch.sensor_ids[order]
+
+        alerts: List[Alert] = []
+        for rule in rules:
+            state = self._state[rule.name]
+            state.ensure(len(self.index))
+            alerts.extend(self._evaluate(rule, state, keys, timestamps, values, sensor_ids))
+        alerts.sort(key=lambda alert: alert.timestamp)
+        return alerts
+
+    def process_readings(self, readings: Iterable[Dict[str, Any]],
+                         type_func: Callable[[str], Optional[str]] = sensor_type_of) -> List[Alert]:
+        """Evaluate reading dicts grouped by the sensor type type_func resolves."""
+        alerts: List[Alert] = []
+        for batch in ReadingBatch.from_readings(readings, type_func).values():
+            alerts.extend(self.process(batch))
+        return alerts
+
+    def active_alerts(self) -> List[Dict[str, Any]]:
+        """Return the sensors currently in an alerted breach."""
+        active = []
+        for sensor_type, rules in self.rules.items():
+            for rule in rules:
+                state = self._state[rule.name]
+                for key in np.flatnonzero(state.breaching & state.alerted):
+                    active.append({
+                        'sensor_id': self.index.sensor_id(int(key)),
+                        'rule': rule.name,
+                        'breach_start': state.breach_start[key].astype(datetime)
+                    })
+        return active
+
+    def _evaluate(self, rule: AlertRule, state: _RuleState, keys: np.ndarray,
+                  timestamps: np.ndarray, values: np.ndarray, sensor_ids: np.ndarray) -> List[Alert]:
+        n = len(keys)
+        positions = np.arange(n)
+        group_start = np.ones(n, dtype=np.bool_)
+        group_start[1:] = keys[1:] != keys[:-1]
+
+        if rule.kind == 'high':
+            enter = values > rule.threshold
+            leave = values < rule.clear_threshold
+        else:
+            enter = values < rule.threshold
+            leave = values > rule.clear_threshold
+
+        # Inside the hysteresis band a reading keeps the previous state:
+        # forward-fill the last decisive reading, seeding each sensor with
+        # the state carried over from earlier batches
+        prior = state.breaching[keys]
+        decisive = enter | leave
+        filled = np.where(decisive, enter, prior)
+        last_decisive = np.maximum.accumulate(np.where(decisive | group_start, positions, 0))
+        breaching = filled[last_decisive]
+
+        previous = np.empty(n, dtype=np.bool_)
+        previous[1:] = breaching[:-1]
+        previous[group_start] = prior[group_start]
+        rising = breaching & ~previous
+        falling = ~breaching & previous
+        carried = group_start & breaching & prior
+
+        # Breach episodes that are open in this batch
+        episode_start = rising | carried
+        episode_of = np.cumsum(episode_start) - 1
+        starts = np.flatnonzero(episode_start)
+        episode_keys = keys[starts]
+        episode_since = np.where(carried[starts], state.breach_start[episode_keys], timestamps[starts])
+        episode_alerted = carried[starts] & state.alerted[episode_keys]
+        prior_alerted = state.alerted.copy()
+        prior_since = state.breach_start.copy()
+
+        alerts: List[Alert] = []
+        qualifying = np.flatnonzero(breaching)
+        if len(qualifying):
+            lasted = timestamps[qualifying] - episode_since[episode_of[qualifying]]
+            qualifying = qualifying[lasted >= self.min_duration]
+        # Only the first qualifying reading of each episode can raise; the
+        # candidates are few, so cooldown is applied sequentially
+        episodes, first = np.unique(episode_of[qualifying], return_index=True)
+        for episode, i in zip(episodes, qualifying[first]):
+            if episode_alerted[episode]:
+                continue
+            key = keys[i]
+            last_alert = state.last_alert[key]
+            if not np.isnat(last_alert) and timestamps[i] - last_alert < self.cooldown:
+                self.suppressed += 1
+                continue
+            state.last_alert[key] = timestamps[i]
+            episode_alerted[episode] = True
+            alerts.append(self._alert(rule, STATUS_RAISED, sensor_ids[i], values[i],
+                                      episode_since[episode], timestamps[i]))
+
+        for i in np.flatnonzero(falling):
+            if group_start[i]:
+                alerted, since = prior_alerted[keys[i]], prior_since[keys[i]]
+            else:
+                episode = episode_of[i - 1]
+                alerted, since = episode_alerted[episode], episode_since[episode]
+            if alerted:
+                alerts.append(self._alert(rule, STATUS_RESOLVED, sensor_ids[i], values[i], since, timestamps[i]))
+
+        # Carry each sensor's state at its last reading into the next batch
+        group_end = np.append(group_start[1:], True)
+        last = np.flatnonzero(group_end)
+        last_keys = keys[last]
+        still_breaching = breaching[last]
+        state.breaching[last_keys] = still_breaching
+        state.breach_start[last_keys] = NAT
+        state.alerted[last_keys] = False
+        open_last = last[still_breaching]
+        open_episodes = episode_of[open_last]
+        state.breach_start[keys[open_last]] = episode_since[open_episodes]
+        state.alerted[keys[open_last]] = episode_alerted[open_episodes]
+        return alerts
+
+    @staticmethod
+    def _alert(rule: AlertRule, status: str, sensor_id: str, value: float,
+               since: np.datetime64, timestamp: np.datetime64) -> Alert:
+        return Alert(
+            sensor_id=sensor_id,
+            sensor_type=rule.sensor_type,
+            rule=rule.name,
+            status=status,
+            threshold=rule.threshold,
+            value=float(value),
+            breach_start=since.astype(datetime),
+            timestamp=timestamp.astype(datetime)
+        )
+
+
+class AlertStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store writing to the sensor_alerts table."""
+        self.db_params = db_params
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def store_alerts(self, alerts: List[Alert]) -> int:
+        """Insert alerts in one statement."""
+        if not alerts:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO sensor_alerts
+                        (sensor_id, rule, status, threshold, value, breach_start, timestamp)
+                    VALUES %s
+                """, [
+                    (a.sensor_id, a.rule, a.status, a.threshold, a.value, a.breach_start, a.timestamp)
+                    for a in alerts
+                ])
+            self.conn.commit()
+            return len(alerts)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error storing alerts: {e}")
+            raise
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Alert store connection closed")
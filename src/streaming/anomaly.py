@@ -0,0 +1,217 @@
+"""Streaming anomaly detection against each sensor's own baseline.
+
+Every sensor keeps an exponentially weighted mean and variance in NumPy
+arrays indexed by its ``SensorIndex`` key. Each reading is scored as a
+z-score against the baseline before it, then folded into the baseline, so
+the cost per reading is constant and no window of history is rescanned.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.pipeline.queues import sensor_type_of
+from src.storage.base import ReadingBatch
+from .state import SensorIndex, grow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Anomaly:
+    """A reading that deviates from its sensor's baseline."""
+    sensor_id: str
+    sensor_type: str
+    timestamp: datetime
+    value: float
+    baseline: float
+    std_dev: float
+    z_score: float
+
+
+class _BaselineState:
+    """EWMA mean, variance and reading count per sensor key."""
+
+    def __init__(self):
+        self.mean = np.zeros(0, dtype=np.float64)
+        self.var = np.zeros(0, dtype=np.float64)
+        self.count = np.zeros(0, dtype=np.int64)
+
+    def ensure(self, size: int):
+        self.mean = grow(self.mean, size, 0.0)
+        self.var = grow(self.var, size, 0.0)
+        self.count = grow(self.count, size, 0)
+
+
+class EwmaAnomalyDetector:
+    def __init__(self, alpha: float = 0.05, z_threshold: float = 4.0, warmup: int = 30,
+                 min_std: Optional[Dict[str, float]] = None,
+                 sensor_types: Sequence[str] = ('temperature', 'humidity')):
+        """Initialize the detector.
+
+        alpha is the EWMA smoothing factor, warmup the number of readings a
+        sensor needs before it is scored, and min_std a floor per sensor
+        type so near-constant sensors do not flag tiny changes.
+        """
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be between 0 and 1")
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.min_std = min_std or {}
+        self.sensor_types = tuple(sensor_types)
+        self.indexes: Dict[str, SensorIndex] = {t: SensorIndex() for t in self.sensor_types}
+        self._state: Dict[str, _BaselineState] = {t: _BaselineState() for t in self.sensor_types}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'EwmaAnomalyDetector':
+        """Create a detector from ANOMALY_CONFIG."""
+        return cls(
+            alpha=config['alpha'],
+            z_threshold=config['z_threshold'],
+            warmup=config['warmup'],
+            min_std=config.get('min_std'),
+            sensor_types=config.get('sensor_types', ('temperature', 'humidity'))
+        )
+
+    def process(self, batch: ReadingBatch) -> List[Anomaly]:
+        """Score every reading of the batch and return the anomalies."""
+        if batch.sensor_type not in self._state or not len(batch):
+            return []
+        index = self.indexes[batch.sensor_type]
+        state = self._state[batch.sensor_type]
+        keys = index.keys_for(batch.sensor_ids)
+        state.ensure(len(index))
+
+        order = np.lexsort((batch.timestamps, keys))
+        keys = keys[order]
+        values = batch.values[order].astype(np.float64)
+
+        # Rank of each reading within its sensor's readings of this batch.
+        # Round r updates every sensor's r-th reading at once, so the EWMA
+        # recurrence stays exact while the work is vectorized across sensors.
+        positions = np.arange(len(keys))
+        group_start = np.ones(len(keys), dtype=np.bool_)
+        group_start[1:] = keys[1:] != keys[:-1]
+        rank = positions - np.maximum.accumulate(np.where(group_start, positions, 0))
+
+        min_var = self.min_std.get(batch.sensor_type, 0.0) ** 2
+        z_scores = np.zeros(len(keys))
+        baselines = np.zeros(len(keys))
+        std_devs = np.zeros(len(keys))
+        scored = np.zeros(len(keys), dtype=np.bool_)
+        by_rank = np.argsort(rank, kind='stable')
+        round_bounds = np.searchsorted(rank[by_rank], np.arange(int(rank.max()) + 2))
+        for start, end in zip(round_bounds[:-1], round_bounds[1:]):
+            idx = by_rank[start:end]
+            k = keys[idx]
+            x = values[idx]
+            mean, var, count = state.mean[k], state.var[k], state.count[k]
+
+            std = np.sqrt(np.maximum(var, min_var))
+            ready = (count >= self.warmup) & (std > 0)
+            z_scores[idx] = np.where(ready, (x - mean) / np.where(std > 0, std, 1.0), 0.0)
+            baselines[idx] = mean
+            std_devs[idx] = std
+            scored[idx] = ready
+
+            # First reading seeds the baseline, later ones update it
+            diff = np.where(count > 0, x - mean, 0.0)
+            increment = self.alpha * diff
+            state.mean[k] = np.where(count > 0, mean + increment, x)
+            state.var[k] = np.where(count > 0, (1 - self.alpha) * (var + diff * increment), 0.0)
+            state.count[k] = count + 1
+
+        flagged = np.flatnonzero(scored & (np.abs(z_scores) >= self.z_threshold))
+        if not len(flagged):
+            return []
+        source = order[flagged]
+        return [
+            Anomaly(
+                sensor_id=sensor_id,
+                sensor_type=batch.sensor_type,
+                timestamp=timestamp,
+                value=value,
+                baseline=baseline,
+                std_dev=std_dev,
+                z_score=z_score
+            )
+            for sensor_id, timestamp, value, baseline, std_dev, z_score in zip(
+                batch.sensor_ids[source].tolist(),
+                batch.timestamps[source].astype(datetime),
+                values[flagged].tolist(),
+                baselines[flagged].tolist(),
+                std_devs[flagged].tolist(),
+                z_scores[flagged].tolist()
+            )
+        ]
+
+    def process_readings(self, readings: Iterable[Dict[str, Any]],
+                         type_func: Callable[[str], Optional[str]] = sensor_type_of) -> List[Anomaly]:
+        """Score reading dicts grouped by the sensor type type_func resolves."""
+        anomalies: List[Anomaly] = []
+        for batch in ReadingBatch.from_readings(readings, type_func).values():
+            anomalies.extend(self.process(batch))
+        return anomalies
+
+    def baseline(self, sensor_type: str, sensor_id: str) -> Optional[Dict[str, float]]:
+        """Return a sensor's current mean, standard deviation and count."""
+        index = self.indexes.get(sensor_type)
+        if index is None or sensor_id not in index:
+            return None
+        key = index.key(sensor_id)
+        state = self._state[sensor_type]
+        return {
+            'mean': float(state.mean[key]),
+            'std_dev': float(np.sqrt(state.var[key])),
+            'count': int(state.count[key])
+        }
+
+
+class AnomalyStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store writing to the sensor_anomalies table."""
+        self.db_params = db_params
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def store_anomalies(self, anomalies: List[Anomaly]) -> int:
+        """Insert anomalies in one statement."""
+        if not anomalies:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO sensor_anomalies
+                        (sensor_id, timestamp, value, baseline, std_dev, z_score)
+                    VALUES %s
+                """, [
+                    (a.sensor_id, a.timestamp, a.value, a.baseline, a.std_dev, a.z_score)
+                    for a in anomalies
+                ])
+            self.conn.commit()
+            return len(anomalies)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error storing anomalies: {e}")
+            raise
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Anomaly store connection closed")
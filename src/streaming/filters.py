@@ -0,0 +1,200 @@
+"""Ingest filters that drop readings carrying no new information.
+
+Analog sensors use a deadband: a reading is stored only when it differs
+from the last stored value of the sensor by more than the deadband, or
+when ``max_interval`` seconds have passed since that value was stored.
+Motion sensors are stored on transitions only (a deadband of zero on the
+boolean value), with the same maximum interval as a heartbeat.
+
+The stored rows then describe a step series: the value holds until the
+next stored row. ``step_series`` and ``time_weighted_average`` rebuild
+regular series and correct averages from them, and because every sensor
+stores at least once per ``max_interval`` the value in effect at the start
+of a range is always found within that lookback.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.pipeline.queues import sensor_type_of
+from src.storage.base import ReadingBatch, StorageBackend
+from .state import SensorIndex, grow
+
+NAT = np.datetime64('NaT', 'us')
+
+
+@dataclass
+class FilterRule:
+    """Deadband and heartbeat interval for one sensor type."""
+    deadband: float = 0.0
+    max_interval: float = 300.0  # seconds
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'FilterRule':
+        deadband = 0.0 if config.get('mode') == 'transition' else config.get('deadband', 0.0)
+        return cls(deadband=float(deadband), max_interval=float(config.get('max_interval_seconds', 300)))
+
+
+class _LastStored:
+    """Last stored value and time per sensor key."""
+
+    def __init__(self):
+        self.value = np.zeros(0, dtype=np.float64)
+        self.timestamp = np.full(0, NAT)
+
+    def ensure(self, size: int):
+        self.value = grow(self.value, size, 0.0)
+        self.timestamp = grow(self.timestamp, size, NAT)
+
+
+class IngestFilter:
+    def __init__(self, rules: Dict[str, FilterRule],
+                 type_func: Callable[[str], Optional[str]] = sensor_type_of):
+        """Initialize with a rule per sensor type; other types pass through.
+
+        type_func resolves the type of reading dicts, e.g. a SensorRegistry's
+        sensor_type.
+        """
+        self.rules = rules
+        self.type_func = type_func
+        self.indexes: Dict[str, SensorIndex] = {t: SensorIndex() for t in rules}
+        self._state: Dict[str, _LastStored] = {t: _LastStored() for t in rules}
+        self.seen = 0
+        self.kept = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any],
+                    type_func: Callable[[str], Optional[str]] = sensor_type_of) -> 'IngestFilter':
+        """Create a filter from INGEST_FILTER_CONFIG['rules']."""
+        return cls({sensor_type: FilterRule.from_config(rule) for sensor_type, rule in config['rules'].items()},
+                   type_func)
+
+    def keep_mask(self, batch: ReadingBatch) -> np.ndarray:
+        """Return which readings of the batch to store and advance the filter state."""
+        rule = self.rules.get(batch.sensor_type)
+        if rule is None or not len(batch):
+            return np.ones(len(batch), dtype=np.bool_)
+        index = self.indexes[batch.sensor_type]
+        state = self._state[batch.sensor_type]
+        keys = index.keys_for(batch.sensor_ids)
+        state.ensure(len(index))
+
+        order = np.lexsort((batch.timestamps, keys))
+        keys = keys[order]
+        values = batch.values[order].astype(np.float64)
+        timestamps = batch.timestamps[order]
+        max_interval = np.timedelta64(int(rule.max_interval * 1e6), 'us')
+
+        # Whether a reading is kept depends on the last kept one, so each
+        # round decides the r-th reading of every sensor at once
+        positions = np.arange(len(keys))
+        group_start = np.ones(len(keys), dtype=np.bool_)
+        group_start[1:] = keys[1:] != keys[:-1]
+        rank = positions - np.maximum.accumulate(np.where(group_start, positions, 0))
+        by_rank = np.argsort(rank, kind='stable')
+        round_bounds = np.searchsorted(rank[by_rank], np.arange(int(rank.max()) + 2))
+
+        keep = np.zeros(len(keys), dtype=np.bool_)
+        for start, end in zip(round_bounds[:-1], round_bounds[1:]):
+            idx = by_rank[start:end]
+            k = keys[idx]
+            last_time = state.timestamp[k]
+            changed = np.abs(values[idx] - state.value[k]) > rule.deadband
+            expired = np.isnat(last_time) | (timestamps[idx] - last_time >= max_interval)
+            kept = changed | expired
+            keep[idx] = kept
+            state.value[k[kept]] = values[idx][kept]
+            state.timestamp[k[kept]] = timestamps[idx][kept]
+
+        mask = np.empty(len(keep), dtype=np.bool_)
+        mask[order] = keep
+        self.seen += len(mask)
+        self.kept += int(mask.sum())
+        return mask
+
+    def filter(self, batch: ReadingBatch) -> ReadingBatch:
+        """Return the readings of the batch worth storing."""
+        return batch.take(self.keep_mask(batch))
+
+    def filter_readings(self, readings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filter simulator reading dicts, preserving their order."""
+        positions: Dict[str, List[int]] = {}
+        for i, reading in enumerate(readings):
+            positions.setdefault(self.type_func(reading['sensor_id']), []).append(i)
+        keep = np.ones(len(readings), dtype=np.bool_)
+        for sensor_type, indices in positions.items():
+            if sensor_type not in self.rules:
+                continue
+            batch = ReadingBatch.from_columns(
+                sensor_type,
+                [readings[i]['sensor_id'] for i in indices],
+                [readings[i]['timestamp'] for i in indices],
+                [readings[i]['value'] for i in indices]
+            )
+            keep[indices] = self.keep_mask(batch)
+        return [reading for reading, kept in zip(readings, keep) if kept]
+
+    def reduction(self) -> float:
+        """Return the share of readings dropped so far."""
+        return 1 - self.kept / self.seen if self.seen else 0.0
+
+
+def step_series(batch: ReadingBatch, start: datetime, end: datetime,
+                step: timedelta) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Resample stored step readings onto a regular grid per sensor.
+
+    Each grid time gets the last stored value at or before it (NaN before
+    the first). Returns sensor_id -> (grid timestamps, values).
+    """
+    grid = np.arange(np.datetime64(start, 'us'), np.datetime64(end, 'us'), np.timedelta64(step))
+    series = {}
+    for sensor_id, timestamps, values in _per_sensor(batch):
+        at = np.searchsorted(timestamps, grid, side='right') - 1
+        resampled = np.where(at >= 0, values[np.maximum(at, 0)], np.nan)
+        series[sensor_id] = (grid, resampled)
+    return series
+
+
+def time_weighted_average(batch: ReadingBatch, start: datetime, end: datetime) -> Dict[str, float]:
+    """Return each sensor's time-weighted mean over [start, end) of a step series.
+
+    For motion sensors this is the share of time with motion detected.
+    Time before a sensor's first stored value is ignored.
+    """
+    start64, end64 = np.datetime64(start, 'us'), np.datetime64(end, 'us')
+    averages = {}
+    for sensor_id, timestamps, values in _per_sensor(batch):
+        # Clip each step to the range; the value before start carries in
+        begins = np.clip(timestamps, start64, end64)
+        ends = np.clip(np.append(timestamps[1:], end64), start64, end64)
+        durations = (ends - begins).astype(np.int64)
+        total = durations.sum()
+        if total > 0:
+            averages[sensor_id] = float((values * durations).sum() / total)
+    return averages
+
+
+def query_step_series(backend: StorageBackend, sensor_type: str, start: datetime, end: datetime,
+                      step: timedelta, lookback: timedelta) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Read filtered readings from a backend and rebuild a regular series.
+
+    lookback should be the filter's max interval so the value in effect
+    at start is included.
+    """
+    batch = backend.query_range(sensor_type, start - lookback, end)
+    return step_series(batch, start, end, step)
+
+
+def _per_sensor(batch: ReadingBatch):
+    """Yield (sensor_id, timestamps, float values) per sensor in time order."""
+    if not len(batch):
+        return
+    order = np.lexsort((batch.timestamps, batch.sensor_ids.astype(str)))
+    sensor_ids = batch.sensor_ids[order]
+    timestamps = batch.timestamps[order]
+    values = batch.values[order].astype(np.float64)
+    bounds = np.flatnonzero(sensor_ids[1:] != sensor_ids[:-1]) + 1
+    for lo, hi in zip(np.append(0, bounds), np.append(bounds, len(order))):
+        yield sensor_ids[lo], timestamps[lo:hi], values[lo:hi]
@@ -0,0 +1,258 @@
+"""Recent readings per sensor in shared memory for local readers.
+
+``HotWindowWriter`` owns a ``multiprocessing.shared_memory`` segment with
+a fixed layout: a header, the id and location of every sensor, and one
+ring of ``slots`` timestamps and values per sensor. Readers in other
+processes attach with ``HotWindowReader`` and map the same arrays
+read-only, so the latest readings are available without a database query.
+
+Consistency uses a seqlock. The writer makes the sequence number odd
+before it changes the arrays and even again afterwards. A reader runs its
+function on the mapped arrays and retries if the sequence was odd or
+changed meanwhile, so it never returns a torn result and never blocks the
+writer.
+
+Every write also stamps the wall-clock time into the header. A writer that
+was killed cannot unlink its segment, so readers check ``age_seconds``
+and treat a window that has not been written for a while as absent.
+"""
+import logging
+import time
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.storage.base import ReadingBatch
+from .state import SensorIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x494F5448  # 'IOTH'
+VERSION = 2
+ID_DTYPE = 'S64'
+LOCATION_DTYPE = 'S100'
+
+# Header fields, as int64
+_MAGIC, _VERSION, _MAX_SENSORS, _SLOTS, _SEQUENCE, _NUM_SENSORS, _LAST_WRITE = range(7)
+_HEADER_FIELDS = 8
+
+
+def _layout(max_sensors: int, slots: int) -> List[Tuple[str, Any, Tuple[int, ...]]]:
+    """Return (name, dtype, shape) of every array in segment order."""
+    return [
+        ('header', np.int64, (_HEADER_FIELDS,)),
+        ('heads', np.int64, (max_sensors,)),  # readings ever written per sensor
+        ('timestamps', np.int64, (max_sensors, slots)),  # epoch microseconds
+        ('values', np.float64, (max_sensors, slots)),
+        ('sensor_ids', ID_DTYPE, (max_sensors,)),
+        ('locations', LOCATION_DTYPE, (max_sensors,)),
+    ]
+
+
+def _map_arrays(buffer, max_sensors: int, slots: int) -> Dict[str, np.ndarray]:
+    arrays, offset = {}, 0
+    for name, dtype, shape in _layout(max_sensors, slots):
+        array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        arrays[name] = array
+        offset += array.nbytes
+    return arrays
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def segment_size(max_sensors: int, slots: int) -> int:
+    """Bytes needed for a window of max_sensors rings of slots readings."""
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize
+               for _, dtype, shape in _layout(max_sensors, slots))
+
+
+class HotWindowWriter:
+    def __init__(self, name: str, max_sensors: int = 1024, slots: int = 600):
+        """Create the shared segment, replacing a stale one of the same name."""
+        size = segment_size(max_sensors, slots)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            logger.warning(f"Replacing existing shared memory segment {name}")
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = name
+        self.max_sensors = max_sensors
+        self.slots = slots
+        self.index = SensorIndex()
+        self.dropped = 0
+        self.arrays = _map_arrays(self.shm.buf, max_sensors, slots)
+        header = self.arrays['header']
+        header[:] = 0
+        header[_MAX_SENSORS] = max_sensors
+        header[_SLOTS] = slots
+        header[_VERSION] = VERSION
+        header[_LAST_WRITE] = _now_us()
+        header[_MAGIC] = MAGIC
+        logger.info(f"Hot window {name} created ({size / 1024 / 1024:.1f} MiB)")
+
+    def write(self, batch: ReadingBatch,
+              location_of: Optional[Callable[[str], Optional[str]]] = None) -> int:
+        """Append a batch to the sensors' rings; returns the readings written.
+
+        location_of resolves the location of sensors seen for the first time.
+        """
+        if not len(batch):
+            return 0
+        keys = self.index.keys_for(batch.sensor_ids)
+        # Sensors beyond the segment's capacity are not tracked
+        fits = keys < self.max_sensors
+        if not fits.all():
+            self.dropped += int((~fits).sum())
+            keys = keys[fits]
+            batch = batch.take(np.flatnonzero(fits))
+            if not len(keys):
+                return 0
+
+        order = np.lexsort((batch.timestamps, keys))
+        keys = keys[order]
+        timestamps = batch.timestamps[order].astype(np.int64)
+        values = batch.values[order].astype(np.float64)
+        positions = np.arange(len(keys))
+        group_start = np.ones(len(keys), dtype=np.bool_)
+        group_start[1:] = keys[1:] != keys[:-1]
+        rank = positions - np.maximum.accumulate(np.where(group_start, positions, 0))
+        group_size = np.diff(np.append(np.flatnonzero(group_start), len(keys)))
+        per_reading_size = np.repeat(group_size, group_size)
+        # Only the newest `slots` readings of a sensor survive the ring
+        kept = rank >= per_reading_size - self.slots
+
+        arrays = self.arrays
+        header = arrays['header']
+        header[_SEQUENCE] += 1  # odd: write in progress
+        try:
+            num_sensors = int(header[_NUM_SENSORS])
+            new_keys = np.unique(keys[keys >= num_sensors])
+            for key in new_keys:
+                sensor_id = self.index.sensor_id(int(key))
+                arrays['sensor_ids'][key] = sensor_id.encode()[:64]
+                location = location_of(sensor_id) if location_of else None
+                arrays['locations'][key] = (location or '').encode()[:100]
+            heads = arrays['heads']
+            slot = (heads[keys] + rank) % self.slots
+            arrays['timestamps'][keys[kept], slot[kept]] = timestamps[kept]
+            arrays['values'][keys[kept], slot[kept]] = values[kept]
+            starts = np.flatnonzero(group_start)
+            heads[keys[starts]] += group_size
+            if len(new_keys):
+                header[_NUM_SENSORS] = max(num_sensors, int(new_keys.max()) + 1)
+            header[_LAST_WRITE] = _now_us()
+        finally:
+            header[_SEQUENCE] += 1  # even: consistent again
+        return len(keys)
+
+    def close(self):
+        """Release and remove the segment."""
+        self.arrays = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        logger.info(f"Hot window {self.name} closed")
+
+
+class HotWindowReader:
+    def __init__(self, name: str, max_retries: int = 1000):
+        """Attach read-only to a writer's segment.
+
+        Raises FileNotFoundError if no writer has created it.
+        """
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Attaching must not make this process remove the segment on exit
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        if header[_MAGIC] != MAGIC or header[_VERSION] != VERSION:
+            del header
+            self.shm.close()
+            raise ValueError(f"Shared memory segment {name} is not a hot window")
+        self.name = name
+        self.max_retries = max_retries
+        self.arrays = _map_arrays(self.shm.buf, int(header[_MAX_SENSORS]), int(header[_SLOTS]))
+        for array in self.arrays.values():
+            array.flags.writeable = False
+        self.slots = int(header[_SLOTS])
+
+    def age_seconds(self) -> float:
+        """Return the seconds since the writer last wrote to the window."""
+        return (_now_us() - int(self.arrays['header'][_LAST_WRITE])) / 1e6
+
+    def read(self, func: Callable[[Dict[str, np.ndarray], int], Any]) -> Any:
+        """Run func(arrays, num_sensors) on a consistent state of the window.
+
+        func works on the shared arrays directly and must return data that
+        does not reference them, since they may change once it returns.
+        """
+        header = self.arrays['header']
+        for attempt in range(self.max_retries):
+            before = int(header[_SEQUENCE])
+            if before % 2 == 0:
+                result = func(self.arrays, int(header[_NUM_SENSORS]))
+                if int(header[_SEQUENCE]) == before:
+                    return result
+            if attempt % 10 == 9:
+                time.sleep(0.0001)
+        raise RuntimeError(f"Hot window {self.name} kept changing while being read")
+
+    def latest(self) -> List[Dict[str, Any]]:
+        """Return the latest reading of every sensor."""
+        def collect(arrays, num_sensors):
+            heads = arrays['heads'][:num_sensors]
+            present = np.flatnonzero(heads > 0)
+            slots = (heads[present] - 1) % self.slots
+            return (
+                arrays['sensor_ids'][present].astype(str),
+                arrays['locations'][present].astype(str),
+                arrays['timestamps'][present, slots],
+                arrays['values'][present, slots]
+            )
+
+        sensor_ids, locations, timestamps, values = self.read(collect)
+        return [
+            {'sensor_id': sensor_id, 'location': location or None, 'timestamp': timestamp, 'value': value}
+            for sensor_id, location, timestamp, value in zip(
+                sensor_ids.tolist(), locations.tolist(),
+                timestamps.astype('datetime64[us]').astype(datetime).tolist(), values.tolist()
+            )
+        ]
+
+    def window(self, sensor_id: str,
+               since: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return a sensor's retained (timestamps, values) in time order."""
+        encoded = sensor_id.encode()
+        since_us = np.datetime64(since, 'us').astype(np.int64) if since else None
+
+        def collect(arrays, num_sensors):
+            matches = np.flatnonzero(arrays['sensor_ids'][:num_sensors] == encoded)
+            if not len(matches):
+                return np.empty(0, dtype=np.int64), np.empty(0)
+            key = matches[0]
+            head = int(arrays['heads'][key])
+            count = min(head, self.slots)
+            order = np.arange(head - count, head) % self.slots
+            timestamps = arrays['timestamps'][key, order]
+            values = arrays['values'][key, order]
+            if since_us is not None:
+                recent = timestamps >= since_us
+                timestamps, values = timestamps[recent], values[recent]
+            return timestamps, values
+
+        timestamps, values = self.read(collect)
+        return timestamps.astype('datetime64[us]'), values
+
+    def close(self):
+        """Detach from the segment; the writer keeps it alive."""
+        self.arrays = None
+        self.shm.close()
@@ -0,0 +1,268 @@
+"""Location-level aggregates maintained as readings arrive.
+
+Readings are rolled up per location (room) and for the whole home into
+fixed windows of count, sum, min and max, with the location name stored
+on every row. Dashboards read ``location_analytics`` directly instead of
+joining reading tables with ``sensors``, and coarser buckets are merged
+with ``SUM(sum) / SUM(count)``. A window is emitted once readings past
+its end plus the allowed lateness have been seen; late readings produce
+another row for the same window, which merges the same way.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.storage.base import ReadingBatch, validate_interval
+from .state import SensorIndex, grow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCOPE_LOCATION = 'location'
+SCOPE_HOME = 'home'
+
+# Code of the home rollup, apart from the location codes so a room may share its name
+HOME_CODE = -2
+
+
+@dataclass
+class LocationAggregate:
+    """Count, sum, min and max of one sensor type at one location and window."""
+    scope: str
+    location: str
+    sensor_type: str
+    window_start: datetime
+    window_end: datetime
+    count: int
+    sum: float
+    min: float
+    max: float
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count
+
+
+class LocationAggregator:
+    def __init__(self, locations: Optional[Dict[str, str]] = None, home: str = 'home',
+                 window_seconds: float = 300.0, allowed_lateness: float = 30.0):
+        """Initialize the aggregator.
+
+        locations maps sensor ids to their location; readings of sensors
+        without one are not aggregated.
+        """
+        self.home = home
+        self.window = np.timedelta64(int(window_seconds * 1e6), 'us')
+        self.allowed_lateness = np.timedelta64(int(allowed_lateness * 1e6), 'us')
+        self.sensors = SensorIndex()
+        self.location_names: List[str] = []
+        self._location_codes: Dict[str, int] = {}
+        self._sensor_location = np.zeros(0, dtype=np.int64)  # location code per sensor key, -1 if unknown
+        self.watermarks: Dict[str, np.datetime64] = {}
+        # (sensor_type, location code, window start) -> [count, sum, min, max]
+        self._open: Dict[Tuple[str, int, np.datetime64], List[float]] = {}
+        self.unmapped = 0
+        self.set_locations(locations or {})
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any],
+                    locations: Optional[Dict[str, str]] = None) -> 'LocationAggregator':
+        """Create an aggregator from LOCATION_AGGREGATE_CONFIG."""
+        return cls(
+            locations,
+            home=config['home'],
+            window_seconds=config['window_seconds'],
+            allowed_lateness=config['allowed_lateness_seconds']
+        )
+
+    def set_locations(self, locations: Dict[str, str]):
+        """Assign or move sensors to locations."""
+        for sensor_id, location in locations.items():
+            key = self.sensors.key(sensor_id)
+            self._sensor_location = grow(self._sensor_location, len(self.sensors), -1)
+            self._sensor_location[key] = self._location_code(location)
+
+    def learn_locations(self, readings: Iterable[Dict[str, Any]]):
+        """Take the location of sensors not mapped yet from reading dicts."""
+        unknown = {}
+        for reading in readings:
+            sensor_id = reading['sensor_id']
+            if reading.get('location') and sensor_id not in unknown and self.location_of(sensor_id) is None:
+                unknown[sensor_id] = reading['location']
+        if unknown:
+            self.set_locations(unknown)
+
+    def location_of(self, sensor_id: str) -> Optional[str]:
+        if sensor_id not in self.sensors:
+            return None
+        code = self._sensor_location[self.sensors.key(sensor_id)]
+        return self.location_names[code] if code >= 0 else None
+
+    def process(self, batch: ReadingBatch) -> List[LocationAggregate]:
+        """Add a batch to the open windows and return the windows it closed."""
+        if not len(batch):
+            return []
+        keys = self.sensors.keys_for(batch.sensor_ids)
+        self._sensor_location = grow(self._sensor_location, len(self.sensors), -1)
+        codes = self._sensor_location[keys]
+        mapped = codes >= 0
+        self.unmapped += int((~mapped).sum())
+
+        window_us = self.window.astype(np.int64)
+        starts = batch.timestamps.astype(np.int64) // window_us * window_us
+        values = batch.values.astype(np.float64)
+        # The home is aggregated as one more location code
+        codes = np.concatenate([codes[mapped], np.full(int(mapped.sum()), HOME_CODE)])
+        starts = np.concatenate([starts[mapped], starts[mapped]])
+        values = np.concatenate([values[mapped], values[mapped]])
+        if len(codes):
+            self._accumulate(batch.sensor_type, codes, starts, values)
+
+        latest = batch.timestamps.max()
+        watermark = self.watermarks.get(batch.sensor_type)
+        self.watermarks[batch.sensor_type] = latest if watermark is None else max(watermark, latest)
+        return self._close(batch.sensor_type, self.watermarks[batch.sensor_type] - self.allowed_lateness)
+
+    def flush(self) -> List[LocationAggregate]:
+        """Close every open window, e.g. on shutdown."""
+        closed = []
+        for sensor_type in {window[0] for window in self._open}:
+            closed.extend(self._close(sensor_type, None))
+        return closed
+
+    def _accumulate(self, sensor_type: str, codes: np.ndarray, starts: np.ndarray, values: np.ndarray):
+        order = np.lexsort((starts, codes))
+        codes, starts, values = codes[order], starts[order], values[order]
+        first = np.flatnonzero(np.append(True, (codes[1:] != codes[:-1]) | (starts[1:] != starts[:-1])))
+        counts = np.diff(np.append(first, len(codes)))
+        sums = np.add.reduceat(values, first)
+        mins = np.minimum.reduceat(values, first)
+        maxs = np.maximum.reduceat(values, first)
+        for code, start, count, total, low, high in zip(
+            codes[first].tolist(), starts[first].astype('datetime64[us]'),
+            counts.tolist(), sums.tolist(), mins.tolist(), maxs.tolist()
+        ):
+            window = (sensor_type, code, start)
+            current = self._open.get(window)
+            if current is None:
+                self._open[window] = [count, total, low, high]
+            else:
+                current[0] += count
+                current[1] += total
+                current[2] = min(current[2], low)
+                current[3] = max(current[3], high)
+
+    def _close(self, sensor_type: str, before: Optional[np.datetime64]) -> List[LocationAggregate]:
+        closed = []
+        for window in [w for w in self._open
+                       if w[0] == sensor_type and (before is None or w[2] + self.window <= before)]:
+            _, code, start = window
+            count, total, low, high = self._open.pop(window)
+            closed.append(LocationAggregate(
+                scope=SCOPE_HOME if code == HOME_CODE else SCOPE_LOCATION,
+                location=self.home if code == HOME_CODE else self.location_names[code],
+                sensor_type=sensor_type,
+                window_start=start.astype(datetime),
+                window_end=(start + self.window).astype(datetime),
+                count=int(count),
+                sum=float(total),
+                min=float(low),
+                max=float(high)
+            ))
+        return closed
+
+    def _location_code(self, location: str) -> int:
+        code = self._location_codes.get(location)
+        if code is None:
+            code = self._location_codes[location] = len(self.location_names)
+            self.location_names.append(location)
+        return code
+
+
+class LocationStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store for the location_analytics table."""
+        self.db_params = db_params
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def store_aggregates(self, aggregates: List[LocationAggregate]) -> int:
+        """Insert location aggregates in one statement."""
+        if not aggregates:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO location_analytics
+                        (scope, location, sensor_type, window_start, window_end,
+                         count, sum_value, min_value, max_value)
+                    VALUES %s
+                """, [
+                    (a.scope, a.location, a.sensor_type, a.window_start, a.window_end,
+                     a.count, a.sum, a.min, a.max)
+                    for a in aggregates
+                ])
+            self.conn.commit()
+            return len(aggregates)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error storing location aggregates: {e}")
+            raise
+
+    def location_trends(self, sensor_type: str, start: datetime, end: datetime,
+                        interval: str = 'hour', scope: str = SCOPE_LOCATION) -> List[Dict[str, Any]]:
+        """Merge stored windows into avg/min/max per location and date_trunc bucket."""
+        validate_interval(interval)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        location,
+                        date_trunc(%s, window_start) AS bucket,
+                        SUM(count) AS count,
+                        SUM(sum_value) / SUM(count) AS avg_value,
+                        MIN(min_value) AS min_value,
+                        MAX(max_value) AS max_value
+                    FROM location_analytics
+                    WHERE sensor_type = %s AND scope = %s
+                        AND window_start >= %s AND window_start < %s
+                    GROUP BY location, bucket
+                    ORDER BY bucket, location
+                """, (interval, sensor_type, scope, start, end))
+                rows = cur.fetchall()
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error reading location trends: {e}")
+            raise
+        return [
+            {
+                'location': row[0],
+                'bucket': row[1],
+                'count': int(row[2]),
+                'avg': float(row[3]),
+                'min': float(row[4]),
+                'max': float(row[5])
+            }
+            for row in rows
+        ]
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Location store connection closed")
@@ -0,0 +1,228 @@
+"""Occupancy intervals built from motion events as they arrive.
+
+A sensor's interval opens at its first ``True`` reading and closes at the
+``False`` reading that ends it. A new detection within ``merge_gap`` of the
+end continues the same interval, so flickering sensors do not produce a
+row per blip. Only closed intervals are emitted; an interval whose sensor
+stops reporting is closed at its last reading by ``close_idle``.
+``OccupancyStore`` additionally keeps one row per still-open interval,
+ending at the time of the latest store, so readers see ongoing occupancy.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.pipeline.queues import sensor_type_of
+from src.storage.base import ReadingBatch
+from .state import SensorIndex, grow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NAT = np.datetime64('NaT', 'us')
+
+
+@dataclass
+class OccupancyInterval:
+    """A closed period of detected motion."""
+    sensor_id: str
+    start: datetime
+    end: datetime
+
+    @property
+    def duration(self) -> float:
+        """Length of the interval in seconds."""
+        return (self.end - self.start).total_seconds()
+
+
+class _SessionState:
+    """Open interval per sensor key."""
+
+    def __init__(self):
+        self.occupied = np.zeros(0, dtype=np.bool_)
+        self.start = np.full(0, NAT)
+        self.pending_end = np.full(0, NAT)  # end of an interval that may still continue
+        self.last_seen = np.full(0, NAT)
+
+    def ensure(self, size: int):
+        self.occupied = grow(self.occupied, size, False)
+        self.start = grow(self.start, size, NAT)
+        self.pending_end = grow(self.pending_end, size, NAT)
+        self.last_seen = grow(self.last_seen, size, NAT)
+
+
+class OccupancySessionizer:
+    def __init__(self, merge_gap: float = 30.0, idle_timeout: float = 300.0):
+        """Initialize the sessionizer.
+
+        merge_gap and idle_timeout are in seconds of reading time.
+        """
+        self.merge_gap = np.timedelta64(int(merge_gap * 1e6), 'us')
+        self.idle_timeout = np.timedelta64(int(idle_timeout * 1e6), 'us')
+        self.index = SensorIndex()
+        self._state = _SessionState()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'OccupancySessionizer':
+        """Create a sessionizer from OCCUPANCY_CONFIG."""
+        return cls(merge_gap=config['merge_gap_seconds'], idle_timeout=config['idle_timeout_seconds'])
+
+    def process(self, batch: ReadingBatch) -> List[OccupancyInterval]:
+        """Fold a motion batch into the open intervals and return the closed ones."""
+        if batch.sensor_type != 'motion' or not len(batch):
+            return []
+        state = self._state
+        keys = self.index.keys_for(batch.sensor_ids)
+        state.ensure(len(self.index))
+
+        order = np.lexsort((batch.timestamps, keys))
+        keys = keys[order]
+        timestamps = batch.timestamps[order]
+        detected = batch.values[order].astype(np.bool_)
+
+        group_start = np.ones(len(keys), dtype=np.bool_)
+        group_start[1:] = keys[1:] != keys[:-1]
+        previous = np.empty(len(keys), dtype=np.bool_)
+        previous[1:] = detected[:-1]
+        previous[group_start] = state.occupied[keys[group_start]]
+
+        # Transitions are far fewer than readings, so they are applied in order
+        closed: List[OccupancyInterval] = []
+        for i in np.flatnonzero(detected != previous):
+            key, timestamp = keys[i], timestamps[i]
+            if not detected[i]:
+                state.pending_end[key] = timestamp
+                continue
+            pending_end = state.pending_end[key]
+            if not np.isnat(pending_end):
+                if timestamp - pending_end <= self.merge_gap:
+                    state.pending_end[key] = NAT
+                    continue
+                closed.append(self._interval(key, state.start[key], pending_end))
+            state.start[key] = timestamp
+            state.pending_end[key] = NAT
+
+        group_end = np.append(group_start[1:], True)
+        last = np.flatnonzero(group_end)
+        last_keys = keys[last]
+        state.occupied[last_keys] = detected[last]
+        state.last_seen[last_keys] = np.fmax(state.last_seen[last_keys], timestamps[last])
+
+        # Ended intervals no longer within reach of a new detection
+        pending = last_keys[~np.isnat(state.pending_end[last_keys])]
+        expired = pending[state.last_seen[pending] - state.pending_end[pending] > self.merge_gap]
+        closed.extend(self._close(expired, state.pending_end[expired]))
+        return closed
+
+    def process_readings(self, readings: Iterable[Dict[str, Any]],
+                         type_func: Callable[[str], Optional[str]] = sensor_type_of) -> List[OccupancyInterval]:
+        """Sessionize the readings type_func resolves as motion among reading dicts."""
+        batches = ReadingBatch.from_readings(readings, type_func)
+        return self.process(batches['motion']) if 'motion' in batches else []
+
+    def close_idle(self, now: datetime) -> List[OccupancyInterval]:
+        """Close the intervals of sensors silent for longer than idle_timeout."""
+        state = self._state
+        size = len(self.index)
+        open_keys = np.flatnonzero(~np.isnat(state.start[:size]))
+        idle = open_keys[np.datetime64(now, 'us') - state.last_seen[open_keys] > self.idle_timeout]
+        # An ended interval closes at its end, a still occupied one at the last reading
+        ends = np.where(np.isnat(state.pending_end[idle]), state.last_seen[idle], state.pending_end[idle])
+        state.occupied[idle] = False
+        return self._close(idle, ends)
+
+    def open_intervals(self) -> Dict[str, datetime]:
+        """Return the start of every interval that has not been closed yet."""
+        state = self._state
+        open_keys = np.flatnonzero(~np.isnat(state.start[:len(self.index)]))
+        return {self.index.sensor_id(int(key)): state.start[key].astype(datetime) for key in open_keys}
+
+    def _close(self, keys: np.ndarray, ends: np.ndarray) -> List[OccupancyInterval]:
+        state = self._state
+        intervals = [self._interval(key, state.start[key], end) for key, end in zip(keys, ends)]
+        state.start[keys] = NAT
+        state.pending_end[keys] = NAT
+        return intervals
+
+    def _interval(self, key: int, start: np.datetime64, end: np.datetime64) -> OccupancyInterval:
+        return OccupancyInterval(
+            sensor_id=self.index.sensor_id(int(key)),
+            start=start.astype(datetime),
+            end=end.astype(datetime)
+        )
+
+
+class OccupancyStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store writing to the occupancy_intervals table."""
+        self.db_params = db_params
+        self.conn = None
+        # Ids of the open-interval rows last stored; None until this store wrote any
+        self.open_ids: Optional[List[int]] = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def store_intervals(self, intervals: List[OccupancyInterval],
+                        open_intervals: Optional[Dict[str, datetime]] = None,
+                        now: Optional[datetime] = None) -> int:
+        """Insert closed intervals with their sensor's location; returns how many.
+
+        If open_intervals (sensor id -> start) is given, the open rows are
+        replaced in the same transaction by one row per open interval, marked
+        is_open and ending at now. A closing interval thus never counts twice.
+        """
+        if not intervals and open_intervals is None:
+            return 0
+        insert = """
+            INSERT INTO occupancy_intervals
+                (sensor_id, location, start_time, end_time, duration_seconds, is_open)
+            SELECT v.sensor_id, s.location, v.start_time, v.end_time, v.duration_seconds, v.is_open
+            FROM (VALUES %s) AS v(sensor_id, start_time, end_time, duration_seconds, is_open)
+            LEFT JOIN sensors s ON s.sensor_id = v.sensor_id
+            RETURNING id
+        """
+        open_ids = self.open_ids
+        try:
+            with self.conn.cursor() as cur:
+                if intervals:
+                    execute_values(cur, insert, [
+                        (i.sensor_id, i.start, i.end, i.duration, False)
+                        for i in intervals
+                    ])
+                if open_intervals is not None:
+                    now = now or datetime.now()
+                    if open_ids is None:
+                        # Rows left open by an earlier run
+                        cur.execute("DELETE FROM occupancy_intervals WHERE is_open")
+                    elif open_ids:
+                        cur.execute("DELETE FROM occupancy_intervals WHERE id = ANY(%s)", (open_ids,))
+                    open_ids = [row[0] for row in execute_values(cur, insert, [
+                        (sensor_id, start, now, (now - start).total_seconds(), True)
+                        for sensor_id, start in open_intervals.items()
+                    ], fetch=True)] if open_intervals else []
+            self.conn.commit()
+            self.open_ids = open_ids
+            return len(intervals)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error storing occupancy intervals: {e}")
+            raise
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Occupancy store connection closed")
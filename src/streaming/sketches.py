@@ -0,0 +1,377 @@
+"""Mergeable quantile sketches per sensor and time window.
+
+``DDSketch`` keeps counts in logarithmically sized buckets, so every
+quantile it returns is within ``relative_accuracy`` of the true value and
+two sketches merge by adding bucket counts. The pipeline keeps one sketch
+per sensor and minute, stores it serialized in ``sensor_sketches``, and
+hourly or daily percentiles are produced by merging the stored minute
+sketches without reading raw rows. Each closed minute is also merged
+across the fleet into one sketch per sensor type, stored in
+``sensor_type_sketches``, so fleet-wide percentiles read one row per
+minute however many sensors report.
+"""
+import logging
+import math
+import struct
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.storage.base import ReadingBatch, validate_interval
+from .state import SensorIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Values closer to zero than this are counted in the zero bucket
+MIN_INDEXABLE = 1e-9
+
+_HEADER = struct.Struct('<BdqqdddII')
+_VERSION = 1
+
+
+def _merge_buckets(keys: np.ndarray, counts: np.ndarray,
+                   other_keys: np.ndarray, other_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Add two sparse bucket stores."""
+    if not len(other_keys):
+        return keys, counts
+    if not len(keys):
+        return other_keys, other_counts
+    merged_keys, inverse = np.unique(np.concatenate([keys, other_keys]), return_inverse=True)
+    merged_counts = np.zeros(len(merged_keys), dtype=np.int64)
+    np.add.at(merged_counts, inverse.reshape(-1), np.concatenate([counts, other_counts]))
+    return merged_keys, merged_counts
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01):
+        """Initialize an empty sketch with the given relative accuracy."""
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive_keys = np.zeros(0, dtype=np.int32)
+        self.positive_counts = np.zeros(0, dtype=np.int64)
+        self.negative_keys = np.zeros(0, dtype=np.int32)
+        self.negative_counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, values: Sequence[float]):
+        """Add an array of values."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sum += float(values.sum())
+
+        positive = values[values > MIN_INDEXABLE]
+        negative = -values[values < -MIN_INDEXABLE]
+        self.zero_count += len(values) - len(positive) - len(negative)
+        self.positive_keys, self.positive_counts = _merge_buckets(
+            self.positive_keys, self.positive_counts, *self._buckets(positive))
+        self.negative_keys, self.negative_counts = _merge_buckets(
+            self.negative_keys, self.negative_counts, *self._buckets(negative))
+
+    def merge(self, other: 'DDSketch'):
+        """Add the counts of another sketch with the same accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.count:
+            return
+        self.count += other.count
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.positive_keys, self.positive_counts = _merge_buckets(
+            self.positive_keys, self.positive_counts, other.positive_keys, other.positive_counts)
+        self.negative_keys, self.negative_counts = _merge_buckets(
+            self.negative_keys, self.negative_counts, other.negative_keys, other.negative_counts)
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Return the estimated value at each quantile in [0, 1]."""
+        if not self.count:
+            return [None] * len(qs)
+        # Buckets in value order: most negative first, then zero, then positive
+        values = np.concatenate([
+            -self._bucket_values(self.negative_keys[::-1]),
+            [0.0],
+            self._bucket_values(self.positive_keys)
+        ])
+        counts = np.concatenate([self.negative_counts[::-1], [self.zero_count], self.positive_counts])
+        cumulative = np.cumsum(counts)
+        qs = np.asarray(qs, dtype=np.float64)
+        at = np.searchsorted(cumulative, qs * (self.count - 1), side='right')
+        estimates = np.clip(values[np.minimum(at, len(values) - 1)], self.min, self.max)
+        # The extremes are tracked exactly
+        estimates = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, estimates))
+        return estimates.tolist()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the estimated value at quantile q."""
+        return self.quantiles([q])[0]
+
+    def to_bytes(self) -> bytes:
+        """Serialize the sketch into a compact binary form."""
+        header = _HEADER.pack(
+            _VERSION, self.relative_accuracy, self.count, self.zero_count,
+            self.min, self.max, self.sum, len(self.positive_keys), len(self.negative_keys)
+        )
+        return b''.join([
+            header,
+            self.positive_keys.astype('<i4').tobytes(), self.positive_counts.astype('<i8').tobytes(),
+            self.negative_keys.astype('<i4').tobytes(), self.negative_counts.astype('<i8').tobytes()
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DDSketch':
+        """Deserialize a sketch written by to_bytes."""
+        data = bytes(data)
+        (version, relative_accuracy, count, zero_count, min_value, max_value, total,
+         num_positive, num_negative) = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported sketch version {version}")
+        sketch = cls(relative_accuracy)
+        sketch.count, sketch.zero_count = count, zero_count
+        sketch.min, sketch.max, sketch.sum = min_value, max_value, total
+        offset = _HEADER.size
+        sketch.positive_keys = np.frombuffer(data, '<i4', num_positive, offset).astype(np.int32)
+        offset += 4 * num_positive
+        sketch.positive_counts = np.frombuffer(data, '<i8', num_positive, offset).astype(np.int64)
+        offset += 8 * num_positive
+        sketch.negative_keys = np.frombuffer(data, '<i4', num_negative, offset).astype(np.int32)
+        offset += 4 * num_negative
+        sketch.negative_counts = np.frombuffer(data, '<i8', num_negative, offset).astype(np.int64)
+        return sketch
+
+    def _buckets(self, magnitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(magnitudes):
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int32)
+        keys, counts = np.unique(keys, return_counts=True)
+        return keys, counts.astype(np.int64)
+
+    def _bucket_values(self, keys: np.ndarray) -> np.ndarray:
+        # Midpoint of the bucket in relative terms
+        return 2 * np.power(self.gamma, keys.astype(np.float64)) / (self.gamma + 1)
+
+
+@dataclass
+class SensorSketch:
+    """A closed sketch of one sensor's readings in one window."""
+    sensor_id: str
+    sensor_type: str
+    window_start: datetime
+    window_end: datetime
+    sketch: DDSketch
+
+
+class SketchAggregator:
+    def __init__(self, window_seconds: float = 60.0, relative_accuracy: float = 0.01,
+                 allowed_lateness: float = 30.0,
+                 sensor_types: Sequence[str] = ('temperature', 'humidity')):
+        """Initialize the aggregator.
+
+        A window is closed once readings allowed_lateness seconds past its
+        end have been seen for its sensor type. Readings that arrive for a
+        closed window start a new sketch of that window, which merges with
+        the stored one at query time.
+        """
+        self.window = np.timedelta64(int(window_seconds * 1e6), 'us')
+        self.allowed_lateness = np.timedelta64(int(allowed_lateness * 1e6), 'us')
+        self.relative_accuracy = relative_accuracy
+        self.sensor_types = tuple(sensor_types)
+        self.indexes: Dict[str, SensorIndex] = {t: SensorIndex() for t in self.sensor_types}
+        self.watermarks: Dict[str, np.datetime64] = {}
+        # Open sketches by window start, then sensor key, so closing only visits the starts
+        self._open: Dict[str, Dict[np.datetime64, Dict[int, DDSketch]]] = {t: {} for t in self.sensor_types}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SketchAggregator':
+        """Create an aggregator from SKETCH_CONFIG."""
+        return cls(
+            window_seconds=config['window_seconds'],
+            relative_accuracy=config['relative_accuracy'],
+            allowed_lateness=config['allowed_lateness_seconds'],
+            sensor_types=config.get('sensor_types', ('temperature', 'humidity'))
+        )
+
+    def process(self, batch: ReadingBatch) -> List[SensorSketch]:
+        """Add a batch to the open windows and return the windows it closed."""
+        if batch.sensor_type not in self._open or not len(batch):
+            return []
+        open_windows = self._open[batch.sensor_type]
+        keys = self.indexes[batch.sensor_type].keys_for(batch.sensor_ids)
+        window_us = self.window.astype(np.int64)
+        starts = (batch.timestamps.astype(np.int64) // window_us * window_us).astype('datetime64[us]')
+
+        order = np.lexsort((starts, keys))
+        keys, starts = keys[order], starts[order]
+        values = batch.values[order].astype(np.float64)
+        bounds = np.flatnonzero((keys[1:] != keys[:-1]) | (starts[1:] != starts[:-1])) + 1
+        for lo, hi in zip(np.append(0, bounds), np.append(bounds, len(keys))):
+            sketches = open_windows.setdefault(starts[lo], {})
+            key = int(keys[lo])
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = DDSketch(self.relative_accuracy)
+            sketch.add(values[lo:hi])
+
+        latest = batch.timestamps.max()
+        watermark = self.watermarks.get(batch.sensor_type)
+        self.watermarks[batch.sensor_type] = latest if watermark is None else max(watermark, latest)
+        return self._close(batch.sensor_type, self.watermarks[batch.sensor_type] - self.allowed_lateness)
+
+    def flush(self) -> List[SensorSketch]:
+        """Close every open window, e.g. on shutdown."""
+        closed = []
+        for sensor_type in self.sensor_types:
+            closed.extend(self._close(sensor_type, None))
+        return closed
+
+    def _close(self, sensor_type: str, before: Optional[np.datetime64]) -> List[SensorSketch]:
+        open_windows = self._open[sensor_type]
+        index = self.indexes[sensor_type]
+        closed = []
+        for start in [s for s in open_windows if before is None or s + self.window <= before]:
+            window_start, window_end = start.astype(datetime), (start + self.window).astype(datetime)
+            closed.extend(
+                SensorSketch(index.sensor_id(key), sensor_type, window_start, window_end, sketch)
+                for key, sketch in open_windows.pop(start).items()
+            )
+        return closed
+
+
+class SketchStore:
+    def __init__(self, db_params: Dict[str, str]):
+        """Initialize the store reading and writing the sensor_sketches table."""
+        self.db_params = db_params
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        """Establish database connection."""
+        try:
+            self.conn = psycopg2.connect(**self.db_params)
+            self.conn.autocommit = False
+        except Exception as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+
+    def store_sketches(self, sketches: List[SensorSketch]) -> int:
+        """Insert serialized window sketches and their fleet rollups in one transaction."""
+        if not sketches:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO sensor_sketches
+                        (sensor_id, sensor_type, window_start, window_end,
+                         count, min_value, max_value, sketch)
+                    VALUES %s
+                """, [
+                    (s.sensor_id, s.sensor_type, s.window_start, s.window_end, s.sketch.count,
+                     s.sketch.min, s.sketch.max, psycopg2.Binary(s.sketch.to_bytes()))
+                    for s in sketches
+                ])
+                execute_values(cur, """
+                    INSERT INTO sensor_type_sketches
+                        (sensor_type, window_start, window_end, sensors, count, sketch)
+                    VALUES %s
+                """, [
+                    (sensor_type, window_start, window_end, sensors, sketch.count,
+                     psycopg2.Binary(sketch.to_bytes()))
+                    for sensor_type, window_start, window_end, sensors, sketch in fleet_sketches(sketches)
+                ])
+            self.conn.commit()
+            return len(sketches)
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error storing sketches: {e}")
+            raise
+
+    def merged_percentiles(self, sensor_type: str, start: datetime, end: datetime,
+                           interval: str = 'hour',
+                           quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> List[Dict[str, Any]]:
+        """Merge stored sketches per sensor and date_trunc bucket into percentiles."""
+        validate_interval(interval)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT sensor_id, date_trunc(%s, window_start) AS bucket, sketch
+                    FROM sensor_sketches
+                    WHERE sensor_type = %s AND window_start >= %s AND window_start < %s
+                    ORDER BY bucket, sensor_id
+                """, (interval, sensor_type, start, end))
+                rows = cur.fetchall()
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error reading sketches: {e}")
+            raise
+        return percentiles_from_sketches(rows, quantiles)
+
+    def close(self):
+        """Close database connection."""
+        if self.conn:
+            self.conn.close()
+            logger.info("Sketch store connection closed")
+
+
+def fleet_sketches(sketches: Sequence[SensorSketch]) -> List[Tuple[str, datetime, datetime, int, DDSketch]]:
+    """Merge sensor sketches per type and window into (type, start, end, sensors, sketch) rows.
+
+    Sketches of a window that closed again after late readings form a
+    second rollup row, which merges with the first at query time.
+    """
+    merged: Dict[Tuple[str, datetime, datetime], List[Any]] = {}
+    for s in sketches:
+        window = (s.sensor_type, s.window_start, s.window_end)
+        if window in merged:
+            merged[window][0].merge(s.sketch)
+            merged[window][1] += 1
+        else:
+            rollup = DDSketch(s.sketch.relative_accuracy)
+            rollup.merge(s.sketch)
+            merged[window] = [rollup, 1]
+    return [(sensor_type, start, end, sensors, sketch)
+            for (sensor_type, start, end), (sketch, sensors) in merged.items()]
+
+
+def percentiles_from_sketches(rows: Sequence[Tuple[str, Any, bytes]],
+                              quantiles: Sequence[float] = (0.5, 0.95, 0.99),
+                              group_name: str = 'sensor_id') -> List[Dict[str, Any]]:
+    """Merge (group, bucket, serialized sketch) rows into percentile rows.
+
+    The group is reported under group_name and quantile columns are named
+    after the quantile, e.g. p50 and p99 for 0.5 and 0.99.
+    """
+    merged: Dict[Tuple[str, Any], DDSketch] = {}
+    for group, bucket, data in rows:
+        sketch = DDSketch.from_bytes(data)
+        if (group, bucket) in merged:
+            merged[(group, bucket)].merge(sketch)
+        else:
+            merged[(group, bucket)] = sketch
+    names = [f"p{q * 100:g}".replace('.', '_') for q in quantiles]
+    results = []
+    for (group, bucket), sketch in merged.items():
+        row = {group_name: group, 'bucket': bucket, 'count': sketch.count}
+        row.update(zip(names, sketch.quantiles(quantiles)))
+        results.append(row)
+    return results
@@ -0,0 +1,60 @@
+"""Per-sensor state shared by the streaming evaluators.
+
+Streaming operators keep their state in NumPy arrays indexed by a dense
+integer key per sensor, so a whole batch can be scored with array
+operations instead of per-reading dict lookups.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+
+class SensorIndex:
+    """Assigns dense integer keys to sensor ids as they are first seen."""
+
+    def __init__(self):
+        self._keys: Dict[str, int] = {}
+        self._ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, sensor_id: str) -> bool:
+        return sensor_id in self._keys
+
+    def key(self, sensor_id: str) -> int:
+        """Return the key of a sensor id, assigning a new one if needed."""
+        key = self._keys.get(sensor_id)
+        if key is None:
+            key = len(self._ids)
+            self._keys[sensor_id] = key
+            self._ids.append(sensor_id)
+        return key
+
+    def keys_for(self, sensor_ids: np.ndarray) -> np.ndarray:
+        """Return the keys of an array of sensor ids."""
+        if not len(sensor_ids):
+            return np.empty(0, dtype=np.int64)
+        # Resolve each distinct id once
+        ids, inverse = np.unique(np.asarray(sensor_ids).astype(str), return_inverse=True)
+        keys = np.fromiter((self.key(sensor_id) for sensor_id in ids), dtype=np.int64, count=len(ids))
+        return keys[inverse.reshape(-1)]
+
+    def sensor_id(self, key: int) -> str:
+        return self._ids[key]
+
+    def sensor_ids(self) -> List[str]:
+        """Return all known sensor ids in key order."""
+        return list(self._ids)
+
+
+def grow(array: np.ndarray, size: int, fill) -> np.ndarray:
+    """Return array extended with fill to hold at least size entries.
+
+    Capacity is doubled so repeated growth stays amortized O(1).
+    """
+    if len(array) >= size:
+        return array
+    grown = np.full(max(size, 2 * len(array), 16), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
@@ -0,0 +1,67 @@
+"""Message transports used by the sensor producer and consumer.
+
+A transport creates producers and consumers exposing the confluent_kafka
+API subset the pipeline relies on (produce/poll/flush and
+subscribe/consume/commit/close). ``KafkaTransport`` talks to a cluster;
+``InMemoryTransport`` runs the same code paths against an in-process
+broker for offline tests and benchmarks.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from .memory import InMemoryBroker, InMemoryConsumer, InMemoryProducer
+
+
+class Transport(ABC):
+    """Factory for producers and consumers of one message system."""
+
+    @abstractmethod
+    def create_producer(self, config: Optional[Dict[str, Any]] = None):
+        """Create a producer with the given client config."""
+
+    @abstractmethod
+    def create_consumer(self, config: Dict[str, Any]):
+        """Create a consumer with the given client config (group.id, ...)."""
+
+    def is_partition_eof(self, error) -> bool:
+        """Return True if a consumer error only signals the end of a partition."""
+        return False
+
+
+class KafkaTransport(Transport):
+    def __init__(self, bootstrap_servers: str):
+        """Initialize the transport for a Kafka cluster."""
+        self.bootstrap_servers = bootstrap_servers
+
+    def create_producer(self, config: Optional[Dict[str, Any]] = None):
+        from confluent_kafka import Producer
+        return Producer({'bootstrap.servers': self.bootstrap_servers, **(config or {})})
+
+    def create_consumer(self, config: Dict[str, Any]):
+        from confluent_kafka import Consumer
+        return Consumer({'bootstrap.servers': self.bootstrap_servers, **config})
+
+    def is_partition_eof(self, error) -> bool:
+        from confluent_kafka import KafkaError
+        return error.code() == KafkaError._PARTITION_EOF
+
+
+class InMemoryTransport(Transport):
+    def __init__(self, broker: Optional[InMemoryBroker] = None, num_partitions: int = 3):
+        """Initialize the transport over broker, or a new broker with num_partitions."""
+        self.broker = broker or InMemoryBroker(num_partitions=num_partitions)
+
+    def create_producer(self, config: Optional[Dict[str, Any]] = None):
+        return InMemoryProducer(self.broker, config)
+
+    def create_consumer(self, config: Dict[str, Any]):
+        return InMemoryConsumer(self.broker, config)
+
+
+def create_transport(name: str, **kwargs) -> Transport:
+    """Create a transport by name: kafka or memory."""
+    if name == 'kafka':
+        return KafkaTransport(**kwargs)
+    if name == 'memory':
+        return InMemoryTransport(**kwargs)
+    raise ValueError(f"Unknown transport '{name}'")
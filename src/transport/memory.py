@@ -0,0 +1,309 @@
+"""In-process stand-in for a Kafka cluster.
+
+``InMemoryBroker`` keeps partitioned, append-only topic logs in memory.
+``InMemoryProducer`` and ``InMemoryConsumer`` mirror the parts of the
+confluent_kafka ``Producer``/``Consumer`` API the pipeline uses (produce,
+poll, flush, subscribe, consume, commit) so producer -> consumer paths can
+be exercised and load-tested without a cluster.
+"""
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _to_bytes(value: Union[str, bytes, None]) -> Optional[bytes]:
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return value
+
+
+class InMemoryMessage:
+    """A stored message with the accessor methods of confluent_kafka.Message."""
+    __slots__ = ('_topic', '_partition', '_offset', '_key', '_value', '_timestamp')
+
+    def __init__(self, topic: str, partition: int, offset: int,
+                 key: Optional[bytes], value: bytes, timestamp: float):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._timestamp = timestamp
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return self._partition
+
+    def offset(self) -> int:
+        return self._offset
+
+    def key(self) -> Optional[bytes]:
+        return self._key
+
+    def value(self) -> bytes:
+        return self._value
+
+    def timestamp(self) -> Tuple[int, int]:
+        # (TIMESTAMP_CREATE_TIME, epoch milliseconds)
+        return 1, int(self._timestamp * 1000)
+
+    def error(self) -> None:
+        return None
+
+
+class InMemoryBroker:
+    def __init__(self, num_partitions: int = 3):
+        """Initialize an empty broker; topics are created on first use."""
+        self.num_partitions = num_partitions
+        self._logs: Dict[str, List[List[InMemoryMessage]]] = {}
+        self._committed: Dict[Tuple[str, str, int], int] = {}
+        self._members: Dict[str, List[Any]] = {}
+        self._generations: Dict[str, int] = {}
+        self._round_robin: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._appended = threading.Condition(self._lock)
+
+    def create_topic(self, topic: str, num_partitions: Optional[int] = None):
+        """Create a topic if it does not exist yet."""
+        with self._lock:
+            self._create_topic(topic, num_partitions)
+
+    def _create_topic(self, topic: str, num_partitions: Optional[int] = None) -> List[List[InMemoryMessage]]:
+        if topic not in self._logs:
+            self._logs[topic] = [[] for _ in range(num_partitions or self.num_partitions)]
+        return self._logs[topic]
+
+    def partitions(self, topic: str) -> int:
+        """Return the partition count of a topic, creating it if needed."""
+        with self._lock:
+            return len(self._create_topic(topic))
+
+    def partition_for(self, topic: str, key: Optional[bytes]) -> int:
+        """Pick a partition: stable hash of the key, round robin without one."""
+        count = self.partitions(topic)
+        if key is None:
+            with self._lock:
+                partition = self._round_robin.get(topic, 0)
+                self._round_robin[topic] = (partition + 1) % count
+            return partition
+        return zlib.crc32(key) % count
+
+    def append(self, topic: str, value: bytes, key: Optional[bytes] = None,
+               partition: Optional[int] = None) -> InMemoryMessage:
+        """Append a message and return it with its assigned offset."""
+        if partition is None:
+            partition = self.partition_for(topic, key)
+        with self._appended:
+            log = self._create_topic(topic)[partition]
+            message = InMemoryMessage(topic, partition, len(log), key, value, time.time())
+            log.append(message)
+            self._appended.notify_all()
+        return message
+
+    def fetch(self, topic: str, partition: int, offset: int, max_messages: int) -> List[InMemoryMessage]:
+        """Return up to max_messages messages starting at offset."""
+        with self._lock:
+            log = self._create_topic(topic)[partition]
+            return log[offset:offset + max_messages]
+
+    def end_offset(self, topic: str, partition: int) -> int:
+        """Return the offset the next appended message will get."""
+        with self._lock:
+            return len(self._create_topic(topic)[partition])
+
+    def wait_for_data(self, timeout: float) -> bool:
+        """Block until any message is appended or the timeout expires."""
+        with self._appended:
+            return self._appended.wait(timeout)
+
+    def join_group(self, group_id: str, member):
+        """Add a consumer to a group, triggering a rebalance."""
+        with self._lock:
+            members = self._members.setdefault(group_id, [])
+            if member not in members:
+                members.append(member)
+                self._generations[group_id] = self._generations.get(group_id, 0) + 1
+
+    def leave_group(self, group_id: str, member):
+        """Remove a consumer from a group, triggering a rebalance."""
+        with self._lock:
+            members = self._members.get(group_id, [])
+            if member in members:
+                members.remove(member)
+                self._generations[group_id] = self._generations.get(group_id, 0) + 1
+
+    def assignment(self, group_id: str, member, topics: List[str]) -> Tuple[int, List[Tuple[str, int]]]:
+        """Return the group generation and the partitions of topics assigned to member.
+
+        Partitions are spread round robin over the members in join order.
+        """
+        with self._lock:
+            members = self._members.get(group_id, [])
+            generation = self._generations.get(group_id, 0)
+            if member not in members:
+                return generation, []
+            index = members.index(member)
+            partitions = [
+                (topic, partition)
+                for topic in topics
+                for partition in range(len(self._create_topic(topic)))
+            ]
+            return generation, partitions[index::len(members)]
+
+    def generation(self, group_id: str) -> int:
+        with self._lock:
+            return self._generations.get(group_id, 0)
+
+    def commit(self, group_id: str, topic: str, partition: int, offset: int):
+        """Store the next offset to read for a consumer group."""
+        with self._lock:
+            self._committed[(group_id, topic, partition)] = offset
+
+    def committed(self, group_id: str, topic: str, partition: int) -> Optional[int]:
+        """Return a consumer group's committed offset, if any."""
+        with self._lock:
+            return self._committed.get((group_id, topic, partition))
+
+
+class InMemoryProducer:
+    def __init__(self, broker: InMemoryBroker, config: Optional[Dict[str, Any]] = None):
+        """Initialize a producer writing to broker.
+
+        The librdkafka config is accepted for parity; only
+        queue.buffering.max.messages is honoured, by raising BufferError like
+        the real client when that many delivery reports are pending.
+        """
+        self.broker = broker
+        self.config = dict(config or {})
+        self.max_pending = int(self.config.get('queue.buffering.max.messages', 100000))
+        self._pending: Deque[Tuple[Callable, InMemoryMessage]] = deque()
+
+    def produce(self, topic: str, value: Union[str, bytes], key: Union[str, bytes, None] = None,
+                partition: Optional[int] = None, on_delivery: Optional[Callable] = None, **kwargs):
+        """Append a message; the delivery report is served by poll() or flush()."""
+        if len(self._pending) >= self.max_pending:
+            raise BufferError("Local: Queue full")
+        message = self.broker.append(topic, _to_bytes(value), _to_bytes(key), partition)
+        callback = on_delivery or kwargs.get('callback')
+        if callback is not None:
+            self._pending.append((callback, message))
+
+    def poll(self, timeout: float = 0) -> int:
+        """Serve pending delivery reports and return how many were served."""
+        served = 0
+        while self._pending:
+            callback, message = self._pending.popleft()
+            callback(None, message)
+            served += 1
+        return served
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Serve all delivery reports; returns the number still pending (always 0)."""
+        self.poll()
+        return 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+class InMemoryConsumer:
+    def __init__(self, broker: InMemoryBroker, config: Optional[Dict[str, Any]] = None):
+        """Initialize a consumer of broker using the confluent_kafka config keys.
+
+        group.id, auto.offset.reset (earliest/latest) and enable.auto.commit
+        are honoured. Consumers sharing a group.id split the partitions of
+        their topics and rebalance when members join or leave.
+        """
+        self.broker = broker
+        self.config = dict(config or {})
+        self.group_id = self.config.get('group.id', 'default')
+        self.auto_commit = str(self.config.get('enable.auto.commit', True)).lower() != 'false'
+        self.reset_earliest = self.config.get('auto.offset.reset', 'latest') in ('earliest', 'smallest', 'beginning')
+        self._topics: List[str] = []
+        self._generation = -1
+        self._positions: Dict[Tuple[str, int], int] = {}
+        self._next_partition = 0
+        self.closed = False
+
+    def subscribe(self, topics: List[str]):
+        """Join the consumer group for topics."""
+        self._topics = list(topics)
+        for topic in self._topics:
+            self.broker.create_topic(topic)
+        self.broker.join_group(self.group_id, self)
+        self._rebalance()
+
+    def _rebalance(self):
+        """Commit current positions and take the group's new assignment."""
+        if self._positions and self.auto_commit:
+            self.commit(asynchronous=False)
+        self._generation, partitions = self.broker.assignment(self.group_id, self, self._topics)
+        self._positions = {}
+        for topic, partition in partitions:
+            committed = self.broker.committed(self.group_id, topic, partition)
+            if committed is None:
+                committed = 0 if self.reset_earliest else self.broker.end_offset(topic, partition)
+            self._positions[(topic, partition)] = committed
+
+    def assignment(self) -> List[Tuple[str, int]]:
+        return list(self._positions)
+
+    def consume(self, num_messages: int = 1, timeout: float = -1) -> List[InMemoryMessage]:
+        """Return up to num_messages messages, waiting up to timeout seconds for the first."""
+        deadline = time.monotonic() + (timeout if timeout >= 0 else float('inf'))
+        while True:
+            messages = self._fetch(num_messages)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages
+            self.broker.wait_for_data(min(remaining, 0.1))
+
+    def poll(self, timeout: float = -1) -> Optional[InMemoryMessage]:
+        """Return a single message or None."""
+        messages = self.consume(1, timeout)
+        return messages[0] if messages else None
+
+    def _fetch(self, num_messages: int) -> List[InMemoryMessage]:
+        if self.broker.generation(self.group_id) != self._generation:
+            self._rebalance()
+        assigned = list(self._positions)
+        messages: List[InMemoryMessage] = []
+        # Rotate the starting partition so no partition starves
+        for i in range(len(assigned)):
+            if len(messages) >= num_messages:
+                break
+            topic, partition = assigned[(self._next_partition + i) % len(assigned)]
+            position = self._positions[(topic, partition)]
+            fetched = self.broker.fetch(topic, partition, position, num_messages - len(messages))
+            if fetched:
+                self._positions[(topic, partition)] = position + len(fetched)
+                messages.extend(fetched)
+        if assigned:
+            self._next_partition = (self._next_partition + 1) % len(assigned)
+        if messages and self.auto_commit:
+            self.commit(asynchronous=False)
+        return messages
+
+    def commit(self, message: Optional[InMemoryMessage] = None, asynchronous: bool = True):
+        """Commit the position after message, or the current positions of all partitions."""
+        if message is not None:
+            self.broker.commit(self.group_id, message.topic(), message.partition(), message.offset() + 1)
+            return
+        for (topic, partition), position in self._positions.items():
+            self.broker.commit(self.group_id, topic, partition, position)
+
+    def close(self):
+        """Commit positions if auto-committing and leave the group."""
+        if self.auto_commit and self._positions:
+            self.commit(asynchronous=False)
+        self.broker.leave_group(self.group_id, self)
+        self.closed = True
+        logger.info("In-memory consumer closed")
@@ -0,0 +1,145 @@
+"""Producer gateway publishing sensor batches to the Kafka topics.
+
+Readings are keyed so that every reading of a sensor lands on the same
+partition and stays in order: JSON messages are keyed by sensor id, and
+binary frames are split into key groups by a stable hash of the sensor id
+so that one frame still carries many readings. Batching (linger.ms,
+batch.size) and compression are left to the producer client and
+configured through ``KAFKA_CONFIG['producer']``.
+"""
+import logging
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from src.pipeline.queues import sensor_type_of
+from src.storage.base import ReadingBatch
+from .codec import TopicCodec, encode_binary, encode_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProducerStats:
+    """Delivery accounting of a producer gateway."""
+    readings_sent: int = 0
+    messages_sent: int = 0
+    bytes_sent: int = 0
+    messages_delivered: int = 0
+    messages_failed: int = 0
+    buffer_full_waits: int = 0
+
+    @property
+    def messages_pending(self) -> int:
+        return self.messages_sent - self.messages_delivered - self.messages_failed
+
+
+def key_groups(sensor_ids: np.ndarray, num_groups: int) -> np.ndarray:
+    """Map each sensor id to a stable key group in [0, num_groups)."""
+    ids, inverse = np.unique(sensor_ids.astype(str), return_inverse=True)
+    # Hash each distinct id once
+    groups = np.fromiter((zlib.crc32(sensor_id.encode('utf-8')) % num_groups for sensor_id in ids),
+                         dtype=np.int64, count=len(ids))
+    return groups[inverse]
+
+
+class SensorGateway:
+    def __init__(self, producer, codec: TopicCodec, topics: Dict[str, str],
+                 frame_key_groups: int = 16, buffer_full_timeout: float = 0.1,
+                 type_func: Callable[[str], Optional[str]] = sensor_type_of):
+        """Initialize the gateway.
+
+        producer comes from Transport.create_producer, topics maps sensor
+        types to topic names. type_func resolves the type of reading dicts.
+        """
+        self.type_func = type_func
+        self.producer = producer
+        self.codec = codec
+        self.topics = topics
+        self.frame_key_groups = frame_key_groups
+        self.buffer_full_timeout = buffer_full_timeout
+        self._stats = ProducerStats()
+        self._last_error: Optional[str] = None
+
+    def publish_batch(self, batch: ReadingBatch) -> int:
+        """Publish a batch to its sensor type's topic; return the number of messages."""
+        if not len(batch):
+            return 0
+        topic = self.topics[batch.sensor_type]
+        sent = 0
+        if self.codec.encoding_for(batch.sensor_type) == 'binary':
+            groups = key_groups(batch.sensor_ids, self.frame_key_groups)
+            for group in np.unique(groups):
+                frame = encode_binary(batch.take(groups == group))
+                self._produce(topic, frame, f"{batch.sensor_type}-{group}")
+                sent += 1
+        else:
+            for sensor_id, payload in zip(batch.sensor_ids.tolist(), encode_json(batch)):
+                self._produce(topic, payload, sensor_id)
+                sent += 1
+        self._stats.readings_sent += len(batch)
+        # Serve delivery reports without blocking
+        self.producer.poll(0)
+        return sent
+
+    def publish_readings(self, readings: Iterable[Dict[str, Any]]) -> int:
+        """Publish simulator reading dicts grouped by sensor type."""
+        batches = ReadingBatch.from_readings(readings, self.type_func)
+        return sum(self.publish_batch(batch) for batch in batches.values())
+
+    def _produce(self, topic: str, payload: bytes, key: str):
+        while True:
+            try:
+                self.producer.produce(topic, value=payload, key=key, on_delivery=self._on_delivery)
+                break
+            except BufferError:
+                # Local queue full: wait for deliveries to free space
+                self._stats.buffer_full_waits += 1
+                self.producer.poll(self.buffer_full_timeout)
+        self._stats.messages_sent += 1
+        self._stats.bytes_sent += len(payload)
+
+    def _on_delivery(self, err, msg):
+        if err is not None:
+            self._stats.messages_failed += 1
+            self._last_error = str(err)
+            logger.error(f"Delivery to {msg.topic()} failed: {err}")
+        else:
+            self._stats.messages_delivered += 1
+
+    def flush(self, timeout: float = 30.0) -> int:
+        """Wait for outstanding deliveries; return the number still pending."""
+        return self.producer.flush(timeout)
+
+    def stats(self) -> ProducerStats:
+        """Return a snapshot of the delivery accounting."""
+        return ProducerStats(**vars(self._stats))
+
+    def close(self, timeout: float = 30.0):
+        """Flush outstanding messages and log the delivery totals."""
+        remaining = self.flush(timeout)
+        stats = self.stats()
+        logger.info(f"Producer gateway closed: {stats.messages_delivered} delivered, "
+                    f"{stats.messages_failed} failed, {remaining} undelivered")
+        if self._last_error:
+            logger.warning(f"Last delivery error: {self._last_error}")
+
+
+def run_gateway(gateway: SensorGateway, simulator, interval: float = 1.0,
+                duration: Optional[float] = None) -> ProducerStats:
+    """Publish simulator batches every interval seconds until duration elapses."""
+    start = time.time()
+    try:
+        while duration is None or time.time() - start < duration:
+            gateway.publish_readings(simulator.generate_batch())
+            if interval:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Stopping producer gateway...")
+    finally:
+        gateway.close()
+    return gateway.stats()
@@ -4,9 +4,22 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
-from sqlalchemy import create_engine
+import psycopg2
+from contextlib import closing
 import plotly.io as pio
 import numpy as np
+import sys
+from pathlib import Path
+
+# Make the project packages importable when run with `streamlit run`
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from config.config import ARCHIVE_CONFIG, HOT_WINDOW_CONFIG
+from src.pipeline.registry import SensorRegistry, SensorRegistryStore
+from src.storage.archive import ColdArchive, list_partitions, month_key
+from src.storage.base import SENSOR_TABLES
+from src.streaming.hot_window import HotWindowReader
+from src.storage.frames import read_frame
+from src.streaming.sketches import percentiles_from_sketches
 
 # Set Plotly theme
 pio.templates.default = "plotly_dark"
@@ -34,103 +47,233 @@ COLORS = {
     'gradient2': '#00D4FF'
 }
 
-def get_db_engine():
-    """Create a SQLAlchemy engine."""
-    return create_engine(
-        f'postgresql://{DB_CONFIG["user"]}:{DB_CONFIG["password"]}@{DB_CONFIG["host"]}:{DB_CONFIG["port"]}/{DB_CONFIG["dbname"]}'
+def get_db_connection():
+    """Open a database connection."""
+    return psycopg2.connect(**DB_CONFIG)
+
+@st.cache_resource
+def get_sensor_registry():
+    """Load the registered sensors once per dashboard process.
+
+    Without a database, types of the sensors seen are inferred from their ids.
+    """
+    try:
+        return SensorRegistry(SensorRegistryStore(DB_CONFIG))
+    except Exception:
+        return SensorRegistry()
+
+def get_hot_latest_readings():
+    """Get the latest readings from the pipeline's shared-memory hot window.
+
+    Returns None when no pipeline on this host has published readings
+    recently, e.g. because it was killed and left its segment behind.
+    """
+    try:
+        reader = HotWindowReader(HOT_WINDOW_CONFIG['name'])
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        if reader.age_seconds() > HOT_WINDOW_CONFIG['max_age_seconds']:
+            return None
+        latest = pd.DataFrame(reader.latest(), columns=['sensor_id', 'value', 'timestamp', 'location'])
+    finally:
+        reader.close()
+    if latest.empty:
+        return None
+    
+    latest['location'] = latest['location'].fillna(latest['sensor_id'])
+    sensor_types = latest['sensor_id'].map(get_sensor_registry().sensor_type)
+    temp_df, humidity_df, motion_df = (
+        latest[sensor_types == sensor_type].sort_values('sensor_id').reset_index(drop=True)
+        for sensor_type in ('temperature', 'humidity', 'motion')
     )
+    motion_df['value'] = motion_df['value'].astype(bool)
+    return temp_df, humidity_df, motion_df
 
 def get_latest_readings():
     """Get the latest readings for all sensors."""
-    engine = get_db_engine()
+    hot = get_hot_latest_readings()
+    if hot is not None:
+        return hot
     
-    # Latest temperature readings
-    temp_df = pd.read_sql_query("""
-        SELECT DISTINCT ON (t.sensor_id)
-            t.sensor_id, t.value, t.timestamp,
-            s.location
-        FROM temperature_readings t
-        JOIN sensors s ON t.sensor_id = s.sensor_id
-        ORDER BY t.sensor_id, t.timestamp DESC
-    """, engine)
+    with closing(get_db_connection()) as conn:
+        # Latest temperature readings
+        temp_df = read_frame(conn, """
+            SELECT DISTINCT ON (sensor_id)
+                sensor_id, value::float8 as value, timestamp
+            FROM temperature_readings
+            ORDER BY sensor_id, timestamp DESC
+        """)
     
-    # Latest humidity readings
-    humidity_df = pd.read_sql_query("""
-        SELECT DISTINCT ON (h.sensor_id)
-            h.sensor_id, h.value, h.timestamp,
-            s.location
-        FROM humidity_readings h
-        JOIN sensors s ON h.sensor_id = s.sensor_id
-        ORDER BY h.sensor_id, h.timestamp DESC
-    """, engine)
+        # Latest humidity readings
+        humidity_df = read_frame(conn, """
+            SELECT DISTINCT ON (sensor_id)
+                sensor_id, value::float8 as value, timestamp
+            FROM humidity_readings
+            ORDER BY sensor_id, timestamp DESC
+        """)
     
-    # Latest motion events
-    motion_df = pd.read_sql_query("""
-        SELECT DISTINCT ON (m.sensor_id)
-            m.sensor_id, m.detected as value, m.timestamp,
-            s.location
-        FROM motion_events m
-        JOIN sensors s ON m.sensor_id = s.sensor_id
-        ORDER BY m.sensor_id, m.timestamp DESC
-    """, engine)
+        # Latest motion events
+        motion_df = read_frame(conn, """
+            SELECT DISTINCT ON (sensor_id)
+                sensor_id, detected as value, timestamp
+            FROM motion_events
+            ORDER BY sensor_id, timestamp DESC
+        """)
     
+    # Locations come from the cached registry instead of a join with sensors
+    registry = get_sensor_registry()
+    for df in (temp_df, humidity_df, motion_df):
+        df['location'] = df['sensor_id'].map(registry.location).fillna(df['sensor_id'])
     return temp_df, humidity_df, motion_df
 
+# Percentage of each hour covered by a motion sensor's occupancy intervals,
+# including the still-open ones the pipeline keeps current (is_open). The
+# location is stored on every interval, so no join with sensors is needed.
+MOTION_ACTIVITY_QUERY = """
+    WITH hours AS (
+        SELECT generate_series(
+            date_trunc('hour', %(start_time)s::timestamp),
+            %(end_time)s::timestamp,
+            interval '1 hour'
+        ) AS hour
+    ),
+    recent AS (
+        SELECT id, sensor_id, COALESCE(location, sensor_id) as location, start_time, end_time
+        FROM occupancy_intervals
+        WHERE end_time > date_trunc('hour', %(start_time)s::timestamp)
+    ),
+    motion_sensors AS (
+        SELECT DISTINCT sensor_id, location FROM recent
+    )
+    SELECT 
+        m.sensor_id,
+        h.hour,
+        COUNT(o.id) as intervals,
+        COALESCE(SUM(EXTRACT(EPOCH FROM
+            LEAST(o.end_time, h.hour + interval '1 hour') - GREATEST(o.start_time, h.hour)
+        )), 0)::float8 / 36 as activity_rate,
+        m.location
+    FROM motion_sensors m
+    CROSS JOIN hours h
+    LEFT JOIN recent o
+        ON o.sensor_id = m.sensor_id
+        AND o.start_time < h.hour + interval '1 hour'
+        AND o.end_time > h.hour
+    GROUP BY m.sensor_id, h.hour, m.location
+    ORDER BY h.hour
+"""
+
+def get_cold_location_trends(conn, sensor_type, start_time, end_time):
+    """Get hourly trends per location from the Parquet archive (cold tier).
+
+    Months that still have a live partition are skipped, as in
+    AnalyticsProcessor.add_cold_trends, so they are only read from PostgreSQL.
+    """
+    table, _ = SENSOR_TABLES[sensor_type]
+    with conn.cursor() as cur:
+        hot_months = {month_key(start) for _, start, _ in list_partitions(cur, table)}
+    archived = ColdArchive(ARCHIVE_CONFIG['path']).scan(table, start_time, end_time, hot_months).to_pandas()
+    if archived.empty:
+        return pd.DataFrame(columns=['location', 'hour', 'avg_value', 'min_value', 'max_value'])
+    
+    archived['location'] = archived['sensor_id'].map(get_sensor_registry().location).fillna(archived['sensor_id'])
+    archived['hour'] = archived['timestamp'].dt.floor('h')
+    return archived.groupby(['location', 'hour'])['value'].agg(
+        avg_value='mean', min_value='min', max_value='max'
+    ).reset_index()
+
+def with_cold_trends(conn, hot_trends, sensor_type, start_time, end_time):
+    """Add archived hours missing from the precomputed location trends."""
+    cold_trends = get_cold_location_trends(conn, sensor_type, start_time, end_time)
+    if cold_trends.empty:
+        return hot_trends
+    trends = pd.concat([cold_trends, hot_trends], ignore_index=True)
+    return trends.drop_duplicates(['location', 'hour'], keep='last').sort_values('hour').reset_index(drop=True)
+
 def get_historical_data(hours=24):
     """Get historical data for trend analysis."""
-    engine = get_db_engine()
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=hours)
     
-    # Temperature trends
-    temp_trends = pd.read_sql_query("""
-        SELECT 
-            t.sensor_id,
-            date_trunc('hour', t.timestamp) as hour,
-            AVG(t.value) as avg_value,
-            MIN(t.value) as min_value,
-            MAX(t.value) as max_value,
-            s.location
-        FROM temperature_readings t
-        JOIN sensors s ON t.sensor_id = s.sensor_id
-        WHERE t.timestamp >= %(start_time)s
-        GROUP BY t.sensor_id, date_trunc('hour', t.timestamp), s.location
-        ORDER BY hour
-    """, engine, params={"start_time": start_time})
+    with closing(get_db_connection()) as conn:
+        # Temperature trends per location, precomputed by the pipeline
+        temp_trends = read_frame(conn, """
+            SELECT 
+                location,
+                date_trunc('hour', window_start) as hour,
+                SUM(sum_value) / SUM(count) as avg_value,
+                MIN(min_value) as min_value,
+                MAX(max_value) as max_value
+            FROM location_analytics
+            WHERE sensor_type = 'temperature' AND scope = 'location' AND window_start >= %(start_time)s
+            GROUP BY location, date_trunc('hour', window_start)
+            ORDER BY hour
+        """, params={"start_time": start_time})
+    
+        # Humidity trends per location, precomputed by the pipeline
+        humidity_trends = read_frame(conn, """
+            SELECT 
+                location,
+                date_trunc('hour', window_start) as hour,
+                SUM(sum_value) / SUM(count) as avg_value,
+                MIN(min_value) as min_value,
+                MAX(max_value) as max_value
+            FROM location_analytics
+            WHERE sensor_type = 'humidity' AND scope = 'location' AND window_start >= %(start_time)s
+            GROUP BY location, date_trunc('hour', window_start)
+            ORDER BY hour
+        """, params={"start_time": start_time})
     
-    # Humidity trends
-    humidity_trends = pd.read_sql_query("""
-        SELECT 
-            h.sensor_id,
-            date_trunc('hour', h.timestamp) as hour,
-            AVG(h.value) as avg_value,
-            MIN(h.value) as min_value,
-            MAX(h.value) as max_value,
-            s.location
-        FROM humidity_readings h
-        JOIN sensors s ON h.sensor_id = s.sensor_id
-        WHERE h.timestamp >= %(start_time)s
-        GROUP BY h.sensor_id, date_trunc('hour', h.timestamp), s.location
-        ORDER BY hour
-    """, engine, params={"start_time": start_time})
+        # Hours whose readings were archived come from the cold tier
+        temp_trends = with_cold_trends(conn, temp_trends, 'temperature', start_time, end_time)
+        humidity_trends = with_cold_trends(conn, humidity_trends, 'humidity', start_time, end_time)
     
-    # Motion activity trends
-    motion_trends = pd.read_sql_query("""
-        SELECT 
-            m.sensor_id,
-            date_trunc('hour', m.timestamp) as hour,
-            COUNT(*) as total_events,
-            SUM(CASE WHEN m.detected THEN 1 ELSE 0 END)::float / COUNT(*) * 100 as activity_rate,
-            s.location
-        FROM motion_events m
-        JOIN sensors s ON m.sensor_id = s.sensor_id
-        WHERE m.timestamp >= %(start_time)s
-        GROUP BY m.sensor_id, date_trunc('hour', m.timestamp), s.location
-        ORDER BY hour
-    """, engine, params={"start_time": start_time})
+        # Motion activity trends: share of each hour covered by occupancy intervals
+        motion_trends = read_frame(conn, MOTION_ACTIVITY_QUERY,
+                                   params={"start_time": start_time, "end_time": end_time})
     
     return temp_trends, humidity_trends, motion_trends
 
+def get_activity_summary(hours=24):
+    """Get the mean, max and min hourly occupancy per location."""
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=hours)
+    with closing(get_db_connection()) as conn:
+        return read_frame(conn, f"""
+            SELECT
+                location,
+                ROUND(AVG(activity_rate)::numeric, 2)::float8 as "Avg %%",
+                ROUND(MAX(activity_rate)::numeric, 2)::float8 as "Max %%",
+                ROUND(MIN(activity_rate)::numeric, 2)::float8 as "Min %%"
+            FROM (
+                SELECT location, hour, AVG(activity_rate) as activity_rate
+                FROM ({MOTION_ACTIVITY_QUERY}) per_sensor
+                GROUP BY location, hour
+            ) hourly
+            GROUP BY location
+            ORDER BY location
+        """, params={"start_time": start_time, "end_time": end_time}).set_index('location')
+
+def get_percentile_trends(sensor_type, hours=24):
+    """Get fleet-wide hourly percentiles merged from the per-type minute rollups."""
+    start_time = datetime.now() - timedelta(hours=hours)
+    with closing(get_db_connection()) as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT sensor_type, date_trunc('hour', window_start) as hour, sketch
+            FROM sensor_type_sketches
+            WHERE sensor_type = %(sensor_type)s AND window_start >= %(start_time)s
+        """, {"sensor_type": sensor_type, "start_time": start_time})
+        rows = cur.fetchall()
+    
+    percentiles = pd.DataFrame(percentiles_from_sketches(rows, group_name='sensor_type'))
+    if percentiles.empty:
+        return percentiles
+    return percentiles.sort_values('bucket').melt(
+        id_vars=['bucket'], value_vars=['p50', 'p95', 'p99'],
+        var_name='percentile', value_name='value'
+    )
+
 def create_gauge(value, title, min_val, max_val, threshold, unit=""):
     """Create a styled gauge chart."""
     fig = go.Figure(go.Indicator(
@@ -449,6 +592,30 @@ def main():
             )
             st.plotly_chart(fig, use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Fleet percentiles merged from minute sketches
+        col1, col2 = st.columns(2)
+        for column, sensor_type, label, unit in (
+            (col1, 'temperature', '🌡️ Temperature Percentiles', "Temperature (°C)"),
+            (col2, 'humidity', '💧 Humidity Percentiles', "Humidity (%)")
+        ):
+            with column:
+                st.markdown('<div class="glass-card">', unsafe_allow_html=True)
+                st.markdown(f"#### {label}")
+                percentiles = get_percentile_trends(sensor_type, 24)
+                if percentiles.empty:
+                    st.info("No sketches stored yet")
+                else:
+                    fig = create_trend_chart(
+                        percentiles,
+                        x='bucket',
+                        y='value',
+                        color='percentile',
+                        title="Last 24 hours, all sensors",
+                        y_label=unit
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
     
     with tab3:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
@@ -459,14 +626,12 @@ def main():
             title="Motion Activity Heatmap"
         )
         st.plotly_chart(fig, use_container_width=True)
+        st.caption("Share of each hour a location's motion sensors spent in occupancy intervals, "
+                   "including intervals still open when the pipeline last stored them.")
         
         # Activity patterns in a more compact format
-        activity_patterns = motion_trends.groupby('location')['activity_rate'].agg(['mean', 'max', 'min']).round(2)
         st.markdown("##### Activity Summary")
-        
-        # Create a more compact table view
-        pattern_df = pd.DataFrame(activity_patterns)
-        pattern_df.columns = ['Avg %', 'Max %', 'Min %']
+        pattern_df = get_activity_summary(24)
         st.dataframe(
             pattern_df,
             hide_index=False,
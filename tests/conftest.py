@@ -2,6 +2,19 @@
 import pytest
 import psycopg2
 from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+
+def make_batch(sensor_type, values_by_sensor, start=0):
+    """Build a batch with one reading per second for each sensor, from start seconds after BASE_TIME."""
+    ids, timestamps, values = [], [], []
+    for sensor_id, values_ in values_by_sensor.items():
+        for i, value in enumerate(values_):
+            ids.append(sensor_id)
+            timestamps.append(BASE_TIME + timedelta(seconds=start + i))
+            values.append(value)
+    return ReadingBatch.from_columns(sensor_type, ids, timestamps, values)
 
 @pytest.fixture(scope="session")
 def db_params():
@@ -0,0 +1,89 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+from src.streaming.alerts import AlertEngine, AlertRule, rules_from_thresholds
+from src.streaming.state import SensorIndex
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+
+def temperature_batch(values, sensor_id='temp_sensor_1', start=0, step=10):
+    """Build a temperature batch with one reading every step seconds."""
+    return ReadingBatch.from_columns(
+        'temperature',
+        [sensor_id] * len(values),
+        [BASE_TIME + timedelta(seconds=start + i * step) for i in range(len(values))],
+        values
+    )
+
+@pytest.fixture
+def engine():
+    """Engine with a 28.0 high threshold, 0.5 hysteresis and 20s minimum duration."""
+    return AlertEngine([AlertRule('temperature', 'high', 28.0, 0.5)], min_duration=20, cooldown=600)
+
+def test_alert_requires_minimum_duration(engine):
+    """Test a short spike does not alert but a sustained breach does."""
+    assert engine.process(temperature_batch([27.0, 29.0, 27.0])) == []
+
+    alerts = engine.process(temperature_batch([29.0, 29.5, 30.0, 30.5], start=100))
+    assert len(alerts) == 1
+    assert alerts[0].status == 'raised'
+    assert alerts[0].breach_start == BASE_TIME + timedelta(seconds=100)
+    assert alerts[0].timestamp == BASE_TIME + timedelta(seconds=120)
+
+def test_oscillating_sensor_alerts_once(engine):
+    """Test values oscillating inside the hysteresis band keep a single breach."""
+    values = [29.0, 27.8, 28.2, 27.6, 29.0] * 20
+    alerts = engine.process(temperature_batch(values))
+    assert [alert.status for alert in alerts] == ['raised']
+    assert engine.active_alerts()[0]['sensor_id'] == 'temp_sensor_1'
+
+def test_cooldown_suppresses_repeated_breaches(engine):
+    """Test breaches separated by clears within the cooldown raise one alert."""
+    values = ([29.0] * 4 + [25.0]) * 5
+    alerts = engine.process(temperature_batch(values))
+    assert [alert.status for alert in alerts] == ['raised', 'resolved']
+    assert engine.suppressed == 4
+
+def test_state_carries_across_batches(engine):
+    """Test a breach spanning batch boundaries raises once and resolves later."""
+    assert engine.process(temperature_batch([29.0, 29.0], start=0)) == []
+    raised = engine.process(temperature_batch([29.0, 29.0], start=20))
+    assert [alert.status for alert in raised] == ['raised']
+    assert raised[0].breach_start == BASE_TIME
+    assert engine.process(temperature_batch([29.0], start=40)) == []
+
+    resolved = engine.process(temperature_batch([27.0], start=50))
+    assert [alert.status for alert in resolved] == ['resolved']
+    assert engine.active_alerts() == []
+
+def test_sensors_are_evaluated_independently(engine):
+    """Test interleaved, unsorted readings from several sensors."""
+    batches = [temperature_batch([29.0] * 5, sensor_id=f'temp_sensor_{i}') for i in range(3)]
+    batch = ReadingBatch.concat('temperature', batches)
+    shuffled = batch.take(np.random.default_rng(0).permutation(len(batch)))
+    alerts = engine.process(shuffled)
+    assert sorted(alert.sensor_id for alert in alerts) == ['temp_sensor_0', 'temp_sensor_1', 'temp_sensor_2']
+    assert all(alert.timestamp == BASE_TIME + timedelta(seconds=20) for alert in alerts)
+
+def test_rules_from_thresholds():
+    """Test ALERT_THRESHOLDS style keys map to rules with hysteresis."""
+    rules = rules_from_thresholds({'humidity_low': 35.0, 'temperature_high': 28.0}, {'humidity': 2.0})
+    assert [(r.sensor_type, r.kind, r.clear_threshold) for r in rules] == [
+        ('humidity', 'low', 37.0), ('temperature', 'high', 28.0)
+    ]
+    engine = AlertEngine(rules)
+    low = ReadingBatch.from_columns('humidity', ['humidity_sensor_1'] * 2,
+                                    [BASE_TIME, BASE_TIME + timedelta(seconds=1)], [30.0, 36.0])
+    assert [alert.rule for alert in engine.process(low)] == ['humidity_low']
+    assert engine.process(ReadingBatch.from_columns('motion', ['motion_sensor_1'], [BASE_TIME], [True])) == []
+    with pytest.raises(ValueError):
+        rules_from_thresholds({'temperature_max': 30.0})
+
+def test_sensor_index_keys_are_stable():
+    """Test keys are assigned once per sensor and stay stable."""
+    index = SensorIndex()
+    keys = index.keys_for(np.array(['b', 'a', 'b'], dtype=object))
+    assert keys[0] == keys[2] != keys[1]
+    assert index.keys_for(np.array(['a', 'c'], dtype=object)).tolist() == [keys[1], 2]
+    assert len(index) == 3
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from conftest import BASE_TIME, make_batch
+from src.streaming.anomaly import EwmaAnomalyDetector
+
+def reference_ewma(values, alpha):
+    """Sequential EWMA mean and variance."""
+    mean, var = values[0], 0.0
+    for x in values[1:]:
+        diff = x - mean
+        increment = alpha * diff
+        mean += increment
+        var = (1 - alpha) * (var + diff * increment)
+    return mean, var
+
+def test_spike_is_flagged_after_warmup():
+    """Test a spike far from the baseline is reported with its z-score."""
+    rng = np.random.default_rng(1)
+    values = list(22.0 + rng.normal(0, 0.2, 100))
+    values[80] = 27.0
+    detector = EwmaAnomalyDetector(alpha=0.05, z_threshold=4.0, warmup=30)
+    anomalies = detector.process(make_batch('temperature', {'temp_sensor_1': values}))
+    assert [a.timestamp for a in anomalies] == [BASE_TIME + timedelta(seconds=80)]
+    assert anomalies[0].z_score > 4.0
+    assert anomalies[0].baseline == pytest.approx(22.0, abs=0.3)
+
+def test_no_scoring_during_warmup():
+    """Test readings are not scored before the warmup count."""
+    detector = EwmaAnomalyDetector(warmup=10)
+    assert detector.process(make_batch('temperature', {'temp_sensor_1': [20.0, 20.1, 35.0, 20.0]})) == []
+
+def test_vectorized_state_matches_sequential_ewma():
+    """Test interleaved sensors split over batches match a per-reading EWMA."""
+    rng = np.random.default_rng(2)
+    series = {f'humidity_sensor_{i}': list(50 + rng.normal(0, 2, 40 + i)) for i in range(4)}
+    detector = EwmaAnomalyDetector(alpha=0.1, sensor_types=('humidity',))
+    batch = make_batch('humidity', series)
+    shuffled = batch.take(rng.permutation(len(batch)))
+    half = len(batch) // 2
+    # Split in time order so each batch continues the previous one
+    by_time = np.argsort(shuffled.timestamps, kind='stable')
+    detector.process(shuffled.take(by_time[:half]))
+    detector.process(shuffled.take(by_time[half:]))
+
+    for sensor_id, values in series.items():
+        mean, var = reference_ewma(values, 0.1)
+        baseline = detector.baseline('humidity', sensor_id)
+        assert baseline['count'] == len(values)
+        assert baseline['mean'] == pytest.approx(mean)
+        assert baseline['std_dev'] == pytest.approx(np.sqrt(var))
+
+def test_min_std_floor_and_unscored_types():
+    """Test the std floor suppresses tiny changes and motion batches are skipped."""
+    detector = EwmaAnomalyDetector(warmup=5, min_std={'temperature': 0.5})
+    assert detector.process(make_batch('temperature', {'temp_sensor_1': [21.0] * 20 + [21.5]})) == []
+    assert len(detector.process(make_batch('temperature', {'temp_sensor_1': [24.0]}, start=30))) == 1
+    motion = make_batch('motion', {'motion_sensor_1': [True, False]})
+    assert detector.process(motion) == []
+    with pytest.raises(ValueError):
+        EwmaAnomalyDetector(alpha=1.5)
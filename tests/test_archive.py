@@ -0,0 +1,200 @@
+import pytest
+import os
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime, timedelta
+from src.processors.analytics_processor import AnalyticsProcessor
+from src.storage.archive import ARCHIVE_SCHEMA, TREND_SCHEMAS, ColdArchive, PartitionArchiver, months_between
+
+class FakeCursor:
+    """Cursor answering partition listings, partition reads and row counts."""
+
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.itersize = 2000
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=None):
+        query = ' '.join(query.split())
+        self.conn.queries.append(query)
+        if 'pg_inherits' in query:
+            self.rows = self.conn.partitions.get(params[0], [])
+        elif query.startswith('SELECT COUNT(*)'):
+            self.rows = [(self.conn.count,)]
+        elif query.startswith('SELECT sensor_id'):
+            self.rows = self.conn.partition_rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class FakeConnection:
+    def __init__(self, partition_rows=(), count=None, partitions=None):
+        self.partition_rows = list(partition_rows)
+        self.count = len(self.partition_rows) if count is None else count
+        self.partitions = partitions or {}
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        return FakeCursor(self, name)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def make_archiver(monkeypatch, root, conn):
+    monkeypatch.setattr(psycopg2, 'connect', lambda **kwargs: conn)
+    return PartitionArchiver({}, str(root), row_group_size=2)
+
+PARTITION_ROWS = [
+    ('temp_sensor_1', datetime(2024, 1, 1, 0, 0), 20.0),
+    ('temp_sensor_1', datetime(2024, 1, 1, 0, 1), 20.5),
+    ('temp_sensor_1', datetime(2024, 1, 1, 0, 2), 21.0),
+    ('temp_sensor_2', datetime(2024, 1, 1, 0, 0), 18.0)
+]
+
+def write_archive_file(root, table, month, rows):
+    """Write rows the way PartitionArchiver lays them out."""
+    month_dir = os.path.join(root, table, f"month={month}")
+    os.makedirs(month_dir, exist_ok=True)
+    path = os.path.join(month_dir, f"{table}_p{month.replace('-', '_')}.parquet")
+    pq.write_table(PartitionArchiver._rows_to_table(rows, ARCHIVE_SCHEMA[table]), path)
+
+@pytest.fixture
+def archive(tmp_path):
+    """An archive with two months of temperature and one of motion data."""
+    root = str(tmp_path)
+    for month_start in (datetime(2024, 1, 31, 22), datetime(2024, 2, 1, 0)):
+        rows = [
+            ('temp_sensor_1', month_start + timedelta(minutes=30 * i), 20.0 + i)
+            for i in range(4)
+        ]
+        write_archive_file(root, 'temperature_readings', month_key_of(month_start), rows)
+    write_archive_file(root, 'motion_events', '2024-02', [
+        ('motion_sensor_1', datetime(2024, 2, 1, 0, minute), minute % 2 == 0)
+        for minute in range(4)
+    ])
+    return ColdArchive(root)
+
+def month_key_of(value):
+    """Format a datetime as YYYY-MM."""
+    return value.strftime('%Y-%m')
+
+def test_months_between():
+    """Test month enumeration across a year boundary."""
+    assert months_between(datetime(2024, 11, 15), datetime(2025, 2, 1)) == ['2024-11', '2024-12', '2025-01']
+    assert months_between(datetime(2024, 1, 1), datetime(2024, 1, 1)) == []
+
+def test_cold_months(archive):
+    """Test listing archived months."""
+    assert archive.months('temperature_readings') == {'2024-01', '2024-02'}
+    assert archive.months('humidity_readings') == set()
+
+def test_cold_query_range(archive):
+    """Test range reads across archived months."""
+    batch = archive.query_range('temperature', datetime(2024, 1, 1), datetime(2024, 3, 1))
+    assert len(batch) == 8
+    assert list(batch.timestamps) == sorted(batch.timestamps)
+
+    hot_feb = archive.query_range('temperature', datetime(2024, 1, 1), datetime(2024, 3, 1),
+                                  exclude_months={'2024-02'})
+    assert len(hot_feb) == 4
+
+def test_cold_hourly_trends(archive):
+    """Test hourly trends match the hot trend format."""
+    trends = archive.hourly_trends('temperature', datetime(2024, 1, 31), datetime(2024, 2, 2))
+    assert [row['hour'] for row in trends] == sorted(row['hour'] for row in trends)
+    assert set(trends[0]) == {'sensor_id', 'hour', 'avg', 'min', 'max'}
+    first = trends[0]
+    assert first['hour'] == datetime(2024, 1, 31, 22)
+    assert first['avg'] == pytest.approx(20.5)
+
+    motion = archive.hourly_trends('motion', datetime(2024, 2, 1), datetime(2024, 2, 2))
+    assert motion == [{
+        'sensor_id': 'motion_sensor_1',
+        'hour': datetime(2024, 2, 1, 0),
+        'total_events': 4,
+        'activity_rate': 50.0
+    }]
+
+def test_export_partition(monkeypatch, tmp_path):
+    """Test export writes sorted rows with one row group per sensor run and row group size."""
+    conn = FakeConnection(PARTITION_ROWS)
+    archiver = make_archiver(monkeypatch, tmp_path, conn)
+    assert archiver.export_partition('temperature_readings', 'temperature_readings_p2024_01',
+                                     datetime(2024, 1, 1)) == 4
+    assert "ORDER BY sensor_id, timestamp" in conn.queries[-1]
+    assert conn.commits == 1
+
+    path = archiver.archive_path_for('temperature_readings', 'temperature_readings_p2024_01', datetime(2024, 1, 1))
+    assert path.endswith(os.path.join('temperature_readings', 'month=2024-01', 'temperature_readings_p2024_01.parquet'))
+    assert not os.path.exists(path + '.tmp')
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read().to_pylist()[-1] == {'sensor_id': 'temp_sensor_2', 'timestamp': datetime(2024, 1, 1),
+                                              'value': 18.0}
+
+def test_archive_partition_locks_counts_then_drops(monkeypatch, tmp_path):
+    """Test the partition is locked before the export and dropped after the counts match."""
+    conn = FakeConnection(PARTITION_ROWS)
+    archiver = make_archiver(monkeypatch, tmp_path, conn)
+    assert archiver.archive_partition('temperature_readings', 'temperature_readings_p2024_01',
+                                      datetime(2024, 1, 1)) == 4
+    assert [q.split(' FROM ')[0] if q.startswith('SELECT sensor_id') else q for q in conn.queries] == [
+        "LOCK TABLE temperature_readings_p2024_01 IN SHARE MODE",
+        "SELECT sensor_id, timestamp, value::float8",
+        "SELECT COUNT(*) FROM temperature_readings_p2024_01",
+        "ALTER TABLE temperature_readings DETACH PARTITION temperature_readings_p2024_01",
+        "DROP TABLE temperature_readings_p2024_01"
+    ]
+    # Lock, export, count and drop share one transaction
+    assert conn.commits == 1
+
+def test_archive_partition_refuses_count_mismatch(monkeypatch, tmp_path):
+    """Test a partition whose row count differs from the archive is kept."""
+    conn = FakeConnection(PARTITION_ROWS, count=5)
+    archiver = make_archiver(monkeypatch, tmp_path, conn)
+    with pytest.raises(RuntimeError, match="has 4 rows, partition has 5"):
+        archiver.archive_partition('temperature_readings', 'temperature_readings_p2024_01', datetime(2024, 1, 1))
+    assert not any(q.startswith(('ALTER TABLE', 'DROP TABLE')) for q in conn.queries)
+    assert (conn.commits, conn.rollbacks) == (0, 1)
+
+def test_add_cold_trends_skips_live_months(monkeypatch, archive):
+    """Test archived months are merged unless the month still has a live partition."""
+    conn = FakeConnection(partitions={'temperature_readings': [
+        ('temperature_readings_p2024_02', "FOR VALUES FROM ('2024-02-01 00:00:00') TO ('2024-03-01 00:00:00')")
+    ]})
+    monkeypatch.setattr(psycopg2, 'connect', lambda **kwargs: conn)
+    processor = AnalyticsProcessor({}, archive_path=archive.archive_path)
+    hot = pa.Table.from_pylist([
+        {'sensor_id': 'temp_sensor_1', 'hour': datetime(2024, 2, 1, 0), 'avg': 30.0, 'min': 30.0, 'max': 30.0}
+    ], schema=TREND_SCHEMAS['temperature'])
+    trends = {'temperature': hot, 'humidity': TREND_SCHEMAS['humidity'].empty_table(),
+              'motion': TREND_SCHEMAS['motion'].empty_table()}
+
+    processor.add_cold_trends(trends, datetime(2024, 1, 31), datetime(2024, 2, 2))
+    # January is archived only; February is still live and counted from PostgreSQL alone
+    assert [(row['hour'], row['avg']) for row in trends['temperature'].to_pylist()] == [
+        (datetime(2024, 1, 31, 22), 20.5),
+        (datetime(2024, 1, 31, 23), 22.5),
+        (datetime(2024, 2, 1, 0), 30.0)
+    ]
+    assert trends['humidity'].num_rows == 0
+    assert trends['motion'].column('total_events').to_pylist() == [4]
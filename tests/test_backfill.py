@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime, timedelta
+from src.processors.backfill import (
+    AnalyticsBackfill, BackfillCheckpoint, BackfillTask, align_down, backfill_query, split_range
+)
+
+PARTITIONS = [
+    ('temperature_readings_p2024_01', datetime(2024, 1, 1), datetime(2024, 2, 1)),
+    ('temperature_readings_p2024_02', datetime(2024, 2, 1), datetime(2024, 3, 1))
+]
+
+def test_tasks_break_at_partitions_and_task_hours():
+    """Test tasks cover the range without gaps and never span a partition bound."""
+    tasks = split_range('temperature', datetime(2024, 1, 31, 6), datetime(2024, 2, 2),
+                        window_minutes=5, task_hours=24, partitions=PARTITIONS)
+    assert [(t.start, t.end) for t in tasks] == [
+        (datetime(2024, 1, 31, 6), datetime(2024, 2, 1)),
+        (datetime(2024, 2, 1), datetime(2024, 2, 2))
+    ]
+
+def test_task_bounds_follow_window_grid():
+    """Test bounds are rounded down so no window is split between tasks."""
+    partitions = [('p', datetime(2024, 1, 1), datetime(2024, 1, 1, 0, 7))]
+    tasks = split_range('humidity', datetime(2024, 1, 1, 0, 3), datetime(2024, 1, 1, 0, 22),
+                        window_minutes=5, task_hours=1, partitions=partitions)
+    assert [(t.start.minute, t.end.minute) for t in tasks] == [(0, 5), (5, 20)]
+    assert align_down(datetime(2024, 1, 1, 0, 59, 59), timedelta(minutes=15)) == datetime(2024, 1, 1, 0, 45)
+
+def test_task_hours_must_hold_whole_windows():
+    """Test a task length that is not a multiple of the window is rejected."""
+    with pytest.raises(ValueError):
+        split_range('temperature', datetime(2024, 1, 1), datetime(2024, 1, 2),
+                    window_minutes=7, task_hours=1)
+
+def test_backfill_query_writes_process_analytics_metrics():
+    """Test the statement unpivots the same metrics process_analytics stores."""
+    query = backfill_query('temperature')
+    for metric in ('temp_min', 'temp_max', 'temp_avg', 'temp_std'):
+        assert f"('{metric}'," in query
+    assert 'FROM temperature_readings' in query
+    assert "('motion_rate', w.m0)" in backfill_query('motion')
+
+def test_checkpoint_resumes_and_rejects_other_params(tmp_path):
+    """Test finished tasks survive a restart only for the same backfill."""
+    path = str(tmp_path / 'checkpoint.json')
+    params = {'start': '2024-01-01T00:00:00', 'window_minutes': 5}
+    BackfillCheckpoint(path, params).mark('temperature:2024-01-01T00:00:00', 120)
+    assert BackfillCheckpoint(path, params).done == {'temperature:2024-01-01T00:00:00': 120}
+    with pytest.raises(ValueError):
+        BackfillCheckpoint(path, dict(params, window_minutes=15))
+
+def test_run_skips_checkpointed_tasks(tmp_path, monkeypatch):
+    """Test a resumed backfill submits nothing when every task is done."""
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 3)
+    tasks = split_range('motion', start, end, window_minutes=5, task_hours=24)
+    backfill = AnalyticsBackfill({}, workers=2, checkpoint_path=str(tmp_path / 'checkpoint.json'))
+    monkeypatch.setattr(backfill, 'plan', lambda *args: tasks)
+    checkpoint = BackfillCheckpoint(backfill.checkpoint_path, {
+        'start': start.isoformat(), 'end': end.isoformat(), 'window_minutes': 5,
+        'task_hours': 24, 'sensor_types': ['motion']
+    })
+    for task in tasks:
+        checkpoint.mark(task.task_id, 1)
+    assert backfill.run(start, end, ['motion']) == {}
+    assert BackfillTask('motion', start, end).task_id == 'motion:2024-01-01T00:00:00'
+
+    # Other task hours split the range differently, so the checkpoint does not apply
+    resized = AnalyticsBackfill({}, workers=2, task_hours=12, checkpoint_path=backfill.checkpoint_path)
+    with pytest.raises(ValueError):
+        resized.run(start, end, ['motion'])
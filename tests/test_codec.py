@@ -0,0 +1,130 @@
+import pytest
+import json
+import numpy as np
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+from src.transport.codec import (
+    CodecError, TopicCodec, decode_binary, decode_json, encode_binary, encode_json, is_binary_frame
+)
+
+TOPICS = {'temperature': 'temperature_data', 'humidity': 'humidity_data', 'motion': 'motion_data'}
+
+@pytest.fixture
+def temperature_batch():
+    """A temperature batch with repeated sensor ids."""
+    base_time = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    return ReadingBatch.from_columns(
+        'temperature',
+        [f'temp_sensor_{i % 3}' for i in range(30)],
+        [base_time + timedelta(seconds=i) for i in range(30)],
+        [20.0 + i * 0.25 for i in range(30)]
+    )
+
+def test_binary_round_trip(temperature_batch):
+    """Test that a binary frame decodes to the original batch."""
+    payload = encode_binary(temperature_batch)
+    assert is_binary_frame(payload)
+
+    decoded = decode_binary(payload)
+    assert decoded.sensor_type == 'temperature'
+    assert decoded.sensor_ids.tolist() == temperature_batch.sensor_ids.tolist()
+    assert np.array_equal(decoded.timestamps, temperature_batch.timestamps)
+    assert np.array_equal(decoded.values, temperature_batch.values)
+
+def test_binary_motion_round_trip():
+    """Test that motion values decode back to booleans."""
+    batch = ReadingBatch.from_columns(
+        'motion', ['motion_sensor_1'] * 3, [datetime(2024, 5, 1)] * 3, [True, False, True]
+    )
+    decoded = decode_binary(encode_binary(batch))
+    assert decoded.values.dtype == np.bool_
+    assert decoded.values.tolist() == [True, False, True]
+
+def test_binary_is_smaller_than_json(temperature_batch):
+    """Test the binary frame is several times smaller than JSON messages."""
+    binary_size = len(encode_binary(temperature_batch))
+    json_size = sum(len(payload) for payload in encode_json(temperature_batch))
+    assert binary_size * 3 < json_size
+
+def test_binary_rejects_truncated_frame(temperature_batch):
+    """Test that corrupt frames raise CodecError."""
+    payload = encode_binary(temperature_batch)
+    with pytest.raises(CodecError):
+        decode_binary(payload[:-1])
+    with pytest.raises(CodecError):
+        decode_binary(payload[:8])
+
+def test_json_decode(temperature_batch):
+    """Test vectorized JSON decoding matches the encoded batch."""
+    decoded = decode_json(encode_json(temperature_batch))
+    batch = decoded['temperature']
+    assert batch.sensor_ids.tolist() == temperature_batch.sensor_ids.tolist()
+    assert np.array_equal(batch.timestamps, temperature_batch.timestamps)
+
+def test_json_decode_original_format():
+    """Test messages in the original producer format."""
+    payload = json.dumps({
+        'sensor_id': 'humidity_sensor_1',
+        'type': 'humidity',
+        'value': 45.5,
+        'timestamp': datetime(2024, 5, 1, 8, 30).isoformat()
+    }).encode('utf-8')
+    batch = decode_json([payload])['humidity']
+    assert batch.timestamps[0] == np.datetime64('2024-05-01T08:30:00')
+    with pytest.raises(CodecError):
+        decode_json([b'not json'])
+
+def test_topic_codec_negotiation(temperature_batch):
+    """Test per-topic encodings with auto-detection on decode."""
+    codec = TopicCodec({'temperature': 'binary', 'humidity': 'json'}, TOPICS)
+    assert len(codec.encode(temperature_batch)) == 1
+
+    humidity = ReadingBatch.from_columns('humidity', ['humidity_sensor_1'], [datetime(2024, 5, 1)], [50.0])
+    assert codec.encode(humidity)[0].startswith(b'{')
+
+    # A topic mid-migration can carry both formats
+    payloads = codec.encode(temperature_batch) + encode_json(temperature_batch)
+    decoded = codec.decode('temperature_data', payloads)
+    assert len(decoded['temperature']) == 2 * len(temperature_batch)
+
+    with pytest.raises(ValueError):
+        TopicCodec({'temperature': 'xml'}, TOPICS)
+
+def test_decode_many_groups_topics_and_skips_invalid(temperature_batch):
+    """Test batch decoding across topics with a corrupt message in one group."""
+    codec = TopicCodec({'temperature': 'binary'}, TOPICS)
+    humidity = ReadingBatch.from_columns(
+        'humidity', ['humidity_sensor_1', 'humidity_sensor_2'], [datetime(2024, 5, 1)] * 2, [40.0, 41.0]
+    )
+    messages = [('temperature_data', payload) for payload in codec.encode(temperature_batch)]
+    messages += [('humidity_data', payload) for payload in encode_json(humidity)]
+    messages.append(('humidity_data', b'{"sensor_id": "humidity_sensor_3"'))
+
+    batches, invalid = codec.decode_many(messages)
+    assert invalid == 1
+    assert len(batches['temperature']) == len(temperature_batch)
+    assert batches['humidity'].sensor_ids.tolist() == ['humidity_sensor_1', 'humidity_sensor_2']
+
+def test_malformed_timestamp_raises_codec_error(temperature_batch):
+    """Test one unparsable timestamp fails the batch with CodecError, not ValueError."""
+    good = encode_json(temperature_batch)[:2]
+    bad = json.dumps({'sensor_id': 'temp_sensor_9', 'type': 'temperature',
+                      'value': 21.0, 'timestamp': 'not-a-date'}).encode('utf-8')
+    with pytest.raises(CodecError):
+        decode_json(good + [bad])
+
+    batches, invalid = TopicCodec({}, TOPICS).decode_many([('temperature_data', p) for p in good + [bad]])
+    assert invalid == 1
+    assert len(batches['temperature']) == 2
+
+def test_corrupt_sensor_ids_raise_codec_error(temperature_batch):
+    """Test a frame cut inside its id dictionary or with bad key references raises CodecError."""
+    payload = encode_binary(temperature_batch)
+    with pytest.raises(CodecError):
+        decode_binary(payload[:17])
+    records = bytearray(payload)
+    # Point the first record at a sensor key past the dictionary
+    first_record = len(payload) - len(temperature_batch) * 20
+    records[first_record:first_record + 4] = (99).to_bytes(4, 'little')
+    with pytest.raises(CodecError):
+        decode_binary(bytes(records))
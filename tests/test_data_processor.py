@@ -1,5 +1,6 @@
 import pytest
-from datetime import datetime
+import psycopg2
+from datetime import datetime, timedelta
 from src.processors.data_processor import DataProcessor
 from src.simulator.sensor_simulator import SensorSimulator
 
@@ -104,4 +105,34 @@ def test_error_handling(processor):
         'location': 'room_1'
     }
     result = processor.process_reading(invalid_reading)
-    assert result is False 
\ No newline at end of file
+    assert result is False
+
+
+class RejectingInserts:
+    """Prepared inserts failing any batch holding a reading of an unregistered sensor."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def write_batch(self, batch):
+        self.calls += 1
+        if 'temp_sensor_99' in batch.sensor_ids:
+            raise psycopg2.errors.ForeignKeyViolation("sensor_id not present in sensors")
+        if 'humidity_sensor_2' in batch.sensor_ids:
+            raise psycopg2.OperationalError("server closed the connection")
+        return len(batch)
+
+def test_rejected_rows_are_bisected_out_of_prepared_batches(monkeypatch):
+    """Test one bad row costs only itself, while a failed connection drops the batch."""
+    monkeypatch.setattr(DataProcessor, 'connect', lambda self: None)
+    monkeypatch.setattr(DataProcessor, 'ensure_connection', lambda self: None)
+    processor = DataProcessor()
+    processor.inserts = RejectingInserts()
+    now = datetime(2024, 5, 1, 12, 0)
+    readings = [
+        {'sensor_id': f"temp_sensor_{i}", 'timestamp': now + timedelta(seconds=i), 'value': 21.0}
+        for i in (1, 2, 99, 3, 4, 5, 6, 7)
+    ] + [{'sensor_id': 'humidity_sensor_2', 'timestamp': now, 'value': 45.0}]
+    assert processor.process_batches(readings) == 7
+    # 1 + 2 halves + 2 quarters + 2 eighths for temperature, one call for humidity
+    assert processor.inserts.calls == 8
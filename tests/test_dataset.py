@@ -0,0 +1,136 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from src.simulator import dataset
+from src.simulator.dataset import (
+    DatasetTask, ReadingStream, iter_task_batches, plan_tasks, sensor_inventory, step_count
+)
+from src.simulator.sensor_simulator import MOTION_TRANSITIONS, RANDOM_WALKS
+
+START = datetime(2024, 5, 1)
+
+def test_tasks_split_sensors_into_blocks():
+    """Test every sensor of every type belongs to exactly one task."""
+    tasks = plan_tasks(25, 10, ['temperature', 'motion'])
+    assert [(task.sensor_type, task.first, task.count) for task in tasks] == [
+        ('temperature', 1, 10), ('temperature', 11, 10), ('temperature', 21, 5),
+        ('motion', 1, 10), ('motion', 11, 10), ('motion', 21, 5)
+    ]
+    assert tasks[2].sensor_ids[-1] == 'temp_sensor_25'
+    assert sensor_inventory(2, ['humidity']) == [
+        ('humidity_sensor_1', 'humidity', 'room_1'), ('humidity_sensor_2', 'humidity', 'room_2')
+    ]
+
+def test_same_seed_reproduces_the_dataset():
+    """Test a seed always yields the same readings and other seeds or blocks do not."""
+    task = DatasetTask('temperature', 0, 1, 8)
+    first = ReadingStream(task, 42, START, 60).next_batch(50)
+    again = ReadingStream(task, 42, START, 60).next_batch(50)
+    assert np.array_equal(first.values, again.values)
+    assert np.array_equal(first.timestamps, again.timestamps)
+    assert not np.array_equal(first.values, ReadingStream(task, 43, START, 60).next_batch(50).values)
+    other_block = DatasetTask('temperature', 1, 9, 8)
+    assert not np.array_equal(first.values, ReadingStream(other_block, 42, START, 60).next_batch(50).values)
+
+def test_chunk_size_does_not_change_the_readings():
+    """Test the walk carries its state from chunk to chunk."""
+    task = DatasetTask('humidity', 0, 1, 5)
+    whole = ReadingStream(task, 7, START, 30).next_batch(40)
+    stream = ReadingStream(task, 7, START, 30)
+    chunks = [stream.next_batch(steps) for steps in (15, 25)]
+    assert np.array_equal(whole.values, np.concatenate([chunk.values for chunk in chunks]))
+    assert np.array_equal(whole.timestamps, np.concatenate([chunk.timestamps for chunk in chunks]))
+
+def test_walk_follows_the_simulator_model():
+    """Test readings stay in bounds and move by at most one step per interval."""
+    task = DatasetTask('temperature', 0, 1, 20)
+    _, step, lower, upper = RANDOM_WALKS['temperature']
+    walk = ReadingStream(task, 1, START, 60).advance(5000)
+    assert walk.min() >= lower and walk.max() <= upper
+    assert np.abs(np.diff(walk, axis=0)).max() <= step + 1e-9
+    assert np.abs(walk[0] - RANDOM_WALKS['temperature'][0]).max() <= step
+
+def test_motion_follows_the_markov_chain():
+    """Test motion continues and starts at the simulator's transition rates."""
+    task = DatasetTask('motion', 0, 1, 50)
+    states = ReadingStream(task, 3, START, 60).advance(4000)
+    previous, current = states[:-1], states[1:]
+    assert abs(current[previous].mean() - MOTION_TRANSITIONS[True]) < 0.02
+    assert abs(current[~previous].mean() - MOTION_TRANSITIONS[False]) < 0.02
+
+def test_each_sensor_reports_once_per_interval_at_its_offset():
+    """Test timestamps advance by the interval with a fixed per-sensor offset."""
+    task = DatasetTask('temperature', 0, 1, 3)
+    batch = ReadingStream(task, 0, START, 60).next_batch(4)
+    assert list(batch.sensor_ids[:4]) == ['temp_sensor_1', 'temp_sensor_2', 'temp_sensor_3', 'temp_sensor_1']
+    per_sensor = batch.timestamps.reshape(4, 3)
+    assert (np.diff(per_sensor, axis=0) == np.timedelta64(60, 's')).all()
+    assert (per_sensor[0] >= np.datetime64(START)).all()
+    assert (per_sensor[0] < np.datetime64(START + timedelta(seconds=60))).all()
+    assert np.array_equal(batch.values, np.round(batch.values, 2))
+
+def test_task_batches_cover_the_range_in_chunks():
+    """Test batches hold about chunk_rows readings and none past the end."""
+    task = DatasetTask('motion', 0, 1, 10)
+    end = START + timedelta(hours=2)
+    batches = list(iter_task_batches(task, 0, START, end, 60, chunk_rows=300))
+    assert step_count(START, end, 60) == 120
+    assert [len(batch) for batch in batches[:-1]] == [300] * 3
+    assert sum(len(batch) for batch in batches) <= 1200
+    assert all((batch.timestamps < np.datetime64(end)).all() for batch in batches)
+    assert batches[-1].values.dtype == np.bool_
+
+class FakeCursor:
+    def __init__(self, fail_after=None):
+        self.statements = []
+        self.copies = 0
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        self.statements.append((' '.join(query.split()), params))
+
+    def copy_expert(self, statement, source):
+        if self.copies == self.fail_after:
+            raise RuntimeError("connection lost")
+        self.copies += 1
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self.cur = cursor
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def test_task_replaces_its_rows_in_one_transaction(monkeypatch):
+    """Test a task deletes its sensors' range first and commits once after every chunk."""
+    conn = FakeConnection(FakeCursor())
+    monkeypatch.setattr(dataset, '_worker_conn', conn)
+    task = DatasetTask('temperature', 0, 1, 10)
+    end = START + timedelta(hours=1)
+    assert dataset._load_task(task, 0, START, end, 60, chunk_rows=100) == ('temperature:0', 600)
+    [(delete, params)] = conn.cur.statements
+    assert delete.startswith('DELETE FROM temperature_readings WHERE sensor_id = ANY(%s)')
+    assert params == (task.sensor_ids, START, end)
+    assert (conn.cur.copies, conn.commits, conn.rollbacks) == (6, 1, 0)
+
+def test_failed_task_commits_nothing(monkeypatch):
+    """Test a failure after some chunks rolls the whole task back."""
+    conn = FakeConnection(FakeCursor(fail_after=3))
+    monkeypatch.setattr(dataset, '_worker_conn', conn)
+    with pytest.raises(RuntimeError):
+        dataset._load_task(DatasetTask('humidity', 0, 1, 10), 0, START, START + timedelta(hours=1), 60, 100)
+    assert (conn.commits, conn.rollbacks) == (0, 1)
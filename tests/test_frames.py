@@ -0,0 +1,77 @@
+import pyarrow as pa
+import pandas as pd
+from datetime import datetime
+from src.storage.frames import frame_from_csv, read_frame
+
+POSTGRES_CSV = (
+    b'sensor_id,value,detected,timestamp,location\n'
+    b'temp_sensor_1,21.5,t,2024-05-01 12:00:00.123456,Kitchen\n'
+    b'temp_sensor_2,,f,2024-05-01 12:00:01,""\n'
+    b'temp_sensor_3,19.25,,2024-05-01 12:00:02,\n'
+)
+
+class FakeCursor:
+    """Cursor recording the COPY statement and returning fixed CSV output."""
+
+    def __init__(self, output):
+        self.output = output
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def mogrify(self, query, params):
+        return (query % {k: f"'{v}'" for k, v in params.items()}).encode()
+
+    def copy_expert(self, statement, buffer):
+        self.statements.append(statement)
+        buffer.write(self.output)
+
+class FakeConnection:
+    def __init__(self, output):
+        self.cur = FakeCursor(output)
+        self.commits = 0
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.commits += 1
+
+def test_csv_columns_decode_to_native_types():
+    """Test values, booleans and timestamps arrive as NumPy columns, not objects."""
+    df = frame_from_csv(POSTGRES_CSV)
+    assert df['value'].dtype == 'float64'
+    assert df['timestamp'].dtype.kind == 'M'
+    assert df['timestamp'][0] == pd.Timestamp(datetime(2024, 5, 1, 12, 0, 0, 123456))
+    assert df['detected'].tolist()[:2] == [True, False]
+    assert pd.isna(df['value'][1])
+
+def test_csv_distinguishes_null_and_empty_string():
+    """Test an unquoted empty field is NULL and a quoted one an empty string."""
+    df = frame_from_csv(POSTGRES_CSV)
+    assert df['location'][1] == ''
+    assert pd.isna(df['location'][2])
+
+def test_column_types_pin_all_null_columns():
+    """Test column_types keeps an all-NULL column numeric."""
+    data = b'sensor_id,value\ntemp_sensor_1,\n'
+    assert frame_from_csv(data)['value'].dtype == object
+    assert frame_from_csv(data, {'value': pa.float64()})['value'].dtype == 'float64'
+
+def test_empty_result_keeps_columns():
+    """Test a result without rows still has its columns."""
+    df = frame_from_csv(b'sensor_id,value\n')
+    assert list(df.columns) == ['sensor_id', 'value'] and df.empty
+
+def test_read_frame_wraps_bound_query_in_copy():
+    """Test the query is bound client-side and streamed through COPY as CSV."""
+    conn = FakeConnection(POSTGRES_CSV)
+    df = read_frame(conn, "SELECT * FROM t WHERE timestamp >= %(start)s;\n", {'start': '2024-05-01'})
+    assert conn.cur.statements == [
+        "COPY (SELECT * FROM t WHERE timestamp >= '2024-05-01') TO STDOUT WITH (FORMAT csv, HEADER true)"
+    ]
+    assert len(df) == 3 and conn.commits == 1
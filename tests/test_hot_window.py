@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import uuid
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+from src.streaming import hot_window
+from src.streaming.hot_window import HotWindowReader, HotWindowWriter
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def writer():
+    """A hot window with room for 4 sensors of 5 readings."""
+    writer = HotWindowWriter(f"iot_test_{uuid.uuid4().hex[:8]}", max_sensors=4, slots=5)
+    yield writer
+    writer.close()
+
+def make_batch(sensor_ids, seconds, values, sensor_type='temperature'):
+    timestamps = [BASE_TIME + timedelta(seconds=s) for s in seconds]
+    return ReadingBatch.from_columns(sensor_type, sensor_ids, timestamps, values)
+
+def test_latest_reading_per_sensor(writer):
+    """Test readers see each sensor's newest reading and location."""
+    writer.write(make_batch(['temp_sensor_1', 'temp_sensor_2', 'temp_sensor_1'], [0, 1, 2], [20.0, 21.0, 22.0]),
+                 location_of={'temp_sensor_1': 'Kitchen'}.get)
+    reader = HotWindowReader(writer.name)
+    latest = {row['sensor_id']: row for row in reader.latest()}
+    assert latest['temp_sensor_1']['value'] == 22.0
+    assert latest['temp_sensor_1']['timestamp'] == BASE_TIME + timedelta(seconds=2)
+    assert latest['temp_sensor_1']['location'] == 'Kitchen'
+    assert latest['temp_sensor_2']['location'] is None
+    reader.close()
+
+def test_ring_keeps_newest_readings_in_order(writer):
+    """Test a sensor's ring wraps around and returns the newest slots in time order."""
+    writer.write(make_batch(['temp_sensor_1'] * 3, [0, 1, 2], [0.0, 1.0, 2.0]))
+    # Out of order within the batch and more than the ring holds
+    writer.write(make_batch(['temp_sensor_1'] * 6, [8, 3, 4, 5, 7, 6], [8.0, 3.0, 4.0, 5.0, 7.0, 6.0]))
+    reader = HotWindowReader(writer.name)
+    timestamps, values = reader.window('temp_sensor_1')
+    assert values.tolist() == [4.0, 5.0, 6.0, 7.0, 8.0]
+    assert timestamps[0] == np.datetime64(BASE_TIME + timedelta(seconds=4), 'us')
+    _, recent = reader.window('temp_sensor_1', since=BASE_TIME + timedelta(seconds=7))
+    assert recent.tolist() == [7.0, 8.0]
+    assert reader.window('temp_sensor_9')[1].size == 0
+    reader.close()
+
+def test_sensors_beyond_capacity_are_dropped(writer):
+    """Test readings of sensors past max_sensors are counted and skipped."""
+    ids = [f'temp_sensor_{i}' for i in range(6)]
+    assert writer.write(make_batch(ids, range(6), np.arange(6.0))) == 4
+    assert writer.dropped == 2
+    reader = HotWindowReader(writer.name)
+    assert len(reader.latest()) == 4
+    reader.close()
+
+def test_reader_arrays_are_read_only(writer):
+    """Test readers cannot modify the shared arrays."""
+    writer.write(make_batch(['temp_sensor_1'], [0], [20.0]))
+    reader = HotWindowReader(writer.name)
+    with pytest.raises(ValueError):
+        reader.arrays['values'][0, 0] = 1.0
+    reader.close()
+
+def test_read_retries_when_sequence_changes(writer):
+    """Test a read overlapping a write is retried until it is consistent."""
+    writer.write(make_batch(['temp_sensor_1'], [0], [20.0]))
+    reader = HotWindowReader(writer.name)
+    calls = []
+
+    def read_latest(arrays, num_sensors):
+        calls.append(num_sensors)
+        if len(calls) == 1:
+            # A write lands while the first attempt is reading
+            writer.write(make_batch(['temp_sensor_1'], [1], [21.0]))
+        return float(arrays['values'][0, (arrays['heads'][0] - 1) % 5])
+
+    assert reader.read(read_latest) == 21.0
+    assert len(calls) == 2
+    reader.close()
+
+def test_read_gives_up_while_write_in_progress(writer):
+    """Test readers never return data while the sequence number is odd."""
+    reader = HotWindowReader(writer.name, max_retries=20)
+    writer.arrays['header'][4] += 1
+    with pytest.raises(RuntimeError):
+        reader.read(lambda arrays, num_sensors: num_sensors)
+    writer.arrays['header'][4] += 1
+    assert reader.read(lambda arrays, num_sensors: num_sensors) == 0
+    reader.close()
+
+def test_reader_in_another_process(writer):
+    """Test another process maps the segment and reads the latest values."""
+    writer.write(make_batch(['temp_sensor_1', 'temp_sensor_2'], [0, 0], [20.5, 21.5]))
+    script = (
+        "from src.streaming.hot_window import HotWindowReader\n"
+        f"reader = HotWindowReader({writer.name!r})\n"
+        "print(sorted(row['value'] for row in reader.latest()))\n"
+        "reader.close()\n"
+    )
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == '[20.5, 21.5]'
+    # The segment outlives the reader process
+    reader = HotWindowReader(writer.name)
+    assert len(reader.latest()) == 2
+    reader.close()
+
+def test_age_tracks_the_last_write(writer, monkeypatch):
+    """Test readers see how long ago the writer last wrote, so an abandoned window can be ignored."""
+    reader = HotWindowReader(writer.name)
+    try:
+        assert 0 <= reader.age_seconds() < 5
+        clock = hot_window._now_us() + 60_000_000
+        monkeypatch.setattr(hot_window, '_now_us', lambda: clock)
+        assert reader.age_seconds() >= 60
+        writer.write(make_batch(['temp_sensor_1'], [0], [21.0]))
+        assert reader.age_seconds() == 0
+    finally:
+        reader.close()
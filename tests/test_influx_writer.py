@@ -0,0 +1,122 @@
+import gzip
+import pytest
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from src.storage.influx_writer import AsyncInfluxWriter, encode_line_protocol, to_epoch_us
+
+class StubInfluxHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the InfluxDB v2 write endpoint."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        server.requests.append((self.path, self.headers.get('Authorization'), gzip.decompress(body)))
+        status = server.statuses.pop(0) if server.statuses else 204
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def influx_stub():
+    """Run a stub InfluxDB HTTP server on a free local port."""
+    server = HTTPServer(('127.0.0.1', 0), StubInfluxHandler)
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_writer(server, **kwargs):
+    """Create a writer pointed at the stub server."""
+    return AsyncInfluxWriter(
+        url=f'http://127.0.0.1:{server.server_port}',
+        token='test-token',
+        org='iot_org',
+        bucket='iot_bucket',
+        **kwargs
+    )
+
+def test_encode_line_protocol():
+    """Test line protocol encoding of a column batch."""
+    ts = datetime(2024, 1, 1, 0, 0, 0, 5)
+    payload = encode_line_protocol(
+        'temperature',
+        ['temp_sensor_1', 'temp sensor,2'],
+        [23.5, 21],
+        [ts, to_epoch_us(ts)]
+    )
+    lines = payload.decode('utf-8').split('\n')
+    assert lines[0] == 'temperature,sensor_id=temp_sensor_1 value=23.5 1704067200000005'
+    assert lines[1] == 'temperature,sensor_id=temp\\ sensor\\,2 value=21.0 1704067200000005'
+
+    motion = encode_line_protocol('motion', ['motion_sensor_1'], [True], [ts])
+    assert b'value=true' in motion
+
+def test_batched_write(influx_stub):
+    """Test that queued batches are gzipped and posted together."""
+    writer = make_writer(influx_stub, batch_size=100, flush_interval=0.05)
+    ts = datetime.now()
+    for i in range(10):
+        writer.write_batch('temperature', [f'temp_sensor_{i}'], [20.0 + i], [ts])
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    lines = [line for _, _, body in influx_stub.requests for line in body.split(b'\n')]
+    assert len(lines) == 10
+    path, auth, _ = influx_stub.requests[0]
+    assert path.startswith('/api/v2/write?')
+    assert 'precision=us' in path
+    assert auth == 'Token test-token'
+
+    stats = writer.stats()
+    assert stats.points_written == 10
+    assert stats.points_dropped == 0
+    assert stats.batches_written == len(influx_stub.requests)
+
+def test_retry_on_server_error(influx_stub):
+    """Test that transient server errors are retried."""
+    influx_stub.statuses = [503, 500]
+    writer = make_writer(influx_stub, flush_interval=0.01, retry_base_delay=0.01)
+    writer.write_batch('humidity', ['humidity_sensor_1'], [45.0], [datetime.now()])
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    stats = writer.stats()
+    assert len(influx_stub.requests) == 3
+    assert stats.retries == 2
+    assert stats.points_written == 1
+
+def test_bad_request_is_dropped(influx_stub):
+    """Test that a rejected payload is dropped without retrying."""
+    influx_stub.statuses = [400]
+    writer = make_writer(influx_stub, flush_interval=0.01, retry_base_delay=0.01)
+    writer.write_batch('humidity', ['humidity_sensor_1'], [45.0], [datetime.now()])
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    stats = writer.stats()
+    assert len(influx_stub.requests) == 1
+    assert stats.batches_failed == 1
+    assert stats.points_dropped == 1
+
+def test_non_finite_values_are_dropped_before_encoding(influx_stub):
+    """Test NaN and infinite readings are left out instead of failing the whole batch."""
+    ts = datetime(2024, 1, 1)
+    payload = encode_line_protocol('temperature', ['a', 'b', 'c'], [float('nan'), 21.5, float('inf')], [ts] * 3)
+    assert payload == b'temperature,sensor_id=b value=21.5 1704067200000000'
+
+    writer = make_writer(influx_stub, flush_interval=0.01)
+    writer.write_batch('temperature', ['a', 'b', 'c'], [float('nan'), 21.5, float('-inf')], [ts] * 3)
+    writer.write_batch('temperature', ['a'], [float('nan')], [ts])
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    stats = writer.stats()
+    assert len(influx_stub.requests) == 1
+    assert (stats.points_written, stats.points_dropped, stats.batches_failed) == (1, 3, 0)
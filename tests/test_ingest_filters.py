@@ -0,0 +1,113 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from conftest import BASE_TIME, make_batch
+from src.storage.base import ReadingBatch
+from src.streaming.filters import (
+    FilterRule, IngestFilter, step_series, time_weighted_average
+)
+
+def reference_keep(values, seconds, deadband, max_interval):
+    """Sequential deadband decision for one sensor."""
+    keep, last_value, last_time = [], None, None
+    for value, t in zip(values, seconds):
+        kept = (last_time is None or abs(value - last_value) > deadband
+                or t - last_time >= max_interval)
+        if kept:
+            last_value, last_time = value, t
+        keep.append(kept)
+    return keep
+
+def test_deadband_drops_small_changes():
+    """Test only readings past the deadband from the last stored value are kept."""
+    ingest = IngestFilter({'temperature': FilterRule(deadband=0.5, max_interval=3600)})
+    batch = make_batch('temperature', {'temp_sensor_1': [20.0, 20.2, 20.4, 20.6, 20.3, 19.9]})
+    assert ingest.keep_mask(batch).tolist() == [True, False, False, True, False, True]
+    assert ingest.kept == 3 and ingest.reduction() == pytest.approx(0.5)
+
+def test_max_interval_forces_heartbeat():
+    """Test a flat sensor is stored again once max_interval has passed."""
+    ingest = IngestFilter({'temperature': FilterRule(deadband=0.5, max_interval=2)})
+    batch = make_batch('temperature', {'temp_sensor_1': [20.0] * 6})
+    assert ingest.keep_mask(batch).tolist() == [True, False, True, False, True, False]
+
+def test_motion_stores_transitions_only():
+    """Test transition mode keeps only changes of the boolean value."""
+    rule = FilterRule.from_config({'mode': 'transition', 'max_interval_seconds': 3600})
+    ingest = IngestFilter({'motion': rule})
+    batch = make_batch('motion', {'motion_sensor_1': [False, False, True, True, True, False]})
+    stored = ingest.filter(batch)
+    assert stored.values.tolist() == [False, True, False]
+
+def test_state_carries_across_batches_and_matches_reference():
+    """Test interleaved sensors split over batches match a sequential filter."""
+    rng = np.random.default_rng(3)
+    walks = {f'temp_sensor_{i}': list(20 + np.cumsum(rng.uniform(-0.5, 0.5, 200))) for i in range(4)}
+    ingest = IngestFilter({'temperature': FilterRule(deadband=0.4, max_interval=10)})
+    masks = {sensor_id: [] for sensor_id in walks}
+    for start in range(0, 200, 50):
+        batch = make_batch('temperature', {s: v[start:start + 50] for s, v in walks.items()}, start=start)
+        # Shuffle so the filter has to order readings itself
+        batch = batch.take(rng.permutation(len(batch)))
+        mask = ingest.keep_mask(batch)
+        for sensor_id in walks:
+            of_sensor = np.flatnonzero(batch.sensor_ids == sensor_id)
+            in_time = of_sensor[np.argsort(batch.timestamps[of_sensor])]
+            masks[sensor_id].extend(mask[in_time].tolist())
+    for sensor_id, values in walks.items():
+        assert masks[sensor_id] == reference_keep(values, range(200), 0.4, 10)
+
+def test_filter_readings_preserves_order_and_passes_unknown_types():
+    """Test reading dicts keep their order and types without a rule pass through."""
+    ingest = IngestFilter({'temperature': FilterRule(deadband=1.0, max_interval=3600)})
+    readings = [
+        {'sensor_id': 'temp_sensor_1', 'timestamp': BASE_TIME, 'value': 20.0},
+        {'sensor_id': 'humidity_sensor_1', 'timestamp': BASE_TIME, 'value': 50.0},
+        {'sensor_id': 'temp_sensor_1', 'timestamp': BASE_TIME + timedelta(seconds=1), 'value': 20.5},
+        {'sensor_id': 'humidity_sensor_1', 'timestamp': BASE_TIME + timedelta(seconds=1), 'value': 50.1},
+    ]
+    assert ingest.filter_readings(readings) == [readings[0], readings[1], readings[3]]
+
+def test_filter_readings_resolves_types_with_type_func():
+    """Test reading types come from the given lookup rather than the id."""
+    types = {'kitchen_probe': 'temperature'}
+    ingest = IngestFilter({'temperature': FilterRule(deadband=1.0, max_interval=3600)}, type_func=types.get)
+    readings = [
+        {'sensor_id': 'kitchen_probe', 'timestamp': BASE_TIME, 'value': 20.0},
+        {'sensor_id': 'kitchen_probe', 'timestamp': BASE_TIME + timedelta(seconds=1), 'value': 20.5},
+    ]
+    assert ingest.filter_readings(readings) == [readings[0]]
+
+def test_step_series_reconstructs_filtered_readings():
+    """Test resampling the stored rows gives back the raw series within the deadband."""
+    rng = np.random.default_rng(5)
+    values = list(20 + np.cumsum(rng.uniform(-0.5, 0.5, 120)))
+    raw = make_batch('temperature', {'temp_sensor_1': values})
+    ingest = IngestFilter({'temperature': FilterRule(deadband=0.3, max_interval=30)})
+    stored = ingest.filter(raw)
+    assert len(stored) < len(raw)
+
+    grid, rebuilt = step_series(stored, BASE_TIME, BASE_TIME + timedelta(seconds=120),
+                                timedelta(seconds=1))['temp_sensor_1']
+    assert len(grid) == 120
+    assert np.all(np.abs(rebuilt - np.array(values)) <= 0.3)
+
+def test_step_series_before_first_value_is_nan():
+    """Test grid points before a sensor's first stored reading are NaN."""
+    stored = make_batch('temperature', {'temp_sensor_1': [21.0, 22.0]}, start=2)
+    _, rebuilt = step_series(stored, BASE_TIME, BASE_TIME + timedelta(seconds=5),
+                             timedelta(seconds=1))['temp_sensor_1']
+    assert np.isnan(rebuilt[:2]).all()
+    assert rebuilt[2:].tolist() == [21.0, 22.0, 22.0]
+
+def test_time_weighted_average_of_motion():
+    """Test the motion share counts the value carried in from before the range."""
+    stored = ReadingBatch.from_columns(
+        'motion', ['motion_sensor_1'] * 3,
+        [BASE_TIME, BASE_TIME + timedelta(seconds=30), BASE_TIME + timedelta(seconds=45)],
+        [True, False, True]
+    )
+    averages = time_weighted_average(stored, BASE_TIME + timedelta(seconds=10),
+                                     BASE_TIME + timedelta(seconds=60))
+    # True for 20s, False for 15s, True for 15s
+    assert averages['motion_sensor_1'] == pytest.approx(35 / 50)
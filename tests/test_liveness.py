@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from src.monitoring.liveness import LivenessTracker
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+
+def at(seconds):
+    return BASE_TIME + timedelta(seconds=seconds)
+
+def touch(tracker, sensor_ids, seconds):
+    """Report one reading per sensor at BASE_TIME + seconds."""
+    return tracker.touch(sensor_ids, np.array([at(seconds)] * len(sensor_ids), dtype='datetime64[us]'))
+
+def test_silent_sensor_becomes_stale():
+    """Test only sensors silent for longer than their timeout expire."""
+    tracker = LivenessTracker({'temperature': 10, 'motion': 30})
+    tracker.advance(at(0))
+    touch(tracker, ['temp_sensor_1', 'temp_sensor_2', 'motion_sensor_1'], 0)
+
+    for second in range(1, 10):
+        touch(tracker, ['temp_sensor_1'], second)
+        assert not tracker.advance(at(second))
+
+    changes = tracker.advance(at(12))
+    assert changes.stale_ids == ['temp_sensor_2']
+    assert changes.stale_last_seen == [at(0)]
+    assert tracker.advance(at(25)).stale_ids == ['temp_sensor_1']
+    assert tracker.advance(at(31)).stale_ids == ['motion_sensor_1']
+    assert sorted(tracker.stale_sensors()) == ['motion_sensor_1', 'temp_sensor_1', 'temp_sensor_2']
+    assert tracker.stale_count == 3
+
+def test_stale_sensor_recovers():
+    """Test a stale sensor reporting again is returned as recovered and can expire again."""
+    tracker = LivenessTracker({'humidity': 5})
+    tracker.advance(at(0))
+    touch(tracker, ['humidity_sensor_1'], 0)
+    assert tracker.advance(at(6)).stale_ids == ['humidity_sensor_1']
+    assert tracker.advance(at(20)).stale_ids == []
+
+    changes = touch(tracker, ['humidity_sensor_1'], 21)
+    assert changes.recovered_ids == ['humidity_sensor_1']
+    assert tracker.stale_sensors() == []
+    assert tracker.stale_count == 0
+    assert tracker.advance(at(27)).stale_ids == ['humidity_sensor_1']
+    assert tracker.stale_count == 1
+
+def test_long_pause_checks_each_slot_once():
+    """Test advancing far past the wheel size still finds every expired sensor."""
+    tracker = LivenessTracker({}, default_timeout=3)
+    tracker.advance(at(0))
+    sensors = [f'temp_sensor_{i}' for i in range(1000)]
+    touch(tracker, sensors, 0)
+    changes = tracker.advance(at(3600))
+    assert len(changes.stale_ids) == 1000
+    assert tracker.advance(at(7200)).stale_ids == []
+
+def test_active_sensors_are_not_rescanned():
+    """Test sensors reporting on time are only revisited when their slot comes due."""
+    tracker = LivenessTracker({}, default_timeout=60)
+    tracker.advance(at(0))
+    sensors = [f'temp_sensor_{i}' for i in range(100)]
+    for second in range(0, 59):
+        touch(tracker, sensors, second)
+        tracker.advance(at(second))
+    # One wheel entry per sensor, however often it reported
+    assert sum(len(keys) for slot in tracker._slots for keys in slot) == 100
@@ -0,0 +1,91 @@
+import pytest
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+from src.streaming.locations import LocationAggregator, SCOPE_HOME, SCOPE_LOCATION
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+LOCATIONS = {
+    'temp_sensor_1': 'Kitchen',
+    'temp_sensor_2': 'Kitchen',
+    'temp_sensor_3': 'Office'
+}
+
+def make_batch(rows, sensor_type='temperature'):
+    """Build a batch from (sensor_id, seconds after BASE_TIME, value) rows."""
+    return ReadingBatch.from_columns(
+        sensor_type,
+        [row[0] for row in rows],
+        [BASE_TIME + timedelta(seconds=row[1]) for row in rows],
+        [row[2] for row in rows]
+    )
+
+def by_location(aggregates):
+    return {(a.scope, a.location, a.window_start): a for a in aggregates}
+
+def test_windows_roll_up_per_location_and_home():
+    """Test closed windows hold count, avg, min and max per location and for the home."""
+    aggregator = LocationAggregator(LOCATIONS, home='Home', window_seconds=60, allowed_lateness=0)
+    assert aggregator.process(make_batch([
+        ('temp_sensor_1', 0, 20.0), ('temp_sensor_2', 10, 22.0), ('temp_sensor_3', 20, 25.0),
+        ('temp_sensor_1', 30, 21.0)
+    ])) == []
+    closed = by_location(aggregator.process(make_batch([('temp_sensor_3', 60, 24.0)])))
+    assert set(closed) == {
+        (SCOPE_LOCATION, 'Kitchen', BASE_TIME), (SCOPE_LOCATION, 'Office', BASE_TIME),
+        (SCOPE_HOME, 'Home', BASE_TIME)
+    }
+    kitchen = closed[(SCOPE_LOCATION, 'Kitchen', BASE_TIME)]
+    assert (kitchen.count, kitchen.min, kitchen.max) == (3, 20.0, 22.0)
+    assert kitchen.avg == pytest.approx(21.0)
+    home = closed[(SCOPE_HOME, 'Home', BASE_TIME)]
+    assert (home.count, home.sum) == (4, 88.0)
+    assert home.window_end == BASE_TIME + timedelta(minutes=1)
+
+def test_open_window_accumulates_across_batches():
+    """Test readings of one window from several batches are combined."""
+    aggregator = LocationAggregator(LOCATIONS, window_seconds=60, allowed_lateness=30)
+    aggregator.process(make_batch([('temp_sensor_3', 0, 20.0)]))
+    aggregator.process(make_batch([('temp_sensor_3', 59, 30.0)]))
+    # Still within the allowed lateness
+    assert aggregator.process(make_batch([('temp_sensor_3', 80, 10.0)])) == []
+    closed = by_location(aggregator.process(make_batch([('temp_sensor_3', 95, 10.0)])))
+    office = closed[(SCOPE_LOCATION, 'Office', BASE_TIME)]
+    assert (office.count, office.min, office.max) == (2, 20.0, 30.0)
+
+def test_room_named_like_the_home_stays_a_location():
+    """Test a room sharing the home's name is rolled up apart from the home."""
+    aggregator = LocationAggregator({'temp_sensor_1': 'home', 'temp_sensor_3': 'Office'},
+                                    window_seconds=60, allowed_lateness=0)
+    aggregator.process(make_batch([('temp_sensor_1', 0, 20.0), ('temp_sensor_3', 0, 24.0)]))
+    closed = by_location(aggregator.flush())
+    assert closed[(SCOPE_LOCATION, 'home', BASE_TIME)].count == 1
+    assert closed[(SCOPE_HOME, 'home', BASE_TIME)].count == 2
+
+def test_unmapped_sensors_are_counted_not_aggregated():
+    """Test readings of sensors without a location are skipped."""
+    aggregator = LocationAggregator(LOCATIONS, window_seconds=60, allowed_lateness=0)
+    aggregator.process(make_batch([('temp_sensor_9', 0, 20.0), ('temp_sensor_1', 0, 21.0)]))
+    closed = aggregator.flush()
+    assert aggregator.unmapped == 1
+    assert sorted((a.location, a.count) for a in closed) == [('Kitchen', 1), ('home', 1)]
+
+def test_learn_locations_from_readings_keeps_known_mapping():
+    """Test reading dicts fill in unknown sensors without overriding known ones."""
+    aggregator = LocationAggregator({'temp_sensor_1': 'Kitchen'})
+    aggregator.learn_locations([
+        {'sensor_id': 'temp_sensor_1', 'location': 'room_1'},
+        {'sensor_id': 'motion_sensor_2', 'location': 'room_2'}
+    ])
+    assert aggregator.location_of('temp_sensor_1') == 'Kitchen'
+    assert aggregator.location_of('motion_sensor_2') == 'room_2'
+    assert aggregator.location_of('humidity_sensor_1') is None
+
+def test_motion_average_is_activity_share():
+    """Test motion windows average to the share of detections."""
+    aggregator = LocationAggregator({'motion_sensor_1': 'Hall'}, window_seconds=60)
+    aggregator.process(make_batch([
+        ('motion_sensor_1', 0, True), ('motion_sensor_1', 1, False),
+        ('motion_sensor_1', 2, True), ('motion_sensor_1', 3, True)
+    ], 'motion'))
+    hall = by_location(aggregator.flush())[(SCOPE_LOCATION, 'Hall', BASE_TIME)]
+    assert hall.sensor_type == 'motion' and hall.avg == 0.75
@@ -0,0 +1,137 @@
+import pytest
+from datetime import datetime, timedelta
+from conftest import BASE_TIME, make_batch
+from src.storage.base import ReadingBatch
+from src.streaming import occupancy
+from src.streaming.occupancy import OccupancyInterval, OccupancySessionizer, OccupancyStore
+
+def at(seconds):
+    return BASE_TIME + timedelta(seconds=seconds)
+
+def test_interval_closes_after_merge_gap():
+    """Test a run of detections becomes one interval once the merge gap passes."""
+    sessionizer = OccupancySessionizer(merge_gap=2, idle_timeout=600)
+    intervals = sessionizer.process(make_batch('motion', {'motion_sensor_1': [0, 1, 1, 1, 0, 0, 0, 0]}))
+    assert [(i.start, i.end) for i in intervals] == [(at(1), at(4))]
+    assert intervals[0].duration == 3.0
+    assert sessionizer.open_intervals() == {}
+
+def test_short_gap_merges_intervals():
+    """Test detections separated by less than the merge gap form one interval."""
+    sessionizer = OccupancySessionizer(merge_gap=3, idle_timeout=600)
+    values = [1, 1, 0, 0, 1, 1, 0, 0, 0, 0, 0]
+    intervals = sessionizer.process(make_batch('motion', {'motion_sensor_1': values}))
+    assert [(i.start, i.end) for i in intervals] == [(at(0), at(6))]
+
+def test_long_gap_splits_intervals():
+    """Test a detection after the merge gap starts a new interval."""
+    sessionizer = OccupancySessionizer(merge_gap=1, idle_timeout=600)
+    values = [1, 0, 0, 0, 1, 0, 0, 0]
+    intervals = sessionizer.process(make_batch('motion', {'motion_sensor_1': values}))
+    assert [(i.start, i.end) for i in intervals] == [(at(0), at(1)), (at(4), at(5))]
+
+def test_interval_spans_batches_and_sensors():
+    """Test open intervals carry over batches independently per sensor."""
+    sessionizer = OccupancySessionizer(merge_gap=1, idle_timeout=600)
+    first = sessionizer.process(make_batch('motion', {
+        'motion_sensor_1': [0, 1, 1],
+        'motion_sensor_2': [1, 1, 1]
+    }))
+    assert first == []
+    assert set(sessionizer.open_intervals()) == {'motion_sensor_1', 'motion_sensor_2'}
+
+    second = sessionizer.process(make_batch('motion', {
+        'motion_sensor_1': [1, 0, 0, 0],
+        'motion_sensor_2': [1, 1, 1, 1]
+    }, start=3))
+    assert [(i.sensor_id, i.start, i.end) for i in second] == [('motion_sensor_1', at(1), at(4))]
+    assert sessionizer.open_intervals() == {'motion_sensor_2': at(0)}
+
+def test_close_idle_ends_interval_at_last_reading():
+    """Test a sensor that goes silent while occupied is closed at its last reading."""
+    sessionizer = OccupancySessionizer(merge_gap=5, idle_timeout=60)
+    sessionizer.process(make_batch('motion', {'motion_sensor_1': [1, 1, 1]}))
+    assert sessionizer.close_idle(at(30)) == []
+    intervals = sessionizer.close_idle(at(120))
+    assert [(i.start, i.end) for i in intervals] == [(at(0), at(2))]
+    assert sessionizer.open_intervals() == {}
+
+def test_other_sensor_types_are_ignored():
+    """Test non-motion batches produce no intervals."""
+    sessionizer = OccupancySessionizer()
+    batch = ReadingBatch.from_columns('temperature', ['temp_sensor_1'], [BASE_TIME], [21.0])
+    assert sessionizer.process(batch) == []
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.queries.append((' '.join(query.split()), params))
+
+class FakeConnection:
+    def __init__(self):
+        self.queries = []
+        self.inserted = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+@pytest.fixture
+def store(monkeypatch):
+    conn = FakeConnection()
+    next_id = iter(range(1, 100))
+
+    def fake_execute_values(cur, query, rows, fetch=False):
+        conn.inserted.append(rows)
+        return [(next(next_id),) for _ in rows] if fetch else None
+
+    monkeypatch.setattr(occupancy.psycopg2, 'connect', lambda **kwargs: conn)
+    monkeypatch.setattr(occupancy, 'execute_values', fake_execute_values)
+    return OccupancyStore({})
+
+def test_store_replaces_open_rows(store):
+    """Test each store swaps the previous open rows for the current ones in one transaction."""
+    conn = store.conn
+    store.store_intervals([], {'motion_sensor_1': at(0)}, at(60))
+    assert conn.queries == [("DELETE FROM occupancy_intervals WHERE is_open", None)]
+    assert conn.inserted == [[('motion_sensor_1', at(0), at(60), 60.0, True)]]
+    assert store.open_ids == [1]
+
+    closed = OccupancyInterval('motion_sensor_1', at(0), at(90))
+    assert store.store_intervals([closed], {}, at(120)) == 1
+    assert conn.queries[-1] == ("DELETE FROM occupancy_intervals WHERE id = ANY(%s)", ([1],))
+    assert conn.inserted[-1] == [('motion_sensor_1', at(0), at(90), 90.0, False)]
+    assert store.open_ids == []
+    assert conn.commits == 2
+
+    # Nothing open and nothing stored since: no delete needed
+    store.store_intervals([], {}, at(180))
+    assert len(conn.queries) == 2
+
+def test_store_keeps_open_ids_on_failure(store, monkeypatch):
+    """Test a failed store rolls back and leaves the tracked open rows unchanged."""
+    store.store_intervals([], {'motion_sensor_1': at(0)}, at(60))
+
+    def failing_execute_values(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(occupancy, 'execute_values', failing_execute_values)
+    with pytest.raises(RuntimeError):
+        store.store_intervals([], {'motion_sensor_1': at(0)}, at(120))
+    assert store.conn.rollbacks == 1
+    assert store.open_ids == [1]
@@ -0,0 +1,189 @@
+import pytest
+from datetime import datetime, timedelta
+from src.processors.ingest import PreparedInserts, merge_staging, prepare_statement
+from src.storage.base import ReadingBatch
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        if self.conn.fail_on and self.conn.fail_on in query:
+            raise RuntimeError("statement failed")
+        query = ' '.join(query.split())
+        self.conn.statements.append((query, params))
+        # Results are looked up by a fragment of the statement
+        self.result = next((result for fragment, result in self.conn.results.items() if fragment in query), None)
+        self.rowcount = self.result if isinstance(self.result, int) else 0
+
+    def fetchone(self):
+        return self.result
+
+    def fetchall(self):
+        return self.result
+
+    def copy_expert(self, statement, buffer):
+        self.conn.statements.append((statement, buffer.read()))
+
+class FakeConnection:
+    def __init__(self, fail_on=None, results=None):
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail_on = fail_on
+        self.results = results or {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def make_batch(sensor_type, sensor_ids, values):
+    timestamps = [BASE_TIME + timedelta(seconds=i) for i in range(len(values))]
+    return ReadingBatch.from_columns(sensor_type, sensor_ids, timestamps, values)
+
+def test_batch_is_one_execute_of_array_parameters():
+    """Test a batch is sent as one EXECUTE with sensor ids, timestamps and values as lists."""
+    conn = FakeConnection()
+    inserts = PreparedInserts(conn)
+    assert inserts.write_batch(make_batch('temperature', ['temp_sensor_1', 'temp_sensor_2'], [21.5, 22.0])) == 2
+    prepare, execute = conn.statements
+    assert prepare[0].startswith('PREPARE insert_temperature_readings (text[], timestamp[], float8[])')
+    assert execute == ('EXECUTE insert_temperature_readings (%s, %s, %s)', (
+        ['temp_sensor_1', 'temp_sensor_2'],
+        [BASE_TIME, BASE_TIME + timedelta(seconds=1)],
+        [21.5, 22.0]
+    ))
+    assert conn.commits == 1
+
+def test_statements_are_prepared_once_per_connection():
+    """Test later batches reuse the session's prepared statement."""
+    conn = FakeConnection()
+    inserts = PreparedInserts(conn)
+    for _ in range(3):
+        inserts.write_batch(make_batch('motion', ['motion_sensor_1'], [True]))
+    inserts.write_batch(make_batch('humidity', ['humidity_sensor_1'], [45.0]))
+    prepares = [query for query, _ in conn.statements if query.startswith('PREPARE')]
+    assert len(prepares) == 2
+    assert PreparedInserts(FakeConnection()).prepared == set()
+
+def test_motion_values_are_booleans():
+    """Test motion batches bind a boolean array into the detected column."""
+    assert 'boolean[]' in prepare_statement('motion')
+    assert 'INSERT INTO motion_events (sensor_id, timestamp, detected)' in ' '.join(prepare_statement('motion').split())
+    conn = FakeConnection()
+    PreparedInserts(conn).write_batch(make_batch('motion', ['motion_sensor_1', 'motion_sensor_1'], [True, False]))
+    assert conn.statements[-1][1][2] == [True, False]
+
+def test_failed_batch_rolls_back():
+    """Test a failing EXECUTE rolls back and raises."""
+    conn = FakeConnection(fail_on='EXECUTE')
+    with pytest.raises(RuntimeError):
+        PreparedInserts(conn).write_batch(make_batch('temperature', ['temp_sensor_1'], [21.0]))
+    assert conn.rollbacks == 1 and conn.commits == 0
+
+def test_empty_batch_sends_nothing():
+    """Test an empty batch makes no round trip."""
+    conn = FakeConnection()
+    assert PreparedInserts(conn).write_batch(ReadingBatch.empty('humidity')) == 0
+    assert conn.statements == []
+
+def test_relaxed_mode_turns_off_synchronous_commit_locally():
+    """Test relaxed batches set synchronous_commit off for their transaction only."""
+    conn = FakeConnection()
+    inserts = PreparedInserts(conn, {'motion': 'relaxed'})
+    inserts.write_batch(make_batch('motion', ['motion_sensor_1'], [True]))
+    inserts.write_batch(make_batch('temperature', ['temp_sensor_1'], [21.0]))
+    executes = [query for query, _ in conn.statements if 'EXECUTE' in query]
+    assert executes[0] == ('SET LOCAL synchronous_commit TO OFF; '
+                           'EXECUTE insert_motion_events (%s, %s, %s)')
+    assert executes[1] == 'EXECUTE insert_temperature_readings (%s, %s, %s)'
+
+def test_staged_mode_copies_into_staging_table():
+    """Test staged batches are COPYed as CSV into the unlogged staging table with relaxed commits."""
+    conn = FakeConnection()
+    PreparedInserts(conn, {'humidity': 'staged'}).write_batch(
+        make_batch('humidity', ['humidity_sensor_1', 'humidity_sensor_2'], [45.0, 46.5]))
+    relax, (copy, data) = conn.statements
+    assert relax[0] == 'SET LOCAL synchronous_commit TO OFF'
+    assert copy == 'COPY humidity_readings_staging (sensor_id, timestamp, value) FROM STDIN WITH (FORMAT csv)'
+    assert data == (b'"humidity_sensor_1",2024-05-01 12:00:00.000000,45\n'
+                    b'"humidity_sensor_2",2024-05-01 12:00:01.000000,46.5\n')
+    assert conn.commits == 1
+
+PARTITION_ROWS = [
+    ('motion_events_p2024_04', "FOR VALUES FROM ('2024-04-01 00:00:00') TO ('2024-05-01 00:00:00')"),
+    ('motion_events_p2024_05', "FOR VALUES FROM ('2024-05-01 00:00:00') TO ('2024-06-01 00:00:00')"),
+    ('motion_events_p2024_06', "FOR VALUES FROM ('2024-06-01 00:00:00') TO ('2024-07-01 00:00:00')")
+]
+
+def test_merge_inserts_sorted_deduplicated_rows_per_partition():
+    """Test staged rows go straight into the overlapping partitions, then staging is truncated."""
+    conn = FakeConnection(results={
+        'SELECT COUNT(*), MIN(timestamp)': (10, datetime(2024, 4, 30, 23, 59), datetime(2024, 5, 1, 0, 1)),
+        'pg_inherits': PARTITION_ROWS,
+        'INSERT INTO motion_events_p2024_04': 3,
+        'INSERT INTO motion_events_p2024_05': 5,
+        'COUNT(*) FILTER': (0, 0)
+    })
+    merged = PreparedInserts(conn, {'motion': 'staged', 'temperature': 'relaxed'}).merge_staged()
+    assert merged == {'motion': 8}
+    queries = [query for query, _ in conn.statements]
+    assert queries[0] == 'LOCK TABLE motion_events_staging IN EXCLUSIVE MODE'
+    inserts = [query for query in queries if query.startswith('INSERT')]
+    assert [query.split()[2] for query in inserts] == ['motion_events_p2024_04', 'motion_events_p2024_05']
+    assert 'DISTINCT ON (s.sensor_id, s.timestamp)' in inserts[0]
+    assert inserts[0].endswith('ORDER BY s.sensor_id, s.timestamp')
+    assert queries[-1] == 'TRUNCATE motion_events_staging'
+    assert conn.commits == 1
+
+def test_merge_keeps_rows_without_partition_staged():
+    """Test rows outside every partition stay in staging instead of being truncated."""
+    conn = FakeConnection(results={
+        'SELECT COUNT(*), MIN(timestamp)': (4, datetime(2024, 6, 30, 23), datetime(2024, 7, 1, 1)),
+        'pg_inherits': PARTITION_ROWS,
+        'INSERT INTO motion_events_p2024_06': 2,
+        'COUNT(*) FILTER': (2, 0)
+    })
+    assert merge_staging(conn, 'motion') == 2
+    queries = [query for query, _ in conn.statements]
+    assert 'TRUNCATE motion_events_staging' not in queries
+    delete, params = conn.statements[-1]
+    assert delete.startswith('DELETE FROM motion_events_staging s WHERE')
+    assert params == [datetime(2024, 6, 1), datetime(2024, 7, 1)]
+
+def test_merge_keeps_rows_of_unregistered_sensors_staged():
+    """Test readings of sensors missing from sensors are left staged rather than truncated."""
+    conn = FakeConnection(results={
+        'SELECT COUNT(*), MIN(timestamp)': (5, datetime(2024, 6, 2), datetime(2024, 6, 3)),
+        'pg_inherits': PARTITION_ROWS,
+        'INSERT INTO motion_events_p2024_06': 3,
+        'COUNT(*) FILTER': (0, 2)
+    })
+    assert merge_staging(conn, 'motion') == 3
+    delete, _ = conn.statements[-1]
+    assert 'TRUNCATE motion_events_staging' not in [query for query, _ in conn.statements]
+    assert delete.endswith('AND EXISTS (SELECT 1 FROM sensors r WHERE r.sensor_id = s.sensor_id)')
+
+def test_merge_of_empty_staging_does_nothing():
+    """Test an empty staging table is left alone."""
+    conn = FakeConnection(results={'SELECT COUNT(*), MIN(timestamp)': (0, None, None)})
+    assert merge_staging(conn, 'temperature') == 0
+    assert len(conn.statements) == 2 and conn.commits == 1
+
+def test_unknown_durability_mode_is_rejected():
+    """Test a misspelled durability mode fails early."""
+    with pytest.raises(ValueError):
+        PreparedInserts(FakeConnection(), {'motion': 'async'})
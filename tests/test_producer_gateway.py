@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+from src.transport.codec import TopicCodec
+from src.transport.memory import InMemoryBroker, InMemoryConsumer, InMemoryProducer
+from src.transport.producer import SensorGateway, key_groups
+
+TOPICS = {'temperature': 'temperature_data', 'humidity': 'humidity_data', 'motion': 'motion_data'}
+
+def make_batch(sensor_type, num_sensors=6, per_sensor=5):
+    """Build a batch with interleaved readings of several sensors."""
+    base_time = datetime(2024, 5, 1, 12, 0)
+    ids, timestamps, values = [], [], []
+    for i in range(per_sensor):
+        for s in range(num_sensors):
+            ids.append(f"{sensor_type}_sensor_{s}")
+            timestamps.append(base_time + timedelta(seconds=i))
+            values.append(float(i))
+    return ReadingBatch.from_columns(sensor_type, ids, timestamps, values)
+
+def consume_all(broker, group_id='test'):
+    """Drain every sensor topic from the beginning."""
+    consumer = InMemoryConsumer(broker, {'group.id': group_id, 'auto.offset.reset': 'earliest'})
+    consumer.subscribe(list(TOPICS.values()))
+    messages = []
+    while True:
+        batch = consumer.consume(100, 0)
+        if not batch:
+            return messages
+        messages.extend(batch)
+
+@pytest.mark.parametrize('encoding', ['json', 'binary'])
+def test_gateway_keys_sensors_to_one_partition(encoding):
+    """Test every reading of a sensor lands on a single partition in order."""
+    broker = InMemoryBroker(num_partitions=4)
+    codec = TopicCodec({'temperature': encoding}, TOPICS)
+    gateway = SensorGateway(InMemoryProducer(broker), codec, TOPICS, frame_key_groups=3)
+    batch = make_batch('temperature')
+    gateway.publish_batch(batch)
+    gateway.close()
+
+    partitions_by_sensor = {}
+    for msg in consume_all(broker):
+        decoded = codec.decode(msg.topic(), [msg.value()])['temperature']
+        for sensor_id in set(decoded.sensor_ids):
+            partitions_by_sensor.setdefault(sensor_id, set()).add(msg.partition())
+            timestamps = decoded.timestamps[decoded.sensor_ids == sensor_id]
+            assert (timestamps[1:] >= timestamps[:-1]).all()
+    assert len(partitions_by_sensor) == 6
+    assert all(len(partitions) == 1 for partitions in partitions_by_sensor.values())
+
+    stats = gateway.stats()
+    assert stats.readings_sent == len(batch)
+    assert stats.messages_delivered == stats.messages_sent
+    assert stats.messages_pending == 0
+
+def test_gateway_retries_when_local_queue_is_full():
+    """Test BufferError from the producer is retried after serving deliveries."""
+    broker = InMemoryBroker()
+    producer = InMemoryProducer(broker, {'queue.buffering.max.messages': 4})
+    gateway = SensorGateway(producer, TopicCodec({}, TOPICS), TOPICS)
+    gateway.publish_batch(make_batch('humidity', num_sensors=2, per_sensor=5))
+    gateway.close()
+
+    stats = gateway.stats()
+    assert stats.buffer_full_waits > 0
+    assert stats.messages_delivered == 10
+    assert len(consume_all(broker)) == 10
+
+def test_gateway_publishes_simulator_readings():
+    """Test reading dicts are routed to the topic of their sensor type."""
+    broker = InMemoryBroker()
+    gateway = SensorGateway(InMemoryProducer(broker), TopicCodec({}, TOPICS), TOPICS)
+    readings = [
+        {'sensor_id': 'temp_sensor_1', 'timestamp': datetime(2024, 5, 1), 'value': 21.5},
+        {'sensor_id': 'motion_sensor_1', 'timestamp': datetime(2024, 5, 1), 'value': True}
+    ]
+    assert gateway.publish_readings(readings) == 2
+    assert sorted(msg.topic() for msg in consume_all(broker)) == ['motion_data', 'temperature_data']
+
+def test_consumer_resumes_from_committed_offsets():
+    """Test a consumer group continues where its last commit left off."""
+    broker = InMemoryBroker(num_partitions=2)
+    producer = InMemoryProducer(broker)
+    for i in range(10):
+        producer.produce('temperature_data', value=b'x', key=f"sensor_{i}")
+
+    first = InMemoryConsumer(broker, {'group.id': 'g', 'auto.offset.reset': 'earliest'})
+    first.subscribe(['temperature_data'])
+    assert len(first.consume(4, 0)) == 4
+    first.close()
+
+    second = InMemoryConsumer(broker, {'group.id': 'g', 'auto.offset.reset': 'earliest'})
+    second.subscribe(['temperature_data'])
+    assert len(second.consume(100, 0)) == 6
+
+def test_key_groups_are_stable():
+    """Test key groups depend only on the sensor id."""
+    first = make_batch('motion').sensor_ids
+    groups = key_groups(first, 5)
+    assert ((groups >= 0) & (groups < 5)).all()
+    assert (key_groups(first[::-1], 5) == groups[::-1]).all()
@@ -0,0 +1,151 @@
+import queue
+from datetime import datetime
+from database.setup import setup_db
+from database.setup.setup_db import (
+    build_index, build_indexes, create_schema, index_jobs, load_sensor_inventory, month_starts
+)
+
+class FakeCursor:
+    def __init__(self, results=None):
+        self.statements = []
+        self.copies = []
+        # Results are looked up by a fragment of the statement
+        self.results = results or {}
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        query = ' '.join(query.split())
+        self.statements.append((query, params))
+        result = next((result for fragment, result in self.results.items() if fragment in query), None)
+        self.result = result(params) if callable(result) else result
+
+    def fetchone(self):
+        return self.result
+
+    def fetchall(self):
+        return self.result
+
+    def copy_expert(self, statement, source):
+        self.copies.append((statement, source.read()))
+        self.rowcount = 2
+
+def test_month_starts_cross_year_boundaries():
+    """Test partition months roll over into the next year."""
+    assert month_starts(datetime(2024, 11, 17, 8, 30), 3) == [
+        datetime(2024, 11, 1), datetime(2024, 12, 1), datetime(2025, 1, 1)
+    ]
+
+def test_schema_only_creates_what_is_missing():
+    """Test provisioning never drops and creates tables, partitions and parent indexes idempotently."""
+    cursor = FakeCursor()
+    create_schema(cursor, datetime(2024, 5, 10), 2)
+    queries = [query for query, _ in cursor.statements]
+    assert not any('DROP' in query for query in queries)
+    creates = [query for query in queries if query.startswith('CREATE')]
+    assert all('IF NOT EXISTS' in query for query in creates)
+    assert 'CREATE TABLE IF NOT EXISTS temperature_readings_p2024_06 PARTITION OF temperature_readings' in \
+        ' '.join(queries)
+    assert 'CREATE INDEX IF NOT EXISTS idx_temp_sensor_timestamp ON ONLY temperature_readings(sensor_id, timestamp)' in queries
+    assert not any('ON ONLY sensor_analytics' in query for query in queries)
+
+def test_inventory_is_copied_and_merged_in_one_statement(tmp_path):
+    """Test an inventory file is COPYed into a temporary table and upserted without per-row inserts."""
+    inventory = tmp_path / 'sensors.csv'
+    inventory.write_text("sensor_id,type,location\nhome_9_temp,temperature,Attic\nhome_9_motion,motion,Hall\n")
+    cursor = FakeCursor()
+    assert load_sensor_inventory(cursor, str(inventory)) == 2
+    (copy, data), = cursor.copies
+    assert copy.startswith('COPY sensor_inventory (sensor_id, type, location) FROM STDIN')
+    assert 'home_9_motion,motion,Hall' in data
+    inserts = [query for query, _ in cursor.statements if query.startswith('INSERT')]
+    assert len(inserts) == 1
+    assert 'SELECT DISTINCT ON (sensor_id)' in inserts[0] and 'ON CONFLICT (sensor_id) DO UPDATE' in inserts[0]
+
+def test_initial_sensors_are_the_default_inventory():
+    """Test the built-in sensors are loaded through the same COPY."""
+    cursor = FakeCursor()
+    load_sensor_inventory(cursor)
+    (_, data), = cursor.copies
+    lines = data.splitlines()
+    assert lines[0] == 'sensor_id,type,location'
+    assert lines[1] == 'temp_sensor_1,temperature,Living Room'
+
+def test_index_jobs_cover_unattached_partitions_and_missing_indexes():
+    """Test a job is planned per partition lacking its index and per missing plain index."""
+    def partitions(params):
+        table, _ = params
+        return [(f"{table}_p2024_06",)] if table == 'temperature_readings' else []
+
+    cursor = FakeCursor({
+        'FROM pg_inherits': partitions,
+        "to_regclass(%s) AND indisvalid": None
+    })
+    jobs = index_jobs(cursor)
+    assert jobs[0] == (
+        'idx_temp_sensor_timestamp_p2024_06',
+        'CREATE INDEX CONCURRENTLY idx_temp_sensor_timestamp_p2024_06 ON temperature_readings_p2024_06 (sensor_id, timestamp)',
+        'idx_temp_sensor_timestamp'
+    )
+    assert ('idx_analytics_sensor_metric',
+            'CREATE INDEX CONCURRENTLY idx_analytics_sensor_metric ON sensor_analytics(sensor_id, metric_name, window_start)',
+            None) in jobs
+    # Backfill deletes by metric and window across sensors
+    assert ('idx_analytics_metric_window',
+            'CREATE INDEX CONCURRENTLY idx_analytics_metric_window ON sensor_analytics(metric_name, window_start)',
+            None) in jobs
+    assert not any(name.startswith('idx_humidity') for name, _, _ in jobs)
+
+def test_invalid_index_is_dropped_and_rebuilt_then_attached():
+    """Test an index left invalid by an interrupted build is rebuilt before attaching."""
+    cursor = FakeCursor({'SELECT indisvalid': (False,)})
+    build_index(cursor, 'idx_p', 'CREATE INDEX CONCURRENTLY idx_p ON t_p (a)', 'idx')
+    assert [query for query, _ in cursor.statements[1:]] == [
+        'DROP INDEX CONCURRENTLY idx_p',
+        'CREATE INDEX CONCURRENTLY idx_p ON t_p (a)',
+        'ALTER INDEX idx ATTACH PARTITION idx_p'
+    ]
+
+def test_valid_index_is_only_attached():
+    """Test a built but unattached partition index is not rebuilt."""
+    cursor = FakeCursor({'SELECT indisvalid': (True,)})
+    build_index(cursor, 'idx_p', 'CREATE INDEX CONCURRENTLY idx_p ON t_p (a)', 'idx')
+    assert [query for query, _ in cursor.statements[1:]] == ['ALTER INDEX idx ATTACH PARTITION idx_p']
+
+def test_index_jobs_are_shared_across_workers(monkeypatch):
+    """Test every job is built exactly once by at most `workers` connections."""
+    built = []
+    started = []
+
+    def fake_worker(pending: queue.Queue):
+        started.append(1)
+        count = 0
+        while True:
+            try:
+                built.append(pending.get_nowait()[0])
+            except queue.Empty:
+                return count
+            count += 1
+
+    monkeypatch.setattr(setup_db, '_index_worker', fake_worker)
+    jobs = [(f"idx_{i}", f"CREATE INDEX CONCURRENTLY idx_{i} ON t (a)", None) for i in range(10)]
+    assert build_indexes(jobs, workers=3) == 10
+    assert sorted(built) == sorted(name for name, _, _ in jobs)
+    assert len(started) == 3
+    assert build_indexes([], workers=3) == 0
+
+def test_schema_adds_columns_missing_from_older_tables():
+    """Test provisioning adds sensor_key to a sensors table created before it existed."""
+    cursor = FakeCursor({'information_schema.columns': None})
+    create_schema(cursor, datetime(2024, 5, 10), 1)
+    queries = [query for query, _ in cursor.statements]
+    assert 'ALTER TABLE sensors ADD COLUMN sensor_key SERIAL UNIQUE' in queries
+
+    cursor = FakeCursor({'information_schema.columns': (1,)})
+    create_schema(cursor, datetime(2024, 5, 10), 1)
+    assert not any(query.startswith('ALTER TABLE sensors') for query, _ in cursor.statements)
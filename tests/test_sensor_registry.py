@@ -0,0 +1,99 @@
+from datetime import datetime
+from src.pipeline.registry import SensorInfo, SensorRegistry
+from src.storage.base import ReadingBatch
+
+NOW = datetime(2024, 5, 1, 12, 0)
+
+class FakeStore:
+    """Sensors table keyed like sensor_key SERIAL."""
+
+    def __init__(self, sensors=()):
+        self.rows = {info.sensor_id: info for info in sensors}
+        self.upserts = []
+
+    def load_sensors(self):
+        return list(self.rows.values())
+
+    def upsert_sensors(self, sensors):
+        self.upserts.append(list(sensors))
+        for sensor_id, sensor_type, location in sensors:
+            if sensor_id not in self.rows:
+                self.rows[sensor_id] = SensorInfo(len(self.rows) + 1, sensor_id, sensor_type, location)
+        return [self.rows[sensor_id] for sensor_id, _, _ in sensors]
+
+def reading(sensor_id, location=None):
+    return {'sensor_id': sensor_id, 'timestamp': NOW, 'value': 21.0, 'location': location}
+
+def test_loaded_sensors_serve_type_key_and_location():
+    """Test registered sensors are looked up without parsing their ids."""
+    store = FakeStore([SensorInfo(7, 'kitchen_probe', 'temperature', 'Kitchen')])
+    registry = SensorRegistry(store)
+    assert registry.sensor_type('kitchen_probe') == 'temperature'
+    assert (registry.key('kitchen_probe'), registry.location('kitchen_probe')) == (7, 'Kitchen')
+    assert registry.locations() == {'kitchen_probe': 'Kitchen'}
+
+def test_unknown_sensors_are_registered_in_one_upsert():
+    """Test each unknown id of a batch is registered once, with its first location."""
+    store = FakeStore([SensorInfo(1, 'temp_sensor_1', 'temperature', 'Living Room')])
+    registry = SensorRegistry(store)
+    registered = registry.register_readings([
+        reading('temp_sensor_1'), reading('temp_sensor_12', 'room_12'),
+        reading('motion_sensor_12', 'room_12'), reading('temp_sensor_12', 'elsewhere')
+    ])
+    assert store.upserts == [[
+        ('temp_sensor_12', 'temperature', 'room_12'),
+        ('motion_sensor_12', 'motion', 'room_12')
+    ]]
+    assert [info.key for info in registered] == [2, 3]
+    assert registry.key('motion_sensor_12') == 3
+    # Known now, so the next batch needs no round trip
+    assert registry.register_readings([reading('temp_sensor_12')]) == []
+    assert len(store.upserts) == 1
+
+def test_ids_of_unknown_type_are_not_registered():
+    """Test readings whose type cannot be inferred are left unregistered."""
+    store = FakeStore()
+    registry = SensorRegistry(store)
+    assert registry.register_readings([reading('pressure_sensor_1')]) == []
+    assert store.upserts == []
+    assert registry.sensor_type('pressure_sensor_1') is None
+
+def test_reading_type_is_used_over_the_id():
+    """Test a reading's type field registers sensors whose id does not name their type."""
+    store = FakeStore()
+    registry = SensorRegistry(store)
+    registry.register_readings([dict(reading('kitchen_probe', 'Kitchen'), type='temperature')])
+    assert store.upserts == [[('kitchen_probe', 'temperature', 'Kitchen')]]
+    assert registry.sensor_type('kitchen_probe') == 'temperature'
+
+def test_unregistered_types_are_inferred_once():
+    """Test an id is parsed once and then served from the cache."""
+    calls = []
+
+    def infer(sensor_id):
+        calls.append(sensor_id)
+        return 'humidity'
+
+    registry = SensorRegistry(infer_type=infer)
+    assert registry.sensor_type('h1') == 'humidity'
+    assert registry.sensor_type('h1') == 'humidity'
+    assert calls == ['h1']
+    assert 'h1' not in registry
+
+def test_registry_without_store_assigns_local_keys():
+    """Test server-less runs still get dense integer keys."""
+    registry = SensorRegistry()
+    registry.register_readings([reading('temp_sensor_1'), reading('humidity_sensor_1')])
+    assert (registry.key('temp_sensor_1'), registry.key('humidity_sensor_1')) == (1, 2)
+    assert registry.unknown(['temp_sensor_1', 'temp_sensor_2', 'temp_sensor_2']) == ['temp_sensor_2']
+
+def test_batches_register_unknown_sensors_with_the_batch_type():
+    """Test a columnar batch registers its unknown ids once, typed by the batch."""
+    store = FakeStore([SensorInfo(1, 'temp_sensor_1', 'temperature', 'Living Room')])
+    registry = SensorRegistry(store)
+    batch = ReadingBatch.from_columns('temperature', ['temp_sensor_1', 'probe_a', 'probe_a'], [NOW] * 3,
+                                      [20.0, 21.0, 22.0])
+    assert [info.sensor_id for info in registry.register_batch(batch)] == ['probe_a']
+    assert store.upserts == [[('probe_a', 'temperature', None)]]
+    assert registry.sensor_type('probe_a') == 'temperature'
+    assert registry.register_batch(batch) == []
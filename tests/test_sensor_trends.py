@@ -0,0 +1,133 @@
+import pytest
+import psycopg2
+import numpy as np
+from datetime import datetime, timedelta
+from src.processors.analytics_processor import AnalyticsProcessor
+
+BASE_HOUR = datetime(2024, 5, 1, 0)
+
+class FakeNamedCursor:
+    """Server-side cursor yielding fixed rows and counting round trips of itersize."""
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+        self.itersize = 2000
+        self.round_trips = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def execute(self, query, params):
+        self.query = query
+        self.position = 0
+        self.buffer = []
+
+    def __iter__(self):
+        # Like psycopg2, the cursor is its own iterator
+        return self
+
+    def __next__(self):
+        if not self.buffer:
+            self.buffer = self.rows[self.position:self.position + self.itersize]
+            self.position += len(self.buffer)
+            if not self.buffer:
+                raise StopIteration
+            self.round_trips += 1
+        return self.buffer.pop(0)
+
+class FakeConnection:
+    def __init__(self, rows_by_table):
+        self.rows_by_table = rows_by_table
+        self.cursors = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        assert name is not None, "trends must use a named cursor"
+        cursor = FakeNamedCursor(name, [])
+        original = cursor.execute
+
+        def execute(query, params):
+            original(query, params)
+            table = next(t for t in self.rows_by_table if f"FROM {t}" in query)
+            cursor.rows = self.rows_by_table[table]
+
+        cursor.execute = execute
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def hourly_rows(sensor_id, hours):
+    return [(sensor_id, BASE_HOUR + timedelta(hours=h), 20.0 + h, 19.0 + h, 21.0 + h) for h in range(hours)]
+
+@pytest.fixture
+def connection():
+    return FakeConnection({
+        'temperature_readings': hourly_rows('temp_sensor_1', 5),
+        'humidity_readings': hourly_rows('humidity_sensor_1', 2),
+        'motion_events': [('motion_sensor_1', BASE_HOUR, 4, 50.0)]
+    })
+
+@pytest.fixture
+def processor(monkeypatch, connection):
+    monkeypatch.setattr(psycopg2, 'connect', lambda **params: connection)
+    return AnalyticsProcessor({})
+
+def test_trend_chunks_stream_through_named_cursor(processor, connection):
+    """Test chunks are bounded by chunk_size and fetched itersize rows at a time."""
+    chunks = list(processor.iter_trend_chunks('temperature', BASE_HOUR, BASE_HOUR + timedelta(days=90),
+                                              chunk_size=2))
+    assert [chunk.num_rows for chunk in chunks] == [2, 2, 1]
+    cursor = connection.cursors[0]
+    assert cursor.itersize == 2 and cursor.round_trips == 3 and cursor.closed
+    assert chunks[0].column('avg').to_pylist() == [20.0, 21.0]
+
+def test_trend_transaction_ends_when_consumer_stops_early(processor, connection):
+    """Test abandoning the chunk stream still closes the cursor and ends the transaction."""
+    chunks = processor.iter_trend_chunks('temperature', BASE_HOUR, BASE_HOUR + timedelta(days=1), chunk_size=2)
+    assert next(chunks).num_rows == 2
+    chunks.close()
+    assert connection.cursors[0].closed
+    assert (connection.commits, connection.rollbacks) == (1, 0)
+
+def test_trend_tables_are_columnar(processor):
+    """Test each sensor type comes back as one table of typed columns."""
+    tables = processor.get_sensor_trend_tables(hours=24, chunk_size=2)
+    temperature = tables['temperature']
+    assert temperature.num_rows == 5
+    np.testing.assert_array_equal(temperature.column('max').to_numpy(), [21.0, 22.0, 23.0, 24.0, 25.0])
+    assert str(temperature.schema.field('hour').type) == 'timestamp[us]'
+    assert tables['motion'].column_names == ['sensor_id', 'hour', 'total_events', 'activity_rate']
+
+def test_named_cursors_are_unique(processor, connection):
+    """Test every streamed query opens its own server-side cursor."""
+    processor.get_sensor_trend_tables()
+    names = [cursor.name for cursor in connection.cursors]
+    assert len(names) == 3 and len(set(names)) == 3
+
+def test_row_trends_keep_their_shape(processor):
+    """Test get_sensor_trends still returns one dict per row."""
+    trends = processor.get_sensor_trends(hours=24)
+    assert trends['motion'] == [{
+        'sensor_id': 'motion_sensor_1',
+        'hour': BASE_HOUR,
+        'total_events': 4,
+        'activity_rate': 50.0
+    }]
+    assert trends['humidity'][1] == {
+        'sensor_id': 'humidity_sensor_1',
+        'hour': BASE_HOUR + timedelta(hours=1),
+        'avg': 21.0,
+        'min': 20.0,
+        'max': 22.0
+    }
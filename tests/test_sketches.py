@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch
+from src.streaming.sketches import (
+    DDSketch, SketchAggregator, fleet_sketches, percentiles_from_sketches
+)
+
+BASE_TIME = datetime(2024, 5, 1, 12, 0)
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+def assert_within_accuracy(sketch, values, accuracy):
+    """Assert every quantile is within the relative accuracy of the exact one."""
+    exact = np.quantile(values, QUANTILES, method='lower')
+    for estimate, truth in zip(sketch.quantiles(QUANTILES), exact):
+        assert abs(estimate - truth) <= accuracy * abs(truth) + 1e-9
+
+def test_quantiles_within_relative_accuracy():
+    """Test estimated quantiles stay within the configured relative error."""
+    values = np.random.default_rng(1).lognormal(3, 1, 20000)
+    sketch = DDSketch(0.01)
+    sketch.add(values)
+    assert len(sketch) == 20000
+    assert_within_accuracy(sketch, values, 0.01)
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+def test_negative_and_zero_values():
+    """Test values below and at zero are ordered correctly."""
+    values = np.concatenate([np.linspace(-50, -1, 500), np.zeros(100), np.linspace(1, 50, 400)])
+    sketch = DDSketch(0.02)
+    sketch.add(values)
+    assert_within_accuracy(sketch, values, 0.02)
+
+def test_merge_equals_single_sketch():
+    """Test merged minute sketches give the same quantiles as one sketch."""
+    values = np.random.default_rng(2).normal(22, 2, 6000)
+    whole = DDSketch()
+    whole.add(values)
+    merged = DDSketch()
+    for part in np.array_split(values, 60):
+        minute = DDSketch()
+        minute.add(part)
+        merged.merge(minute)
+    assert merged.quantiles(QUANTILES) == whole.quantiles(QUANTILES)
+    assert merged.count == whole.count and merged.sum == pytest.approx(whole.sum)
+
+def test_merge_rejects_different_accuracy():
+    """Test sketches with different accuracy cannot be merged."""
+    with pytest.raises(ValueError):
+        DDSketch(0.01).merge(DDSketch(0.02))
+
+def test_serialization_round_trip():
+    """Test a sketch survives to_bytes and from_bytes unchanged."""
+    sketch = DDSketch()
+    sketch.add(np.random.default_rng(3).normal(0, 10, 1000))
+    restored = DDSketch.from_bytes(sketch.to_bytes())
+    assert restored.quantiles(QUANTILES) == sketch.quantiles(QUANTILES)
+    assert (restored.count, restored.min, restored.max) == (sketch.count, sketch.min, sketch.max)
+
+def test_empty_sketch_has_no_quantiles():
+    """Test quantiles of an empty sketch are None."""
+    assert DDSketch().quantiles([0.5, 0.99]) == [None, None]
+
+def make_batch(sensor_ids, seconds, values):
+    timestamps = [BASE_TIME + timedelta(seconds=s) for s in seconds]
+    return ReadingBatch.from_columns('temperature', sensor_ids, timestamps, values)
+
+def test_aggregator_closes_windows_after_lateness():
+    """Test a window is emitted once readings pass its end plus the allowed lateness."""
+    aggregator = SketchAggregator(window_seconds=60, allowed_lateness=10)
+    first = aggregator.process(make_batch(
+        ['temp_sensor_1', 'temp_sensor_2'] * 30, range(60), np.arange(60, dtype=float)))
+    assert first == []
+
+    closed = aggregator.process(make_batch(['temp_sensor_1'], [75], [1.0]))
+    assert sorted(s.sensor_id for s in closed) == ['temp_sensor_1', 'temp_sensor_2']
+    assert all(s.window_start == BASE_TIME and s.window_end == BASE_TIME + timedelta(minutes=1)
+               for s in closed)
+    assert sum(s.sketch.count for s in closed) == 60
+
+    remaining = aggregator.flush()
+    assert [(s.sensor_id, s.window_start, s.sketch.count) for s in remaining] == [
+        ('temp_sensor_1', BASE_TIME + timedelta(minutes=1), 1)]
+
+def test_percentiles_from_minute_sketches():
+    """Test hourly percentiles are merged from serialized minute sketches."""
+    rng = np.random.default_rng(4)
+    hour = BASE_TIME.replace(minute=0)
+    values, rows = [], []
+    for minute in range(60):
+        minute_values = rng.normal(21, 1, 60)
+        values.append(minute_values)
+        sketch = DDSketch()
+        sketch.add(minute_values)
+        rows.append(('temp_sensor_1', hour, sketch.to_bytes()))
+    [result] = percentiles_from_sketches(rows)
+    assert result['sensor_id'] == 'temp_sensor_1' and result['count'] == 3600
+    exact = np.quantile(np.concatenate(values), [0.5, 0.95, 0.99], method='lower')
+    for name, truth in zip(['p50', 'p95', 'p99'], exact):
+        assert result[name] == pytest.approx(truth, rel=0.01)
+
+def test_fleet_rollups_merge_closed_sensor_sketches():
+    """Test closed sketches are merged into one rollup per sensor type and window."""
+    aggregator = SketchAggregator(window_seconds=60, allowed_lateness=0)
+    values = np.arange(180, dtype=float)
+    closed = aggregator.process(make_batch(['temp_sensor_1', 'temp_sensor_2', 'temp_sensor_3'] * 60,
+                                           np.repeat(range(0, 120, 2), 3).tolist(), values))
+    closed += aggregator.flush()
+    rollups = fleet_sketches(closed)
+    assert [(t, start, sensors, sketch.count) for t, start, _, sensors, sketch in rollups] == [
+        ('temperature', BASE_TIME, 3, 90), ('temperature', BASE_TIME + timedelta(minutes=1), 3, 90)]
+    whole = DDSketch()
+    whole.add(values)
+    merged = DDSketch()
+    for *_, sketch in rollups:
+        merged.merge(sketch)
+    assert merged.quantiles(QUANTILES) == whole.quantiles(QUANTILES)
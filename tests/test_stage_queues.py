@@ -0,0 +1,127 @@
+import pytest
+import threading
+from datetime import datetime
+from src.pipeline.queues import BoundedStageQueue
+
+def make_reading(sensor_id, value):
+    """Build a minimal reading for queue tests."""
+    return {
+        'sensor_id': sensor_id,
+        'value': value,
+        'timestamp': datetime.now(),
+        'location': 'room_1'
+    }
+
+def test_invalid_configuration():
+    """Test rejection of invalid capacity and policy."""
+    with pytest.raises(ValueError):
+        BoundedStageQueue('test', capacity=0)
+    with pytest.raises(ValueError):
+        BoundedStageQueue('test', policy='unknown')
+
+def test_fifo_order():
+    """Test that items come out in insertion order."""
+    queue = BoundedStageQueue('test', capacity=10)
+    readings = [make_reading(f'temp_sensor_{i}', i) for i in range(5)]
+    assert queue.put_many(readings) == 5
+    assert queue.get_batch(3) == readings[:3]
+    assert queue.get_batch(10) == readings[3:]
+
+    stats = queue.stats()
+    assert stats.enqueued == 5
+    assert stats.dequeued == 5
+    assert stats.depth == 0
+    assert stats.high_watermark == 5
+
+def test_block_policy_timeout():
+    """Test that a blocking put gives up after the timeout."""
+    queue = BoundedStageQueue('test', capacity=1, policy='block')
+    assert queue.put(make_reading('temp_sensor_1', 1.0))
+    assert queue.put(make_reading('temp_sensor_1', 2.0), timeout=0.05) is False
+
+    stats = queue.stats()
+    assert stats.dropped == 1
+    assert stats.blocked_seconds > 0
+
+def test_block_policy_unblocks_on_get():
+    """Test that a blocked producer resumes once the consumer drains."""
+    queue = BoundedStageQueue('test', capacity=1, policy='block')
+    queue.put(make_reading('temp_sensor_1', 1.0))
+
+    results = []
+    producer = threading.Thread(
+        target=lambda: results.append(queue.put(make_reading('temp_sensor_1', 2.0), timeout=5))
+    )
+    producer.start()
+    assert len(queue.get_batch(1)) == 1
+    producer.join()
+    assert results == [True]
+    assert queue.get_batch(1)[0]['value'] == 2.0
+
+def test_drop_oldest_policy():
+    """Test that the oldest reading is evicted on overflow."""
+    queue = BoundedStageQueue('test', capacity=2, policy='drop_oldest')
+    for value in range(4):
+        queue.put(make_reading('temp_sensor_1', value))
+
+    assert [r['value'] for r in queue.get_batch(10)] == [2, 3]
+    assert queue.stats().dropped == 2
+
+def test_drop_priority_policy():
+    """Test that low priority sensor types are shed first."""
+    queue = BoundedStageQueue('test', capacity=2, policy='drop_priority')
+    queue.put(make_reading('humidity_sensor_1', 40.0))
+    queue.put(make_reading('temp_sensor_1', 20.0))
+
+    # Motion outranks humidity, so humidity is evicted
+    assert queue.put(make_reading('motion_sensor_1', True))
+    # Another humidity reading ranks below everything queued and is rejected
+    assert queue.put(make_reading('humidity_sensor_2', 41.0)) is False
+
+    ids = [r['sensor_id'] for r in queue.get_batch(10)]
+    assert ids == ['temp_sensor_1', 'motion_sensor_1']
+    assert queue.stats().dropped == 2
+
+def test_coalesce_policy():
+    """Test that overload degrades to the latest value per sensor."""
+    queue = BoundedStageQueue('test', capacity=3, policy='coalesce')
+    queue.put(make_reading('temp_sensor_1', 1.0))
+    queue.put(make_reading('temp_sensor_2', 2.0))
+    queue.put(make_reading('temp_sensor_1', 3.0))
+    queue.put(make_reading('temp_sensor_2', 4.0))
+
+    batch = queue.get_batch(10)
+    assert [(r['sensor_id'], r['value']) for r in batch] == [
+        ('temp_sensor_1', 3.0),
+        ('temp_sensor_2', 4.0)
+    ]
+    assert queue.stats().coalesced == 2
+    assert queue.stats().dropped == 0
+
+def test_close():
+    """Test that a closed queue rejects puts and does not block gets."""
+    queue = BoundedStageQueue('test', capacity=2)
+    queue.close()
+    assert queue.put(make_reading('temp_sensor_1', 1.0)) is False
+    assert queue.get_batch(1, timeout=5) == []
+
+def test_priority_eviction_under_sustained_overload():
+    """Test a full queue keeps the newest high-priority readings without growing its backlog."""
+    queue = BoundedStageQueue('test', capacity=100, policy='drop_priority')
+    for i in range(5000):
+        queue.put(make_reading(f"humidity_sensor_{i}", 40.0))
+        queue.put(make_reading(f"motion_sensor_{i}", True))
+    assert len(queue) == 100 and len(queue._items) <= 200
+    batch = queue.get_batch(1000)
+    assert {r['sensor_id'].split('_')[0] for r in batch} == {'motion'}
+    assert len(batch) == 100 and queue._by_priority == {}
+
+def test_coalesce_indexes_are_released_on_dequeue():
+    """Test drained readings leave nothing behind in the coalescing indexes."""
+    queue = BoundedStageQueue('test', capacity=10, policy='coalesce')
+    for round_ in range(50):
+        queue.put_many(make_reading(f"temp_sensor_{i % 3}", round_) for i in range(6))
+        assert len(queue.get_batch(6)) == 6
+    assert queue._latest == {} and len(queue._superseded) <= 20
+    stats = queue.stats()
+    assert (stats.coalesced, stats.dropped, stats.depth) == (0, 0, 0)
@@ -0,0 +1,87 @@
+import pytest
+import psycopg2
+from datetime import datetime
+from src.processors.ingest import merge_staging
+
+SCHEMA = 'staging_merge_test'
+
+@pytest.fixture
+def merge_db(db_params):
+    """A connection whose search_path holds a private copy of the motion tables."""
+    try:
+        conn = psycopg2.connect(**db_params)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        cur.execute("CREATE TABLE sensors (sensor_id VARCHAR(50) PRIMARY KEY)")
+        cur.execute("""
+            CREATE TABLE motion_events (
+                sensor_id VARCHAR(50) NOT NULL,
+                detected BOOLEAN NOT NULL,
+                timestamp TIMESTAMP NOT NULL
+            ) PARTITION BY RANGE (timestamp)
+        """)
+        cur.execute("""
+            CREATE TABLE motion_events_p2024_04 PARTITION OF motion_events
+            FOR VALUES FROM ('2024-04-01') TO ('2024-05-01')
+        """)
+        cur.execute("""
+            CREATE TABLE motion_events_p2024_05 PARTITION OF motion_events
+            FOR VALUES FROM ('2024-05-01') TO ('2024-06-01')
+        """)
+        cur.execute("""
+            CREATE TABLE motion_events_staging (
+                sensor_id VARCHAR(50) NOT NULL,
+                detected BOOLEAN NOT NULL,
+                timestamp TIMESTAMP NOT NULL
+            )
+        """)
+    conn.commit()
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+def rows(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT sensor_id, timestamp, detected FROM {table} ORDER BY sensor_id, timestamp")
+        return cur.fetchall()
+
+def test_merge_routes_deduplicates_and_keeps_unmergeable_rows(merge_db):
+    """Test staged rows land once in their partition and orphans or unpartitioned rows stay staged."""
+    with merge_db.cursor() as cur:
+        cur.execute("INSERT INTO sensors VALUES ('motion_sensor_1'), ('motion_sensor_2')")
+        cur.execute("INSERT INTO motion_events VALUES ('motion_sensor_1', true, '2024-05-01 12:00')")
+        cur.execute("""
+            INSERT INTO motion_events_staging (sensor_id, detected, timestamp) VALUES
+                ('motion_sensor_1', true, '2024-05-01 12:00'),
+                ('motion_sensor_1', false, '2024-05-01 12:01'),
+                ('motion_sensor_1', false, '2024-05-01 12:01'),
+                ('motion_sensor_2', true, '2024-04-30 23:59'),
+                ('hall_pir', true, '2024-05-01 12:02'),
+                ('motion_sensor_1', true, '2024-06-01 00:00')
+        """)
+    merge_db.commit()
+
+    assert merge_staging(merge_db, 'motion') == 2
+    assert rows(merge_db, 'motion_events_p2024_04') == [('motion_sensor_2', datetime(2024, 4, 30, 23, 59), True)]
+    assert rows(merge_db, 'motion_events_p2024_05') == [
+        ('motion_sensor_1', datetime(2024, 5, 1, 12, 0), True),
+        ('motion_sensor_1', datetime(2024, 5, 1, 12, 1), False)
+    ]
+    assert rows(merge_db, 'motion_events_staging') == [
+        ('hall_pir', datetime(2024, 5, 1, 12, 2), True),
+        ('motion_sensor_1', datetime(2024, 6, 1), True)
+    ]
+
+    # Once registered, the orphan merges on the next run
+    with merge_db.cursor() as cur:
+        cur.execute("INSERT INTO sensors VALUES ('hall_pir')")
+    merge_db.commit()
+    assert merge_staging(merge_db, 'motion') == 1
+    assert rows(merge_db, 'motion_events_staging') == [('motion_sensor_1', datetime(2024, 6, 1), True)]
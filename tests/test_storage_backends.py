@@ -0,0 +1,109 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from src.storage.base import ReadingBatch, create_backend
+from src.storage.parquet_backend import ParquetBackend
+
+def sensor_type(sensor_id):
+    """Resolve sensor types for test readings."""
+    return {'temp': 'temperature', 'humidity': 'humidity', 'motion': 'motion'}.get(sensor_id.split('_')[0])
+
+@pytest.fixture
+def backend(tmp_path):
+    """Create a Parquet backend in a temporary directory."""
+    backend = ParquetBackend(str(tmp_path), flush_rows=1000)
+    yield backend
+    backend.close()
+
+@pytest.fixture
+def base_time():
+    """A fixed start time spanning a day boundary."""
+    return datetime(2024, 3, 1, 22, 0, 0)
+
+def temperature_batch(base_time, hours=4):
+    """Two sensors reporting every 10 minutes."""
+    ids, timestamps, values = [], [], []
+    for step in range(hours * 6):
+        for sensor in (1, 2):
+            ids.append(f'temp_sensor_{sensor}')
+            timestamps.append(base_time + timedelta(minutes=10 * step))
+            values.append(20.0 + sensor + step * 0.1)
+    return ReadingBatch.from_columns('temperature', ids, timestamps, values)
+
+def test_batch_from_readings(base_time):
+    """Test grouping reading dicts into typed batches."""
+    readings = [
+        {'sensor_id': 'temp_sensor_1', 'timestamp': base_time, 'value': 21.5},
+        {'sensor_id': 'motion_sensor_1', 'timestamp': base_time, 'value': True},
+        {'sensor_id': 'temp_sensor_2', 'timestamp': base_time, 'value': 22.5},
+        {'sensor_id': 'unknown_sensor_1', 'timestamp': base_time, 'value': 1.0}
+    ]
+    batches = ReadingBatch.from_readings(readings, sensor_type)
+    assert set(batches) == {'temperature', 'motion'}
+    assert batches['temperature'].sensor_ids.tolist() == ['temp_sensor_1', 'temp_sensor_2']
+    assert batches['temperature'].values.dtype == np.float64
+    assert batches['motion'].values.dtype == np.bool_
+    assert list(batches['temperature'].rows())[0] == ('temp_sensor_1', base_time, 21.5)
+
+def test_unknown_backend():
+    """Test that unknown backend names are rejected."""
+    with pytest.raises(ValueError):
+        create_backend('unknown')
+
+def test_parquet_partitions_by_day(backend, base_time, tmp_path):
+    """Test that files are written per sensor type and day."""
+    backend.write_batch(temperature_batch(base_time))
+    backend.flush()
+    days = sorted(p.name for p in (tmp_path / 'temperature').iterdir())
+    assert days == ['date=2024-03-01', 'date=2024-03-02']
+
+def test_parquet_query_range(backend, base_time):
+    """Test range queries with sensor filtering."""
+    backend.write_batch(temperature_batch(base_time))
+    start = base_time + timedelta(hours=1)
+    end = base_time + timedelta(hours=3)
+
+    batch = backend.query_range('temperature', start, end)
+    assert len(batch) == 2 * 12
+    assert batch.timestamps.min() >= np.datetime64(start)
+    assert batch.timestamps.max() < np.datetime64(end)
+    assert np.all(np.diff(batch.timestamps.astype(np.int64)) >= 0)
+
+    only_one = backend.query_range('temperature', start, end, sensor_ids=['temp_sensor_2'])
+    assert set(only_one.sensor_ids.tolist()) == {'temp_sensor_2'}
+
+def test_parquet_latest(backend, base_time):
+    """Test latest reading per sensor."""
+    backend.write_batch(temperature_batch(base_time))
+    latest = backend.latest('temperature')
+    assert latest.sensor_ids.tolist() == ['temp_sensor_1', 'temp_sensor_2']
+    expected_time = np.datetime64(base_time + timedelta(minutes=10 * 23))
+    assert np.all(latest.timestamps == expected_time)
+    assert latest.values[1] == pytest.approx(22.0 + 2.3)
+
+def test_parquet_aggregate(backend, base_time):
+    """Test hourly aggregation."""
+    backend.write_batch(temperature_batch(base_time))
+    rows = backend.aggregate('temperature', base_time, base_time + timedelta(hours=4), 'hour')
+    assert len(rows) == 2 * 4
+    first = rows[0]
+    assert first['sensor_id'] == 'temp_sensor_1'
+    assert first['bucket'] == base_time
+    assert first['count'] == 6
+    assert first['min'] == pytest.approx(21.0)
+    assert first['max'] == pytest.approx(21.5)
+
+    with pytest.raises(ValueError):
+        backend.aggregate('temperature', base_time, base_time, 'week')
+
+def test_parquet_motion_aggregate(backend, base_time):
+    """Test that motion aggregates report the detection share."""
+    batch = ReadingBatch.from_columns(
+        'motion',
+        ['motion_sensor_1'] * 4,
+        [base_time + timedelta(minutes=i) for i in range(4)],
+        [True, False, True, True]
+    )
+    backend.write_batch(batch)
+    rows = backend.aggregate('motion', base_time, base_time + timedelta(hours=1))
+    assert rows[0]['avg'] == pytest.approx(0.75)
@@ -0,0 +1,150 @@
+import pytest
+from datetime import datetime, timedelta
+from src.pipeline.registry import SensorRegistry
+from src.processors.sensor_processor import SensorProcessor
+from src.storage.base import ReadingBatch, create_backend
+from src.transport.base import InMemoryTransport, create_transport
+from src.transport.producer import SensorGateway
+
+def produce(transport, topic, count, prefix='sensor'):
+    """Produce count keyed messages to topic."""
+    producer = transport.create_producer()
+    for i in range(count):
+        producer.produce(topic, value=f"{i}".encode(), key=f"{prefix}_{i}")
+    producer.flush()
+
+def test_consumer_group_splits_partitions():
+    """Test consumers of one group share partitions without duplicates."""
+    transport = InMemoryTransport(num_partitions=4)
+    produce(transport, 'temperature_data', 100)
+    config = {'group.id': 'g', 'auto.offset.reset': 'earliest'}
+    first = transport.create_consumer(config)
+    second = transport.create_consumer(config)
+    first.subscribe(['temperature_data'])
+    second.subscribe(['temperature_data'])
+
+    values = [msg.value() for msg in first.consume(1000, 0) + second.consume(1000, 0)]
+    assert len(values) == 100
+    assert len(set(values)) == 100
+    assert len(first.assignment()) == len(second.assignment()) == 2
+
+def test_consumer_group_rebalances_on_leave():
+    """Test a remaining consumer takes over partitions at their committed offsets."""
+    transport = InMemoryTransport(num_partitions=2)
+    config = {'group.id': 'g', 'auto.offset.reset': 'earliest'}
+    first = transport.create_consumer(config)
+    second = transport.create_consumer(config)
+    first.subscribe(['motion_data'])
+    second.subscribe(['motion_data'])
+    produce(transport, 'motion_data', 50)
+
+    consumed = len(first.consume(1000, 0)) + len(second.consume(1000, 0))
+    second.close()
+    produce(transport, 'motion_data', 50, prefix='late')
+    consumed += len(first.consume(1000, 0))
+    assert consumed == 100
+    assert len(first.assignment()) == 2
+
+def test_manual_commit_redelivers_uncommitted():
+    """Test offsets only advance for a new consumer after commit."""
+    transport = InMemoryTransport(num_partitions=1)
+    produce(transport, 'humidity_data', 10)
+    config = {'group.id': 'g', 'auto.offset.reset': 'earliest', 'enable.auto.commit': False}
+    consumer = transport.create_consumer(config)
+    consumer.subscribe(['humidity_data'])
+    messages = consumer.consume(4, 0)
+    consumer.commit(messages[-1])
+    consumer.consume(4, 0)
+    consumer.close()
+
+    restarted = transport.create_consumer(config)
+    restarted.subscribe(['humidity_data'])
+    assert [msg.offset() for msg in restarted.consume(100, 0)] == list(range(4, 10))
+
+def test_create_transport_rejects_unknown():
+    """Test unknown transport names raise ValueError."""
+    with pytest.raises(ValueError):
+        create_transport('carrier-pigeon')
+
+@pytest.mark.parametrize('encoding', ['json', 'binary'])
+def test_sensor_processor_end_to_end(tmp_path, encoding):
+    """Test readings flow producer -> in-memory broker -> SensorProcessor -> Parquet."""
+    transport = InMemoryTransport(num_partitions=3)
+    backend = create_backend('parquet', root_path=str(tmp_path))
+    processor = SensorProcessor(transport=transport, backends=[backend])
+    processor.codec.encodings = {'temperature': encoding}
+    processor.batch_timeout = 0
+
+    base_time = datetime(2024, 5, 1, 12, 0)
+    batch = ReadingBatch.from_columns(
+        'temperature',
+        [f'temp_sensor_{i % 4}' for i in range(40)],
+        [base_time + timedelta(seconds=i) for i in range(40)],
+        [20.0 + i for i in range(40)]
+    )
+    gateway = SensorGateway(transport.create_producer(), processor.codec, processor.topic_map)
+    gateway.publish_batch(batch)
+    gateway.close()
+
+    processor.run(until_idle=True)
+    assert processor.readings_processed == 40
+    stored = backend.query_range('temperature', base_time, base_time + timedelta(hours=1))
+    assert sorted(stored.values.tolist()) == batch.values.tolist()
+
+def test_sensor_processor_skips_only_poison_messages(tmp_path):
+    """Test a consumed batch with malformed messages still stores every good reading."""
+    transport = InMemoryTransport(num_partitions=1)
+    backend = create_backend('parquet', root_path=str(tmp_path))
+    processor = SensorProcessor(transport=transport, backends=[backend])
+    processor.batch_timeout = 0
+
+    base_time = datetime(2024, 5, 1, 12, 0)
+    good = ReadingBatch.from_columns(
+        'humidity',
+        [f'humidity_sensor_{i}' for i in range(5)],
+        [base_time + timedelta(seconds=i) for i in range(5)],
+        [40.0 + i for i in range(5)]
+    )
+    topic = processor.topic_map['humidity']
+    producer = transport.create_producer()
+    payloads = processor.codec.encode(good)
+    payloads.insert(2, b'{"sensor_id": "humidity_sensor_9", "value": 41.0, "timestamp": "not-a-date"}')
+    payloads.insert(4, b'\x00garbage')
+    for payload in payloads:
+        producer.produce(topic, value=payload, key='humidity')
+    producer.flush()
+
+    processor.run(until_idle=True)
+    assert processor.readings_processed == 5
+    stored = backend.query_range('humidity', base_time, base_time + timedelta(hours=1))
+    assert sorted(stored.values.tolist()) == good.values.tolist()
+
+def test_sensor_processor_registers_unknown_sensors_before_storing(tmp_path):
+    """Test consumed readings of new sensors are registered before any backend write."""
+    events = []
+
+    class RecordingRegistry(SensorRegistry):
+        def register_batch(self, batch):
+            events.append(('register', batch.sensor_ids.tolist()))
+            return super().register_batch(batch)
+
+    class RecordingBackend:
+        def write_batch(self, batch):
+            events.append(('write', len(batch)))
+
+        def close(self):
+            pass
+
+    transport = InMemoryTransport(num_partitions=1)
+    registry = RecordingRegistry()
+    processor = SensorProcessor(transport=transport, backends=[RecordingBackend()], registry=registry)
+    processor.batch_timeout = 0
+    processor.ingest_filter = None
+    batch = ReadingBatch.from_columns('motion', ['hall_pir'], [datetime(2024, 5, 1)], [True])
+    gateway = SensorGateway(transport.create_producer(), processor.codec, processor.topic_map)
+    gateway.publish_batch(batch)
+    gateway.close()
+
+    processor.run(until_idle=True)
+    assert events == [('register', ['hall_pir']), ('write', 1)]
+    assert registry.sensor_type('hall_pir') == 'motion' and 'hall_pir' in registry